@@ -29,6 +29,7 @@ from app.schemas.accounts_payable import (
     SupplierSummary,
     APCategoryAnalysis,
 )
+from app.services.supplier_invoice_stats import SupplierInvoiceStats
 
 router = APIRouter()
 
@@ -179,6 +180,7 @@ def create_invoice(
         created_by=current_user.id
     )
     db.add(db_invoice)
+    SupplierInvoiceStats(db).record_invoice(db_invoice)
     db.commit()
     db.refresh(db_invoice)
     return db_invoice
@@ -15,6 +15,7 @@ Data: 2025-01-30
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func, extract, case
 from typing import List, Optional
@@ -23,6 +24,15 @@ from datetime import datetime, date, timedelta
 from app.core.deps import get_current_user, get_db
 from app.models.user import User
 from app.models.cash_flow import BankAccount, CashFlowTransaction, TransactionType
+from app.services.cash_flow_ledger import CashFlowLedger
+from app.services.financial_facts import MonthlyFinancialFacts
+from app.services.cash_flow_export import (
+    EXPORT_MEDIA_TYPES,
+    export_filename,
+    export_rows,
+    stream_csv,
+    stream_xlsx,
+)
 from app.schemas.cash_flow import (
     # Bank Account
     BankAccountCreate,
@@ -42,6 +52,7 @@ from app.schemas.cash_flow import (
     CashFlowProjection,
     CashFlowAnalytics,
     TransactionTypeEnum,
+    TransactionExportFormatEnum,
 )
 
 router = APIRouter()
@@ -248,6 +259,12 @@ def create_transaction(
     )
 
     db.add(db_transaction)
+    db.flush()
+
+    # Atualizar ledger diário e cubo mensal na mesma transação do banco
+    CashFlowLedger(db).record_transaction(db_transaction)
+    MonthlyFinancialFacts(db).record_transaction(db_transaction)
+
     db.commit()
     db.refresh(db_transaction)
 
@@ -277,42 +294,53 @@ def get_transactions(
 
     Retorna lista de transações com filtros opcionais.
     """
-    query = db.query(CashFlowTransaction).filter(
-        CashFlowTransaction.workspace_id == current_user.workspace_id
+    query = _filter_transactions(
+        db, current_user.workspace_id, start_date, end_date, type, category, account_id, is_reconciled, search
     )
 
-    # Aplicar filtros
-    if start_date:
-        query = query.filter(CashFlowTransaction.transaction_date >= datetime.combine(start_date, datetime.min.time()))
-
-    if end_date:
-        query = query.filter(CashFlowTransaction.transaction_date <= datetime.combine(end_date, datetime.max.time()))
-
-    if type:
-        query = query.filter(CashFlowTransaction.type == type.value)
+    query = query.order_by(CashFlowTransaction.transaction_date.desc(), CashFlowTransaction.created_at.desc())
+    transactions = query.offset(skip).limit(limit).all()
 
-    if category:
-        query = query.filter(CashFlowTransaction.category == category)
+    return transactions
 
-    if account_id:
-        query = query.filter(CashFlowTransaction.account_id == account_id)
 
-    if is_reconciled is not None:
-        query = query.filter(CashFlowTransaction.is_reconciled == is_reconciled)
+@router.get("/transactions/export")
+def export_transactions(
+    format: TransactionExportFormatEnum = Query(TransactionExportFormatEnum.CSV, description="Formato do arquivo"),
+    start_date: Optional[date] = Query(None, description="Data inicial"),
+    end_date: Optional[date] = Query(None, description="Data final"),
+    type: Optional[TransactionTypeEnum] = Query(None, description="Tipo de transação"),
+    category: Optional[str] = Query(None, description="Categoria"),
+    account_id: Optional[int] = Query(None, description="ID da conta"),
+    is_reconciled: Optional[bool] = Query(None, description="Filtrar por reconciliação"),
+    search: Optional[str] = Query(None, description="Busca textual"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Exportar movimentações financeiras (CSV ou XLSX)
 
-    if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            or_(
-                CashFlowTransaction.description.ilike(search_filter),
-                CashFlowTransaction.notes.ilike(search_filter)
-            )
-        )
+    Aceita os mesmos filtros da listagem, sem limite de linhas. O arquivo é
+    gerado em streaming a partir de um cursor no banco, com memória constante
+    independente da quantidade de transações.
+    """
+    query = _filter_transactions(
+        db, current_user.workspace_id, start_date, end_date, type, category, account_id, is_reconciled, search
+    ).order_by(
+        CashFlowTransaction.transaction_date.desc(),
+        CashFlowTransaction.created_at.desc(),
+        CashFlowTransaction.id.desc()
+    )
 
-    query = query.order_by(CashFlowTransaction.transaction_date.desc(), CashFlowTransaction.created_at.desc())
-    transactions = query.offset(skip).limit(limit).all()
+    rows = export_rows(query)
+    content = stream_csv(rows) if format == TransactionExportFormatEnum.CSV else stream_xlsx(rows)
+    filename = export_filename(format.value, date.today())
 
-    return transactions
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_MEDIA_TYPES[format.value],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 
 @router.get("/transactions/{transaction_id}", response_model=CashFlowTransactionResponse)
@@ -371,6 +399,8 @@ def update_transaction(
     old_value = db_transaction.value
     old_type = db_transaction.type
     old_account_id = db_transaction.account_id
+    old_transaction_date = db_transaction.transaction_date
+    old_category = db_transaction.category
 
     update_data = transaction_update.dict(exclude_unset=True)
 
@@ -385,6 +415,24 @@ def update_transaction(
     value_changed = 'value' in update_data and update_data['value'] != old_value
     type_changed = 'type' in update_data and update_data['type'] != old_type
     account_changed = 'account_id' in update_data and update_data['account_id'] != old_account_id
+    date_changed = 'transaction_date' in update_data and update_data['transaction_date'] != old_transaction_date
+    category_changed = 'category' in update_data and update_data['category'] != old_category
+
+    # Atualizar ledger diário (data também afeta o saldo diário)
+    if value_changed or type_changed or account_changed or date_changed:
+        ledger = CashFlowLedger(db)
+        ledger.revert_movement(
+            db_transaction.workspace_id, old_account_id, old_transaction_date, old_type, old_value
+        )
+        ledger.record_transaction(db_transaction)
+
+    # Atualizar cubo mensal (categoria também define a linha do DRE)
+    if value_changed or type_changed or account_changed or date_changed or category_changed:
+        facts = MonthlyFinancialFacts(db)
+        facts.revert_movement(
+            db_transaction.workspace_id, old_account_id, old_transaction_date, old_type, old_category, old_value
+        )
+        facts.record_transaction(db_transaction)
 
     if value_changed or type_changed or account_changed:
         # Reverter impacto da transação antiga
@@ -425,6 +473,23 @@ def delete_transaction(
             detail=f"Transaction with id {transaction_id} not found"
         )
 
+    # Reverter impacto no ledger diário e no cubo mensal
+    CashFlowLedger(db).revert_movement(
+        db_transaction.workspace_id,
+        db_transaction.account_id,
+        db_transaction.transaction_date,
+        db_transaction.type,
+        db_transaction.value
+    )
+    MonthlyFinancialFacts(db).revert_movement(
+        db_transaction.workspace_id,
+        db_transaction.account_id,
+        db_transaction.transaction_date,
+        db_transaction.type,
+        db_transaction.category,
+        db_transaction.value
+    )
+
     # Reverter impacto no saldo
     if db_transaction.account_id:
         _revert_account_balance(
@@ -520,6 +585,18 @@ def create_transfer(
     )
 
     db.add(entry_transaction)
+    db.flush()
+
+    # Atualizar ledger diário das duas contas
+    ledger = CashFlowLedger(db)
+    ledger.record_transaction(exit_transaction)
+    ledger.record_transaction(entry_transaction)
+
+    # Atualizar cubo mensal
+    facts = MonthlyFinancialFacts(db)
+    facts.record_transaction(exit_transaction)
+    facts.record_transaction(entry_transaction)
+
     db.commit()
 
     # Atualizar saldos
@@ -539,6 +616,52 @@ def create_transfer(
 # HELPER FUNCTIONS
 # ============================================
 
+def _filter_transactions(
+    db: Session,
+    workspace_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    type: Optional[TransactionTypeEnum] = None,
+    category: Optional[str] = None,
+    account_id: Optional[int] = None,
+    is_reconciled: Optional[bool] = None,
+    search: Optional[str] = None
+):
+    """Query de transações do workspace com os filtros da listagem/exportação"""
+    query = db.query(CashFlowTransaction).filter(
+        CashFlowTransaction.workspace_id == workspace_id
+    )
+
+    if start_date:
+        query = query.filter(CashFlowTransaction.transaction_date >= datetime.combine(start_date, datetime.min.time()))
+
+    if end_date:
+        query = query.filter(CashFlowTransaction.transaction_date <= datetime.combine(end_date, datetime.max.time()))
+
+    if type:
+        query = query.filter(CashFlowTransaction.type == type.value)
+
+    if category:
+        query = query.filter(CashFlowTransaction.category == category)
+
+    if account_id:
+        query = query.filter(CashFlowTransaction.account_id == account_id)
+
+    if is_reconciled is not None:
+        query = query.filter(CashFlowTransaction.is_reconciled == is_reconciled)
+
+    if search:
+        search_filter = f"%{search}%"
+        query = query.filter(
+            or_(
+                CashFlowTransaction.description.ilike(search_filter),
+                CashFlowTransaction.notes.ilike(search_filter)
+            )
+        )
+
+    return query
+
+
 def _update_account_balance(db: Session, account_id: int, value: float, transaction_type: str):
     """
     Atualiza o saldo de uma conta bancária.
@@ -18,10 +18,11 @@ Data: 2025-01-30
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func, extract, case, desc
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict
 from datetime import datetime, date, timedelta
-from collections import defaultdict
+import itertools
 import logging
+import numpy as np
 
 from app.core.deps import get_current_user, get_db
 
@@ -29,7 +30,11 @@ logger = logging.getLogger(__name__)
 from app.models.user import User
 from app.models.cash_flow import BankAccount, CashFlowTransaction, TransactionType
 from app.models.accounts_receivable import AccountsReceivable
-from app.models.accounts_payable import AccountsPayableInvoice
+from app.models.accounts_payable import AccountsPayableInvoice, InvoiceStatus
+from app.services.cash_flow_aggregator import CashFlowAggregator
+from app.services.cash_flow_ledger import CashFlowLedger
+from app.services.scenario_engine import ScenarioBatch, project_scenarios, to_projection_points
+from app.services.cash_flow_monte_carlo import MonteCarloInputs, run_simulation
 from app.schemas.cash_flow import (
     CashFlowSummary,
     CategorySummary,
@@ -43,7 +48,6 @@ from app.schemas.cash_flow import (
     BreakEvenPoint,
     ScenarioTypeEnum,
     ScenarioPremises,
-    ScenarioProjectionPoint,
     ScenarioAnalysisResult,
     ScenarioComparisonRequest,
     ScenarioComparisonResponse,
@@ -52,6 +56,12 @@ from app.schemas.cash_flow import (
     SimulationResult,
     SimulationRequest,
     SimulationComparison,
+    MonteCarloRequest,
+    MonteCarloBandPoint,
+    MonteCarloResponse,
+    ScenarioSensitivityRequest,
+    ScenarioSensitivityPoint,
+    ScenarioSensitivityResponse,
     AlertTypeEnum,
     AlertSeverityEnum,
     Alert,
@@ -63,6 +73,13 @@ from app.schemas.cash_flow import (
 
 router = APIRouter()
 
+# Categorias consideradas custos FIXOS (break-even)
+FIXED_COST_KEYWORDS = [
+    'aluguel', 'salário', 'salario', 'folha', 'seguro', 'licença', 'licenca',
+    'assinatura', 'contador', 'advogado', 'consultoria', 'internet', 'telefone',
+    'energia', 'água', 'agua', 'condomínio', 'condominio', 'iptu', 'alvará', 'alvara'
+]
+
 
 # ============================================
 # ANALYTICS ENDPOINTS
@@ -81,27 +98,17 @@ def get_cash_flow_summary(
 
     Retorna KPIs principais: entradas, saídas, fluxo líquido, médias diárias.
     """
-    # Query base
-    query = db.query(CashFlowTransaction).filter(
-        and_(
-            CashFlowTransaction.workspace_id == current_user.workspace_id,
-            CashFlowTransaction.transaction_date >= datetime.combine(start_date, datetime.min.time()),
-            CashFlowTransaction.transaction_date <= datetime.combine(end_date, datetime.max.time())
-        )
+    # Calcular métricas (agregação no banco)
+    totals = CashFlowAggregator(db).type_totals(
+        current_user.workspace_id, start_date, end_date, account_id
     )
 
-    if account_id:
-        query = query.filter(CashFlowTransaction.account_id == account_id)
-
-    transactions = query.all()
-
-    # Calcular métricas
-    total_entries = sum(t.value for t in transactions if t.type == TransactionType.ENTRADA.value)
-    total_exits = sum(t.value for t in transactions if t.type == TransactionType.SAIDA.value)
-    entries_count = sum(1 for t in transactions if t.type == TransactionType.ENTRADA.value)
-    exits_count = sum(1 for t in transactions if t.type == TransactionType.SAIDA.value)
+    total_entries = totals.total_entries
+    total_exits = totals.total_exits
+    entries_count = totals.entries_count
+    exits_count = totals.exits_count
 
-    net_flow = total_entries - total_exits
+    net_flow = totals.net_flow
 
     # Calcular dias no período
     days_in_period = (end_date - start_date).days + 1
@@ -146,51 +153,35 @@ def get_by_category(
 
     Agrupa transações por categoria mostrando totais e percentuais.
     """
-    query = db.query(CashFlowTransaction).filter(
-        and_(
-            CashFlowTransaction.workspace_id == current_user.workspace_id,
-            CashFlowTransaction.transaction_date >= datetime.combine(start_date, datetime.min.time()),
-            CashFlowTransaction.transaction_date <= datetime.combine(end_date, datetime.max.time())
-        )
+    # Agrupar por categoria (GROUP BY no banco)
+    category_rows = CashFlowAggregator(db).category_totals(
+        current_user.workspace_id,
+        start_date,
+        end_date,
+        type.value if type else None
     )
 
-    if type:
-        query = query.filter(CashFlowTransaction.type == type.value)
-
-    transactions = query.all()
-
-    # Agrupar por categoria
-    category_data: Dict[tuple, Dict[str, Any]] = defaultdict(lambda: {
-        'total_value': 0.0,
-        'transaction_count': 0,
-        'type': None
-    })
-
     total_by_type = {
         TransactionType.ENTRADA.value: 0.0,
         TransactionType.SAIDA.value: 0.0
     }
 
-    for t in transactions:
-        key = (t.category, t.subcategory, t.type)
-        category_data[key]['total_value'] += t.value
-        category_data[key]['transaction_count'] += 1
-        category_data[key]['type'] = t.type
-        total_by_type[t.type] += t.value
+    for row in category_rows:
+        total_by_type[row.type] += row.total_value
 
     # Converter para lista de CategorySummary
     result = []
-    for (category, subcategory, trans_type), data in category_data.items():
-        total_for_type = total_by_type[trans_type]
-        percentage = (data['total_value'] / total_for_type * 100) if total_for_type > 0 else 0
-        avg_value = data['total_value'] / data['transaction_count'] if data['transaction_count'] > 0 else 0
+    for row in category_rows:
+        total_for_type = total_by_type[row.type]
+        percentage = (row.total_value / total_for_type * 100) if total_for_type > 0 else 0
+        avg_value = row.total_value / row.transaction_count if row.transaction_count > 0 else 0
 
         result.append(CategorySummary(
-            category=category,
-            subcategory=subcategory,
-            type=TransactionTypeEnum(trans_type),
-            total_value=data['total_value'],
-            transaction_count=data['transaction_count'],
+            category=row.category,
+            subcategory=row.subcategory,
+            type=TransactionTypeEnum(row.type),
+            total_value=row.total_value,
+            transaction_count=row.transaction_count,
             percentage=percentage,
             avg_value=avg_value
         ))
@@ -227,20 +218,17 @@ def get_by_account(
     if not end_date:
         end_date = date.today()
 
+    # Movimentações do período de todas as contas em uma única query
+    totals_by_account = CashFlowAggregator(db).account_totals(
+        current_user.workspace_id, start_date, end_date
+    )
+
     result = []
     for account in accounts:
-        # Calcular movimentações do período
-        transactions = db.query(CashFlowTransaction).filter(
-            and_(
-                CashFlowTransaction.workspace_id == current_user.workspace_id,
-                CashFlowTransaction.account_id == account.id,
-                CashFlowTransaction.transaction_date >= datetime.combine(start_date, datetime.min.time()),
-                CashFlowTransaction.transaction_date <= datetime.combine(end_date, datetime.max.time())
-            )
-        ).all()
+        totals = totals_by_account.get(account.id)
 
-        month_entries = sum(t.value for t in transactions if t.type == TransactionType.ENTRADA.value)
-        month_exits = sum(t.value for t in transactions if t.type == TransactionType.SAIDA.value)
+        month_entries = totals.total_entries if totals else 0.0
+        month_exits = totals.total_exits if totals else 0.0
         month_net_flow = month_entries - month_exits
 
         result.append(AccountBalanceSummary(
@@ -269,33 +257,11 @@ def get_balance_history(
 
     Retorna o saldo e movimentações para cada dia do período.
     """
-    # Obter todas as transações do período
-    query = db.query(CashFlowTransaction).filter(
-        and_(
-            CashFlowTransaction.workspace_id == current_user.workspace_id,
-            CashFlowTransaction.transaction_date >= datetime.combine(start_date, datetime.min.time()),
-            CashFlowTransaction.transaction_date <= datetime.combine(end_date, datetime.max.time())
-        )
+    # Movimentações diárias do período (range scan no ledger diário)
+    daily_data = CashFlowLedger(db).daily_movements(
+        current_user.workspace_id, start_date, end_date, account_id
     )
 
-    if account_id:
-        query = query.filter(CashFlowTransaction.account_id == account_id)
-
-    transactions = query.all()
-
-    # Agrupar por data
-    daily_data: Dict[date, Dict[str, float]] = defaultdict(lambda: {
-        'entries': 0.0,
-        'exits': 0.0
-    })
-
-    for t in transactions:
-        trans_date = t.transaction_date.date()
-        if t.type == TransactionType.ENTRADA.value:
-            daily_data[trans_date]['entries'] += t.value
-        else:
-            daily_data[trans_date]['exits'] += t.value
-
     # Calcular saldo inicial
     initial_balance = _calculate_balance_at_date(
         db,
@@ -310,15 +276,17 @@ def get_balance_history(
     current_date = start_date
 
     while current_date <= end_date:
-        day_data = daily_data.get(current_date, {'entries': 0.0, 'exits': 0.0})
-        net_flow = day_data['entries'] - day_data['exits']
+        day_data = daily_data.get(current_date)
+        entries = day_data.entries if day_data else 0.0
+        exits = day_data.exits if day_data else 0.0
+        net_flow = entries - exits
         current_balance += net_flow
 
         result.append(BalanceHistory(
             date=current_date,
             balance=current_balance,
-            entries=day_data['entries'],
-            exits=day_data['exits'],
+            entries=entries,
+            exits=exits,
             net_flow=net_flow
         ))
 
@@ -344,26 +312,14 @@ def get_projection(
     end_date = date.today()
     start_date = end_date - timedelta(days=90)
 
-    query = db.query(CashFlowTransaction).filter(
-        and_(
-            CashFlowTransaction.workspace_id == current_user.workspace_id,
-            CashFlowTransaction.transaction_date >= datetime.combine(start_date, datetime.min.time()),
-            CashFlowTransaction.transaction_date <= datetime.combine(end_date, datetime.max.time())
-        )
+    totals = CashFlowAggregator(db).type_totals(
+        current_user.workspace_id, start_date, end_date, account_id
     )
 
-    if account_id:
-        query = query.filter(CashFlowTransaction.account_id == account_id)
-
-    transactions = query.all()
-
     # Calcular médias
-    total_entries = sum(t.value for t in transactions if t.type == TransactionType.ENTRADA.value)
-    total_exits = sum(t.value for t in transactions if t.type == TransactionType.SAIDA.value)
-
     days_count = 90
-    avg_daily_entry = total_entries / days_count
-    avg_daily_exit = total_exits / days_count
+    avg_daily_entry = totals.total_entries / days_count
+    avg_daily_exit = totals.total_exits / days_count
 
     # Saldo atual
     current_balance = _calculate_balance_at_date(db, current_user.workspace_id, end_date, account_id)
@@ -471,16 +427,12 @@ def get_financial_kpis(
     ).scalar() or 0.0
 
     # Transações do período
-    transactions = db.query(CashFlowTransaction).filter(
-        and_(
-            CashFlowTransaction.workspace_id == current_user.workspace_id,
-            CashFlowTransaction.transaction_date >= datetime.combine(start_date, datetime.min.time()),
-            CashFlowTransaction.transaction_date <= datetime.combine(calculation_date, datetime.max.time())
-        )
-    ).all()
+    totals = CashFlowAggregator(db).type_totals(
+        current_user.workspace_id, start_date, calculation_date
+    )
 
-    total_entries = sum(t.value for t in transactions if t.type == TransactionType.ENTRADA.value)
-    total_exits = sum(t.value for t in transactions if t.type == TransactionType.SAIDA.value)
+    total_entries = totals.total_entries
+    total_exits = totals.total_exits
     net_revenue = total_entries  # Receita líquida do período
 
     # ========================================
@@ -633,64 +585,24 @@ def get_break_even_analysis(
     start_date = end_date - timedelta(days=period_days)
 
     # ========================================
-    # 1. BUSCAR TRANSAÇÕES DO PERÍODO
+    # 1. RECEITA E CUSTOS (FIXOS vs VARIÁVEIS)
     # ========================================
 
-    transactions = db.query(CashFlowTransaction).filter(
-        and_(
-            CashFlowTransaction.workspace_id == current_user.workspace_id,
-            CashFlowTransaction.transaction_date >= datetime.combine(start_date, datetime.min.time()),
-            CashFlowTransaction.transaction_date <= datetime.combine(end_date, datetime.max.time())
-        )
-    ).all()
-
-    # Receita total
-    total_revenue = sum(t.value for t in transactions if t.type == TransactionType.ENTRADA.value)
-
-    # ========================================
-    # 2. CLASSIFICAR CUSTOS (FIXOS vs VARIÁVEIS)
-    # ========================================
-
-    # Categorias consideradas custos FIXOS
-    fixed_cost_categories = [
-        'aluguel', 'salário', 'salario', 'folha', 'seguro', 'licença', 'licenca',
-        'assinatura', 'contador', 'advogado', 'consultoria', 'internet', 'telefone',
-        'energia', 'água', 'agua', 'condomínio', 'condominio', 'iptu', 'alvará', 'alvara'
-    ]
-
-    # Categorias consideradas custos VARIÁVEIS
-    variable_cost_categories = [
-        'mercadoria', 'produto', 'matéria', 'materia', 'fornecedor', 'compra',
-        'comissão', 'comissao', 'frete', 'embalagem', 'marketing', 'publicidade',
-        'taxa', 'imposto variável', 'imposto variavel', 'insumo'
-    ]
-
-    fixed_costs = 0.0
-    variable_costs = 0.0
-
-    for t in transactions:
-        if t.type != TransactionType.SAIDA.value:
-            continue
-
-        category_lower = (t.category or '').lower()
-        description_lower = (t.description or '').lower()
-
-        # Classificar como fixo ou variável baseado em categoria/descrição
-        is_fixed = any(keyword in category_lower or keyword in description_lower
-                      for keyword in fixed_cost_categories)
-        is_variable = any(keyword in category_lower or keyword in description_lower
-                         for keyword in variable_cost_categories)
+    # Saídas com palavra-chave de custo FIXO na categoria/descrição são fixas;
+    # as demais são variáveis (mais conservador)
+    breakdown = CashFlowAggregator(db).cost_breakdown(
+        current_user.workspace_id,
+        start_date,
+        end_date,
+        FIXED_COST_KEYWORDS
+    )
 
-        if is_fixed:
-            fixed_costs += t.value
-        elif is_variable:
-            variable_costs += t.value
-        else:
-            # Se não identificado, considerar como variável (mais conservador)
-            variable_costs += t.value
+    total_revenue = breakdown.total_revenue
+    fixed_costs = breakdown.fixed_costs
+    variable_costs = breakdown.variable_costs
 
     # ========================================
-    # 3. CÁLCULOS DE BREAK-EVEN
+    # 2. CÁLCULOS DE BREAK-EVEN
     # ========================================
 
     total_costs = fixed_costs + variable_costs
@@ -712,7 +624,7 @@ def get_break_even_analysis(
     revenue_gap_pct = (revenue_gap / break_even_revenue * 100) if break_even_revenue > 0 else 0
 
     # ========================================
-    # 4. GERAR DADOS PARA O GRÁFICO
+    # 3. GERAR DADOS PARA O GRÁFICO
     # ========================================
 
     # Criar 10 pontos de 0% a 150% da receita atual
@@ -782,32 +694,8 @@ def _calculate_balance_at_date(
     target_date: date,
     account_id: Optional[int] = None
 ) -> float:
-    """Calcula o saldo em uma data específica"""
-    query = db.query(CashFlowTransaction).filter(
-        and_(
-            CashFlowTransaction.workspace_id == workspace_id,
-            CashFlowTransaction.transaction_date <= datetime.combine(target_date, datetime.max.time())
-        )
-    )
-
-    if account_id:
-        query = query.filter(CashFlowTransaction.account_id == account_id)
-        # Adicionar saldo inicial da conta
-        account = db.query(BankAccount).filter(BankAccount.id == account_id).first()
-        initial_balance = account.initial_balance if account else 0.0
-    else:
-        # Somar saldo inicial de todas as contas
-        accounts = db.query(BankAccount).filter(
-            BankAccount.workspace_id == workspace_id
-        ).all()
-        initial_balance = sum(acc.initial_balance for acc in accounts)
-
-    transactions = query.all()
-
-    total_entries = sum(t.value for t in transactions if t.type == TransactionType.ENTRADA.value)
-    total_exits = sum(t.value for t in transactions if t.type == TransactionType.SAIDA.value)
-
-    return initial_balance + total_entries - total_exits
+    """Calcula o saldo em uma data específica (consulta ao ledger diário)"""
+    return CashFlowLedger(db).balance_at(workspace_id, target_date, account_id)
 
 
 def _calculate_health_score(summary: CashFlowSummary, runway_months: Optional[float]) -> float:
@@ -863,6 +751,286 @@ def calculate_scenarios(
 
     # ===== BUSCAR DADOS HISTÓRICOS PARA BASE DE CÁLCULO =====
 
+    base = _get_scenario_base_data(db, workspace_id, start_date, end_date)
+    current_balance = base['current_balance']
+
+    # ===== PREMISSAS DOS CENÁRIOS SOLICITADOS =====
+
+    scenario_premises: List[tuple] = []
+
+    # Cenário Otimista
+    if request.include_optimistic:
+        scenario_premises.append((ScenarioTypeEnum.OPTIMISTIC, ScenarioPremises(
+            collection_rate=0.95,
+            average_delay_days=2,
+            revenue_growth=5.0,
+            expense_variation=-2.0
+        )))
+
+    # Cenário Realista
+    if request.include_realistic:
+        scenario_premises.append((ScenarioTypeEnum.REALISTIC, ScenarioPremises(
+            collection_rate=0.85,
+            average_delay_days=7,
+            revenue_growth=2.0,
+            expense_variation=0.0
+        )))
+
+    # Cenário Pessimista
+    if request.include_pessimistic:
+        scenario_premises.append((ScenarioTypeEnum.PESSIMISTIC, ScenarioPremises(
+            collection_rate=0.70,
+            average_delay_days=15,
+            revenue_growth=-3.0,
+            expense_variation=5.0
+        )))
+
+    # ===== PROJETAR TODOS OS CENÁRIOS DE UMA VEZ (VETORIZADO) =====
+
+    batch = _project_premises(
+        base,
+        [premises for _, premises in scenario_premises],
+        request.days_ahead
+    )
+
+    scenario_name_map = {
+        ScenarioTypeEnum.OPTIMISTIC: "Cenário Otimista",
+        ScenarioTypeEnum.REALISTIC: "Cenário Realista",
+        ScenarioTypeEnum.PESSIMISTIC: "Cenário Pessimista"
+    }
+
+    scenarios: List[ScenarioAnalysisResult] = [
+        ScenarioAnalysisResult(
+            scenario_type=scenario_type,
+            scenario_name=scenario_name_map.get(scenario_type, "Cenário Personalizado"),
+            premises=premises,
+            projections=to_projection_points(batch, index, end_date),
+            average_balance=float(batch.average_balance[index]),
+            minimum_balance=float(batch.minimum_balance[index]),
+            maximum_balance=float(batch.maximum_balance[index]),
+            total_entries=float(batch.total_entries[index]),
+            total_exits=float(batch.total_exits[index]),
+            final_balance=float(batch.final_balance[index]),
+            period_start=end_date,
+            period_end=projection_end_date,
+            days_projected=request.days_ahead
+        )
+        for index, (scenario_type, premises) in enumerate(scenario_premises)
+    ]
+
+    # ===== CRIAR RESUMO COMPARATIVO =====
+
+    comparison_summary = {
+        "current_balance": current_balance,
+        "base_period_days": 30,
+        "projection_days": request.days_ahead,
+        "scenarios_calculated": len(scenarios),
+        "best_case_balance": max(s.final_balance for s in scenarios) if scenarios else 0,
+        "worst_case_balance": min(s.final_balance for s in scenarios) if scenarios else 0,
+        "balance_range": max(s.final_balance for s in scenarios) - min(s.final_balance for s in scenarios) if scenarios else 0,
+        "critical_scenarios": [
+            s.scenario_name for s in scenarios if s.minimum_balance < 0
+        ],
+        "recommended_action": _get_scenario_recommendation(scenarios, current_balance)
+    }
+
+    logger.info(f"Cenários calculados: {len(scenarios)}, "
+                f"Melhor caso: R$ {comparison_summary['best_case_balance']:,.2f}, "
+                f"Pior caso: R$ {comparison_summary['worst_case_balance']:,.2f}")
+
+    return ScenarioComparisonResponse(
+        scenarios=scenarios,
+        comparison_summary=comparison_summary
+    )
+
+
+@router.post("/scenarios/monte-carlo", response_model=MonteCarloResponse)
+def calculate_monte_carlo(
+    request: MonteCarloRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Simulação Monte Carlo de Risco de Caixa
+
+    Gera milhares de trajetórias de saldo amostrando:
+    - Entradas/saídas diárias da distribuição histórica do workspace
+    - Atrasos de recebimento do histórico de contas a receber pagas
+    - Cobrança de cada recebível com a taxa média de cobrança
+
+    Retorna bandas P5/P50/P95 por dia, probabilidade de saldo negativo e
+    expected shortfall (saldo final médio nas 5% piores trajetórias).
+    """
+
+    logger.info(f"Simulação Monte Carlo: {request.paths} trajetórias, {request.days_ahead} dias")
+
+    workspace_id = current_user.workspace_id
+    today = datetime.now().date()
+    history_start = today - timedelta(days=request.history_days)
+
+    snapshot = get_current_scenario(db, current_user)
+
+    # Distribuição histórica diária (dias sem movimentação entram como zero)
+    movements = CashFlowLedger(db).daily_movements(workspace_id, history_start, today - timedelta(days=1))
+    history_dates = [history_start + timedelta(days=i) for i in range(request.history_days)]
+    historical_entries = np.array(
+        [movements[d].entries if d in movements else 0.0 for d in history_dates], dtype=np.float64
+    )
+    historical_exits = np.array(
+        [movements[d].exits if d in movements else 0.0 for d in history_dates], dtype=np.float64
+    )
+
+    # Atrasos observados (pagamentos antecipados contam como atraso zero)
+    delays = [max(0, delay) for delay in _get_receivable_payment_delays(db, workspace_id, history_start)]
+    if not delays:
+        delays = [snapshot.average_payment_delay]
+
+    # Recebíveis em aberto
+    open_receivables = db.query(
+        AccountsReceivable.value - AccountsReceivable.paid_value,
+        AccountsReceivable.due_date
+    ).filter(
+        AccountsReceivable.workspace_id == workspace_id,
+        AccountsReceivable.status.in_(['pendente', 'parcial', 'vencido'])
+    ).all()
+
+    # Pagáveis em aberto debitados no vencimento (vencidos no primeiro dia)
+    payable_schedule = np.zeros(request.days_ahead, dtype=np.float64)
+    open_payables = db.query(
+        AccountsPayableInvoice.total_value - AccountsPayableInvoice.paid_value,
+        AccountsPayableInvoice.due_date
+    ).filter(
+        AccountsPayableInvoice.workspace_id == workspace_id,
+        AccountsPayableInvoice.status.in_([
+            InvoiceStatus.PENDING, InvoiceStatus.VALIDATED, InvoiceStatus.APPROVED, InvoiceStatus.OVERDUE
+        ])
+    ).all()
+    for amount, due_date in open_payables:
+        offset = max(0, (due_date - today).days)
+        if offset < request.days_ahead:
+            payable_schedule[offset] += amount or 0.0
+
+    inputs = MonteCarloInputs(
+        opening_balance=snapshot.current_balance,
+        historical_entries=historical_entries,
+        historical_exits=historical_exits,
+        receivable_amounts=np.array([amount or 0.0 for amount, _ in open_receivables], dtype=np.float64),
+        receivable_due_offsets=np.array([(due - today).days for _, due in open_receivables], dtype=np.int64),
+        payment_delays=np.array(delays, dtype=np.int64),
+        collection_rate=snapshot.average_collection_rate,
+        payable_schedule=payable_schedule
+    )
+
+    result = run_simulation(inputs, request.days_ahead, request.paths, request.seed)
+
+    p5, p50, p95 = (band.tolist() for band in result.percentiles)
+    probability_by_day = result.probability_negative_by_day.tolist()
+
+    bands = [
+        MonteCarloBandPoint(
+            projection_date=today + timedelta(days=day + 1),
+            p5=p5[day],
+            p50=p50[day],
+            p95=p95[day],
+            probability_negative=probability_by_day[day]
+        )
+        for day in range(request.days_ahead)
+    ]
+
+    final_p5, final_p50, final_p95 = result.final_percentiles.tolist()
+
+    logger.info(f"Monte Carlo concluído - P(saldo negativo): {result.probability_negative:.1%}, "
+                f"Expected shortfall: R$ {result.expected_shortfall:,.2f}")
+
+    return MonteCarloResponse(
+        current_balance=snapshot.current_balance,
+        days_projected=request.days_ahead,
+        paths=result.paths,
+        seed=request.seed,
+        bands=bands,
+        final_balance_p5=final_p5,
+        final_balance_p50=final_p50,
+        final_balance_p95=final_p95,
+        probability_negative_balance=result.probability_negative,
+        expected_shortfall=result.expected_shortfall,
+        collection_rate=snapshot.average_collection_rate,
+        payment_delay_samples=len(delays)
+    )
+
+
+@router.post("/scenarios/sensitivity", response_model=ScenarioSensitivityResponse)
+def calculate_scenario_sensitivity(
+    request: ScenarioSensitivityRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Grade de Sensibilidade de Cenários
+
+    Avalia todas as combinações de taxa de recebimento, atraso médio,
+    crescimento de receita e variação de despesas em um único lote vetorizado,
+    usando a mesma base histórica de /scenarios/calculate.
+    """
+
+    workspace_id = current_user.workspace_id
+
+    end_date = datetime.now().date()
+    start_date = end_date - timedelta(days=30)
+
+    base = _get_scenario_base_data(db, workspace_id, start_date, end_date)
+
+    premises_list = [
+        ScenarioPremises(
+            collection_rate=collection_rate,
+            average_delay_days=delay_days,
+            revenue_growth=revenue_growth,
+            expense_variation=expense_variation
+        )
+        for collection_rate, delay_days, revenue_growth, expense_variation in itertools.product(
+            request.collection_rates,
+            request.delay_days,
+            request.revenue_growths,
+            request.expense_variations
+        )
+    ]
+
+    logger.info(f"Calculando grade de sensibilidade: {len(premises_list)} combinações, "
+                f"{request.days_ahead} dias")
+
+    batch = _project_premises(base, premises_list, request.days_ahead)
+
+    final_balances = batch.final_balance.tolist()
+    minimum_balances = batch.minimum_balance.tolist()
+    average_balances = batch.average_balance.tolist()
+    first_negative_days = batch.first_negative_day.tolist()
+
+    results = [
+        ScenarioSensitivityPoint(
+            premises=premises,
+            final_balance=final_balances[index],
+            minimum_balance=minimum_balances[index],
+            average_balance=average_balances[index],
+            days_to_negative=first_negative_days[index] + 1 if first_negative_days[index] >= 0 else None
+        )
+        for index, premises in enumerate(premises_list)
+    ]
+
+    return ScenarioSensitivityResponse(
+        current_balance=base['current_balance'],
+        days_projected=request.days_ahead,
+        combinations=len(results),
+        results=results,
+        negative_combinations=sum(1 for point in results if point.days_to_negative is not None)
+    )
+
+
+def _get_scenario_base_data(
+    db: Session,
+    workspace_id: int,
+    start_date: date,
+    end_date: date
+) -> Dict[str, float]:
+    """Dados históricos usados como base das projeções de cenários"""
     # Saldo atual total de todas as contas
     current_balance = db.query(func.sum(BankAccount.current_balance)).filter(
         BankAccount.workspace_id == workspace_id,
@@ -915,152 +1083,52 @@ def calculate_scenarios(
                 f"Receitas médias: R$ {avg_daily_entries:,.2f}/dia, "
                 f"Despesas médias: R$ {avg_daily_exits:,.2f}/dia")
 
-    # ===== FUNÇÃO AUXILIAR PARA CALCULAR UM CENÁRIO =====
-
-    def calculate_scenario(
-        scenario_type: ScenarioTypeEnum,
-        premises: ScenarioPremises
-    ) -> ScenarioAnalysisResult:
-        """Calcula projeção para um cenário específico"""
-
-        projections: List[ScenarioProjectionPoint] = []
-        running_balance = current_balance
-        total_entries = 0.0
-        total_exits = 0.0
-        min_balance = current_balance
-        max_balance = current_balance
-
-        # Calcular projeções diárias
-        for day in range(request.days_ahead):
-            projection_date = end_date + timedelta(days=day + 1)
-
-            # Receitas projetadas (com crescimento aplicado)
-            growth_factor = 1 + (premises.revenue_growth / 100)
-            daily_entries = avg_daily_entries * growth_factor * premises.collection_rate
-
-            # Incluir recebíveis com atraso
-            if day >= premises.average_delay_days:
-                # Simular recebimento de recebíveis pendentes ao longo do período
-                daily_receivable_collection = (pending_receivables / request.days_ahead) * premises.collection_rate
-                daily_entries += daily_receivable_collection
-
-            # Despesas projetadas (com variação aplicada)
-            expense_factor = 1 + (premises.expense_variation / 100)
-            daily_exits = avg_daily_exits * expense_factor
-
-            # Incluir pagamento de contas pendentes
-            daily_payable_payment = pending_payables / request.days_ahead
-            daily_exits += daily_payable_payment
-
-            # Calcular fluxo líquido e saldo
-            net_flow = daily_entries - daily_exits
-            running_balance += net_flow
-
-            # Acumular totais
-            total_entries += daily_entries
-            total_exits += daily_exits
-
-            # Atualizar min/max
-            min_balance = min(min_balance, running_balance)
-            max_balance = max(max_balance, running_balance)
-
-            # Calcular nível de confiança (diminui com o tempo)
-            confidence = max(0.5, 1.0 - (day / request.days_ahead) * 0.5)
-
-            # Criar ponto de projeção
-            projections.append(ScenarioProjectionPoint(
-                projection_date=projection_date,
-                projected_balance=running_balance,
-                projected_entries=daily_entries,
-                projected_exits=daily_exits,
-                net_flow=net_flow,
-                confidence_level=confidence
-            ))
-
-        # Calcular médias
-        avg_balance = sum(p.projected_balance for p in projections) / len(projections) if projections else 0
-
-        # Criar resultado do cenário
-        scenario_name_map = {
-            ScenarioTypeEnum.OPTIMISTIC: "Cenário Otimista",
-            ScenarioTypeEnum.REALISTIC: "Cenário Realista",
-            ScenarioTypeEnum.PESSIMISTIC: "Cenário Pessimista"
-        }
-
-        return ScenarioAnalysisResult(
-            scenario_type=scenario_type,
-            scenario_name=scenario_name_map.get(scenario_type, "Cenário Personalizado"),
-            premises=premises,
-            projections=projections,
-            average_balance=avg_balance,
-            minimum_balance=min_balance,
-            maximum_balance=max_balance,
-            total_entries=total_entries,
-            total_exits=total_exits,
-            final_balance=running_balance,
-            period_start=end_date,
-            period_end=projection_end_date,
-            days_projected=request.days_ahead
-        )
-
-    # ===== CALCULAR OS CENÁRIOS SOLICITADOS =====
+    return {
+        'current_balance': current_balance,
+        'avg_daily_entries': avg_daily_entries,
+        'avg_daily_exits': avg_daily_exits,
+        'pending_receivables': pending_receivables,
+        'pending_payables': pending_payables
+    }
 
-    scenarios: List[ScenarioAnalysisResult] = []
 
-    # Cenário Otimista
-    if request.include_optimistic:
-        optimistic_premises = ScenarioPremises(
-            collection_rate=0.95,
-            average_delay_days=2,
-            revenue_growth=5.0,
-            expense_variation=-2.0
-        )
-        scenarios.append(calculate_scenario(ScenarioTypeEnum.OPTIMISTIC, optimistic_premises))
-
-    # Cenário Realista
-    if request.include_realistic:
-        realistic_premises = ScenarioPremises(
-            collection_rate=0.85,
-            average_delay_days=7,
-            revenue_growth=2.0,
-            expense_variation=0.0
-        )
-        scenarios.append(calculate_scenario(ScenarioTypeEnum.REALISTIC, realistic_premises))
-
-    # Cenário Pessimista
-    if request.include_pessimistic:
-        pessimistic_premises = ScenarioPremises(
-            collection_rate=0.70,
-            average_delay_days=15,
-            revenue_growth=-3.0,
-            expense_variation=5.0
-        )
-        scenarios.append(calculate_scenario(ScenarioTypeEnum.PESSIMISTIC, pessimistic_premises))
+def _project_premises(
+    base: Dict[str, float],
+    premises_list: List[ScenarioPremises],
+    days_ahead: int
+) -> ScenarioBatch:
+    """
+    Projeta uma lista de premissas em um único lote vetorizado
 
-    # ===== CRIAR RESUMO COMPARATIVO =====
+    - Entradas diárias: média * (1 + crescimento) * taxa de recebimento
+    - Recebíveis pendentes: diluídos no período a partir do atraso médio
+    - Saídas diárias: média * (1 + variação) + pagáveis pendentes diluídos
+    """
+    collection_rate = np.array([p.collection_rate for p in premises_list], dtype=np.float64)
+    delay_days = np.array([p.average_delay_days for p in premises_list], dtype=np.float64)
+    growth_factor = 1 + np.array([p.revenue_growth for p in premises_list], dtype=np.float64) / 100
+    expense_factor = 1 + np.array([p.expense_variation for p in premises_list], dtype=np.float64) / 100
+
+    return project_scenarios(
+        days_ahead,
+        opening_balance=base['current_balance'],
+        base_entries=base['avg_daily_entries'] * growth_factor * collection_rate,
+        receivable_entries=(base['pending_receivables'] / days_ahead) * collection_rate,
+        delay_days=delay_days,
+        base_exits=base['avg_daily_exits'] * expense_factor + base['pending_payables'] / days_ahead
+    )
 
-    comparison_summary = {
-        "current_balance": current_balance,
-        "base_period_days": 30,
-        "projection_days": request.days_ahead,
-        "scenarios_calculated": len(scenarios),
-        "best_case_balance": max(s.final_balance for s in scenarios) if scenarios else 0,
-        "worst_case_balance": min(s.final_balance for s in scenarios) if scenarios else 0,
-        "balance_range": max(s.final_balance for s in scenarios) - min(s.final_balance for s in scenarios) if scenarios else 0,
-        "critical_scenarios": [
-            s.scenario_name for s in scenarios if s.minimum_balance < 0
-        ],
-        "recommended_action": _get_scenario_recommendation(scenarios, current_balance)
-    }
 
-    logger.info(f"Cenários calculados: {len(scenarios)}, "
-                f"Melhor caso: R$ {comparison_summary['best_case_balance']:,.2f}, "
-                f"Pior caso: R$ {comparison_summary['worst_case_balance']:,.2f}")
+def _get_receivable_payment_delays(db: Session, workspace_id: int, start_date: date) -> List[int]:
+    """Dias entre vencimento e pagamento das contas a receber pagas emitidas desde start_date"""
+    paid_receivables = db.query(AccountsReceivable.payment_date, AccountsReceivable.due_date).filter(
+        AccountsReceivable.workspace_id == workspace_id,
+        AccountsReceivable.status == 'recebido',
+        AccountsReceivable.payment_date.isnot(None),
+        AccountsReceivable.issue_date >= start_date
+    ).all()
 
-    return ScenarioComparisonResponse(
-        scenarios=scenarios,
-        comparison_summary=comparison_summary
-    )
+    return [(payment_date - due_date).days for payment_date, due_date in paid_receivables]
 
 
 def _get_scenario_recommendation(scenarios: List[ScenarioAnalysisResult], current_balance: float) -> str:
@@ -1136,19 +1204,11 @@ def get_current_scenario(
         BankAccount.is_active == True
     ).scalar() or 0.0
 
-    # Transações dos últimos 30 dias
-    transactions = db.query(CashFlowTransaction).filter(
-        CashFlowTransaction.workspace_id == workspace_id,
-        CashFlowTransaction.transaction_date >= datetime.combine(start_date, datetime.min.time()),
-        CashFlowTransaction.transaction_date <= datetime.combine(today, datetime.max.time())
-    ).all()
-
-    # Calcular receitas e despesas mensais
-    total_entries = sum(t.value for t in transactions if t.type == TransactionType.ENTRADA.value)
-    total_exits = sum(t.value for t in transactions if t.type == TransactionType.SAIDA.value)
+    # Receitas e despesas dos últimos 30 dias
+    totals = CashFlowAggregator(db).type_totals(workspace_id, start_date, today)
 
-    monthly_revenue = total_entries
-    monthly_expenses = total_exits
+    monthly_revenue = totals.total_entries
+    monthly_expenses = totals.total_exits
     net_monthly_flow = monthly_revenue - monthly_expenses
 
     # Contas a receber pendentes (valor total - valor pago)
@@ -1177,14 +1237,7 @@ def get_current_scenario(
     average_collection_rate = (total_receivables_paid / total_receivables_issued) if total_receivables_issued > 0 else 0.85
 
     # Atraso médio de pagamentos (simplificado - calcular média entre vencimento e data de pagamento)
-    paid_receivables = db.query(AccountsReceivable).filter(
-        AccountsReceivable.workspace_id == workspace_id,
-        AccountsReceivable.status == 'paga',
-        AccountsReceivable.payment_date.isnot(None),
-        AccountsReceivable.issue_date >= start_date
-    ).all()
-
-    delays = [(r.payment_date - r.due_date).days for r in paid_receivables if r.payment_date > r.due_date]
+    delays = [delay for delay in _get_receivable_payment_delays(db, workspace_id, start_date) if delay > 0]
     average_payment_delay = int(sum(delays) / len(delays)) if delays else 5
 
     logger.info(f"Snapshot gerado - Saldo: R$ {current_balance:,.2f}, "
@@ -1264,75 +1317,38 @@ def simulate_scenario(
     if adj.payment_delay_days:
         payment_delay += adj.payment_delay_days
 
-    # ===== CALCULAR PROJEÇÕES =====
-    projections: List[ScenarioProjectionPoint] = []
-    running_balance = current_snapshot.current_balance
-    total_entries = 0.0
-    total_exits = 0.0
-    min_balance = running_balance
-    max_balance = running_balance
-
-    # Aplicar receita única no primeiro dia
-    if adj.one_time_income:
-        running_balance += adj.one_time_income
-        total_entries += adj.one_time_income
-
-    # Aplicar despesa única no primeiro dia
-    if adj.one_time_expense:
-        running_balance -= adj.one_time_expense
-        total_exits += adj.one_time_expense
-
-    for day in range(request.days_ahead):
-        projection_date = today + timedelta(days=day + 1)
-
-        # Receitas diárias com taxa de cobrança
-        daily_entries = avg_daily_entries * collection_rate
-
-        # Incluir recebimento de recebíveis com atraso
-        if day >= payment_delay:
-            daily_receivable_collection = (current_snapshot.pending_receivables / request.days_ahead) * collection_rate
-            daily_entries += daily_receivable_collection
-
-        # Despesas diárias
-        daily_exits = avg_daily_exits
-
-        # Incluir pagamento de contas pendentes
-        daily_payable_payment = current_snapshot.pending_payables / request.days_ahead
-        daily_exits += daily_payable_payment
-
-        # Calcular fluxo líquido e saldo
-        net_flow = daily_entries - daily_exits
-        running_balance += net_flow
-
-        # Acumular totais
-        total_entries += daily_entries
-        total_exits += daily_exits
-
-        # Atualizar min/max
-        min_balance = min(min_balance, running_balance)
-        max_balance = max(max_balance, running_balance)
-
-        # Nível de confiança (diminui com o tempo)
-        confidence = max(0.5, 1.0 - (day / request.days_ahead) * 0.5)
-
-        projections.append(ScenarioProjectionPoint(
-            projection_date=projection_date,
-            projected_balance=running_balance,
-            projected_entries=daily_entries,
-            projected_exits=daily_exits,
-            net_flow=net_flow,
-            confidence_level=confidence
-        ))
-
-    # ===== CALCULAR CENÁRIO BASELINE (SEM AJUSTES) =====
-    baseline_balance = current_snapshot.current_balance
-    for day in range(request.days_ahead):
-        baseline_daily_entries = (current_snapshot.monthly_revenue / 30) * current_snapshot.average_collection_rate
-        if day >= current_snapshot.average_payment_delay:
-            baseline_daily_entries += (current_snapshot.pending_receivables / request.days_ahead) * current_snapshot.average_collection_rate
+    # ===== CALCULAR PROJEÇÕES (SIMULADO E BASELINE NO MESMO LOTE) =====
+    # Linha 0: cenário simulado; linha 1: baseline sem ajustes
+    pending_receivables_daily = current_snapshot.pending_receivables / request.days_ahead
+    pending_payables_daily = current_snapshot.pending_payables / request.days_ahead
+
+    batch = project_scenarios(
+        request.days_ahead,
+        opening_balance=current_snapshot.current_balance,
+        base_entries=[
+            avg_daily_entries * collection_rate,
+            (current_snapshot.monthly_revenue / 30) * current_snapshot.average_collection_rate
+        ],
+        receivable_entries=[
+            pending_receivables_daily * collection_rate,
+            pending_receivables_daily * current_snapshot.average_collection_rate
+        ],
+        delay_days=[payment_delay, current_snapshot.average_payment_delay],
+        base_exits=[
+            avg_daily_exits + pending_payables_daily,
+            (current_snapshot.monthly_expenses / 30) + pending_payables_daily
+        ],
+        one_time_income=[adj.one_time_income or 0.0, 0.0],
+        one_time_expense=[adj.one_time_expense or 0.0, 0.0]
+    )
 
-        baseline_daily_exits = (current_snapshot.monthly_expenses / 30) + (current_snapshot.pending_payables / request.days_ahead)
-        baseline_balance += (baseline_daily_entries - baseline_daily_exits)
+    projections = to_projection_points(batch, 0, today)
+    running_balance = float(batch.final_balance[0])
+    baseline_balance = float(batch.final_balance[1])
+    min_balance = float(batch.minimum_balance[0])
+    max_balance = float(batch.maximum_balance[0])
+    total_entries = float(batch.total_entries[0])
+    total_exits = float(batch.total_exits[0])
 
     # ===== CALCULAR MELHORIA =====
     improvement = running_balance - baseline_balance
@@ -1362,7 +1378,9 @@ def simulate_scenario(
         "balance_improvement": improvement,
         "improvement_percentage": improvement_pct,
         "risk_of_negative_balance": min_balance < 0,
-        "minimum_balance_date": min(projections, key=lambda p: p.projected_balance).date.isoformat() if projections else None
+        "minimum_balance_date": (
+            projections[int(batch.balances[0].argmin())].projection_date.isoformat() if projections else None
+        )
     }
 
     # ===== RECOMENDAÇÕES =====
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, Query, status, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import logging
 import os
 import time
 from pathlib import Path
 import tempfile
 
-from app.core.database import get_db
+from app.core.database import SessionLocal, get_db
 from app.models.invoice_model import Invoice
 from app.models.supplier_model import Supplier
 from app.core.deps import get_current_user
@@ -18,14 +22,39 @@ from app.schemas.invoice import (
     InvoiceExtractionResponse,
     ExtractedData,
     ExtractionSuggestions,
+    ExtractionCacheInfo,
+    InvoiceExtractionJobResponse,
+    BulkInvoiceFileResult,
+    BulkInvoiceIngestionResponse,
     ConfidenceScores,
     SupplierMatch
 )
 from app.services.invoice_processor import InvoiceProcessorService
 from app.services.ai_service import AIService
+from app.services.bulk_invoice_ingestion import (
+    BatchStager,
+    BulkIngestionError,
+    BulkIngestionLimitError,
+    BulkInvoiceIngestion,
+    entry_status,
+    summarize
+)
+from app.services.extraction_cache import ExtractionCache
+from app.services.invoice_extraction_jobs import (
+    ExtractionBatch,
+    ExtractionJob,
+    JobQueueFull,
+    JobStatus,
+    get_invoice_job_queue
+)
+from app.services.llm_http_client import get_llm_http_client
+from app.services.llm_response_cache import llm_response_cache
 from app.services.supplier_matcher import SupplierMatcher
+from app.services.supplier_index_cache import supplier_index_cache
+from app.services.supplier_invoice_stats import SupplierInvoiceStats
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 @router.get("/", response_model=List[InvoiceResponse])
@@ -90,6 +119,7 @@ def create_invoice(
         status="pending"
     )
     db.add(db_invoice)
+    SupplierInvoiceStats(db).record_invoice(db_invoice)
     db.commit()
     db.refresh(db_invoice)
     return db_invoice
@@ -151,167 +181,240 @@ def delete_invoice(
     return None
 
 
-@router.post("/upload", response_model=InvoiceExtractionResponse)
-async def upload_and_extract_invoice(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """
-    Upload de fatura (PDF/Imagem) com extração automática de dados usando IA
+ALLOWED_UPLOAD_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png'}
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB
 
-    Este endpoint processa o arquivo enviado usando:
-    - LayoutLM para extração estruturada de documentos
-    - OCR (Tesseract) como fallback
-    - Fuzzy matching para identificar fornecedores existentes
+# Intervalo de verificação do streaming de status dos jobs
+JOB_EVENTS_POLL_SECONDS = 0.5
 
-    Args:
-        file: Arquivo PDF ou imagem (JPG, PNG)
 
-    Returns:
-        InvoiceExtractionResponse com dados extraídos e sugestões
+async def _save_upload(file: UploadFile) -> Tuple[str, str]:
     """
+    Valida e grava o upload em arquivo temporário
 
-    start_time = time.time()
-
+    Returns:
+        (caminho do arquivo, MD5 do conteúdo - mesmo de FileUtils.get_file_hash,
+        calculado durante a gravação)
+    """
     # Validação do tipo de arquivo
-    allowed_extensions = {'.pdf', '.jpg', '.jpeg', '.png'}
     file_extension = Path(file.filename).suffix.lower()
 
-    if file_extension not in allowed_extensions:
+    if file_extension not in ALLOWED_UPLOAD_EXTENSIONS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Tipo de arquivo não suportado. Use: {', '.join(allowed_extensions)}"
+            detail=f"Tipo de arquivo não suportado. Use: {', '.join(ALLOWED_UPLOAD_EXTENSIONS)}"
         )
 
     # Validação do tamanho (max 10MB)
-    max_size = 10 * 1024 * 1024  # 10MB
     file_size = 0
-    temp_file_path = None
+    content_hash = hashlib.md5()
 
-    try:
-        # Salva arquivo temporariamente
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            temp_file_path = temp_file.name
+    with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
+        temp_file_path = temp_file.name
 
+        try:
             # Lê e salva o arquivo em chunks
             while chunk := await file.read(8192):
                 file_size += len(chunk)
-                if file_size > max_size:
+                if file_size > MAX_UPLOAD_SIZE:
                     raise HTTPException(
                         status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                         detail="Arquivo muito grande. Tamanho máximo: 10MB"
                     )
                 temp_file.write(chunk)
+                content_hash.update(chunk)
+        except Exception:
+            temp_file.close()
+            os.unlink(temp_file_path)
+            raise
+
+    return temp_file_path, content_hash.hexdigest()
+
+
+def _build_extraction_response(
+    extraction_result: Dict[str, Any],
+    db: Session,
+    start_time: float,
+    cache_info: Optional[ExtractionCacheInfo] = None,
+    supplier_matcher: Optional[SupplierMatcher] = None,
+    workspace_id: Optional[int] = None
+) -> InvoiceExtractionResponse:
+    """
+    Monta a resposta a partir do resultado de process_invoice: scores de
+    confiança, matching de fornecedores (sempre feito na hora) e avisos
 
-        # Inicializa serviços
-        ai_service = AIService()
-        invoice_processor = InvoiceProcessorService(ai_service)
-        supplier_matcher = SupplierMatcher(db)
+    Em lotes, o mesmo supplier_matcher (e seu cache de fornecedores) é
+    reutilizado em todos os arquivos.
+    """
+    supplier_matcher = supplier_matcher or SupplierMatcher(db, workspace_id)
+
+    # Calcula confidence scores
+    overall_confidence = extraction_result.get("confidence_score", 0.0)
+    confidence_scores = ConfidenceScores(
+        invoice_number=min(overall_confidence + 0.1, 1.0),  # Ajustes por campo
+        supplier_name=overall_confidence,
+        total_value=min(overall_confidence + 0.05, 1.0),
+        due_date=max(overall_confidence - 0.1, 0.0),
+        invoice_date=max(overall_confidence - 0.1, 0.0)
+    )
 
-        # Processa a fatura com IA
-        extraction_result = await invoice_processor.process_invoice(
-            temp_file_path,
-            file.filename
-        )
+    # Fuzzy matching de fornecedores
+    supplier_name = extraction_result.get("supplier_name", "")
+    supplier_cnpj = extraction_result.get("supplier_cnpj", "")
+
+    supplier_matches = []
+    suggested_supplier_id = None
 
-        # Calcula confidence scores
-        overall_confidence = extraction_result.get("confidence_score", 0.0)
-        confidence_scores = ConfidenceScores(
-            invoice_number=min(overall_confidence + 0.1, 1.0),  # Ajustes por campo
-            supplier_name=overall_confidence,
-            total_value=min(overall_confidence + 0.05, 1.0),
-            due_date=max(overall_confidence - 0.1, 0.0),
-            invoice_date=max(overall_confidence - 0.1, 0.0)
+    if supplier_name:
+        matches = supplier_matcher.find_matching_suppliers(
+            supplier_name=supplier_name,
+            supplier_cnpj=supplier_cnpj,
+            limit=3
         )
 
-        # Fuzzy matching de fornecedores
-        supplier_name = extraction_result.get("supplier_name", "")
-        supplier_cnpj = extraction_result.get("supplier_cnpj", "")
+        for match in matches:
+            supplier_matches.append(SupplierMatch(
+                id=match.get('supplier_id') or 0,
+                name=match.get('name', ''),
+                cnpj=match.get('cnpj'),
+                score=match.get('score', 0.0),
+                match_reason=match.get('match_reason', ''),
+                match_type=match.get('match_type', '')
+            ))
+
+        # Usa o primeiro match como sugestão se score >= 80
+        if supplier_matches and supplier_matches[0].score >= 80:
+            suggested_supplier_id = supplier_matches[0].id
+
+    # Monta dados extraídos
+    extracted_data = ExtractedData(
+        invoice_number=extraction_result.get("invoice_number", ""),
+        supplier_name=supplier_name,
+        supplier_cnpj=supplier_cnpj,
+        supplier_matches=supplier_matches,
+        total_value=float(extraction_result.get("total_amount", 0.0)),
+        tax_value=float(extraction_result.get("tax_amount", 0.0)),
+        net_value=float(extraction_result.get("net_amount", 0.0)),
+        due_date=extraction_result.get("due_date"),
+        invoice_date=extraction_result.get("issue_date"),
+        category=extraction_result.get("category"),
+        description=extraction_result.get("description"),
+        confidence=confidence_scores
+    )
 
-        supplier_matches = []
-        suggested_supplier_id = None
+    # Gera warnings e sugestões
+    warnings = []
+    needs_review = False
+
+    # Verifica confidence baixa
+    avg_confidence = (
+        confidence_scores.invoice_number +
+        confidence_scores.supplier_name +
+        confidence_scores.total_value +
+        confidence_scores.due_date
+    ) / 4
+
+    if avg_confidence < 0.8:
+        needs_review = True
+        warnings.append("Confiança média na extração - recomenda-se verificação manual")
+
+    if not supplier_matches:
+        warnings.append("Nenhum fornecedor correspondente encontrado - será necessário criar novo")
+    elif supplier_matches[0].score < 90:
+        warnings.append(f"Match de fornecedor com {supplier_matches[0].score:.0f}% de similaridade - verifique se está correto")
+
+    if not extracted_data.due_date:
+        warnings.append("Data de vencimento não encontrada - preencha manualmente")
+
+    if extracted_data.total_value == 0:
+        warnings.append("Valor total não detectado - preencha manualmente")
+        needs_review = True
+
+    # Sugestões finais
+    suggestions = ExtractionSuggestions(
+        supplier_id=suggested_supplier_id,
+        needs_review=needs_review,
+        warnings=warnings
+    )
 
-        if supplier_name:
-            matches = supplier_matcher.find_matching_suppliers(
-                supplier_name=supplier_name,
-                supplier_cnpj=supplier_cnpj,
-                limit=3
-            )
+    # Calcula tempo de processamento
+    processing_time = int((time.time() - start_time) * 1000)
 
-            for match in matches:
-                supplier_matches.append(SupplierMatch(
-                    id=match.get('supplier_id') or 0,
-                    name=match.get('name', ''),
-                    cnpj=match.get('cnpj'),
-                    score=match.get('score', 0.0),
-                    match_reason=match.get('match_reason', ''),
-                    match_type=match.get('match_type', '')
-                ))
-
-            # Usa o primeiro match como sugestão se score >= 80
-            if supplier_matches and supplier_matches[0].score >= 80:
-                suggested_supplier_id = supplier_matches[0].id
-
-        # Monta dados extraídos
-        extracted_data = ExtractedData(
-            invoice_number=extraction_result.get("invoice_number", ""),
-            supplier_name=supplier_name,
-            supplier_cnpj=supplier_cnpj,
-            supplier_matches=supplier_matches,
-            total_value=float(extraction_result.get("total_amount", 0.0)),
-            tax_value=float(extraction_result.get("tax_amount", 0.0)),
-            net_value=float(extraction_result.get("net_amount", 0.0)),
-            due_date=extraction_result.get("due_date"),
-            invoice_date=extraction_result.get("issue_date"),
-            category=extraction_result.get("category"),
-            description=extraction_result.get("description"),
-            confidence=confidence_scores
-        )
+    return InvoiceExtractionResponse(
+        extracted_data=extracted_data,
+        suggestions=suggestions,
+        processing_time_ms=processing_time,
+        success=True,
+        cache=cache_info
+    )
 
-        # Gera warnings e sugestões
-        warnings = []
-        needs_review = False
-
-        # Verifica confidence baixa
-        avg_confidence = (
-            confidence_scores.invoice_number +
-            confidence_scores.supplier_name +
-            confidence_scores.total_value +
-            confidence_scores.due_date
-        ) / 4
-
-        if avg_confidence < 0.8:
-            needs_review = True
-            warnings.append("Confiança média na extração - recomenda-se verificação manual")
-
-        if not supplier_matches:
-            warnings.append("Nenhum fornecedor correspondente encontrado - será necessário criar novo")
-        elif supplier_matches[0].score < 90:
-            warnings.append(f"Match de fornecedor com {supplier_matches[0].score:.0f}% de similaridade - verifique se está correto")
-
-        if not extracted_data.due_date:
-            warnings.append("Data de vencimento não encontrada - preencha manualmente")
-
-        if extracted_data.total_value == 0:
-            warnings.append("Valor total não detectado - preencha manualmente")
-            needs_review = True
-
-        # Sugestões finais
-        suggestions = ExtractionSuggestions(
-            supplier_id=suggested_supplier_id,
-            needs_review=needs_review,
-            warnings=warnings
-        )
 
-        # Calcula tempo de processamento
-        processing_time = int((time.time() - start_time) * 1000)
+@router.post("/upload", response_model=InvoiceExtractionResponse)
+async def upload_and_extract_invoice(
+    file: UploadFile = File(...),
+    refresh_cache: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Upload de fatura (PDF/Imagem) com extração automática de dados usando IA
 
-        return InvoiceExtractionResponse(
-            extracted_data=extracted_data,
-            suggestions=suggestions,
-            processing_time_ms=processing_time,
-            success=True
+    Este endpoint processa o arquivo enviado usando:
+    - LayoutLM para extração estruturada de documentos
+    - OCR (Tesseract) como fallback
+    - Fuzzy matching para identificar fornecedores existentes
+
+    Reenvios do mesmo arquivo no workspace reutilizam a extração guardada no
+    cache (mesmo conteúdo e mesma versão do pipeline); o matching de
+    fornecedores é sempre refeito, pois o cadastro pode ter mudado.
+
+    Para documentos grandes prefira POST /invoices/upload/jobs, que não
+    mantém a requisição aberta durante a extração.
+
+    Args:
+        file: Arquivo PDF ou imagem (JPG, PNG)
+        refresh_cache: Ignora o cache e reprocessa o arquivo
+
+    Returns:
+        InvoiceExtractionResponse com dados extraídos e sugestões
+    """
+
+    start_time = time.time()
+    temp_file_path = None
+
+    try:
+        # Salva arquivo temporariamente
+        temp_file_path, file_hash = await _save_upload(file)
+
+        # Inicializa serviços
+        ai_service = AIService()
+        extraction_cache = ExtractionCache(db, ai_service)
+
+        # Reenvio do mesmo arquivo: usa a extração guardada
+        cached = None if refresh_cache else extraction_cache.get(current_user.workspace_id, file_hash)
+
+        if cached:
+            extraction_result = cached.result
+        else:
+            # Processa a fatura com IA
+            invoice_processor = InvoiceProcessorService(ai_service)
+            extraction_result = await invoice_processor.process_invoice(
+                temp_file_path,
+                file.filename
+            )
+            extraction_cache.set(current_user.workspace_id, file_hash, extraction_result)
+
+        cache_info = ExtractionCacheInfo(
+            hit=cached is not None,
+            backend=extraction_cache.backend_name,
+            content_hash=file_hash,
+            pipeline_version=extraction_cache.version,
+            cached_at=cached.cached_at if cached else None,
+            hit_count=cached.hit_count if cached else 0
+        )
+
+        return _build_extraction_response(
+            extraction_result, db, start_time, cache_info, workspace_id=current_user.workspace_id
         )
 
     except HTTPException:
@@ -343,3 +446,310 @@ async def upload_and_extract_invoice(
                 os.unlink(temp_file_path)
             except:
                 pass
+
+
+@router.post(
+    "/upload/bulk",
+    response_model=BulkInvoiceIngestionResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def upload_invoices_bulk(
+    files: List[UploadFile] = File(...),
+    refresh_cache: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Ingestão em lote: um ou mais ZIPs e/ou arquivos PDF/JPG/PNG
+
+    Os arquivos são gravados em disco conforme chegam e enviados à fila de
+    jobs de extração como um lote; a resposta (202) traz o id do lote e o
+    manifesto com o job de cada arquivo. O andamento é consultado em
+    GET /invoices/batches/{batch_id} e o resultado de cada arquivo em
+    GET /invoices/jobs/{job_id}.
+
+    Retorna 429 (com Retry-After) quando a fila de extração está no limite.
+    """
+    with BatchStager() as stager:
+        try:
+            for upload in files:
+                await stager.add_upload(upload)
+        except BulkIngestionLimitError as e:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+        except BulkIngestionError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        if not stager.files:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Nenhum arquivo de fatura encontrado no lote"
+            )
+
+        ingestion = BulkInvoiceIngestion(
+            current_user.workspace_id,
+            get_invoice_job_queue(),
+            refresh_cache=refresh_cache,
+            extraction_cache=ExtractionCache(db, AIService())
+        )
+        try:
+            batch = ingestion.submit(stager)
+        except JobQueueFull as e:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=str(e),
+                headers={"Retry-After": str(e.retry_after)}
+            )
+
+    return _batch_response(batch, db)
+
+
+@router.get("/batches/{batch_id}", response_model=BulkInvoiceIngestionResponse)
+def get_invoice_batch(
+    batch_id: str,
+    include_results: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Manifesto e andamento de um lote; com include_results inclui a extração
+    dos arquivos já concluídos
+    """
+    batch = get_invoice_job_queue().get_batch(batch_id, current_user.workspace_id)
+
+    if not batch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Lote de extração não encontrado"
+        )
+
+    return _batch_response(batch, db, include_results)
+
+
+def _batch_response(
+    batch: ExtractionBatch,
+    db: Session,
+    include_results: bool = False
+) -> BulkInvoiceIngestionResponse:
+    """Manifesto por arquivo a partir do estado atual dos jobs do lote"""
+    summary = summarize(batch)
+    supplier_matcher = SupplierMatcher(db, batch.workspace_id) if include_results else None
+
+    manifest = []
+    for entry in batch.entries:
+        job = entry.job
+        snapshot = job.snapshot() if job is not None else None
+
+        extraction = None
+        if supplier_matcher and snapshot and snapshot["status"] == "completed" and snapshot["result"] is not None:
+            extraction = _build_extraction_response(
+                snapshot["result"], db, time.time(), supplier_matcher=supplier_matcher
+            )
+            extraction.processing_time_ms = int(snapshot["timings"]["processing_seconds"] * 1000)
+
+        manifest.append(BulkInvoiceFileResult(
+            filename=entry.filename,
+            status=snapshot["status"] if snapshot else entry_status(entry),
+            job_id=snapshot["job_id"] if snapshot else None,
+            content_hash=entry.content_hash,
+            size_bytes=entry.size_bytes,
+            processing_seconds=snapshot["timings"]["processing_seconds"] if snapshot and not entry.duplicate_of else 0.0,
+            cache_hit=snapshot["cache_hit"] if snapshot else False,
+            duplicate_of=entry.duplicate_of,
+            error=snapshot["error"] if snapshot else entry.skip_reason,
+            extraction=extraction
+        ))
+
+    return BulkInvoiceIngestionResponse(
+        batch_id=batch.batch_id,
+        status="completed" if batch.is_finished else "processing",
+        created_at=batch.created_at,
+        files=manifest,
+        **summary
+    )
+
+
+def _job_response(job: ExtractionJob, db: Session) -> InvoiceExtractionJobResponse:
+    """Estado do job; com o job concluído inclui a resposta completa da extração"""
+    snapshot = job.snapshot()
+    extraction = None
+
+    if job.status == JobStatus.COMPLETED and snapshot["result"] is not None:
+        extraction = _build_extraction_response(snapshot["result"], db, time.time(), workspace_id=job.workspace_id)
+        extraction.processing_time_ms = int(snapshot["timings"]["processing_seconds"] * 1000)
+
+    return InvoiceExtractionJobResponse(
+        job_id=snapshot["job_id"],
+        status=snapshot["status"],
+        filename=snapshot["filename"],
+        batch_id=snapshot["batch_id"],
+        attempts=snapshot["attempts"],
+        cache_hit=snapshot["cache_hit"],
+        pages=snapshot["pages"],
+        error=snapshot["error"],
+        created_at=snapshot["created_at"],
+        started_at=snapshot["started_at"],
+        finished_at=snapshot["finished_at"],
+        timings=snapshot["timings"],
+        result=extraction
+    )
+
+
+def _job_event(job: ExtractionJob) -> str:
+    """
+    Evento SSE com o estado do job
+
+    Usa uma sessão própria e curta; só o evento de conclusão acessa o banco
+    (matching de fornecedores).
+    """
+    db = SessionLocal()
+    try:
+        response = _job_response(job, db)
+    finally:
+        db.close()
+    return f"event: {response.status}\ndata: {response.model_dump_json()}\n\n"
+
+
+@router.post(
+    "/upload/jobs",
+    response_model=InvoiceExtractionJobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def create_invoice_extraction_job(
+    file: UploadFile = File(...),
+    refresh_cache: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Upload de fatura com extração em segundo plano
+
+    Grava o arquivo e devolve o job imediatamente (202). O andamento, os
+    resultados parciais por página e o resultado final são consultados em
+    GET /invoices/jobs/{job_id} ou acompanhados por Server-Sent Events em
+    GET /invoices/jobs/{job_id}/events.
+
+    Retorna 429 (com Retry-After) quando a fila de extração está no limite.
+    """
+    temp_file_path, file_hash = await _save_upload(file)
+
+    try:
+        job_queue = get_invoice_job_queue()
+
+        # Reenvio do mesmo arquivo: job já nasce concluído
+        cached = None
+        if not refresh_cache:
+            cached = ExtractionCache(db, AIService()).get(current_user.workspace_id, file_hash)
+
+        if cached:
+            os.unlink(temp_file_path)
+            job = job_queue.add_completed(current_user.workspace_id, file.filename, file_hash, cached.result)
+        else:
+            job = job_queue.submit(current_user.workspace_id, temp_file_path, file.filename, file_hash)
+    except JobQueueFull as e:
+        os.unlink(temp_file_path)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    return _job_response(job, db)
+
+
+@router.get("/jobs/stats", response_model=Dict[str, Any])
+def get_invoice_job_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Métricas da fila de extração do processo (fila, contadores, tempos médios)
+
+    **Permissão**: Apenas admin/super_admin
+    """
+    if current_user.role not in ['admin', 'super_admin']:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view job metrics"
+        )
+
+    return get_invoice_job_queue().stats()
+
+
+@router.get("/ai/metrics", response_model=Dict[str, Any])
+def get_invoice_ai_metrics(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Métricas das chamadas ao LLM do processo: cache de respostas (hit rate,
+    chamadas coalescidas e evitadas) e cliente HTTP (retentativas, limites),
+    além do cache de índices de fornecedores usado no matching
+
+    **Permissão**: Apenas admin/super_admin
+    """
+    if current_user.role not in ['admin', 'super_admin']:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view AI metrics"
+        )
+
+    return {
+        "llm_cache": llm_response_cache.metrics(),
+        "llm_http": get_llm_http_client().stats(),
+        "supplier_index": supplier_index_cache.metrics()
+    }
+
+
+@router.get("/jobs/{job_id}", response_model=InvoiceExtractionJobResponse)
+def get_invoice_extraction_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Status, páginas já processadas e (quando concluído) resultado do job"""
+    job = get_invoice_job_queue().get(job_id, current_user.workspace_id)
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job de extração não encontrado"
+        )
+
+    return _job_response(job, db)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_invoice_extraction_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Server-Sent Events com o estado do job a cada mudança (nova página,
+    retentativa, conclusão); o stream termina quando o job termina
+    """
+    job = get_invoice_job_queue().get(job_id, current_user.workspace_id)
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job de extração não encontrado"
+        )
+
+    # A sessão da requisição não acompanha o stream: cada ouvinte prenderia
+    # uma conexão do pool enquanto o job roda
+    db.close()
+
+    async def events():
+        revision = -1
+        while True:
+            if job.revision != revision:
+                revision = job.revision
+                yield _job_event(job)
+                if job.is_finished:
+                    return
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -7,8 +7,8 @@ Endpoints para executar jobs agendados manualmente.
 - Integração com sistemas de agendamento externos (cron, celery, etc.)
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Dict, Any, Optional
 
 from app.core.deps import get_current_user
 from app.models.user import User
@@ -17,6 +17,14 @@ from app.jobs.accounts_receivable_jobs import (
     calculate_aging_and_risk,
     run_all_ar_jobs
 )
+from app.jobs.cash_flow_jobs import (
+    rebuild_daily_balances,
+    check_daily_balances_consistency
+)
+from app.jobs.financial_reporting_jobs import (
+    refresh_monthly_financial_facts,
+    rebuild_monthly_financial_facts
+)
 
 router = APIRouter()
 
@@ -113,6 +121,139 @@ def run_all_ar_jobs_endpoint(
     return result
 
 
+@router.post("/cash-flow/rebuild-daily-balances", response_model=Dict[str, Any])
+def run_rebuild_daily_balances_job(
+    all_workspaces: bool = Query(False, description="Reconstruir todos os workspaces (apenas super_admin)"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Reconstrói o ledger diário de saldos (cash_flow_daily_balances).
+
+    Usado como backfill após a criação da tabela ou para corrigir
+    divergências apontadas pela verificação de consistência.
+
+    **Permissão**: Apenas admin/super_admin
+    """
+    if current_user.role not in ['admin', 'super_admin']:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can execute jobs"
+        )
+
+    workspace_id: Optional[int] = current_user.workspace_id
+    if all_workspaces:
+        if current_user.role != 'super_admin':
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only super admins can rebuild all workspaces"
+            )
+        workspace_id = None
+
+    result = rebuild_daily_balances(workspace_id)
+
+    if not result['success']:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Job failed: {result.get('error', 'Unknown error')}"
+        )
+
+    return result
+
+
+@router.get("/cash-flow/check-daily-balances", response_model=Dict[str, Any])
+def run_check_daily_balances_job(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Verifica a consistência do ledger diário contra as transações do workspace.
+
+    **Permissão**: Apenas admin/super_admin
+    """
+    if current_user.role not in ['admin', 'super_admin']:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can execute jobs"
+        )
+
+    result = check_daily_balances_consistency(current_user.workspace_id)
+
+    if not result['success']:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Job failed: {result.get('error', 'Unknown error')}"
+        )
+
+    return result
+
+
+@router.post("/reports/refresh-monthly-facts", response_model=Dict[str, Any])
+def run_refresh_monthly_facts_job(
+    months: int = Query(2, ge=1, le=120, description="Meses recentes a recalcular (mês atual incluso)"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Recalcula os meses recentes do cubo mensal (monthly_financial_facts).
+
+    Executado periodicamente para absorver movimentações gravadas fora dos
+    endpoints de Fluxo de Caixa.
+
+    **Permissão**: Apenas admin/super_admin
+    """
+    if current_user.role not in ['admin', 'super_admin']:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can execute jobs"
+        )
+
+    result = refresh_monthly_financial_facts(current_user.workspace_id, months)
+
+    if not result['success']:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Job failed: {result.get('error', 'Unknown error')}"
+        )
+
+    return result
+
+
+@router.post("/reports/rebuild-monthly-facts", response_model=Dict[str, Any])
+def run_rebuild_monthly_facts_job(
+    all_workspaces: bool = Query(False, description="Reconstruir todos os workspaces (apenas super_admin)"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Reconstrói o cubo mensal (monthly_financial_facts) do zero.
+
+    Usado como backfill após a criação da tabela.
+
+    **Permissão**: Apenas admin/super_admin
+    """
+    if current_user.role not in ['admin', 'super_admin']:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can execute jobs"
+        )
+
+    workspace_id: Optional[int] = current_user.workspace_id
+    if all_workspaces:
+        if current_user.role != 'super_admin':
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only super admins can rebuild all workspaces"
+            )
+        workspace_id = None
+
+    result = rebuild_monthly_financial_facts(workspace_id)
+
+    if not result['success']:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Job failed: {result.get('error', 'Unknown error')}"
+        )
+
+    return result
+
+
 @router.get("/health", response_model=Dict[str, str])
 def jobs_health_check():
     """
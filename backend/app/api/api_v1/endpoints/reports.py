@@ -17,8 +17,7 @@ import logging
 from app.core.database import get_db
 from app.models.user import User
 from app.models.cash_flow import CashFlowTransaction, BankAccount, TransactionType
-from app.models.accounts_receivable import AccountsReceivable
-from app.models.accounts_payable import AccountsPayableInvoice
+from app.models.financial_reporting import DreBucket, DreCategoryMapping
 from app.schemas.report import (
     ExecutiveDashboardKPIsResponse,
     ExecutiveDashboardKPI,
@@ -29,9 +28,20 @@ from app.schemas.report import (
     ChartConfig,
     ExecutiveDashboardInsightsResponse,
     ComparisonMetric,
-    Insight
+    Insight,
+    DreCategoryMappingUpdate,
+    DreCategoryMappingResponse
 )
 from app.core.deps import get_current_user
+from app.services.report_cache import report_cache
+from app.services.dashboard_kpi_query import DashboardKPIQuery
+from app.services.dre_classifier import (
+    DreClassifier,
+    DEFAULT_DRE_MAPPING,
+    MAPPABLE_BUCKETS,
+    load_workspace_mapping,
+)
+from app.services.financial_facts import MonthlyFinancialFacts, month_start, next_month
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -69,6 +79,11 @@ async def get_executive_dashboard_kpis(
     if not period_start:
         period_start = date(period_end.year, period_end.month, 1)
 
+    cache_params = {"period_start": period_start, "period_end": period_end}
+    cached = report_cache.get(current_user.workspace_id, "executive-dashboard/kpis", cache_params)
+    if cached is not None:
+        return ExecutiveDashboardKPIsResponse.model_validate_json(cached)
+
     # Calcular período de comparação (período anterior)
     days_diff = (period_end - period_start).days
     comparison_end = period_start - timedelta(days=1)
@@ -78,140 +93,35 @@ async def get_executive_dashboard_kpis(
     logger.info(f"Período de comparação: {comparison_start} a {comparison_end}")
 
     # ============================================
-    # PERÍODO ATUAL
+    # PERÍODO ATUAL E DE COMPARAÇÃO (UM ÚNICO ROUND TRIP)
     # ============================================
 
-    # Receitas do período atual (CashFlowTransaction + AccountsReceivable recebidos)
-    receitas_transacoes = db.query(
-        func.coalesce(func.sum(CashFlowTransaction.value), 0)
-    ).filter(
-        and_(
-            CashFlowTransaction.type == TransactionType.ENTRADA,
-            CashFlowTransaction.transaction_date >= period_start,
-            CashFlowTransaction.transaction_date <= period_end
-        )
-    ).scalar() or 0.0
-
-    receitas_recebidas = db.query(
-        func.coalesce(func.sum(AccountsReceivable.paid_value), 0)
-    ).filter(
-        and_(
-            AccountsReceivable.payment_date >= period_start,
-            AccountsReceivable.payment_date <= period_end,
-            AccountsReceivable.paid_value > 0
-        )
-    ).scalar() or 0.0
-
-    receita_total_atual = receitas_transacoes + receitas_recebidas
-
-    # Despesas do período atual (CashFlowTransaction + AccountsPayable pagos)
-    despesas_transacoes = db.query(
-        func.coalesce(func.sum(CashFlowTransaction.value), 0)
-    ).filter(
-        and_(
-            CashFlowTransaction.type == TransactionType.SAIDA,
-            CashFlowTransaction.transaction_date >= period_start,
-            CashFlowTransaction.transaction_date <= period_end
-        )
-    ).scalar() or 0.0
-
-    despesas_pagas = db.query(
-        func.coalesce(func.sum(AccountsPayableInvoice.paid_value), 0)
-    ).filter(
-        and_(
-            AccountsPayableInvoice.payment_date >= period_start,
-            AccountsPayableInvoice.payment_date <= period_end,
-            AccountsPayableInvoice.paid_value > 0
-        )
-    ).scalar() or 0.0
-
-    despesa_total_atual = despesas_transacoes + despesas_pagas
-
-    # Lucro e Margem
-    lucro_atual = receita_total_atual - despesa_total_atual
-    margem_atual = (lucro_atual / receita_total_atual * 100) if receita_total_atual > 0 else 0
-
-    # Total de vendas (contar transações de entrada)
-    total_vendas_atual = db.query(
-        func.count(CashFlowTransaction.id)
-    ).filter(
-        and_(
-            CashFlowTransaction.type == TransactionType.ENTRADA,
-            CashFlowTransaction.transaction_date >= period_start,
-            CashFlowTransaction.transaction_date <= period_end
-        )
-    ).scalar() or 0
-
-    # Ticket médio
-    ticket_medio_atual = receita_total_atual / total_vendas_atual if total_vendas_atual > 0 else 0
-
-    # ============================================
-    # PERÍODO DE COMPARAÇÃO
-    # ============================================
-
-    # Receitas período anterior
-    receitas_transacoes_ant = db.query(
-        func.coalesce(func.sum(CashFlowTransaction.value), 0)
-    ).filter(
-        and_(
-            CashFlowTransaction.type == TransactionType.ENTRADA,
-            CashFlowTransaction.transaction_date >= comparison_start,
-            CashFlowTransaction.transaction_date <= comparison_end
-        )
-    ).scalar() or 0.0
-
-    receitas_recebidas_ant = db.query(
-        func.coalesce(func.sum(AccountsReceivable.paid_value), 0)
-    ).filter(
-        and_(
-            AccountsReceivable.payment_date >= comparison_start,
-            AccountsReceivable.payment_date <= comparison_end,
-            AccountsReceivable.paid_value > 0
-        )
-    ).scalar() or 0.0
-
-    receita_total_anterior = receitas_transacoes_ant + receitas_recebidas_ant
-
-    # Despesas período anterior
-    despesas_transacoes_ant = db.query(
-        func.coalesce(func.sum(CashFlowTransaction.value), 0)
-    ).filter(
-        and_(
-            CashFlowTransaction.type == TransactionType.SAIDA,
-            CashFlowTransaction.transaction_date >= comparison_start,
-            CashFlowTransaction.transaction_date <= comparison_end
-        )
-    ).scalar() or 0.0
-
-    despesas_pagas_ant = db.query(
-        func.coalesce(func.sum(AccountsPayableInvoice.paid_value), 0)
-    ).filter(
-        and_(
-            AccountsPayableInvoice.payment_date >= comparison_start,
-            AccountsPayableInvoice.payment_date <= comparison_end,
-            AccountsPayableInvoice.paid_value > 0
-        )
-    ).scalar() or 0.0
-
-    despesa_total_anterior = despesas_transacoes_ant + despesas_pagas_ant
-
-    # Lucro e Margem anterior
-    lucro_anterior = receita_total_anterior - despesa_total_anterior
-    margem_anterior = (lucro_anterior / receita_total_anterior * 100) if receita_total_anterior > 0 else 0
-
-    # Total de vendas anterior
-    total_vendas_anterior = db.query(
-        func.count(CashFlowTransaction.id)
-    ).filter(
-        and_(
-            CashFlowTransaction.type == TransactionType.ENTRADA,
-            CashFlowTransaction.transaction_date >= comparison_start,
-            CashFlowTransaction.transaction_date <= comparison_end
-        )
-    ).scalar() or 0
-
-    # Ticket médio anterior
-    ticket_medio_anterior = receita_total_anterior / total_vendas_anterior if total_vendas_anterior > 0 else 0
+    # Receitas = CashFlowTransaction (entradas) + AccountsReceivable recebidos
+    # Despesas = CashFlowTransaction (saídas) + AccountsPayable pagos
+    # Vendas = transações de entrada
+    comparison = DashboardKPIQuery(db).fetch(
+        period_start,
+        period_end,
+        comparison_start,
+        comparison_end,
+        workspace_id=current_user.workspace_id
+    )
+    atual = comparison.current
+    anterior = comparison.previous
+
+    receita_total_atual = atual.total_revenue
+    despesa_total_atual = atual.total_expenses
+    lucro_atual = atual.net_profit
+    margem_atual = atual.profit_margin
+    total_vendas_atual = atual.sales_count
+    ticket_medio_atual = atual.average_ticket
+
+    receita_total_anterior = anterior.total_revenue
+    despesa_total_anterior = anterior.total_expenses
+    lucro_anterior = anterior.net_profit
+    margem_anterior = anterior.profit_margin
+    total_vendas_anterior = anterior.sales_count
+    ticket_medio_anterior = anterior.average_ticket
 
     # ============================================
     # CALCULAR VARIAÇÕES
@@ -318,13 +228,16 @@ async def get_executive_dashboard_kpis(
         )
     ]
 
-    return ExecutiveDashboardKPIsResponse(
+    response = ExecutiveDashboardKPIsResponse(
         kpis=kpis,
         periodo_inicio=period_start,
         periodo_fim=period_end,
         periodo_comparacao_inicio=comparison_start,
         periodo_comparacao_fim=comparison_end
     )
+    report_cache.set(current_user.workspace_id, "executive-dashboard/kpis", cache_params, response.model_dump_json())
+
+    return response
 
 
 # ============================================
@@ -342,6 +255,7 @@ async def get_executive_dashboard_charts(
     Retorna gráficos do Executive Dashboard
 
     - Receita vs Despesa Mensal (últimos 6 meses)
+    - Receita Ano contra Ano (últimos 12 meses vs ano anterior)
     - Fluxo de Caixa Acumulado
     - Distribuição por Categoria (se disponível)
     """
@@ -352,6 +266,11 @@ async def get_executive_dashboard_charts(
     if not period_start:
         period_start = period_end - timedelta(days=180)  # ~6 meses
 
+    cache_params = {"period_start": period_start, "period_end": period_end}
+    cached = report_cache.get(current_user.workspace_id, "executive-dashboard/charts", cache_params)
+    if cached is not None:
+        return ExecutiveDashboardChartsResponse.model_validate_json(cached)
+
     logger.info(f"Gerando gráficos para período {period_start} a {period_end}")
 
     graficos: List[ExecutiveDashboardChart] = []
@@ -360,38 +279,9 @@ async def get_executive_dashboard_charts(
     # GRÁFICO 1: Receita vs Despesa Mensal
     # ============================================
 
-    # Agrupar por mês
-    from sqlalchemy import extract
-
-    # Receitas por mês
-    receitas_por_mes = db.query(
-        extract('year', CashFlowTransaction.transaction_date).label('ano'),
-        extract('month', CashFlowTransaction.transaction_date).label('mes'),
-        func.sum(CashFlowTransaction.value).label('total')
-    ).filter(
-        and_(
-            CashFlowTransaction.type == TransactionType.ENTRADA,
-            CashFlowTransaction.transaction_date >= period_start,
-            CashFlowTransaction.transaction_date <= period_end
-        )
-    ).group_by('ano', 'mes').order_by('ano', 'mes').all()
-
-    # Despesas por mês
-    despesas_por_mes = db.query(
-        extract('year', CashFlowTransaction.transaction_date).label('ano'),
-        extract('month', CashFlowTransaction.transaction_date).label('mes'),
-        func.sum(CashFlowTransaction.value).label('total')
-    ).filter(
-        and_(
-            CashFlowTransaction.type == TransactionType.SAIDA,
-            CashFlowTransaction.transaction_date >= period_start,
-            CashFlowTransaction.transaction_date <= period_end
-        )
-    ).group_by('ano', 'mes').order_by('ano', 'mes').all()
-
-    # Criar dicionários para fácil acesso
-    receitas_dict = {(int(r.ano), int(r.mes)): float(r.total) for r in receitas_por_mes}
-    despesas_dict = {(int(d.ano), int(d.mes)): float(d.total) for d in despesas_por_mes}
+    # Receitas e despesas por mês do workspace (cubo mensal + pontas parciais)
+    facts = MonthlyFinancialFacts(db)
+    movimentos_por_mes = facts.monthly_totals(current_user.workspace_id, period_start, period_end)
 
     # Gerar todos os meses do período
     meses_labels = []
@@ -400,16 +290,13 @@ async def get_executive_dashboard_charts(
 
     current_date = period_start
     while current_date <= period_end:
-        mes_key = (current_date.year, current_date.month)
+        movimento = movimentos_por_mes.get(month_start(current_date))
         meses_labels.append(current_date.strftime('%b/%y'))
-        receitas_data.append(receitas_dict.get(mes_key, 0.0))
-        despesas_data.append(despesas_dict.get(mes_key, 0.0))
+        receitas_data.append(movimento.entries if movimento else 0.0)
+        despesas_data.append(movimento.exits if movimento else 0.0)
 
         # Próximo mês
-        if current_date.month == 12:
-            current_date = date(current_date.year + 1, 1, 1)
-        else:
-            current_date = date(current_date.year, current_date.month + 1, 1)
+        current_date = next_month(month_start(current_date))
 
     graficos.append(ExecutiveDashboardChart(
         id="receita-despesa-mensal",
@@ -439,7 +326,53 @@ async def get_executive_dashboard_charts(
     ))
 
     # ============================================
-    # GRÁFICO 2: Fluxo de Caixa Acumulado
+    # GRÁFICO 2: Receita Ano contra Ano (12 meses)
+    # ============================================
+
+    # Os 12 meses terminando no mês de period_end e os mesmos meses do ano anterior
+    ultimo_mes = month_start(period_end)
+    meses_atuais = [next_month(date(ultimo_mes.year - 1, ultimo_mes.month, 1))]
+    while meses_atuais[-1] < ultimo_mes:
+        meses_atuais.append(next_month(meses_atuais[-1]))
+    inicio_comparacao = date(meses_atuais[0].year - 1, meses_atuais[0].month, 1)
+
+    movimentos_yoy = facts.monthly_totals(current_user.workspace_id, inicio_comparacao, period_end)
+
+    def receita_do_mes(mes: date) -> float:
+        movimento = movimentos_yoy.get(mes)
+        return movimento.entries if movimento else 0.0
+
+    graficos.append(ExecutiveDashboardChart(
+        id="receita-ano-contra-ano",
+        titulo="Receita: Ano Atual vs Ano Anterior",
+        tipo="linhaMultipla",
+        dados=ChartData(
+            labels=[mes.strftime('%b') for mes in meses_atuais],
+            datasets=[
+                ChartDataset(
+                    label="Ano atual",
+                    data=[receita_do_mes(mes) for mes in meses_atuais],
+                    backgroundColor="#10b981",
+                    borderColor="#059669"
+                ),
+                ChartDataset(
+                    label="Ano anterior",
+                    data=[receita_do_mes(date(mes.year - 1, mes.month, 1)) for mes in meses_atuais],
+                    backgroundColor="#94a3b8",
+                    borderColor="#64748b"
+                )
+            ]
+        ),
+        config=ChartConfig(
+            showLegend=True,
+            showGrid=True,
+            showTooltip=True,
+            enableDrillDown=False
+        )
+    ))
+
+    # ============================================
+    # GRÁFICO 3: Fluxo de Caixa Acumulado
     # ============================================
 
     # Saldo inicial (soma de todos os saldos das contas)
@@ -507,7 +440,10 @@ async def get_executive_dashboard_charts(
         )
     ))
 
-    return ExecutiveDashboardChartsResponse(graficos=graficos)
+    response = ExecutiveDashboardChartsResponse(graficos=graficos)
+    report_cache.set(current_user.workspace_id, "executive-dashboard/charts", cache_params, response.model_dump_json())
+
+    return response
 
 
 # ============================================
@@ -534,6 +470,11 @@ async def get_executive_dashboard_insights(
     if not period_start:
         period_start = date(period_end.year, period_end.month, 1)
 
+    cache_params = {"period_start": period_start, "period_end": period_end}
+    cached = report_cache.get(current_user.workspace_id, "executive-dashboard/insights", cache_params)
+    if cached is not None:
+        return ExecutiveDashboardInsightsResponse.model_validate_json(cached)
+
     # Calcular período de comparação
     days_diff = (period_end - period_start).days
     comparison_end = period_start - timedelta(days=1)
@@ -563,10 +504,29 @@ async def get_executive_dashboard_insights(
         )
     ]
 
-    return ExecutiveDashboardInsightsResponse(
+    response = ExecutiveDashboardInsightsResponse(
         comparacao=comparacao,
         insights=insights
     )
+    report_cache.set(current_user.workspace_id, "executive-dashboard/insights", cache_params, response.model_dump_json())
+
+    return response
+
+
+@router.get("/executive-dashboard/cache-metrics")
+async def get_executive_dashboard_cache_metrics(
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Métricas do cache de respostas do Executive Dashboard
+
+    Contadores de hit/miss, gravações, invalidações e evicções do processo
+    atual (por endpoint e totais).
+    """
+    if current_user.role not in ['admin', 'super_admin']:
+        raise HTTPException(status_code=403, detail="Only admins can view cache metrics")
+
+    return report_cache.metrics()
 
 
 # ============================================
@@ -762,66 +722,19 @@ async def get_dre_report(
 
     workspace_id = current_user.workspace_id
 
-    # Buscar todas as transações do período
-    transactions = db.query(CashFlowTransaction).filter(
-        and_(
-            CashFlowTransaction.workspace_id == workspace_id,
-            CashFlowTransaction.transaction_date >= period_start,
-            CashFlowTransaction.transaction_date <= period_end
-        )
-    ).all()
-
-    # Categorias de mapeamento (pode ser customizado futuramente)
-    revenue_categories = ['Venda', 'Receita', 'Receita de Serviço', 'Receita de Produto']
-    tax_categories = ['Impostos', 'PIS', 'COFINS', 'ICMS', 'ISS', 'Taxas']
-    cogs_categories = ['CMV', 'Custo', 'Compra', 'Fornecedor']
-    operational_categories = ['Salários', 'Aluguel', 'Marketing', 'Administrativo', 'Vendas']
-    depreciation_categories = ['Depreciação', 'Amortização']
-    financial_categories = ['Juros', 'Multas', 'Encargos Financeiros', 'Taxas Bancárias']
-
-    # Inicializar valores
-    receita_bruta = 0.0
-    deducoes = 0.0
-    cmv = 0.0
-    despesas_operacionais = 0.0
-    depreciacao = 0.0
-    juros = 0.0
-
-    # Processar transações
-    for t in transactions:
-        category_lower = (t.category or '').lower()
-
-        # Receita Bruta (ENTRADAS com categorias de receita)
-        if t.type == TransactionType.ENTRADA.value:
-            is_revenue = any(cat.lower() in category_lower for cat in revenue_categories)
-            if is_revenue:
-                receita_bruta += t.value
-
-        # Saídas categorizadas
-        if t.type == TransactionType.SAIDA.value:
-            # Impostos e Deduções
-            if any(cat.lower() in category_lower for cat in tax_categories):
-                deducoes += t.value
-
-            # CMV (Custos de Produto/Mercadoria)
-            elif any(cat.lower() in category_lower for cat in cogs_categories):
-                cmv += t.value
-
-            # Despesas Operacionais
-            elif any(cat.lower() in category_lower for cat in operational_categories):
-                despesas_operacionais += t.value
-
-            # Depreciação/Amortização
-            elif any(cat.lower() in category_lower for cat in depreciation_categories):
-                depreciacao += t.value
-
-            # Juros e Despesas Financeiras
-            elif any(cat.lower() in category_lower for cat in financial_categories):
-                juros += t.value
-
-            # Se não se encaixa em nenhuma categoria específica, considerar operacional
-            else:
-                despesas_operacionais += t.value
+    # Somar as transações do período por linha do DRE usando o mapeamento de
+    # categorias do workspace (ou o padrão): meses completos vêm do cubo
+    # mensal, pontas parciais do GROUP BY nas transações
+    classifier = DreClassifier.for_workspace(db, workspace_id)
+    bucket_totals = MonthlyFinancialFacts(db).bucket_totals(workspace_id, period_start, period_end, classifier)
+
+    receita_bruta = bucket_totals.get(DreBucket.RECEITA)
+    deducoes = bucket_totals.get(DreBucket.DEDUCOES)
+    cmv = bucket_totals.get(DreBucket.CMV)
+    despesas_operacionais = bucket_totals.get(DreBucket.DESPESAS_OPERACIONAIS)
+    depreciacao = bucket_totals.get(DreBucket.DEPRECIACAO)
+    juros = bucket_totals.get(DreBucket.JUROS)
+    transactions_count = bucket_totals.transactions_count
 
     # Calcular valores derivados
     receita_liquida = receita_bruta - deducoes
@@ -926,14 +839,85 @@ async def get_dre_report(
         "margem_bruta": round(margem_bruta, 2),
         "margem_ebitda": round(margem_ebitda, 2),
         "margem_liquida": round(margem_liquida, 2),
-        "transactions_count": len(transactions),
+        "transactions_count": transactions_count,
         "data_source": "cash_flow_real_data"
     }
 
     logger.info(
         f"DRE calculado para workspace {workspace_id}: "
         f"Receita={receita_bruta}, Lucro Líquido={lucro_liquido}, "
-        f"Transações={len(transactions)}"
+        f"Transações={transactions_count}"
     )
 
     return response
+
+
+@router.get("/dre/category-mappings", response_model=DreCategoryMappingResponse)
+async def get_dre_category_mappings(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Mapeamento de categorias -> linhas do DRE usado pelo workspace
+    """
+    mapping = load_workspace_mapping(db, current_user.workspace_id)
+
+    return DreCategoryMappingResponse(
+        is_default=mapping is DEFAULT_DRE_MAPPING,
+        mappings={bucket: list(mapping.get(bucket, [])) for bucket in MAPPABLE_BUCKETS}
+    )
+
+
+@router.put("/dre/category-mappings", response_model=DreCategoryMappingResponse)
+async def update_dre_category_mappings(
+    payload: DreCategoryMappingUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Substitui o mapeamento de categorias do DRE do workspace
+
+    Linhas omitidas ficam sem palavras-chave (não recebem nenhuma categoria);
+    um mapeamento vazio equivale a voltar ao padrão.
+    """
+    if current_user.role not in ['admin', 'super_admin']:
+        raise HTTPException(status_code=403, detail="Only admins can change DRE mappings")
+
+    workspace_id = current_user.workspace_id
+
+    db.query(DreCategoryMapping).filter(
+        DreCategoryMapping.workspace_id == workspace_id
+    ).delete(synchronize_session=False)
+
+    for bucket, keywords in payload.mappings.items():
+        for keyword in dict.fromkeys(keyword.strip() for keyword in keywords):
+            db.add(DreCategoryMapping(workspace_id=workspace_id, bucket=bucket.value, keyword=keyword))
+
+    # Regravar a linha do DRE no cubo mensal com o novo mapeamento
+    MonthlyFinancialFacts(db).reclassify(workspace_id)
+
+    db.commit()
+
+    logger.info(f"Mapeamento do DRE atualizado para workspace {workspace_id}")
+
+    return await get_dre_category_mappings(db, current_user)
+
+
+@router.delete("/dre/category-mappings", response_model=DreCategoryMappingResponse)
+async def reset_dre_category_mappings(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Remove o mapeamento próprio do workspace (volta ao padrão)
+    """
+    if current_user.role not in ['admin', 'super_admin']:
+        raise HTTPException(status_code=403, detail="Only admins can change DRE mappings")
+
+    db.query(DreCategoryMapping).filter(
+        DreCategoryMapping.workspace_id == current_user.workspace_id
+    ).delete(synchronize_session=False)
+    MonthlyFinancialFacts(db).reclassify(current_user.workspace_id)
+    db.commit()
+
+    return await get_dre_category_mappings(db, current_user)
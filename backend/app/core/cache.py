@@ -0,0 +1,317 @@
+"""
+Cache de respostas por workspace
+
+Backends intercambiáveis com a mesma interface:
+- MemoryCacheBackend: LRU em processo com TTL por entrada
+- RedisCacheBackend: uma chave por entrada no Redis (settings.REDIS_URL),
+  com TTL próprio e limite de entradas
+
+As entradas são agrupadas por workspace, de forma que a invalidação remove
+apenas as respostas do workspace afetado. ResponseCache monta as chaves a
+partir do endpoint e dos parâmetros e mantém métricas de hit/miss.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCacheBackend:
+    """
+    LRU em processo com TTL
+
+    Cada entrada guarda (expira_em, valor); um índice workspace -> chaves
+    permite invalidar um workspace sem percorrer o cache inteiro.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[float, str]]" = OrderedDict()
+        self._workspace_keys: Dict[int, Set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, workspace_id: int, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get((workspace_id, key))
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(workspace_id, key)
+                return None
+
+            self._entries.move_to_end((workspace_id, key))
+            return value
+
+    def set(self, workspace_id: int, key: str, value: str, ttl: int) -> None:
+        with self._lock:
+            self._entries[(workspace_id, key)] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end((workspace_id, key))
+            self._workspace_keys[workspace_id].add(key)
+
+            while len(self._entries) > self.max_entries:
+                (old_workspace, old_key), _ = self._entries.popitem(last=False)
+                self._discard_index(old_workspace, old_key)
+                self.evictions += 1
+
+    def invalidate_workspace(self, workspace_id: int) -> int:
+        with self._lock:
+            keys = self._workspace_keys.pop(workspace_id, set())
+            for key in keys:
+                self._entries.pop((workspace_id, key), None)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._workspace_keys.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, workspace_id: int, key: str) -> None:
+        self._entries.pop((workspace_id, key), None)
+        self._discard_index(workspace_id, key)
+
+    def _discard_index(self, workspace_id: int, key: str) -> None:
+        keys = self._workspace_keys.get(workspace_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._workspace_keys[workspace_id]
+
+
+class RedisCacheBackend:
+    """
+    Backend Redis: uma chave por entrada (SET chave valor EX ttl)
+
+    O Redis expira cada entrada pelo próprio TTL. Sorted sets (chave ->
+    expira_em) indexam as entradas do processo todo e de cada workspace: o
+    índice geral mantém a quantidade em max_entries (a cada gravação as
+    entradas já expiradas saem dos índices e, acima do limite, as que
+    expiram primeiro são removidas) e o do workspace permite invalidá-lo
+    sem varrer o keyspace.
+    """
+
+    name = "redis"
+
+    def __init__(self, redis_url: str, max_entries: int = 1024, prefix: str = "orion:cache", client=None):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+        self.prefix = prefix
+        self.max_entries = max_entries
+        self.client = client
+        self.evictions = 0
+
+    def get(self, workspace_id: int, key: str) -> Optional[str]:
+        raw = self.client.get(self._entry_key(workspace_id, key))
+        return raw.decode("utf-8") if raw is not None else None
+
+    def set(self, workspace_id: int, key: str, value: str, ttl: int) -> None:
+        entry_key = self._entry_key(workspace_id, key)
+        now = time.time()
+
+        pipeline = self.client.pipeline()
+        pipeline.set(entry_key, value, ex=max(1, int(ttl)))
+        pipeline.zadd(self._index_key(), {entry_key: now + ttl})
+        pipeline.zadd(self._workspace_index_key(workspace_id), {entry_key: now + ttl})
+        pipeline.zrangebyscore(self._index_key(), "-inf", now)
+        pipeline.zcard(self._index_key())
+        expired, count = pipeline.execute()[-2:]
+
+        if expired:
+            self._unindex(expired, from_index=True)
+
+        excess = int(count or 0) - len(expired) - self.max_entries
+        if excess > 0:
+            evicted = [member for member, _ in self.client.zpopmin(self._index_key(), excess)]
+            if evicted:
+                self.client.delete(*evicted)
+                self._unindex(evicted)
+                self.evictions += len(evicted)
+
+    def invalidate_workspace(self, workspace_id: int) -> int:
+        workspace_index = self._workspace_index_key(workspace_id)
+        keys = self.client.zrange(workspace_index, 0, -1)
+        if not keys:
+            return 0
+
+        pipeline = self.client.pipeline()
+        pipeline.delete(*keys)
+        pipeline.zrem(self._index_key(), *keys)
+        pipeline.delete(workspace_index)
+        return int(pipeline.execute()[0] or 0)
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(f"{self.prefix}:ws:*"):
+            self.client.delete(key)
+        for key in self.client.scan_iter(f"{self.prefix}:index*"):
+            self.client.delete(key)
+
+    def size(self) -> int:
+        return int(self.client.zcount(self._index_key(), time.time(), "+inf"))
+
+    def _unindex(self, entry_keys, from_index: bool = False) -> None:
+        """Remove chaves dos índices dos seus workspaces (e do geral)"""
+        by_workspace: Dict[str, list] = defaultdict(list)
+        for entry_key in entry_keys:
+            by_workspace[self._workspace_of(entry_key)].append(entry_key)
+
+        pipeline = self.client.pipeline()
+        if from_index:
+            pipeline.zrem(self._index_key(), *entry_keys)
+        for workspace_id, keys in by_workspace.items():
+            pipeline.zrem(self._workspace_index_key(workspace_id), *keys)
+        pipeline.execute()
+
+    def _workspace_of(self, entry_key) -> str:
+        if isinstance(entry_key, bytes):
+            entry_key = entry_key.decode("utf-8")
+        return entry_key[len(f"{self.prefix}:ws:"):].split(":", 1)[0]
+
+    def _entry_key(self, workspace_id: int, key: str) -> str:
+        return f"{self.prefix}:ws:{workspace_id}:{key}"
+
+    def _index_key(self) -> str:
+        return f"{self.prefix}:index"
+
+    def _workspace_index_key(self, workspace_id) -> str:
+        return f"{self.prefix}:index:ws:{workspace_id}"
+
+
+class ResponseCache:
+    """
+    Cache de respostas serializadas (JSON) por workspace, endpoint e parâmetros
+
+    Falhas do backend (ex.: Redis indisponível) são registradas e tratadas
+    como miss, nunca propagadas para o endpoint.
+    """
+
+    def __init__(self, backend, default_ttl: int = 300, namespace: str = "reports"):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, int] = defaultdict(int)
+        self._endpoint_metrics: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def build_key(self, endpoint: str, params: Dict[str, Any]) -> str:
+        """Chave estável: endpoint + hash dos parâmetros ordenados"""
+        encoded = json.dumps(params, sort_keys=True, default=str)
+        digest = hashlib.sha1(encoded.encode("utf-8")).hexdigest()[:16]
+        return f"{self.namespace}:{endpoint}:{digest}"
+
+    def get(self, workspace_id: int, endpoint: str, params: Dict[str, Any]) -> Optional[str]:
+        """Resposta em cache (JSON) ou None"""
+        try:
+            value = self.backend.get(workspace_id, self.build_key(endpoint, params))
+        except Exception as e:
+            logger.warning(f"Erro ao ler cache ({self.backend.name}): {str(e)}")
+            self._record(endpoint, "errors")
+            value = None
+
+        self._record(endpoint, "hits" if value is not None else "misses")
+        return value
+
+    def set(
+        self,
+        workspace_id: int,
+        endpoint: str,
+        params: Dict[str, Any],
+        value: str,
+        ttl: Optional[int] = None
+    ) -> None:
+        """Grava a resposta serializada"""
+        try:
+            self.backend.set(workspace_id, self.build_key(endpoint, params), value, ttl or self.default_ttl)
+            self._record(endpoint, "sets")
+        except Exception as e:
+            logger.warning(f"Erro ao gravar cache ({self.backend.name}): {str(e)}")
+            self._record(endpoint, "errors")
+
+    def invalidate_workspace(self, workspace_id: int) -> int:
+        """Remove todas as respostas de um workspace"""
+        try:
+            removed = self.backend.invalidate_workspace(workspace_id)
+        except Exception as e:
+            logger.warning(f"Erro ao invalidar cache ({self.backend.name}): {str(e)}")
+            with self._lock:
+                self._metrics["errors"] += 1
+            return 0
+
+        with self._lock:
+            self._metrics["invalidations"] += 1
+            self._metrics["invalidated_entries"] += removed
+        return removed
+
+    def clear(self) -> None:
+        """Limpa o cache e zera as métricas"""
+        self.backend.clear()
+        with self._lock:
+            self._metrics.clear()
+            self._endpoint_metrics.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Contadores de hit/miss do processo atual"""
+        with self._lock:
+            hits = self._metrics["hits"]
+            misses = self._metrics["misses"]
+            metrics = {
+                "backend": self.backend.name,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "sets": self._metrics["sets"],
+                "errors": self._metrics["errors"],
+                "invalidations": self._metrics["invalidations"],
+                "invalidated_entries": self._metrics["invalidated_entries"],
+                "evictions": getattr(self.backend, "evictions", 0),
+                "by_endpoint": {
+                    endpoint: dict(counters) for endpoint, counters in self._endpoint_metrics.items()
+                }
+            }
+
+        try:
+            metrics["entries"] = self.backend.size()
+        except Exception:
+            metrics["entries"] = None
+        return metrics
+
+    def _record(self, endpoint: str, counter: str) -> None:
+        with self._lock:
+            self._metrics[counter] += 1
+            self._endpoint_metrics[endpoint][counter] += 1
+
+
+def build_cache_backend(
+    backend_name: str,
+    redis_url: str,
+    max_entries: int,
+    prefix: str = "orion:cache"
+):
+    """
+    Instancia o backend configurado
+
+    Se o Redis for solicitado mas o pacote não estiver instalado, usa o LRU
+    em processo.
+    """
+    if backend_name == "redis":
+        try:
+            return RedisCacheBackend(redis_url, max_entries, prefix=prefix)
+        except ImportError:
+            logger.warning("Pacote redis não instalado; usando cache em memória")
+
+    return MemoryCacheBackend(max_entries=max_entries)
@@ -28,6 +28,94 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
 
+    # Cache de respostas dos relatórios ("memory" = LRU em processo, "redis")
+    REPORTS_CACHE_BACKEND: str = "memory"
+    REPORTS_CACHE_TTL_SECONDS: int = 300
+    REPORTS_CACHE_MAX_ENTRIES: int = 1024
+
+    # Monte Carlo - processos do pool de simulação (0 = número de CPUs)
+    MONTE_CARLO_WORKERS: int = 0
+
+    # Pipeline de PDFs - processos do pool de OCR (0 = número de CPUs) e
+    # páginas por lote de inferência do LayoutLM
+    PDF_OCR_WORKERS: int = 0
+    LAYOUTLM_BATCH_SIZE: int = 4
+
+    # Camada de texto de PDFs digitais - lida direto do PDF, sem OCR, nas
+    # páginas com pelo menos PDF_TEXT_LAYER_MIN_WORDS palavras legíveis
+    PDF_TEXT_LAYER_ENABLED: bool = True
+    PDF_TEXT_LAYER_MIN_WORDS: int = 15
+
+    # Pré-processamento do OCR (tons de cinza, correção de inclinação e
+    # binarização) e DPI adaptativo: páginas digitalizadas rasterizadas a
+    # OCR_LOW_DPI, com as linhas de confiança média abaixo de
+    # OCR_REFINE_MIN_CONFIDENCE refeitas na resolução de PDF_DPI
+    OCR_PREPROCESS_ENABLED: bool = True
+    OCR_ADAPTIVE_DPI_ENABLED: bool = True
+    OCR_LOW_DPI: int = 150
+    OCR_REFINE_MIN_CONFIDENCE: float = 70.0
+
+    # Worker de inferência do LayoutLM - páginas por micro-lote (entre todas
+    # as requisições do processo) e espera máxima para completar o lote
+    LAYOUTLM_MICRO_BATCH_SIZE: int = 8
+    LAYOUTLM_MICRO_BATCH_WAIT_MS: float = 10.0
+
+    # Modelo LayoutLM compartilhado - carga na inicialização da API,
+    # quantização int8 dinâmica (CPU) e threads do torch (0 = padrão)
+    LAYOUTLM_MODEL_NAME: str = "microsoft/layoutlmv3-base"
+    LAYOUTLM_PRELOAD: bool = False
+    LAYOUTLM_QUANTIZE_INT8: bool = False
+    TORCH_NUM_THREADS: int = 0
+
+    # Cache de extração de faturas por conteúdo ("db", "disk" ou "off") e
+    # tamanho máximo total dos resultados guardados
+    EXTRACTION_CACHE_BACKEND: str = "db"
+    EXTRACTION_CACHE_DIR: str = "/tmp/orion_extraction_cache"
+    EXTRACTION_CACHE_MAX_MB: int = 256
+
+    # Fila de jobs de extração de faturas - workers, limites de backpressure
+    # (jobs aguardando no processo / ativos por workspace / lotes ativos por
+    # workspace), retentativas e tempo que o resultado fica disponível para
+    # consulta
+    INVOICE_JOB_WORKERS: int = 2
+    INVOICE_JOB_MAX_QUEUED: int = 50
+    INVOICE_JOB_MAX_PER_WORKSPACE: int = 10
+    INVOICE_JOB_MAX_BATCHES_PER_WORKSPACE: int = 1
+    INVOICE_JOB_MAX_RETRIES: int = 2
+    INVOICE_JOB_RETRY_BACKOFF_SECONDS: float = 2.0
+    INVOICE_JOB_TIMEOUT_SECONDS: float = 300.0
+    INVOICE_JOB_RESULT_TTL_SECONDS: float = 3600.0
+
+    # Ingestão em lote de faturas - limites do lote (quantidade de arquivos e
+    # total gravado, em MB); a extração roda nos workers da fila de jobs
+    BULK_UPLOAD_MAX_FILES: int = 500
+    BULK_UPLOAD_MAX_TOTAL_MB: int = 1024
+
+    # Cliente HTTP das chamadas de LLM - conexões no pool, chamadas
+    # simultâneas, requisições por segundo (token bucket, 0 = sem limite) e
+    # retentativas com backoff exponencial em 429/5xx
+    LLM_HTTP_MAX_CONNECTIONS: int = 20
+    LLM_HTTP_MAX_CONCURRENCY: int = 8
+    LLM_HTTP_REQUESTS_PER_SECOND: float = 8.0
+    LLM_HTTP_BURST: int = 8
+    LLM_HTTP_MAX_RETRIES: int = 3
+    LLM_HTTP_BACKOFF_SECONDS: float = 0.5
+    LLM_HTTP_TIMEOUT_SECONDS: float = 60.0
+
+    # Cache das respostas do LLM por modelo + prompt normalizado ("memory" =
+    # LRU em processo, "redis" = persistente entre processos, "off")
+    LLM_CACHE_BACKEND: str = "memory"
+    LLM_CACHE_TTL_SECONDS: int = 86400
+    LLM_CACHE_MAX_ENTRIES: int = 2048
+
+    # Cache dos índices de fornecedores por workspace (matching das faturas) -
+    # limites em memória (workspaces e total de fornecedores), validade de
+    # cada índice em segundos e carga na inicialização da API
+    SUPPLIER_INDEX_CACHE_MAX_WORKSPACES: int = 64
+    SUPPLIER_INDEX_CACHE_MAX_SUPPLIERS: int = 200000
+    SUPPLIER_INDEX_CACHE_TTL_SECONDS: float = 600.0
+    SUPPLIER_INDEX_PRELOAD: bool = False
+
     # Security - JWT Configuration
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
     ALGORITHM: str = "HS256"
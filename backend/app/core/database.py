@@ -49,3 +49,15 @@ def init_db():
     Should be called on application startup.
     """
     Base.metadata.create_all(bind=engine)
+
+
+def upsert_insert(db, table):
+    """
+    INSERT supporting ON CONFLICT for the session's database
+    (PostgreSQL in production, SQLite in tests).
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(table)
@@ -0,0 +1,121 @@
+"""
+Jobs de manutenção do Fluxo de Caixa.
+
+Automatiza tarefas como:
+- Reconstrução (backfill) do ledger diário de saldos
+- Verificação de consistência do ledger contra as transações
+
+Uso via linha de comando:
+    python -m app.jobs.cash_flow_jobs rebuild [--workspace-id N]
+    python -m app.jobs.cash_flow_jobs check [--workspace-id N]
+"""
+
+from sqlalchemy.orm import Session
+from datetime import datetime, date
+from typing import Dict, Any, Optional
+import argparse
+import json
+import logging
+
+from app.core.database import SessionLocal
+from app.services.cash_flow_ledger import CashFlowLedger
+
+logger = logging.getLogger(__name__)
+
+
+def rebuild_daily_balances(workspace_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Reconstrói o ledger diário (cash_flow_daily_balances) a partir das transações.
+
+    Args:
+        workspace_id: Workspace a reconstruir; None = todos
+
+    Returns:
+        Dict com estatísticas da reconstrução
+    """
+    db: Session = SessionLocal()
+    try:
+        stats = CashFlowLedger(db).rebuild(workspace_id)
+        db.commit()
+
+        result = {
+            'success': True,
+            'workspace_id': workspace_id,
+            'deleted_rows': stats['deleted'],
+            'inserted_rows': stats['inserted'],
+            'execution_date': date.today().isoformat(),
+            'message': f"Ledger diário reconstruído com {stats['inserted']} linhas"
+        }
+
+        logger.info(f"Job rebuild_daily_balances concluído: {result['message']}")
+        return result
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao reconstruir ledger diário: {str(e)}")
+        return {
+            'success': False,
+            'error': str(e),
+            'workspace_id': workspace_id,
+            'execution_date': date.today().isoformat()
+        }
+    finally:
+        db.close()
+
+
+def check_daily_balances_consistency(workspace_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Compara o ledger diário com as transações brutas.
+
+    Args:
+        workspace_id: Workspace a verificar; None = todos
+
+    Returns:
+        Dict com a lista de divergências encontradas
+    """
+    db: Session = SessionLocal()
+    try:
+        discrepancies = CashFlowLedger(db).check_consistency(workspace_id)
+
+        result = {
+            'success': True,
+            'workspace_id': workspace_id,
+            'consistent': not discrepancies,
+            'discrepancy_count': len(discrepancies),
+            'discrepancies': discrepancies[:100],
+            'execution_date': date.today().isoformat(),
+            'message': (
+                'Ledger diário consistente' if not discrepancies
+                else f'{len(discrepancies)} divergências encontradas no ledger diário'
+            )
+        }
+
+        logger.info(f"Job check_daily_balances_consistency concluído: {result['message']}")
+        return result
+
+    except Exception as e:
+        logger.error(f"Erro ao verificar ledger diário: {str(e)}")
+        return {
+            'success': False,
+            'error': str(e),
+            'workspace_id': workspace_id,
+            'execution_date': date.today().isoformat()
+        }
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Jobs de manutenção do Fluxo de Caixa")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--workspace-id", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "rebuild":
+        output = rebuild_daily_balances(args.workspace_id)
+    else:
+        output = check_daily_balances_consistency(args.workspace_id)
+
+    print(json.dumps(output, indent=2, default=str))
@@ -0,0 +1,133 @@
+"""
+Jobs de manutenção do cubo mensal de relatórios financeiros.
+
+Automatiza tarefas como:
+- Recálculo incremental dos meses recentes (corrige movimentações gravadas
+  fora dos endpoints de Fluxo de Caixa)
+- Reconstrução completa (backfill) de monthly_financial_facts
+
+Uso via linha de comando:
+    python -m app.jobs.financial_reporting_jobs refresh [--workspace-id N] [--months N]
+    python -m app.jobs.financial_reporting_jobs rebuild [--workspace-id N]
+"""
+
+from sqlalchemy.orm import Session
+from datetime import date
+from typing import Dict, Any, Optional
+import argparse
+import json
+import logging
+
+from app.core.database import SessionLocal
+from app.services.financial_facts import MonthlyFinancialFacts
+
+logger = logging.getLogger(__name__)
+
+# Meses recalculados pelo refresh periódico (mês atual incluso)
+DEFAULT_REFRESH_MONTHS = 2
+
+
+def refresh_monthly_financial_facts(
+    workspace_id: Optional[int] = None,
+    months: int = DEFAULT_REFRESH_MONTHS
+) -> Dict[str, Any]:
+    """
+    Recalcula os últimos `months` meses do cubo mensal a partir das transações.
+
+    Args:
+        workspace_id: Workspace a recalcular; None = todos
+        months: Quantidade de meses recentes (mês atual incluso)
+
+    Returns:
+        Dict com estatísticas do recálculo
+    """
+    today = date.today()
+    total_months = today.year * 12 + today.month - 1 - (max(months, 1) - 1)
+    since = date(total_months // 12, total_months % 12 + 1, 1)
+
+    db: Session = SessionLocal()
+    try:
+        stats = MonthlyFinancialFacts(db).refresh(workspace_id, since=since)
+        db.commit()
+
+        result = {
+            'success': True,
+            'workspace_id': workspace_id,
+            'since': since.isoformat(),
+            'deleted_rows': stats['deleted'],
+            'inserted_rows': stats['inserted'],
+            'execution_date': today.isoformat(),
+            'message': f"Cubo mensal recalculado desde {since.isoformat()} com {stats['inserted']} linhas"
+        }
+
+        logger.info(f"Job refresh_monthly_financial_facts concluído: {result['message']}")
+        return result
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao recalcular cubo mensal: {str(e)}")
+        return {
+            'success': False,
+            'error': str(e),
+            'workspace_id': workspace_id,
+            'execution_date': today.isoformat()
+        }
+    finally:
+        db.close()
+
+
+def rebuild_monthly_financial_facts(workspace_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Reconstrói o cubo mensal (monthly_financial_facts) do zero.
+
+    Args:
+        workspace_id: Workspace a reconstruir; None = todos
+
+    Returns:
+        Dict com estatísticas da reconstrução
+    """
+    db: Session = SessionLocal()
+    try:
+        stats = MonthlyFinancialFacts(db).rebuild(workspace_id)
+        db.commit()
+
+        result = {
+            'success': True,
+            'workspace_id': workspace_id,
+            'deleted_rows': stats['deleted'],
+            'inserted_rows': stats['inserted'],
+            'execution_date': date.today().isoformat(),
+            'message': f"Cubo mensal reconstruído com {stats['inserted']} linhas"
+        }
+
+        logger.info(f"Job rebuild_monthly_financial_facts concluído: {result['message']}")
+        return result
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erro ao reconstruir cubo mensal: {str(e)}")
+        return {
+            'success': False,
+            'error': str(e),
+            'workspace_id': workspace_id,
+            'execution_date': date.today().isoformat()
+        }
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Jobs do cubo mensal de relatórios financeiros")
+    parser.add_argument("command", choices=["refresh", "rebuild"])
+    parser.add_argument("--workspace-id", type=int, default=None)
+    parser.add_argument("--months", type=int, default=DEFAULT_REFRESH_MONTHS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "refresh":
+        output = refresh_monthly_financial_facts(args.workspace_id, args.months)
+    else:
+        output = rebuild_monthly_financial_facts(args.workspace_id)
+
+    print(json.dumps(output, indent=2, default=str))
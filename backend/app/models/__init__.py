@@ -6,12 +6,12 @@ All models follow multi-tenant architecture with workspace_id.
 from app.core.database import Base
 from app.models.workspace import Workspace
 from app.models.user import User
-from app.models.supplier_model import Supplier
+from app.models.supplier_model import Supplier, SupplierInvoiceStat
 from app.models.invoice_model import Invoice
 from app.models.product import Product
 from app.models.sale import Sale
 from app.models.accounts_receivable import AccountsReceivable
-from app.models.cash_flow import BankAccount, CashFlowTransaction
+from app.models.cash_flow import BankAccount, CashFlowTransaction, CashFlowDailyBalance
 from app.models.batch import ProductBatch, BatchMovement
 from app.models.warehouse import Warehouse, WarehouseArea, StockTransfer
 from app.models.automation import (
@@ -52,6 +52,8 @@ from app.models.inventory import (
     InventoryCountItem
 )
 from app.models.notification import Notification
+from app.models.financial_reporting import DreCategoryMapping, MonthlyFinancialFact
+from app.models.invoice_extraction import InvoiceExtractionCache
 
 __all__ = [
     "Base",
@@ -64,6 +66,7 @@ __all__ = [
     "AccountsReceivable",
     "BankAccount",
     "CashFlowTransaction",
+    "CashFlowDailyBalance",
     "ProductBatch",
     "BatchMovement",
     "Warehouse",
@@ -99,4 +102,8 @@ __all__ = [
     "InventoryCycleCount",
     "InventoryCountItem",
     "Notification",
+    "DreCategoryMapping",
+    "MonthlyFinancialFact",
+    "InvoiceExtractionCache",
+    "SupplierInvoiceStat",
 ]
@@ -8,7 +8,7 @@ Fase: 2.1 - Sprint Backend Cash Flow
 Referência: roadmaps/ROADMAP_FINANCEIRO_INTEGRACAO.md
 """
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Date, Text, ForeignKey, JSON, Enum as SQLEnum, CheckConstraint
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Date, Text, ForeignKey, JSON, Enum as SQLEnum, CheckConstraint, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models import Base
@@ -177,3 +177,48 @@ class CashFlowTransaction(Base):
 
     def __repr__(self):
         return f"<CashFlowTransaction(id={self.id}, date={self.transaction_date}, type={self.type}, value={self.value})>"
+
+
+class CashFlowDailyBalance(Base):
+    """
+    Ledger diário materializado de Fluxo de Caixa
+
+    Uma linha por workspace/conta/dia com movimentação, contendo entradas,
+    saídas e o saldo de fechamento acumulado das movimentações da conta até o
+    dia (sem o saldo inicial da conta, que permanece em BankAccount).
+    Mantido incrementalmente pelos endpoints de movimentação e reconstruível
+    a partir de cash_flow_transactions (app.jobs.cash_flow_jobs).
+    """
+    __tablename__ = "cash_flow_daily_balances"
+
+    # Primary Key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Multi-tenant (OBRIGATÓRIO)
+    workspace_id = Column(Integer, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False)
+
+    # Conta bancária (0 = transações sem conta vinculada)
+    account_id = Column(Integer, nullable=False, default=0)
+
+    # Dia e movimentações
+    balance_date = Column(Date, nullable=False)
+    entries = Column(Float, nullable=False, default=0.0)
+    exits = Column(Float, nullable=False, default=0.0)
+    closing_balance = Column(Float, nullable=False, default=0.0)
+
+    # Metadata
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Constraints
+    __table_args__ = (
+        UniqueConstraint('workspace_id', 'account_id', 'balance_date', name='uq_daily_balance_account_date'),
+        Index('ix_daily_balance_workspace_date', 'workspace_id', 'balance_date'),
+    )
+
+    @property
+    def net_flow(self) -> float:
+        """Fluxo líquido do dia"""
+        return self.entries - self.exits
+
+    def __repr__(self):
+        return f"<CashFlowDailyBalance(account={self.account_id}, date={self.balance_date}, closing={self.closing_balance})>"
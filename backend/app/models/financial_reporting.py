@@ -0,0 +1,103 @@
+"""
+Modelos de apoio aos relatórios financeiros (DRE)
+
+- DreBucket: linhas do DRE em que as movimentações são classificadas
+- DreCategoryMapping: palavras-chave de categoria por linha do DRE,
+  customizáveis por workspace (sem linhas = mapeamento padrão)
+- MonthlyFinancialFact: cubo mensal pré-agregado de cash_flow_transactions
+  (workspace × mês × linha do DRE × categoria × conta)
+"""
+
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, UniqueConstraint, Index
+from datetime import datetime
+from app.models import Base
+import enum
+
+
+class DreBucket(str, enum.Enum):
+    """Linhas do DRE usadas na classificação de movimentações"""
+    RECEITA = "receita"
+    DEDUCOES = "deducoes"
+    CMV = "cmv"
+    DESPESAS_OPERACIONAIS = "despesas_operacionais"
+    DEPRECIACAO = "depreciacao"
+    JUROS = "juros"
+    NAO_CLASSIFICADO = "nao_classificado"  # entradas que não são receita
+
+
+class DreCategoryMapping(Base):
+    """
+    Palavra-chave de categoria associada a uma linha do DRE
+
+    Uma movimentação cai na linha cuja palavra-chave estiver contida na sua
+    categoria (sem diferenciar maiúsculas). Se o workspace não tiver nenhuma
+    linha cadastrada, vale o mapeamento padrão de app.services.dre_classifier.
+    """
+    __tablename__ = "dre_category_mappings"
+
+    # Primary Key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Multi-tenant (OBRIGATÓRIO)
+    workspace_id = Column(Integer, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False)
+
+    # Mapeamento
+    bucket = Column(String(50), nullable=False)  # DreBucket
+    keyword = Column(String(100), nullable=False)
+
+    # Metadata
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # Constraints
+    __table_args__ = (
+        UniqueConstraint('workspace_id', 'bucket', 'keyword', name='uq_dre_mapping_workspace_bucket_keyword'),
+        Index('ix_dre_mapping_workspace', 'workspace_id'),
+    )
+
+    def __repr__(self):
+        return f"<DreCategoryMapping(workspace={self.workspace_id}, bucket={self.bucket}, keyword={self.keyword})>"
+
+
+class MonthlyFinancialFact(Base):
+    """
+    Movimentações consolidadas por workspace/mês/tipo/categoria/conta
+
+    A linha do DRE (bucket) é derivada de tipo + categoria pelo mapeamento do
+    workspace e fica gravada para que DRE e gráficos agrupem direto no cubo;
+    quando o mapeamento muda, as linhas são reclassificadas no próprio cubo.
+    Mantido incrementalmente pelos endpoints de movimentação e reconstruível a
+    partir de cash_flow_transactions (app.jobs.financial_reporting_jobs).
+    """
+    __tablename__ = "monthly_financial_facts"
+
+    # Primary Key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Multi-tenant (OBRIGATÓRIO)
+    workspace_id = Column(Integer, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False)
+
+    # Dimensões
+    month = Column(Date, nullable=False)  # primeiro dia do mês
+    type = Column(String(20), nullable=False)  # TransactionType
+    category = Column(String(100), nullable=False)
+    account_id = Column(Integer, nullable=False, default=0)  # 0 = sem conta vinculada
+    bucket = Column(String(50), nullable=False)  # DreBucket
+
+    # Medidas
+    total_value = Column(Float, nullable=False, default=0.0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+
+    # Metadata
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Constraints
+    __table_args__ = (
+        UniqueConstraint(
+            'workspace_id', 'month', 'type', 'category', 'account_id',
+            name='uq_monthly_fact_workspace_month_type_category_account'
+        ),
+        Index('ix_monthly_fact_workspace_month', 'workspace_id', 'month'),
+    )
+
+    def __repr__(self):
+        return f"<MonthlyFinancialFact(month={self.month}, bucket={self.bucket}, total={self.total_value})>"
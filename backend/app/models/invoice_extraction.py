@@ -0,0 +1,54 @@
+"""
+Modelos de apoio à extração de faturas
+
+- InvoiceExtractionCache: resultado da extração (OCR + LayoutLM + LLM) por
+  conteúdo do arquivo e versão do pipeline, para servir reenvios do mesmo
+  documento sem reprocessar
+"""
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint, Index
+from datetime import datetime
+from app.models import Base
+
+
+class InvoiceExtractionCache(Base):
+    """
+    Resultado de extração endereçado pelo conteúdo do arquivo
+
+    A chave é (workspace, hash do conteúdo, versão do pipeline): mudar o
+    modelo, a configuração do LayoutLM ou o LLM gera uma nova versão e as
+    entradas antigas deixam de ser usadas (e são removidas pela evicção por
+    tamanho, a partir da menos usada recentemente).
+    """
+    __tablename__ = "invoice_extraction_cache"
+
+    # Primary Key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Multi-tenant (OBRIGATÓRIO)
+    workspace_id = Column(Integer, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False)
+
+    # Chave
+    content_hash = Column(String(64), nullable=False)  # FileUtils.get_file_hash
+    pipeline_version = Column(String(40), nullable=False)
+
+    # Resultado (JSON) e tamanho usado na evicção
+    result = Column(Text, nullable=False)
+    size_bytes = Column(Integer, nullable=False, default=0)
+
+    # Uso
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_used_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # Constraints
+    __table_args__ = (
+        UniqueConstraint(
+            'workspace_id', 'content_hash', 'pipeline_version',
+            name='uq_extraction_cache_workspace_hash_version'
+        ),
+        Index('ix_extraction_cache_last_used', 'last_used_at'),
+    )
+
+    def __repr__(self):
+        return f"<InvoiceExtractionCache(workspace={self.workspace_id}, hash={self.content_hash}, hits={self.hit_count})>"
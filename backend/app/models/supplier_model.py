@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Text, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -32,3 +32,43 @@ class Supplier(Base):
 
     def __repr__(self):
         return f"<Supplier(id={self.id}, name='{self.name}', workspace_id={self.workspace_id})>"
+
+
+class SupplierInvoiceStat(Base):
+    """
+    Faturas de um fornecedor agrupadas pelo nome e CNPJ com que apareceram
+
+    Mantido a cada fatura inserida (app.services.supplier_invoice_stats):
+    um fornecedor renomeado continua encontrável pelos nomes antigos e o
+    matching lê o histórico e as contagens em uma consulta, sem varrer as
+    faturas.
+    """
+    __tablename__ = "supplier_invoice_stats"
+
+    # Primary Key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Multi-tenant (OBRIGATÓRIO)
+    workspace_id = Column(Integer, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False)
+    supplier_id = Column(Integer, ForeignKey("suppliers.id", ondelete="CASCADE"), nullable=False)
+
+    # Chave
+    name = Column(String(255), nullable=False)
+    cnpj = Column(String(20), nullable=False, default='')  # apenas dígitos ('' = sem documento)
+
+    # Medidas
+    invoice_count = Column(Integer, nullable=False, default=0)
+    last_seen_date = Column(Date, nullable=True)  # data da fatura mais recente
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Constraints
+    __table_args__ = (
+        UniqueConstraint(
+            'workspace_id', 'supplier_id', 'name', 'cnpj',
+            name='uq_supplier_invoice_stats_workspace_supplier_name_cnpj'
+        ),
+        Index('ix_supplier_invoice_stats_workspace_cnpj', 'workspace_id', 'cnpj'),
+    )
+
+    def __repr__(self):
+        return f"<SupplierInvoiceStat(supplier={self.supplier_id}, name='{self.name}', invoices={self.invoice_count})>"
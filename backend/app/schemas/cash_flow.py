@@ -28,6 +28,12 @@ class TransactionTypeEnum(str, Enum):
     SAIDA = "saida"
 
 
+class TransactionExportFormatEnum(str, Enum):
+    """Formatos de exportação de movimentações"""
+    CSV = "csv"
+    XLSX = "xlsx"
+
+
 class PaymentMethodEnum(str, Enum):
     """Métodos de pagamento"""
     DINHEIRO = "dinheiro"
@@ -592,6 +598,113 @@ class SimulationComparison(BaseModel):
     recommendations: List[str] = Field(..., description="Recomendações baseadas na simulação")
 
 
+# ============================================
+# GRADE DE SENSIBILIDADE
+# ============================================
+
+# Limite de combinações avaliadas em uma única requisição
+MAX_SENSITIVITY_COMBINATIONS = 1000
+
+
+class ScenarioSensitivityRequest(BaseModel):
+    """
+    Request para grade de sensibilidade (produto cartesiano das premissas)
+    """
+    days_ahead: int = Field(90, ge=7, le=365, description="Dias para projetar")
+    collection_rates: List[float] = Field([0.7, 0.85, 0.95], min_length=1, description="Taxas de recebimento (0-1)")
+    delay_days: List[int] = Field([2, 7, 15], min_length=1, description="Dias médios de atraso")
+    revenue_growths: List[float] = Field([-3.0, 0.0, 5.0], min_length=1, description="Crescimentos de receita (%)")
+    expense_variations: List[float] = Field([-2.0, 0.0, 5.0], min_length=1, description="Variações de despesas (%)")
+
+    @validator('collection_rates')
+    def validate_collection_rates(cls, v):
+        if any(rate < 0 or rate > 1 for rate in v):
+            raise ValueError('Collection rates must be between 0 and 1')
+        return v
+
+    @validator('delay_days')
+    def validate_delay_days(cls, v):
+        if any(days < 0 for days in v):
+            raise ValueError('Delay days must be non-negative')
+        return v
+
+    @validator('expense_variations')
+    def validate_combinations(cls, v, values):
+        combinations = len(v)
+        for field in ('collection_rates', 'delay_days', 'revenue_growths'):
+            combinations *= len(values.get(field) or [])
+        if combinations > MAX_SENSITIVITY_COMBINATIONS:
+            raise ValueError(f'Sensitivity grid limited to {MAX_SENSITIVITY_COMBINATIONS} combinations')
+        return v
+
+
+class ScenarioSensitivityPoint(BaseModel):
+    """Resultado de uma combinação de premissas da grade"""
+    premises: ScenarioPremises = Field(..., description="Premissas da combinação")
+    final_balance: float = Field(..., description="Saldo final projetado")
+    minimum_balance: float = Field(..., description="Saldo mínimo durante período")
+    average_balance: float = Field(..., description="Saldo médio projetado")
+    days_to_negative: Optional[int] = Field(None, description="Dias até o saldo ficar negativo (None = não fica)")
+
+
+class ScenarioSensitivityResponse(BaseModel):
+    """Response da grade de sensibilidade"""
+    current_balance: float = Field(..., description="Saldo atual usado como abertura")
+    days_projected: int
+    combinations: int = Field(..., description="Quantidade de combinações avaliadas")
+    results: List[ScenarioSensitivityPoint] = Field(..., description="Resultados por combinação")
+    negative_combinations: int = Field(..., description="Combinações com saldo negativo em algum dia")
+
+
+# ============================================
+# SIMULAÇÃO MONTE CARLO
+# ============================================
+
+class MonteCarloRequest(BaseModel):
+    """Request para simulação Monte Carlo de risco de caixa"""
+    days_ahead: int = Field(180, ge=7, le=365, description="Dias para projetar")
+    paths: int = Field(10000, ge=100, le=50000, description="Quantidade de trajetórias simuladas")
+    history_days: int = Field(90, ge=30, le=365, description="Dias de histórico usados na amostragem")
+    seed: int = Field(42, ge=0, description="Semente para resultados reprodutíveis")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "days_ahead": 180,
+                "paths": 10000,
+                "history_days": 90,
+                "seed": 42
+            }
+        }
+
+
+class MonteCarloBandPoint(BaseModel):
+    """Bandas de percentis do saldo em um dia da projeção"""
+    projection_date: date = Field(..., description="Data da projeção", alias="date")
+    p5: float = Field(..., description="Percentil 5 do saldo")
+    p50: float = Field(..., description="Mediana do saldo")
+    p95: float = Field(..., description="Percentil 95 do saldo")
+    probability_negative: float = Field(..., description="Probabilidade de saldo negativo no dia (0-1)")
+
+    model_config = {"populate_by_name": True}
+
+
+class MonteCarloResponse(BaseModel):
+    """Resultado da simulação Monte Carlo"""
+    current_balance: float = Field(..., description="Saldo atual usado como abertura")
+    days_projected: int
+    paths: int = Field(..., description="Trajetórias simuladas")
+    seed: int
+    bands: List[MonteCarloBandPoint] = Field(..., description="Bandas P5/P50/P95 por dia")
+    final_balance_p5: float
+    final_balance_p50: float
+    final_balance_p95: float
+    probability_negative_balance: float = Field(..., description="Probabilidade de saldo negativo em algum dia (0-1)")
+    expected_shortfall: float = Field(..., description="Saldo final médio nas 5% piores trajetórias")
+    collection_rate: float = Field(..., description="Taxa de cobrança usada na amostragem (0-1)")
+    payment_delay_samples: int = Field(..., description="Atrasos históricos usados na amostragem")
+
+
 # ============================================
 # ALERTAS E RECOMENDAÇÕES
 # ============================================
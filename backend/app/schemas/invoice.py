@@ -92,6 +92,16 @@ class ExtractionSuggestions(BaseModel):
     warnings: List[str] = []
 
 
+class ExtractionCacheInfo(BaseModel):
+    """Extraction cache lookup for the uploaded file"""
+    hit: bool = False
+    backend: str
+    content_hash: Optional[str] = None
+    pipeline_version: str
+    cached_at: Optional[datetime] = None
+    hit_count: int = 0
+
+
 class InvoiceExtractionResponse(BaseModel):
     """Response from invoice upload and extraction endpoint"""
     extracted_data: ExtractedData
@@ -99,3 +109,73 @@ class InvoiceExtractionResponse(BaseModel):
     processing_time_ms: int
     success: bool = True
     error: Optional[str] = None
+    cache: Optional[ExtractionCacheInfo] = None
+
+
+class InvoiceExtractionJobPage(BaseModel):
+    """Partial LayoutLM result for one PDF page of an extraction job"""
+    page_number: int
+    success: bool
+    confidence_score: float = 0.0
+    extracted_fields: Dict[str, Any] = {}
+    error: Optional[str] = None
+    page_seconds: float
+    elapsed_seconds: float
+
+
+class InvoiceExtractionJobTimings(BaseModel):
+    """Per-job timing metrics (seconds)"""
+    queue_seconds: Optional[float] = None
+    processing_seconds: float = 0.0
+    attempt_seconds: List[float] = []
+    total_seconds: float = 0.0
+
+
+class InvoiceExtractionJobResponse(BaseModel):
+    """Status of an asynchronous invoice extraction job"""
+    job_id: str
+    status: str  # queued, processing, completed, failed
+    filename: str
+    batch_id: Optional[str] = None  # Set for files of a bulk ingestion
+    attempts: int = 0
+    cache_hit: bool = False
+    pages: List[InvoiceExtractionJobPage] = []
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    timings: InvoiceExtractionJobTimings
+    result: Optional[InvoiceExtractionResponse] = None  # Set when completed
+
+
+class BulkInvoiceFileResult(BaseModel):
+    """Manifest entry for one file of a bulk ingestion"""
+    filename: str
+    status: str  # queued, processing, completed, failed, skipped
+    job_id: Optional[str] = None  # Extraction job (GET /invoices/jobs/{job_id})
+    content_hash: Optional[str] = None
+    size_bytes: int = 0
+    processing_seconds: float = 0.0
+    cache_hit: bool = False
+    duplicate_of: Optional[str] = None  # Same content as an earlier file of the batch
+    error: Optional[str] = None
+    extraction: Optional[InvoiceExtractionResponse] = None  # Only with include_results
+
+
+class BulkInvoiceIngestionResponse(BaseModel):
+    """Per-file manifest and progress of a bulk ingestion batch"""
+    batch_id: str
+    status: str  # processing, completed
+    created_at: datetime
+    files: List[BulkInvoiceFileResult]
+    total_files: int
+    queued: int
+    processing: int
+    completed: int
+    failed: int
+    skipped: int
+    cache_hits: int
+    duplicates: int
+    total_seconds: float
+    documents_per_second: float
+    avg_document_seconds: float
@@ -60,6 +60,16 @@ class ExecutionStatus(str, Enum):
     ERRO = "erro"
 
 
+class DreBucketEnum(str, Enum):
+    """Linhas do DRE aceitas no mapeamento de categorias"""
+    RECEITA = "receita"
+    DEDUCOES = "deducoes"
+    CMV = "cmv"
+    DESPESAS_OPERACIONAIS = "despesas_operacionais"
+    DEPRECIACAO = "depreciacao"
+    JUROS = "juros"
+
+
 # ============================================
 # EXECUTIVE DASHBOARD SCHEMAS
 # ============================================
@@ -149,6 +159,44 @@ class ExecutiveDashboardInsightsResponse(BaseModel):
     insights: List[Insight]
 
 
+# ============================================
+# DRE - MAPEAMENTO DE CATEGORIAS
+# ============================================
+
+class DreCategoryMappingUpdate(BaseModel):
+    """Substitui o mapeamento de categorias do DRE do workspace"""
+    mappings: Dict[DreBucketEnum, List[str]] = Field(
+        ..., description="Palavras-chave de categoria por linha do DRE"
+    )
+
+    @validator('mappings')
+    def validate_keywords(cls, v):
+        for keywords in v.values():
+            if any(not keyword.strip() or len(keyword) > 100 for keyword in keywords):
+                raise ValueError('Keywords must be non-empty and at most 100 characters')
+        return v
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "mappings": {
+                    "receita": ["Venda", "Receita"],
+                    "deducoes": ["Impostos", "ICMS"],
+                    "cmv": ["CMV", "Fornecedor"],
+                    "despesas_operacionais": ["Salários", "Aluguel"],
+                    "depreciacao": ["Depreciação"],
+                    "juros": ["Juros", "Multas"]
+                }
+            }
+        }
+
+
+class DreCategoryMappingResponse(BaseModel):
+    """Mapeamento de categorias do DRE em uso pelo workspace"""
+    is_default: bool = Field(..., description="True se o workspace usa o mapeamento padrão")
+    mappings: Dict[str, List[str]]
+
+
 # ============================================
 # GENERATED REPORTS SCHEMAS
 # ============================================
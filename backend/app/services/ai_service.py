@@ -2,13 +2,13 @@ import os
 import json
 import base64
 from typing import Dict, Any, Optional
-import aiohttp
 from pathlib import Path
 import PyPDF2
-from PIL import Image
-import pytesseract
 
 from app.core.config import settings
+from app.services.document_ocr import DocumentOcr
+from app.services.llm_http_client import LLMHttpError, get_llm_http_client
+from app.services.llm_response_cache import llm_response_cache
 
 class AIService:
     """
@@ -35,52 +35,43 @@ class AIService:
         if not self.api_key:
             return self._create_mock_response()
 
-        try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-
-                payload = {
-                    "model": self.model,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": """Você é um assistente especializado em análise de faturas e documentos fiscais brasileiros.
+        payload = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": """Você é um assistente especializado em análise de faturas e documentos fiscais brasileiros.
                                          Sua função é extrair dados estruturados de faturas/notas fiscais com alta precisão.
                                          Sempre retorne apenas JSON válido, sem texto adicional."""
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    "temperature": 0.1,  # Baixa criatividade para maior precisão
-                    "max_tokens": 2000
+                },
+                {
+                    "role": "user",
+                    "content": prompt
                 }
+            ],
+            "temperature": 0.1,  # Baixa criatividade para maior precisão
+            "max_tokens": 2000
+        }
 
-                async with session.post(f"{self.base_url}/chat/completions",
-                                      headers=headers, json=payload) as response:
+        try:
+            return await self._chat_completion(payload)
 
-                    if response.status == 200:
-                        data = await response.json()
-                        return data["choices"][0]["message"]["content"]
-                    else:
-                        error_text = await response.text()
-                        print(f"Erro na API OpenAI: {response.status} - {error_text}")
-                        return self._create_mock_response()
+        except LLMHttpError as e:
+            print(f"Erro na API OpenAI: {e}")
+            return self._create_mock_response()
 
         except Exception as e:
             print(f"Erro ao chamar serviço de IA: {e}")
             return self._create_mock_response()
 
-    async def extract_invoice_from_image(self, image_path: str) -> str:
+    async def extract_invoice_from_image(self, image_path: str, document_ocr: Optional[DocumentOcr] = None) -> str:
         """
         Extrai dados da fatura diretamente da imagem usando GPT-4o Vision
 
         Args:
             image_path: Caminho para o arquivo de imagem
+            document_ocr: OCR do documento usado no fallback (compartilhado
+                com os demais caminhos de extração)
 
         Returns:
             JSON com dados extraídos da fatura
@@ -94,27 +85,21 @@ class AIService:
             with open(image_path, "rb") as image_file:
                 base64_image = base64.b64encode(image_file.read()).decode('utf-8')
 
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-
-                payload = {
-                    "model": self.vision_model,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": """Você é um assistente especializado em análise de faturas e notas fiscais brasileiras.
+            payload = {
+                "model": self.vision_model,
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": """Você é um assistente especializado em análise de faturas e notas fiscais brasileiras.
                                          Sua função é extrair dados estruturados de documentos fiscais com alta precisão.
                                          Sempre retorne apenas JSON válido, sem texto adicional."""
-                        },
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": """Analise esta fatura/nota fiscal brasileira e extraia TODOS os dados no formato JSON exato:
+                    },
+                    {
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "text",
+                                "text": """Analise esta fatura/nota fiscal brasileira e extraia TODOS os dados no formato JSON exato:
 
 {
     "supplier_name": "Nome completo do fornecedor/prestador",
@@ -148,46 +133,61 @@ IMPORTANTE:
 - Calcule net_amount = total_amount - tax_amount
 - confidence_score deve refletir sua certeza (0.0 a 1.0)
 - Retorne APENAS o JSON, sem markdown ou texto extra"""
-                                },
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/jpeg;base64,{base64_image}"
-                                    }
+                            },
+                            {
+                                "type": "image_url",
+                                "image_url": {
+                                    "url": f"data:image/jpeg;base64,{base64_image}"
                                 }
-                            ]
-                        }
-                    ],
-                    "max_tokens": 2000,
-                    "temperature": 0.1
-                }
+                            }
+                        ]
+                    }
+                ],
+                "max_tokens": 2000,
+                "temperature": 0.1
+            }
 
-                async with session.post(f"{self.base_url}/chat/completions",
-                                      headers=headers, json=payload) as response:
+            return await self._chat_completion(payload)
 
-                    if response.status == 200:
-                        data = await response.json()
-                        return data["choices"][0]["message"]["content"]
-                    else:
-                        error_text = await response.text()
-                        print(f"Erro na API OpenAI Vision: {response.status} - {error_text}")
-                        # Fallback para OCR tradicional
-                        return await self._ocr_image_fallback(image_path)
+        except LLMHttpError as e:
+            print(f"Erro na API OpenAI Vision: {e}")
+            # Fallback para OCR tradicional
+            return await self._ocr_image_fallback(image_path, document_ocr)
 
         except Exception as e:
             print(f"Erro ao processar imagem com Vision API: {e}")
             # Fallback para OCR tradicional
-            return await self._ocr_image_fallback(image_path)
+            return await self._ocr_image_fallback(image_path, document_ocr)
+
+    async def _chat_completion(self, payload: Dict[str, Any]) -> str:
+        """
+        Resposta do modelo para o payload, reaproveitando respostas de prompts
+        idênticos e coalescendo chamadas simultâneas (ver llm_response_cache)
 
-    async def _ocr_image_fallback(self, image_path: str) -> str:
+        Returns:
+            Conteúdo da primeira resposta do modelo
+        """
+        return await llm_response_cache.get_or_call(payload, lambda: self._request_chat_completion(payload))
+
+    async def _request_chat_completion(self, payload: Dict[str, Any]) -> str:
+        """
+        Chamada ao endpoint de chat pelo cliente HTTP compartilhado (pool de
+        conexões, limite de taxa e retentativas, ver llm_http_client)
+        """
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+        data = await get_llm_http_client().post_json(f"{self.base_url}/chat/completions", payload, headers)
+        return data["choices"][0]["message"]["content"]
+
+    async def _ocr_image_fallback(self, image_path: str, document_ocr: Optional[DocumentOcr] = None) -> str:
         """Fallback para OCR tradicional se Vision API falhar"""
         try:
-            # Carrega a imagem
-            image = Image.open(image_path)
-
-            # Aplica OCR usando Tesseract
-            custom_config = r'--oem 3 --psm 6 -l por'
-            text = pytesseract.image_to_string(image, config=custom_config)
+            # OCR da imagem (feito uma vez por documento)
+            document_ocr = document_ocr or DocumentOcr()
+            text = await document_ocr.text(image_path, image_path)
 
             # Processa o texto extraído com o modelo de texto
             return await self.extract_invoice_data(self._build_extraction_prompt_from_text(text))
@@ -225,7 +225,7 @@ IMPORTANTE:
         Retorne APENAS o JSON, sem texto adicional.
         """
 
-    async def ocr_image(self, image_path: str) -> str:
+    async def ocr_image(self, image_path: str, document_ocr: Optional[DocumentOcr] = None) -> str:
         """
         DEPRECATED: Use extract_invoice_from_image() para melhor precisão
 
@@ -233,19 +233,16 @@ IMPORTANTE:
 
         Args:
             image_path: Caminho para o arquivo de imagem
+            document_ocr: OCR do documento (reaproveitado se a imagem já
+                passou pelo OCR)
 
         Returns:
             Texto extraído da imagem
         """
 
         try:
-            # Carrega a imagem
-            image = Image.open(image_path)
-
-            # Aplica OCR usando Tesseract
-            # Configuração para português brasileiro
-            custom_config = r'--oem 3 --psm 6 -l por'
-            text = pytesseract.image_to_string(image, config=custom_config)
+            document_ocr = document_ocr or DocumentOcr()
+            text = await document_ocr.text(image_path, image_path)
 
             return text.strip()
 
@@ -0,0 +1,336 @@
+"""
+Ingestão em lote de faturas (ZIP ou vários arquivos)
+
+Os arquivos são gravados em um diretório temporário do lote à medida que
+chegam, em blocos, sem manter o lote em memória; ZIPs são gravados em disco
+e seus membros extraídos um a um. A extração não roda na requisição: os
+arquivos vão para a fila de jobs de extração como um lote (ExtractionBatch)
+e o cliente acompanha o manifesto pelo id do lote. Arquivos já no cache de
+extração entram como jobs concluídos e arquivos repetidos no mesmo lote
+compartilham um único job.
+
+Limites: BULK_UPLOAD_MAX_FILES arquivos, BULK_UPLOAD_MAX_TOTAL_MB no total
+(bytes realmente gravados, inclusive após descompactar) e o limite por
+arquivo do upload individual. Arquivos de tipo não suportado ou grandes
+demais entram no manifesto como ignorados.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from fastapi import UploadFile
+
+from app.core.config import settings
+from app.services.extraction_cache import ExtractionCache
+from app.services.invoice_extraction_jobs import (
+    BatchEntry,
+    ExtractionBatch,
+    ExtractionJob,
+    InvoiceExtractionJobQueue,
+    JobQueueFull,
+    JobStatus
+)
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png'}
+
+# Tamanho máximo de cada documento (mesmo do upload individual)
+MAX_DOCUMENT_SIZE = 10 * 1024 * 1024
+
+# Blocos de leitura/gravação dos arquivos
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+class BulkIngestionError(ValueError):
+    """Lote inválido (ZIP corrompido, nenhum arquivo)"""
+
+
+class BulkIngestionLimitError(BulkIngestionError):
+    """Lote acima dos limites de quantidade ou tamanho"""
+
+
+class StagedFile(NamedTuple):
+    """Arquivo do lote gravado em disco (ou ignorado)"""
+    filename: str
+    path: Optional[str]
+    content_hash: Optional[str]
+    size_bytes: int
+    skip_reason: Optional[str] = None
+
+
+class BatchStager:
+    """
+    Grava os arquivos do lote em um diretório temporário
+
+    Usar como context manager: o diretório é removido na saída.
+    """
+
+    def __init__(
+        self,
+        max_files: Optional[int] = None,
+        max_total_bytes: Optional[int] = None,
+        max_document_bytes: int = MAX_DOCUMENT_SIZE
+    ):
+        self.max_files = max_files or settings.BULK_UPLOAD_MAX_FILES
+        self.max_total_bytes = max_total_bytes or settings.BULK_UPLOAD_MAX_TOTAL_MB * 1024 * 1024
+        self.max_document_bytes = max_document_bytes
+
+        self.directory = tempfile.mkdtemp(prefix="invoice_batch_")
+        self.files: List[StagedFile] = []
+        self.total_bytes = 0
+
+    def __enter__(self) -> "BatchStager":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.cleanup()
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def detach(self, staged: StagedFile) -> str:
+        """
+        Move o arquivo para fora do diretório do lote (não é removido no
+        cleanup); quem chama passa a ser dono do arquivo
+        """
+        descriptor, path = tempfile.mkstemp(prefix="invoice_", suffix=Path(staged.path).suffix)
+        os.close(descriptor)
+        os.replace(staged.path, path)
+        return path
+
+    async def add_upload(self, upload: UploadFile) -> None:
+        """Arquivo enviado na requisição (ZIPs são expandidos)"""
+        filename = upload.filename or "arquivo"
+        extension = Path(filename).suffix.lower()
+
+        if extension == '.zip':
+            zip_path = os.path.join(self.directory, f"upload_{len(self.files)}.zip")
+            with open(zip_path, 'wb') as zip_file:
+                size = 0
+                while chunk := await upload.read(COPY_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_total_bytes:
+                        raise BulkIngestionLimitError(
+                            f"ZIP {filename} excede o limite do lote ({self.max_total_bytes // (1024 * 1024)} MB)"
+                        )
+                    zip_file.write(chunk)
+            try:
+                # Descompactar e calcular o hash dos membros (até o limite do
+                # lote) fora do event loop
+                await asyncio.to_thread(self.add_zip, zip_path)
+            finally:
+                os.remove(zip_path)
+            return
+
+        if not self._accepts(filename):
+            return
+
+        path, writer = self._open()
+        content_hash = hashlib.md5()
+        written, too_large = 0, False
+        with writer:
+            while chunk := await upload.read(COPY_CHUNK_SIZE):
+                if written + len(chunk) > self.max_document_bytes:
+                    too_large = True
+                    break
+                self._count(len(chunk))
+                writer.write(chunk)
+                content_hash.update(chunk)
+                written += len(chunk)
+
+        self._register(filename, path, content_hash.hexdigest(), written, too_large)
+
+    def add_zip(self, zip_path: str) -> None:
+        """Extrai os membros suportados de um ZIP, um de cada vez"""
+        try:
+            archive = zipfile.ZipFile(zip_path)
+        except zipfile.BadZipFile:
+            raise BulkIngestionError(f"Arquivo ZIP inválido: {os.path.basename(zip_path)}")
+
+        with archive:
+            for member in archive.infolist():
+                name = member.filename
+                if member.is_dir() or name.startswith('__MACOSX/') or Path(name).name.startswith('.'):
+                    continue
+                if not self._accepts(name):
+                    continue
+                if member.file_size > self.max_document_bytes:
+                    self._skip(name, member.file_size, "Arquivo muito grande (máximo 10MB)")
+                    continue
+
+                path, writer = self._open()
+                content_hash = hashlib.md5()
+                written, too_large = 0, False
+                try:
+                    with writer, archive.open(member) as source:
+                        # Conta os bytes realmente descompactados (file_size do
+                        # cabeçalho não é confiável)
+                        while chunk := source.read(COPY_CHUNK_SIZE):
+                            if written + len(chunk) > self.max_document_bytes:
+                                too_large = True
+                                break
+                            self._count(len(chunk))
+                            writer.write(chunk)
+                            content_hash.update(chunk)
+                            written += len(chunk)
+                except (RuntimeError, zipfile.BadZipFile, NotImplementedError) as e:
+                    # Membro criptografado, corrompido ou com compressão não suportada
+                    self.total_bytes -= written
+                    os.remove(path)
+                    self._skip(name, member.file_size, f"Não foi possível extrair do ZIP: {e}")
+                    continue
+
+                self._register(name, path, content_hash.hexdigest(), written, too_large)
+
+    def _accepts(self, filename: str) -> bool:
+        """Registra como ignorado se o tipo não é suportado"""
+        if Path(filename).suffix.lower() in SUPPORTED_EXTENSIONS:
+            return True
+        self._skip(filename, 0, f"Tipo de arquivo não suportado. Use: {', '.join(sorted(SUPPORTED_EXTENSIONS))}")
+        return False
+
+    def _open(self):
+        if sum(1 for staged in self.files if staged.path) >= self.max_files:
+            raise BulkIngestionLimitError(f"Lote excede o limite de {self.max_files} arquivos")
+        # Nome gerado: o nome do membro do ZIP nunca é usado como caminho
+        path = os.path.join(self.directory, f"{len(self.files):05d}")
+        return path, open(path, 'wb')
+
+    def _count(self, size: int) -> None:
+        self.total_bytes += size
+        if self.total_bytes > self.max_total_bytes:
+            raise BulkIngestionLimitError(
+                f"Lote excede o limite de {self.max_total_bytes // (1024 * 1024)} MB"
+            )
+
+    def _register(self, filename: str, path: str, content_hash: str, size: int, too_large: bool = False) -> None:
+        if too_large:
+            self.total_bytes -= size
+            os.remove(path)
+            self._skip(filename, size, "Arquivo muito grande (máximo 10MB)")
+            return
+        if size == 0:
+            os.remove(path)
+            self._skip(filename, 0, "Arquivo vazio")
+            return
+
+        # O processamento identifica o tipo pela extensão
+        final_path = path + Path(filename).suffix.lower()
+        os.replace(path, final_path)
+        self.files.append(StagedFile(filename, final_path, content_hash, size))
+
+    def _skip(self, filename: str, size: int, reason: str) -> None:
+        self.files.append(StagedFile(filename, None, None, size, reason))
+
+
+class BulkInvoiceIngestion:
+    """
+    Envia os arquivos de um lote para a fila de jobs de extração
+
+    Args:
+        workspace_id: Workspace do lote
+        job_queue: Fila que executa as extrações
+        refresh_cache: Ignora o cache e reprocessa todos os arquivos
+        extraction_cache: Cache de extração por conteúdo (None = sem cache)
+    """
+
+    def __init__(
+        self,
+        workspace_id: int,
+        job_queue: InvoiceExtractionJobQueue,
+        refresh_cache: bool = False,
+        extraction_cache: Optional[ExtractionCache] = None
+    ):
+        self.workspace_id = workspace_id
+        self.job_queue = job_queue
+        self.refresh_cache = refresh_cache
+        self.extraction_cache = extraction_cache
+
+    def submit(self, stager: BatchStager) -> ExtractionBatch:
+        """
+        Cria o lote com um job por conteúdo distinto e o enfileira; os
+        arquivos pendentes saem do diretório do lote para os jobs
+
+        Raises:
+            JobQueueFull: Fila sem espaço para o lote (nenhum arquivo é mantido)
+        """
+        entries: List[BatchEntry] = []
+        first_by_hash: Dict[str, BatchEntry] = {}
+
+        for staged in stager.files:
+            if staged.skip_reason:
+                entries.append(BatchEntry(
+                    staged.filename, None, staged.size_bytes, skip_reason=staged.skip_reason
+                ))
+                continue
+
+            # Repetido no lote: mesmo job do primeiro arquivo
+            first = first_by_hash.get(staged.content_hash)
+            if first is not None:
+                entries.append(BatchEntry(
+                    staged.filename, staged.content_hash, staged.size_bytes,
+                    job=first.job, duplicate_of=first.filename
+                ))
+                continue
+
+            cached = None
+            if self.extraction_cache and not self.refresh_cache:
+                cached = self.extraction_cache.get(self.workspace_id, staged.content_hash)
+            if cached:
+                job = ExtractionJob.from_cache(self.workspace_id, staged.filename, staged.content_hash, cached.result)
+            else:
+                job = ExtractionJob(self.workspace_id, stager.detach(staged), staged.filename, staged.content_hash)
+
+            entry = BatchEntry(staged.filename, staged.content_hash, staged.size_bytes, job=job)
+            first_by_hash[staged.content_hash] = entry
+            entries.append(entry)
+
+        batch = ExtractionBatch(self.workspace_id, entries)
+        try:
+            return self.job_queue.submit_batch(batch)
+        except JobQueueFull:
+            for job in batch.jobs:
+                if job.file_path:
+                    os.remove(job.file_path)
+            raise
+
+
+def entry_status(entry: BatchEntry) -> str:
+    """queued, processing, completed, failed ou skipped"""
+    return entry.job.status.value if entry.job is not None else "skipped"
+
+
+def summarize(batch: ExtractionBatch) -> Dict[str, Any]:
+    """Totais do lote por status e vazão por documento extraído"""
+    statuses = [entry_status(entry) for entry in batch.entries]
+    extracted = [
+        sum(job.attempt_seconds) for job in batch.jobs
+        if job.is_finished and not job.cache_hit
+    ]
+
+    end = batch.finished_monotonic or time.monotonic()
+    total_seconds = end - batch.created_monotonic
+    finished = sum(1 for job in batch.jobs if job.is_finished)
+
+    return {
+        "total_files": len(batch.entries),
+        "queued": statuses.count(JobStatus.QUEUED.value),
+        "processing": statuses.count(JobStatus.PROCESSING.value),
+        "completed": statuses.count(JobStatus.COMPLETED.value),
+        "failed": statuses.count(JobStatus.FAILED.value),
+        "skipped": statuses.count("skipped"),
+        "cache_hits": sum(1 for entry in batch.entries if entry.job is not None and entry.job.cache_hit),
+        "duplicates": sum(1 for entry in batch.entries if entry.duplicate_of),
+        "total_seconds": round(total_seconds, 3),
+        "documents_per_second": round(finished / total_seconds, 3) if total_seconds > 0 else 0.0,
+        "avg_document_seconds": round(sum(extracted) / len(extracted), 3) if extracted else 0.0
+    }
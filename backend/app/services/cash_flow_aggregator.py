@@ -0,0 +1,261 @@
+"""
+Camada de agregação SQL para analytics de Fluxo de Caixa
+
+Concentra as somas, contagens e agrupamentos por categoria usados pelos
+endpoints de analytics em poucas queries GROUP BY com agregação condicional
+por tipo (entrada/saída), evitando carregar todas as transações do período
+em memória para somá-las em Python.
+"""
+
+import logging
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from datetime import datetime, date
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, func, case, false
+
+from app.models.cash_flow import BankAccount, CashFlowTransaction, TransactionType
+
+logger = logging.getLogger(__name__)
+
+
+class TypeTotals(NamedTuple):
+    """Totais de entradas e saídas de um período"""
+    total_entries: float
+    total_exits: float
+    entries_count: int
+    exits_count: int
+
+    @property
+    def net_flow(self) -> float:
+        return self.total_entries - self.total_exits
+
+
+class CategoryTotals(NamedTuple):
+    """Totais de uma combinação categoria/subcategoria/tipo"""
+    category: str
+    subcategory: Optional[str]
+    type: str
+    total_value: float
+    transaction_count: int
+
+
+class AccountTotals(NamedTuple):
+    """Entradas e saídas de uma conta bancária no período"""
+    account_id: int
+    total_entries: float
+    total_exits: float
+
+    @property
+    def net_flow(self) -> float:
+        return self.total_entries - self.total_exits
+
+
+class CostBreakdown(NamedTuple):
+    """Receita e custos (fixos vs variáveis) de um período"""
+    total_revenue: float
+    fixed_costs: float
+    variable_costs: float
+
+
+class CashFlowAggregator:
+    """
+    Agregações de CashFlowTransaction executadas no banco de dados
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def type_totals(
+        self,
+        workspace_id: int,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        account_id: Optional[int] = None
+    ) -> TypeTotals:
+        """
+        Soma e conta entradas e saídas em uma única query
+
+        Args:
+            workspace_id: ID do workspace
+            start_date: Data inicial (inclusiva); None = sem limite inferior
+            end_date: Data final (inclusiva); None = sem limite superior
+            account_id: Filtrar por conta específica
+
+        Returns:
+            TypeTotals com valores e contagens por tipo
+        """
+        is_entry = CashFlowTransaction.type == TransactionType.ENTRADA.value
+        is_exit = CashFlowTransaction.type == TransactionType.SAIDA.value
+
+        query = self.db.query(
+            func.coalesce(func.sum(case((is_entry, CashFlowTransaction.value), else_=0.0)), 0.0),
+            func.coalesce(func.sum(case((is_exit, CashFlowTransaction.value), else_=0.0)), 0.0),
+            func.coalesce(func.sum(case((is_entry, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((is_exit, 1), else_=0)), 0),
+        ).filter(*self._period_filters(workspace_id, start_date, end_date, account_id))
+
+        total_entries, total_exits, entries_count, exits_count = query.one()
+
+        return TypeTotals(
+            total_entries=float(total_entries),
+            total_exits=float(total_exits),
+            entries_count=int(entries_count),
+            exits_count=int(exits_count)
+        )
+
+    def category_totals(
+        self,
+        workspace_id: int,
+        start_date: date,
+        end_date: date,
+        transaction_type: Optional[str] = None
+    ) -> List[CategoryTotals]:
+        """
+        Agrupa o período por categoria, subcategoria e tipo
+
+        Returns:
+            Lista de CategoryTotals (sem ordenação garantida)
+        """
+        query = self.db.query(
+            CashFlowTransaction.category,
+            CashFlowTransaction.subcategory,
+            CashFlowTransaction.type,
+            func.sum(CashFlowTransaction.value),
+            func.count(CashFlowTransaction.id)
+        ).filter(*self._period_filters(workspace_id, start_date, end_date))
+
+        if transaction_type:
+            query = query.filter(CashFlowTransaction.type == transaction_type)
+
+        query = query.group_by(
+            CashFlowTransaction.category,
+            CashFlowTransaction.subcategory,
+            CashFlowTransaction.type
+        )
+
+        return [
+            CategoryTotals(
+                category=category,
+                subcategory=subcategory,
+                type=trans_type,
+                total_value=float(total_value or 0.0),
+                transaction_count=int(transaction_count)
+            )
+            for category, subcategory, trans_type, total_value, transaction_count in query.all()
+        ]
+
+    def account_totals(
+        self,
+        workspace_id: int,
+        start_date: date,
+        end_date: date
+    ) -> Dict[int, AccountTotals]:
+        """
+        Entradas e saídas do período agrupadas por conta em uma única query
+
+        Returns:
+            Dict account_id -> AccountTotals (contas sem movimentação não aparecem)
+        """
+        is_entry = CashFlowTransaction.type == TransactionType.ENTRADA.value
+        is_exit = CashFlowTransaction.type == TransactionType.SAIDA.value
+
+        query = self.db.query(
+            CashFlowTransaction.account_id,
+            func.coalesce(func.sum(case((is_entry, CashFlowTransaction.value), else_=0.0)), 0.0),
+            func.coalesce(func.sum(case((is_exit, CashFlowTransaction.value), else_=0.0)), 0.0),
+        ).filter(
+            *self._period_filters(workspace_id, start_date, end_date),
+            CashFlowTransaction.account_id.isnot(None)
+        ).group_by(CashFlowTransaction.account_id)
+
+        return {
+            account_id: AccountTotals(
+                account_id=account_id,
+                total_entries=float(total_entries),
+                total_exits=float(total_exits)
+            )
+            for account_id, total_entries, total_exits in query.all()
+        }
+
+    def cost_breakdown(
+        self,
+        workspace_id: int,
+        start_date: date,
+        end_date: date,
+        fixed_keywords: Sequence[str]
+    ) -> CostBreakdown:
+        """
+        Receita e custos fixos/variáveis do período em uma única query
+
+        Uma saída é custo fixo quando alguma palavra-chave de `fixed_keywords`
+        aparece na categoria ou descrição (comparação em minúsculas). Todas as
+        demais saídas são consideradas variáveis (critério conservador).
+        """
+        is_entry = CashFlowTransaction.type == TransactionType.ENTRADA.value
+        is_exit = CashFlowTransaction.type == TransactionType.SAIDA.value
+
+        category_lower = func.lower(func.coalesce(CashFlowTransaction.category, ''))
+        description_lower = func.lower(func.coalesce(CashFlowTransaction.description, ''))
+        is_fixed = or_(*[
+            or_(category_lower.contains(keyword), description_lower.contains(keyword))
+            for keyword in fixed_keywords
+        ]) if fixed_keywords else false()
+
+        query = self.db.query(
+            func.coalesce(func.sum(case((is_entry, CashFlowTransaction.value), else_=0.0)), 0.0),
+            func.coalesce(func.sum(case((and_(is_exit, is_fixed), CashFlowTransaction.value), else_=0.0)), 0.0),
+            func.coalesce(func.sum(case((is_exit, CashFlowTransaction.value), else_=0.0)), 0.0),
+        ).filter(*self._period_filters(workspace_id, start_date, end_date))
+
+        total_revenue, fixed_costs, total_exits = query.one()
+
+        return CostBreakdown(
+            total_revenue=float(total_revenue),
+            fixed_costs=float(fixed_costs),
+            variable_costs=float(total_exits) - float(fixed_costs)
+        )
+
+    def balance_at(
+        self,
+        workspace_id: int,
+        target_date: date,
+        account_id: Optional[int] = None
+    ) -> float:
+        """
+        Saldo (saldo inicial das contas + entradas - saídas) ao final de uma data
+        """
+        if account_id:
+            initial_balance = self.db.query(BankAccount.initial_balance).filter(
+                BankAccount.id == account_id
+            ).scalar()
+        else:
+            initial_balance = self.db.query(func.sum(BankAccount.initial_balance)).filter(
+                BankAccount.workspace_id == workspace_id
+            ).scalar()
+
+        totals = self.type_totals(workspace_id, end_date=target_date, account_id=account_id)
+
+        return float(initial_balance or 0.0) + totals.net_flow
+
+    @staticmethod
+    def _period_filters(
+        workspace_id: int,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        account_id: Optional[int] = None
+    ) -> list:
+        """Filtros padrão de workspace, período e conta"""
+        filters = [CashFlowTransaction.workspace_id == workspace_id]
+
+        if start_date is not None:
+            filters.append(
+                CashFlowTransaction.transaction_date >= datetime.combine(start_date, datetime.min.time())
+            )
+        if end_date is not None:
+            filters.append(
+                CashFlowTransaction.transaction_date <= datetime.combine(end_date, datetime.max.time())
+            )
+        if account_id:
+            filters.append(CashFlowTransaction.account_id == account_id)
+
+        return filters
@@ -0,0 +1,151 @@
+"""
+Exportação em streaming das movimentações de Fluxo de Caixa (CSV/XLSX)
+
+As linhas são lidas em lotes com yield_per (cursor do lado do servidor no
+PostgreSQL) e escritas incrementalmente, sem montar a lista completa em
+memória, de forma que exportações de milhões de linhas mantêm o consumo de
+memória constante.
+
+- CSV: cada bloco de ~64 KB é entregue ao cliente assim que fica pronto
+- XLSX: openpyxl em modo write-only (as linhas vão para um arquivo
+  temporário); o zip final é gerado em um SpooledTemporaryFile e enviado
+  em blocos
+"""
+
+import csv
+import io
+import logging
+import tempfile
+from datetime import datetime, date
+from typing import Any, Iterable, Iterator, List, Sequence, Tuple
+from sqlalchemy.orm import Query
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+from app.models.cash_flow import BankAccount, CashFlowTransaction
+
+logger = logging.getLogger(__name__)
+
+# Linhas buscadas por round trip ao banco
+EXPORT_BATCH_SIZE = 2000
+
+# Tamanho dos blocos enviados ao cliente
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Acima deste tamanho o XLSX gerado vai para disco em vez de memória
+XLSX_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# (cabeçalho, coluna) na ordem do arquivo exportado
+EXPORT_COLUMNS: Tuple[Tuple[str, Any], ...] = (
+    ("ID", CashFlowTransaction.id),
+    ("Data", CashFlowTransaction.transaction_date),
+    ("Tipo", CashFlowTransaction.type),
+    ("Categoria", CashFlowTransaction.category),
+    ("Subcategoria", CashFlowTransaction.subcategory),
+    ("Descrição", CashFlowTransaction.description),
+    ("Valor", CashFlowTransaction.value),
+    ("Forma de Pagamento", CashFlowTransaction.payment_method),
+    ("Conta", BankAccount.bank_name),
+    ("Tipo de Referência", CashFlowTransaction.reference_type),
+    ("ID de Referência", CashFlowTransaction.reference_id),
+    ("Conciliada", CashFlowTransaction.is_reconciled),
+    ("Observações", CashFlowTransaction.notes),
+)
+
+EXPORT_HEADERS: List[str] = [header for header, _ in EXPORT_COLUMNS]
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def export_rows(query: Query, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[tuple]:
+    """
+    Linhas da exportação (tuplas na ordem de EXPORT_COLUMNS) a partir de
+    uma query já filtrada de CashFlowTransaction
+
+    Seleciona apenas as colunas exportadas (sem instanciar os modelos nem
+    acumular objetos no identity map da sessão).
+    """
+    rows = query.outerjoin(
+        BankAccount, BankAccount.id == CashFlowTransaction.account_id
+    ).with_entities(
+        *[column for _, column in EXPORT_COLUMNS]
+    ).execution_options(
+        stream_results=True, yield_per=batch_size
+    )
+
+    for row in rows:
+        yield tuple(row)
+
+
+def _format_csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "sim" if value else "não"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def stream_csv(rows: Iterable[Sequence[Any]], chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Gera o CSV em blocos de bytes (UTF-8 com BOM para abrir no Excel)
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(EXPORT_HEADERS)
+
+    for row in rows:
+        writer.writerow([_format_csv_value(value) for value in row])
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_xlsx(rows: Iterable[Sequence[Any]], chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Gera o XLSX em blocos de bytes usando openpyxl em modo write-only
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Movimentações")
+    sheet.append(EXPORT_HEADERS)
+
+    count = 0
+    for row in rows:
+        sheet.append([_format_xlsx_value(value) for value in row])
+        count += 1
+
+    with tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_MAX_SIZE) as output:
+        workbook.save(output)
+        logger.info(f"Exportação XLSX gerada: {count} linhas, {output.tell()} bytes")
+        output.seek(0)
+
+        while True:
+            chunk = output.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _format_xlsx_value(value: Any) -> Any:
+    if isinstance(value, bool):
+        return "sim" if value else "não"
+    if isinstance(value, str):
+        # Caracteres de controle não são aceitos no XML da planilha
+        return ILLEGAL_CHARACTERS_RE.sub("", value)
+    return value
+
+
+def export_filename(export_format: str, today: date) -> str:
+    """Nome do arquivo sugerido no Content-Disposition"""
+    return f"movimentacoes_{today.isoformat()}.{export_format}"
@@ -0,0 +1,337 @@
+"""
+Ledger diário materializado de Fluxo de Caixa
+
+Mantém a tabela cash_flow_daily_balances (entradas, saídas e saldo de
+fechamento por workspace/conta/dia) de forma incremental a cada movimentação,
+permitindo que histórico de saldo seja um range scan e que o saldo em uma
+data seja uma única consulta. Inclui reconstrução completa e verificação de
+consistência contra cash_flow_transactions.
+"""
+
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional
+from datetime import datetime, date
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, case, select, Date
+
+from app.core.database import upsert_insert
+from app.models.cash_flow import BankAccount, CashFlowTransaction, CashFlowDailyBalance, TransactionType
+
+logger = logging.getLogger(__name__)
+
+# Conta usada no ledger para transações sem conta bancária vinculada
+NO_ACCOUNT_ID = 0
+
+
+class DailyMovement(NamedTuple):
+    """Movimentação consolidada de um dia"""
+    balance_date: date
+    entries: float
+    exits: float
+
+    @property
+    def net_flow(self) -> float:
+        return self.entries - self.exits
+
+
+class CashFlowLedger:
+    """
+    Manutenção e consulta do ledger diário de saldos
+    """
+
+    # Tolerância para diferenças de ponto flutuante na verificação
+    consistency_tolerance = 0.01
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ============================================
+    # MANUTENÇÃO INCREMENTAL
+    # ============================================
+
+    def record_transaction(self, transaction: CashFlowTransaction) -> None:
+        """Aplica o impacto de uma transação no ledger (não faz commit)"""
+        self.apply_movement(
+            transaction.workspace_id,
+            transaction.account_id,
+            transaction.transaction_date,
+            transaction.type,
+            transaction.value
+        )
+
+    def revert_movement(
+        self,
+        workspace_id: int,
+        account_id: Optional[int],
+        transaction_date: datetime,
+        transaction_type: str,
+        value: float
+    ) -> None:
+        """Desfaz o impacto de uma movimentação já registrada (não faz commit)"""
+        self.apply_movement(workspace_id, account_id, transaction_date, transaction_type, -value)
+
+    def apply_movement(
+        self,
+        workspace_id: int,
+        account_id: Optional[int],
+        transaction_date: datetime,
+        transaction_type: str,
+        value: float
+    ) -> None:
+        """
+        Soma `value` (negativo para reverter) às entradas ou saídas do dia e
+        propaga a diferença no saldo de fechamento de todos os dias seguintes
+        da mesma conta com um único UPDATE.
+
+        A linha do dia é criada ou somada com um único upsert (ON CONFLICT),
+        de forma que movimentações simultâneas no mesmo dia não se perdem nem
+        colidem na constraint uq_daily_balance_account_date.
+        """
+        account_key = account_id or NO_ACCOUNT_ID
+        balance_date = transaction_date.date() if isinstance(transaction_date, datetime) else transaction_date
+        is_entry = transaction_type == TransactionType.ENTRADA.value
+        delta = value if is_entry else -value
+
+        # Dia novo começa no saldo de fechamento do último dia anterior
+        previous_closing = select(CashFlowDailyBalance.closing_balance).where(
+            CashFlowDailyBalance.workspace_id == workspace_id,
+            CashFlowDailyBalance.account_id == account_key,
+            CashFlowDailyBalance.balance_date < balance_date
+        ).order_by(CashFlowDailyBalance.balance_date.desc()).limit(1).scalar_subquery()
+
+        upsert = upsert_insert(self.db, CashFlowDailyBalance.__table__).values(
+            workspace_id=workspace_id,
+            account_id=account_key,
+            balance_date=balance_date,
+            entries=value if is_entry else 0.0,
+            exits=0.0 if is_entry else value,
+            closing_balance=func.coalesce(previous_closing, 0.0),
+            updated_at=datetime.utcnow()
+        )
+        self.db.execute(upsert.on_conflict_do_update(
+            index_elements=['workspace_id', 'account_id', 'balance_date'],
+            set_={
+                'entries': CashFlowDailyBalance.entries + upsert.excluded.entries,
+                'exits': CashFlowDailyBalance.exits + upsert.excluded.exits,
+                'updated_at': upsert.excluded.updated_at
+            }
+        ))
+
+        self.db.query(CashFlowDailyBalance).filter(
+            CashFlowDailyBalance.workspace_id == workspace_id,
+            CashFlowDailyBalance.account_id == account_key,
+            CashFlowDailyBalance.balance_date >= balance_date
+        ).update(
+            {CashFlowDailyBalance.closing_balance: CashFlowDailyBalance.closing_balance + delta},
+            synchronize_session=False
+        )
+
+    # ============================================
+    # CONSULTAS
+    # ============================================
+
+    def daily_movements(
+        self,
+        workspace_id: int,
+        start_date: date,
+        end_date: date,
+        account_id: Optional[int] = None
+    ) -> Dict[date, DailyMovement]:
+        """Entradas/saídas por dia no intervalo (range scan no ledger)"""
+        query = self.db.query(
+            CashFlowDailyBalance.balance_date,
+            func.sum(CashFlowDailyBalance.entries),
+            func.sum(CashFlowDailyBalance.exits)
+        ).filter(
+            CashFlowDailyBalance.workspace_id == workspace_id,
+            CashFlowDailyBalance.balance_date >= start_date,
+            CashFlowDailyBalance.balance_date <= end_date
+        )
+
+        if account_id:
+            query = query.filter(CashFlowDailyBalance.account_id == account_id)
+
+        query = query.group_by(CashFlowDailyBalance.balance_date)
+
+        return {
+            balance_date: DailyMovement(balance_date, float(entries or 0.0), float(exits or 0.0))
+            for balance_date, entries, exits in query.all()
+        }
+
+    def balance_at(
+        self,
+        workspace_id: int,
+        target_date: date,
+        account_id: Optional[int] = None
+    ) -> float:
+        """
+        Saldo ao final de `target_date`: saldo inicial da(s) conta(s) mais o
+        último saldo de fechamento do ledger de cada conta até a data.
+        """
+        if account_id:
+            initial_balance = self.db.query(BankAccount.initial_balance).filter(
+                BankAccount.id == account_id
+            ).scalar()
+        else:
+            initial_balance = self.db.query(func.sum(BankAccount.initial_balance)).filter(
+                BankAccount.workspace_id == workspace_id
+            ).scalar()
+
+        latest = self.db.query(
+            CashFlowDailyBalance.account_id,
+            func.max(CashFlowDailyBalance.balance_date).label('balance_date')
+        ).filter(
+            CashFlowDailyBalance.workspace_id == workspace_id,
+            CashFlowDailyBalance.balance_date <= target_date
+        )
+        if account_id:
+            latest = latest.filter(CashFlowDailyBalance.account_id == account_id)
+        latest = latest.group_by(CashFlowDailyBalance.account_id).subquery()
+
+        ledger_balance = self.db.query(func.sum(CashFlowDailyBalance.closing_balance)).join(
+            latest,
+            and_(
+                CashFlowDailyBalance.account_id == latest.c.account_id,
+                CashFlowDailyBalance.balance_date == latest.c.balance_date
+            )
+        ).filter(
+            CashFlowDailyBalance.workspace_id == workspace_id
+        ).scalar()
+
+        return float(initial_balance or 0.0) + float(ledger_balance or 0.0)
+
+    # ============================================
+    # RECONSTRUÇÃO E CONSISTÊNCIA
+    # ============================================
+
+    def rebuild(self, workspace_id: Optional[int] = None) -> Dict[str, int]:
+        """
+        Reconstrói o ledger a partir de cash_flow_transactions (não faz commit)
+
+        Args:
+            workspace_id: Workspace a reconstruir; None = todos
+
+        Returns:
+            Dict com quantidade de linhas removidas e inseridas
+        """
+        delete_query = self.db.query(CashFlowDailyBalance)
+        if workspace_id is not None:
+            delete_query = delete_query.filter(CashFlowDailyBalance.workspace_id == workspace_id)
+        deleted = delete_query.delete(synchronize_session=False)
+
+        rows = []
+        running: Dict[tuple, float] = defaultdict(float)
+        for ws_id, account_key, balance_date, entries, exits in self._aggregate_transactions(workspace_id):
+            running[(ws_id, account_key)] += entries - exits
+            rows.append({
+                'workspace_id': ws_id,
+                'account_id': account_key,
+                'balance_date': balance_date,
+                'entries': entries,
+                'exits': exits,
+                'closing_balance': running[(ws_id, account_key)],
+                'updated_at': datetime.utcnow()
+            })
+
+        if rows:
+            self.db.bulk_insert_mappings(CashFlowDailyBalance, rows)
+        self.db.flush()
+
+        logger.info(f"Ledger diário reconstruído: {deleted} linhas removidas, {len(rows)} inseridas")
+
+        return {'deleted': deleted, 'inserted': len(rows)}
+
+    def check_consistency(self, workspace_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Compara o ledger com as transações brutas
+
+        Returns:
+            Lista de divergências (vazia quando o ledger está consistente)
+        """
+        expected_days = {
+            (ws_id, account_key, balance_date): (entries, exits)
+            for ws_id, account_key, balance_date, entries, exits in self._aggregate_transactions(workspace_id)
+        }
+
+        query = self.db.query(CashFlowDailyBalance)
+        if workspace_id is not None:
+            query = query.filter(CashFlowDailyBalance.workspace_id == workspace_id)
+
+        actual: Dict[tuple, Dict[str, float]] = {
+            (row.workspace_id, row.account_id, row.balance_date): {
+                'entries': row.entries,
+                'exits': row.exits,
+                'closing_balance': row.closing_balance
+            }
+            for row in query.yield_per(1000)
+        }
+
+        # Chaves ordenadas por (workspace, conta, dia): o saldo esperado é acumulado
+        # na mesma ordem, de forma que dias sem movimentação que ficaram no ledger
+        # (ex.: após exclusões) são aceitos desde que o saldo de fechamento confira
+        discrepancies = []
+        running: Dict[tuple, float] = defaultdict(float)
+        for key in sorted(set(expected_days) | set(actual)):
+            ws_id, account_key, balance_date = key
+            entries, exits = expected_days.get(key, (0.0, 0.0))
+            running[(ws_id, account_key)] += entries - exits
+
+            expected_row = {
+                'entries': entries,
+                'exits': exits,
+                'closing_balance': running[(ws_id, account_key)]
+            }
+            actual_row = actual.get(key)
+
+            if actual_row is None:
+                reason = 'missing_row'
+            elif any(
+                abs(expected_row[field] - actual_row[field]) > self.consistency_tolerance
+                for field in ('entries', 'exits', 'closing_balance')
+            ):
+                reason = 'value_mismatch'
+            else:
+                continue
+
+            discrepancies.append({
+                'workspace_id': ws_id,
+                'account_id': account_key,
+                'balance_date': balance_date.isoformat(),
+                'reason': reason,
+                'expected': expected_row,
+                'actual': actual_row
+            })
+
+        if discrepancies:
+            logger.warning(f"Ledger diário inconsistente: {len(discrepancies)} divergências")
+
+        return discrepancies
+
+    def _aggregate_transactions(self, workspace_id: Optional[int] = None) -> List[tuple]:
+        """Entradas/saídas por workspace/conta/dia a partir das transações brutas"""
+        is_entry = CashFlowTransaction.type == TransactionType.ENTRADA.value
+        is_exit = CashFlowTransaction.type == TransactionType.SAIDA.value
+        account_key = func.coalesce(CashFlowTransaction.account_id, NO_ACCOUNT_ID)
+        balance_date = func.date(CashFlowTransaction.transaction_date, type_=Date)
+
+        query = self.db.query(
+            CashFlowTransaction.workspace_id,
+            account_key,
+            balance_date,
+            func.coalesce(func.sum(case((is_entry, CashFlowTransaction.value), else_=0.0)), 0.0),
+            func.coalesce(func.sum(case((is_exit, CashFlowTransaction.value), else_=0.0)), 0.0)
+        )
+        if workspace_id is not None:
+            query = query.filter(CashFlowTransaction.workspace_id == workspace_id)
+
+        query = query.group_by(
+            CashFlowTransaction.workspace_id, account_key, balance_date
+        ).order_by(
+            CashFlowTransaction.workspace_id, account_key, balance_date
+        )
+
+        return [
+            (ws_id, int(account), day, float(entries), float(exits))
+            for ws_id, account, day, entries, exits in query.all()
+        ]
@@ -0,0 +1,214 @@
+"""
+Simulação Monte Carlo de risco de Fluxo de Caixa
+
+Gera milhares de trajetórias estocásticas de saldo:
+- Entradas/saídas diárias amostradas (bootstrap) dos dias históricos do workspace
+- Recebíveis pendentes liquidados no vencimento + atraso amostrado do histórico
+  de pagamentos, com probabilidade igual à taxa de cobrança
+- Pagáveis pendentes debitados no vencimento
+
+As trajetórias são geradas em lotes vetorizados distribuídos em um pool de
+processos. Cada lote tem sua própria semente derivada de uma SeedSequence, de
+forma que o resultado depende apenas da semente e não do número de workers.
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, NamedTuple, Optional
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Trajetórias por lote (fixo para manter o resultado independente dos workers)
+PATHS_PER_CHUNK = 2500
+
+# Abaixo de trajetórias x dias, o custo do pool supera o ganho: roda no processo
+PARALLEL_MIN_CELLS = 500_000
+
+# Percentis das bandas de saldo
+PERCENTILES = (5, 50, 95)
+
+# Cauda usada no expected shortfall (5% piores trajetórias)
+SHORTFALL_TAIL = 0.05
+
+# Início dos processos do pool: o fork de um processo que já tem threads
+# (cliente de LLM, batcher do LayoutLM, torch) pode deixar os workers travados
+MP_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class MonteCarloInputs(NamedTuple):
+    """Dados do workspace usados para gerar as trajetórias"""
+    opening_balance: float
+    historical_entries: np.ndarray      # entradas por dia do histórico
+    historical_exits: np.ndarray        # saídas por dia do histórico
+    receivable_amounts: np.ndarray      # saldo em aberto de cada recebível
+    receivable_due_offsets: np.ndarray  # dias até o vencimento (negativo = vencido)
+    payment_delays: np.ndarray          # atrasos observados (dias, >= 0)
+    collection_rate: float              # probabilidade de um recebível ser pago
+    payable_schedule: np.ndarray        # saídas programadas por dia da projeção
+
+
+class MonteCarloResult(NamedTuple):
+    """Estatísticas agregadas das trajetórias"""
+    percentiles: np.ndarray                    # len(PERCENTILES) x dias
+    probability_negative_by_day: np.ndarray    # dias
+    probability_negative: float
+    expected_shortfall: float
+    final_percentiles: np.ndarray              # len(PERCENTILES)
+    paths: int
+
+
+def simulate_chunk(
+    inputs: MonteCarloInputs,
+    days_ahead: int,
+    paths: int,
+    seed_sequence: np.random.SeedSequence
+) -> np.ndarray:
+    """
+    Gera um lote de trajetórias de saldo (paths x days_ahead)
+
+    Executado dentro dos workers do pool; deve permanecer no nível do módulo
+    para poder ser serializado.
+    """
+    rng = np.random.default_rng(seed_sequence)
+
+    # Bootstrap de dias históricos (entradas e saídas do mesmo dia juntas)
+    history_size = len(inputs.historical_entries)
+    if history_size:
+        sampled_days = rng.integers(0, history_size, size=(paths, days_ahead))
+        net_flow = inputs.historical_entries[sampled_days] - inputs.historical_exits[sampled_days]
+    else:
+        net_flow = np.zeros((paths, days_ahead))
+
+    net_flow -= inputs.payable_schedule[np.newaxis, :]
+
+    # Recebíveis: cobrança (Bernoulli) e dia de chegada = vencimento + atraso amostrado
+    receivables = len(inputs.receivable_amounts)
+    if receivables and len(inputs.payment_delays):
+        delays = inputs.payment_delays[rng.integers(0, len(inputs.payment_delays), size=(paths, receivables))]
+        arrival = np.maximum(inputs.receivable_due_offsets[np.newaxis, :] + delays, 0)
+        collected = (rng.random((paths, receivables)) < inputs.collection_rate) & (arrival < days_ahead)
+
+        path_index = np.broadcast_to(np.arange(paths)[:, np.newaxis], arrival.shape)
+        flat_index = path_index[collected] * days_ahead + arrival[collected]
+        amounts = np.broadcast_to(inputs.receivable_amounts[np.newaxis, :], arrival.shape)[collected]
+        net_flow += np.bincount(flat_index, weights=amounts, minlength=paths * days_ahead).reshape(paths, days_ahead)
+
+    return inputs.opening_balance + np.cumsum(net_flow, axis=1)
+
+
+def run_simulation(
+    inputs: MonteCarloInputs,
+    days_ahead: int,
+    paths: int,
+    seed: int,
+    workers: Optional[int] = None
+) -> MonteCarloResult:
+    """
+    Executa a simulação completa e agrega as trajetórias
+
+    Args:
+        inputs: Dados do workspace
+        days_ahead: Dias projetados
+        paths: Quantidade de trajetórias
+        seed: Semente determinística
+        workers: Processos do pool (None = configuração/CPUs disponíveis)
+    """
+    chunk_sizes = [PATHS_PER_CHUNK] * (paths // PATHS_PER_CHUNK)
+    if paths % PATHS_PER_CHUNK:
+        chunk_sizes.append(paths % PATHS_PER_CHUNK)
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+    chunks: Optional[List[np.ndarray]] = None
+    if len(chunk_sizes) > 1 and paths * days_ahead >= PARALLEL_MIN_CELLS:
+        executor = None
+        try:
+            executor = _get_executor(workers)
+            futures = [
+                executor.submit(simulate_chunk, inputs, days_ahead, size, seed_sequence)
+                for size, seed_sequence in zip(chunk_sizes, seed_sequences)
+            ]
+            chunks = [future.result() for future in futures]
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning(f"Pool de processos indisponível, simulando no processo atual: {str(e)}")
+            if executor is not None:
+                _discard_executor(executor)
+
+    if chunks is None:
+        chunks = [
+            simulate_chunk(inputs, days_ahead, size, seed_sequence)
+            for size, seed_sequence in zip(chunk_sizes, seed_sequences)
+        ]
+
+    balances = np.vstack(chunks)
+    return summarize_paths(balances)
+
+
+def summarize_paths(balances: np.ndarray) -> MonteCarloResult:
+    """Percentis diários, probabilidade de saldo negativo e expected shortfall"""
+    paths = balances.shape[0]
+    final_balances = balances[:, -1]
+
+    # Expected shortfall: média do saldo final nas 5% piores trajetórias
+    tail_size = max(1, int(np.ceil(paths * SHORTFALL_TAIL)))
+    worst_final = np.partition(final_balances, tail_size - 1)[:tail_size]
+
+    negative = balances < 0
+
+    return MonteCarloResult(
+        percentiles=np.percentile(balances, PERCENTILES, axis=0),
+        probability_negative_by_day=negative.mean(axis=0),
+        probability_negative=float(negative.any(axis=1).mean()),
+        expected_shortfall=float(worst_final.mean()),
+        final_percentiles=np.percentile(final_balances, PERCENTILES),
+        paths=paths
+    )
+
+
+def _get_executor(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Pool de processos compartilhado (criado sob demanda)"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            if not workers:
+                workers = settings.MONTE_CARLO_WORKERS or os.cpu_count() or 1
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(MP_START_METHOD)
+            )
+            logger.info(f"Pool Monte Carlo iniciado com {workers} processos")
+        return _executor
+
+
+def _discard_executor(broken: ProcessPoolExecutor) -> None:
+    """Descarta um pool quebrado sem cancelar simulações de outras requisições"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False)
+
+
+def shutdown_executor() -> None:
+    """Encerra o pool compartilhado (saída do processo)"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+atexit.register(shutdown_executor)
@@ -0,0 +1,172 @@
+"""
+Query única dos KPIs do Executive Dashboard
+
+Calcula os números do período atual e do período de comparação para
+CashFlowTransaction, AccountsReceivable e AccountsPayableInvoice em um só
+statement: uma CTE por tabela filtra a janela combinada (início da comparação
+até o fim do período atual) e separa os dois períodos com agregação
+condicional. O custo passa a ser um round trip, independente da quantidade
+de KPIs exibidos.
+"""
+
+import logging
+from typing import NamedTuple, Optional
+from datetime import date
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, case, select, true
+
+from app.models.cash_flow import CashFlowTransaction, TransactionType
+from app.models.accounts_receivable import AccountsReceivable
+from app.models.accounts_payable import AccountsPayableInvoice
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodKPIs(NamedTuple):
+    """Valores brutos de um período"""
+    revenue_transactions: float
+    revenue_received: float
+    expense_transactions: float
+    expense_paid: float
+    sales_count: int
+
+    @property
+    def total_revenue(self) -> float:
+        return self.revenue_transactions + self.revenue_received
+
+    @property
+    def total_expenses(self) -> float:
+        return self.expense_transactions + self.expense_paid
+
+    @property
+    def net_profit(self) -> float:
+        return self.total_revenue - self.total_expenses
+
+    @property
+    def profit_margin(self) -> float:
+        return (self.net_profit / self.total_revenue * 100) if self.total_revenue > 0 else 0
+
+    @property
+    def average_ticket(self) -> float:
+        return self.total_revenue / self.sales_count if self.sales_count > 0 else 0
+
+
+class KPIComparison(NamedTuple):
+    """Período atual e período de comparação"""
+    current: PeriodKPIs
+    previous: PeriodKPIs
+
+
+class DashboardKPIQuery:
+    """
+    Builder da query de KPIs com os dois períodos em um único round trip
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def fetch(
+        self,
+        period_start: date,
+        period_end: date,
+        comparison_start: date,
+        comparison_end: date,
+        workspace_id: Optional[int] = None
+    ) -> KPIComparison:
+        """
+        Executa o statement e retorna os valores dos dois períodos
+
+        Args:
+            workspace_id: Restringe ao workspace; None = todos os workspaces
+        """
+        row = self.db.execute(
+            self.build(period_start, period_end, comparison_start, comparison_end, workspace_id)
+        ).one()
+
+        return KPIComparison(
+            current=PeriodKPIs(
+                float(row.cf_revenue_current),
+                float(row.ar_received_current),
+                float(row.cf_expense_current),
+                float(row.ap_paid_current),
+                int(row.cf_sales_current)
+            ),
+            previous=PeriodKPIs(
+                float(row.cf_revenue_previous),
+                float(row.ar_received_previous),
+                float(row.cf_expense_previous),
+                float(row.ap_paid_previous),
+                int(row.cf_sales_previous)
+            )
+        )
+
+    def build(
+        self,
+        period_start: date,
+        period_end: date,
+        comparison_start: date,
+        comparison_end: date,
+        workspace_id: Optional[int] = None
+    ):
+        """Monta o SELECT com uma CTE por tabela (sem executar)"""
+        window_start = min(period_start, comparison_start)
+        window_end = max(period_end, comparison_end)
+
+        # ===== Movimentações de caixa =====
+        tx_date = CashFlowTransaction.transaction_date
+        in_current = and_(tx_date >= period_start, tx_date <= period_end)
+        in_previous = and_(tx_date >= comparison_start, tx_date <= comparison_end)
+        is_entry = CashFlowTransaction.type == TransactionType.ENTRADA.value
+        is_exit = CashFlowTransaction.type == TransactionType.SAIDA.value
+
+        cash_flow_filters = [tx_date >= window_start, tx_date <= window_end]
+        if workspace_id is not None:
+            cash_flow_filters.append(CashFlowTransaction.workspace_id == workspace_id)
+
+        cash_flow = select(
+            self._sum(and_(is_entry, in_current), CashFlowTransaction.value).label("cf_revenue_current"),
+            self._sum(and_(is_entry, in_previous), CashFlowTransaction.value).label("cf_revenue_previous"),
+            self._sum(and_(is_exit, in_current), CashFlowTransaction.value).label("cf_expense_current"),
+            self._sum(and_(is_exit, in_previous), CashFlowTransaction.value).label("cf_expense_previous"),
+            self._count(and_(is_entry, in_current)).label("cf_sales_current"),
+            self._count(and_(is_entry, in_previous)).label("cf_sales_previous"),
+        ).where(*cash_flow_filters).cte("cash_flow_kpis")
+
+        # ===== Contas a receber recebidas =====
+        ar_date = AccountsReceivable.payment_date
+        receivable_filters = [ar_date >= window_start, ar_date <= window_end, AccountsReceivable.paid_value > 0]
+        if workspace_id is not None:
+            receivable_filters.append(AccountsReceivable.workspace_id == workspace_id)
+
+        receivables = select(
+            self._sum(and_(ar_date >= period_start, ar_date <= period_end),
+                      AccountsReceivable.paid_value).label("ar_received_current"),
+            self._sum(and_(ar_date >= comparison_start, ar_date <= comparison_end),
+                      AccountsReceivable.paid_value).label("ar_received_previous"),
+        ).where(*receivable_filters).cte("receivable_kpis")
+
+        # ===== Contas a pagar pagas =====
+        ap_date = AccountsPayableInvoice.payment_date
+        payable_filters = [ap_date >= window_start, ap_date <= window_end, AccountsPayableInvoice.paid_value > 0]
+        if workspace_id is not None:
+            payable_filters.append(AccountsPayableInvoice.workspace_id == workspace_id)
+
+        payables = select(
+            self._sum(and_(ap_date >= period_start, ap_date <= period_end),
+                      AccountsPayableInvoice.paid_value).label("ap_paid_current"),
+            self._sum(and_(ap_date >= comparison_start, ap_date <= comparison_end),
+                      AccountsPayableInvoice.paid_value).label("ap_paid_previous"),
+        ).where(*payable_filters).cte("payable_kpis")
+
+        # Cada CTE retorna exatamente uma linha: o join sem condição as combina
+        return select(cash_flow, receivables, payables).select_from(
+            cash_flow.join(receivables, true()).join(payables, true())
+        )
+
+    @staticmethod
+    def _sum(condition, column):
+        return func.coalesce(func.sum(case((condition, column), else_=0.0)), 0.0)
+
+    @staticmethod
+    def _count(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
@@ -1,6 +1,7 @@
 import re
 import logging
-from typing import Dict, Any, Optional, List
+import time
+from typing import Dict, Any, Optional, List, Callable
 from datetime import datetime, date
 from decimal import Decimal, InvalidOperation
 import unicodedata
@@ -9,6 +10,46 @@ import unicodedata
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Padrões pré-compilados (caminho unitário e lote)
+WHITESPACE_PATTERN = re.compile(r'\s+')
+NON_DIGIT_PATTERN = re.compile(r'\D')
+DIGITS_PATTERN = re.compile(r'\d+')
+NON_WORD_PATTERN = re.compile(r'[^\w\s]')
+SUPPLIER_NAME_STRIP_PATTERN = re.compile(r'[^\w\s\-&\.]')
+INVOICE_NUMBER_STRIP_PATTERN = re.compile(r'[^\w\-/.]')
+DATE_STRIP_PATTERN = re.compile(r'[^\d/\-.]')
+CURRENCY_STRIP_PATTERN = re.compile(r'[R$\s]')
+CONTROL_CHARS_PATTERN = re.compile(r'[\x00-\x1f\x7f-\x9f]')
+
+# Diferentes padrões de data brasileira
+DATE_PATTERNS = (
+    re.compile(r'(\d{2})[/\-.](\d{2})[/\-.](\d{4})'),  # DD/MM/YYYY
+    re.compile(r'(\d{1,2})[/\-.](\d{1,2})[/\-.](\d{4})'),  # D/M/YYYY
+    re.compile(r'(\d{4})[/\-.](\d{2})[/\-.](\d{2})'),  # YYYY/MM/DD
+    re.compile(r'(\d{2})(\d{2})(\d{4})'),  # DDMMYYYY
+)
+
+# Nomes de fornecedor normalizados guardados entre lotes (por instância)
+SUPPLIER_NAME_MEMO_SIZE = 8192
+
+# Campo ausente no registro (no lote vale o padrão do caminho unitário)
+_MISSING = object()
+
+
+class _CleaningError:
+    """Erro de limpeza de um valor no lote, relançado ao montar o registro"""
+    __slots__ = ('error',)
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+def _value(result: Any) -> Any:
+    if isinstance(result, _CleaningError):
+        raise result.error
+    return result
+
+
 class DataCleaner:
     """
     Serviço para limpeza e formatação de dados extraídos de documentos
@@ -29,6 +70,8 @@ class DataCleaner:
             'comercial', 'industrial', 'servicos', 'prestadora', 'empresa'
         }
 
+        self._supplier_name_memo: Dict[str, str] = {}
+
         logger.info("DataCleaner inicializado")
 
     def clean_extracted_data(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -60,14 +103,7 @@ class DataCleaner:
                 'ai_suggestions': self.clean_suggestions(raw_data.get('ai_suggestions', []))
             }
 
-            # Calcula net_amount após limpeza dos valores
-            cleaned_data['net_amount'] = max(0, cleaned_data['total_amount'] - cleaned_data['tax_amount'])
-
-            # Valida consistência dos dados
-            cleaned_data = self._validate_data_consistency(cleaned_data)
-
-            # Adiciona sugestões de qualidade
-            cleaned_data['ai_suggestions'].extend(self._generate_quality_suggestions(cleaned_data))
+            cleaned_data = self._finalize_cleaned_data(cleaned_data)
 
             logger.info(f"Dados limpos com sucesso. Confiança: {cleaned_data['confidence_score']:.2f}")
 
@@ -77,6 +113,85 @@ class DataCleaner:
             logger.error(f"Erro na limpeza dos dados: {e}")
             return self._create_fallback_cleaned_data(raw_data, str(e))
 
+    def clean_batch(self, records: Any) -> List[Dict[str, Any]]:
+        """
+        Limpa vários registros de uma vez, coluna a coluna
+
+        Cada valor distinto de uma coluna é limpo uma única vez (nomes de
+        fornecedor, CNPJs, datas e valores se repetem muito em importações),
+        com os mesmos métodos do caminho unitário: cada registro sai idêntico
+        ao de clean_extracted_data, inclusive o fallback em caso de erro.
+
+        Args:
+            records: Lista de dicionários ou colunas ({campo: [valores]} ou
+                DataFrame, lido com to_dict('list'))
+
+        Returns:
+            Lista de dados limpos, na ordem de entrada
+        """
+        started = time.perf_counter()
+        columns, raw_records = self._batch_columns(records)
+        count = len(raw_records)
+
+        def values(field: str, default: Any) -> List[Any]:
+            if field not in columns:
+                return [default] * count
+            return [default if value is _MISSING else value for value in columns[field]]
+
+        def column(field: str, default: Any, clean: Callable[[Any], Any], memo: Optional[Dict] = None) -> List[Any]:
+            return self._clean_column(clean, values(field, default), {} if memo is None else memo)
+
+        money_memo: Dict = {}
+        supplier_names = column('supplier_name', '', self._memoized_supplier_name)
+        cnpjs = column('supplier_cnpj', '', self.clean_cnpj)
+        invoice_numbers = column('invoice_number', '', self.clean_invoice_number)
+        date_memo: Dict = {}
+        issue_dates = column('issue_date', '', self.clean_date, date_memo)
+        due_dates = column('due_date', '', self.clean_date, date_memo)
+        totals = column('total_amount', 0, self.clean_monetary_value, money_memo)
+        taxes = column('tax_amount', 0, self.clean_monetary_value, money_memo)
+        descriptions = column('description', '', self.clean_description)
+        categories = column('category', '', self.clean_category)
+        payment_methods = column('payment_method', '', self.clean_payment_method)
+        items = self._clean_items_column(values('items', []), money_memo)
+        confidences = column('confidence_score', 0, self.validate_confidence_score)
+        suggestions = values('ai_suggestions', [])
+
+        results = []
+        for i in range(count):
+            if raw_records[i] is not _MISSING:
+                # Registro que não é dicionário: mesmo tratamento do caminho unitário
+                results.append(self.clean_extracted_data(raw_records[i]))
+                continue
+
+            try:
+                cleaned_data = {
+                    'supplier_name': _value(supplier_names[i]),
+                    'supplier_cnpj': _value(cnpjs[i]),
+                    'invoice_number': _value(invoice_numbers[i]),
+                    'issue_date': _value(issue_dates[i]),
+                    'due_date': _value(due_dates[i]),
+                    'total_amount': _value(totals[i]),
+                    'tax_amount': _value(taxes[i]),
+                    'net_amount': 0.0,  # Será calculado após limpeza
+                    'description': _value(descriptions[i]),
+                    'category': _value(categories[i]),
+                    'payment_method': _value(payment_methods[i]),
+                    'items': self._assemble_items(items[i]),
+                    'confidence_score': _value(confidences[i]),
+                    'ai_suggestions': self.clean_suggestions(suggestions[i])
+                }
+                results.append(self._finalize_cleaned_data(cleaned_data))
+
+            except Exception as e:
+                logger.error(f"Erro na limpeza dos dados: {e}")
+                results.append(self._create_fallback_cleaned_data({}, str(e)))
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Lote de {count} registros limpo em {elapsed * 1000:.0f} ms")
+
+        return results
+
     def clean_supplier_name(self, supplier_name: str) -> str:
         """Limpa e formata nome do fornecedor"""
         if not supplier_name or not isinstance(supplier_name, str):
@@ -86,10 +201,10 @@ class DataCleaner:
         cleaned = unicodedata.normalize('NFKD', supplier_name.strip())
 
         # Remove quebras de linha e espaços extras
-        cleaned = re.sub(r'\s+', ' ', cleaned)
+        cleaned = WHITESPACE_PATTERN.sub(' ', cleaned)
 
         # Remove caracteres não alfanuméricos exceto espaços e alguns símbolos
-        cleaned = re.sub(r'[^\w\s\-&\.]', '', cleaned)
+        cleaned = SUPPLIER_NAME_STRIP_PATTERN.sub('', cleaned)
 
         # Converte para title case mantendo siglas
         words = cleaned.split()
@@ -119,14 +234,14 @@ class DataCleaner:
             return ""
 
         # Remove tudo exceto números
-        numbers_only = re.sub(r'\D', '', str(cnpj))
+        numbers_only = NON_DIGIT_PATTERN.sub('', str(cnpj))
 
         # Valida se tem 14 dígitos
         if len(numbers_only) != 14:
             # Tenta encontrar CNPJ no texto
             match = self.cnpj_pattern.search(cnpj)
             if match:
-                numbers_only = re.sub(r'\D', '', match.group(1))
+                numbers_only = NON_DIGIT_PATTERN.sub('', match.group(1))
 
         if len(numbers_only) == 14:
             # Valida CNPJ básico (verificação de dígitos seria mais complexa)
@@ -144,7 +259,7 @@ class DataCleaner:
         cleaned = str(invoice_number).strip().upper()
 
         # Remove caracteres especiais exceto números, letras e alguns símbolos
-        cleaned = re.sub(r'[^\w\-/.]', '', cleaned)
+        cleaned = INVOICE_NUMBER_STRIP_PATTERN.sub('', cleaned)
 
         # Limita tamanho
         return cleaned[:50] if len(cleaned) > 50 else cleaned
@@ -155,21 +270,13 @@ class DataCleaner:
             return ""
 
         # Remove espaços e caracteres extras
-        cleaned = re.sub(r'[^\d/\-.]', '', str(date_str).strip())
+        cleaned = DATE_STRIP_PATTERN.sub('', str(date_str).strip())
 
         if not cleaned:
             return ""
 
-        # Diferentes padrões de data brasileira
-        date_patterns = [
-            r'(\d{2})[/\-.](\d{2})[/\-.](\d{4})',  # DD/MM/YYYY
-            r'(\d{1,2})[/\-.](\d{1,2})[/\-.](\d{4})',  # D/M/YYYY
-            r'(\d{4})[/\-.](\d{2})[/\-.](\d{2})',  # YYYY/MM/DD
-            r'(\d{2})(\d{2})(\d{4})',  # DDMMYYYY
-        ]
-
-        for pattern in date_patterns:
-            match = re.search(pattern, cleaned)
+        for pattern in DATE_PATTERNS:
+            match = pattern.search(cleaned)
             if match:
                 try:
                     if len(match.group(3)) == 4:  # Ano com 4 dígitos
@@ -204,7 +311,7 @@ class DataCleaner:
         # Se é string, limpa e converte
         if isinstance(value, str):
             # Remove símbolos de moeda e espaços
-            cleaned = re.sub(r'[R$\s]', '', value.strip())
+            cleaned = CURRENCY_STRIP_PATTERN.sub('', value.strip())
 
             # Tenta diferentes formatos brasileiros
             try:
@@ -223,7 +330,7 @@ class DataCleaner:
 
             except ValueError:
                 # Tenta extrair números usando regex
-                numbers = re.findall(r'\d+', str(value))
+                numbers = DIGITS_PATTERN.findall(str(value))
                 if numbers:
                     # Une os números e tenta converter
                     try:
@@ -241,10 +348,10 @@ class DataCleaner:
 
         # Normaliza unicode e remove quebras de linha excessivas
         cleaned = unicodedata.normalize('NFKD', description.strip())
-        cleaned = re.sub(r'\s+', ' ', cleaned)
+        cleaned = WHITESPACE_PATTERN.sub(' ', cleaned)
 
         # Remove caracteres de controle
-        cleaned = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', cleaned)
+        cleaned = CONTROL_CHARS_PATTERN.sub('', cleaned)
 
         # Capitaliza primeira letra
         if cleaned:
@@ -260,7 +367,7 @@ class DataCleaner:
 
         # Normaliza e limpa
         cleaned = unicodedata.normalize('NFKD', category.strip()).title()
-        cleaned = re.sub(r'[^\w\s]', '', cleaned)
+        cleaned = NON_WORD_PATTERN.sub('', cleaned)
 
         # Mapeamento de categorias conhecidas
         category_mapping = {
@@ -311,7 +418,7 @@ class DataCleaner:
                     return standard_method
 
         # Remove caracteres especiais
-        cleaned = re.sub(r'[^\w\s]', '', cleaned).title()
+        cleaned = NON_WORD_PATTERN.sub('', cleaned).title()
         return cleaned[:50] if len(cleaned) > 50 else cleaned
 
     def clean_items_list(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -325,27 +432,35 @@ class DataCleaner:
             if not isinstance(item, dict):
                 continue
 
-            cleaned_item = {
+            cleaned_item = self._complete_item({
                 'description': self.clean_description(item.get('description', '')),
                 'quantity': self.clean_quantity(item.get('quantity', 1)),
                 'unit_price': self.clean_monetary_value(item.get('unit_price', 0)),
                 'total_price': self.clean_monetary_value(item.get('total_price', 0))
-            }
-
-            # Valida se item tem dados mínimos
-            if cleaned_item['description'] or cleaned_item['total_price'] > 0:
-                # Calcula total_price se não fornecido mas temos quantidade e preço unitário
-                if cleaned_item['total_price'] == 0 and cleaned_item['quantity'] > 0 and cleaned_item['unit_price'] > 0:
-                    cleaned_item['total_price'] = cleaned_item['quantity'] * cleaned_item['unit_price']
-
-                # Calcula unit_price se não fornecido
-                elif cleaned_item['unit_price'] == 0 and cleaned_item['quantity'] > 0 and cleaned_item['total_price'] > 0:
-                    cleaned_item['unit_price'] = cleaned_item['total_price'] / cleaned_item['quantity']
+            })
 
+            if cleaned_item:
                 cleaned_items.append(cleaned_item)
 
         return cleaned_items
 
+    def _complete_item(self, cleaned_item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Completa preço unitário/total; None se o item não tem dados mínimos"""
+
+        # Valida se item tem dados mínimos
+        if not (cleaned_item['description'] or cleaned_item['total_price'] > 0):
+            return None
+
+        # Calcula total_price se não fornecido mas temos quantidade e preço unitário
+        if cleaned_item['total_price'] == 0 and cleaned_item['quantity'] > 0 and cleaned_item['unit_price'] > 0:
+            cleaned_item['total_price'] = cleaned_item['quantity'] * cleaned_item['unit_price']
+
+        # Calcula unit_price se não fornecido
+        elif cleaned_item['unit_price'] == 0 and cleaned_item['quantity'] > 0 and cleaned_item['total_price'] > 0:
+            cleaned_item['unit_price'] = cleaned_item['total_price'] / cleaned_item['quantity']
+
+        return cleaned_item
+
     def clean_quantity(self, quantity: Any) -> int:
         """Limpa e converte quantidade para inteiro"""
         if isinstance(quantity, (int, float)):
@@ -353,7 +468,7 @@ class DataCleaner:
 
         if isinstance(quantity, str):
             # Remove caracteres não numéricos
-            numbers = re.sub(r'\D', '', quantity.strip())
+            numbers = NON_DIGIT_PATTERN.sub('', quantity.strip())
             if numbers:
                 try:
                     return max(1, int(numbers))
@@ -401,6 +516,136 @@ class DataCleaner:
         # Por simplicidade, apenas verifica se é numérico e não repetitivo
         return cnpj.isdigit()
 
+    def _finalize_cleaned_data(self, cleaned_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Valor líquido, consistência e sugestões de qualidade"""
+
+        # Calcula net_amount após limpeza dos valores
+        cleaned_data['net_amount'] = max(0, cleaned_data['total_amount'] - cleaned_data['tax_amount'])
+
+        # Valida consistência dos dados
+        cleaned_data = self._validate_data_consistency(cleaned_data)
+
+        # Adiciona sugestões de qualidade
+        cleaned_data['ai_suggestions'].extend(self._generate_quality_suggestions(cleaned_data))
+
+        return cleaned_data
+
+    # ============================================
+    # LOTE (COLUNA A COLUNA)
+    # ============================================
+
+    def _batch_columns(self, records: Any):
+        """
+        Colunas do lote e, por posição, o registro bruto quando ele não é um
+        dicionário (_MISSING para os registros válidos)
+        """
+        if hasattr(records, 'to_dict') and not isinstance(records, dict):
+            records = records.to_dict('list')
+
+        if isinstance(records, dict):
+            columns = {field: list(values) for field, values in records.items()}
+            count = max((len(values) for values in columns.values()), default=0)
+            if any(len(values) != count for values in columns.values()):
+                raise ValueError("Colunas do lote com tamanhos diferentes")
+            return columns, [_MISSING] * count
+
+        records = list(records)
+        fields = {field for record in records if isinstance(record, dict) for field in record}
+        columns = {
+            field: [record.get(field, _MISSING) if isinstance(record, dict) else _MISSING for record in records]
+            for field in fields
+        }
+
+        raw_records = [_MISSING if isinstance(record, dict) else record for record in records]
+        return columns, raw_records
+
+    def _clean_column(self, clean: Callable[[Any], Any], values: List[Any], memo: Dict) -> List[Any]:
+        """Aplica clean uma vez por valor distinto da coluna"""
+        cleaned = []
+        for value in values:
+            try:
+                key = (type(value), value)
+                result = memo.get(key, _MISSING)
+            except TypeError:  # valor não hashable (lista, dict)
+                key = None
+                result = _MISSING
+
+            if result is _MISSING:
+                try:
+                    result = clean(value)
+                except Exception as e:
+                    result = _CleaningError(e)
+                if key is not None:
+                    memo[key] = result
+
+            cleaned.append(result)
+        return cleaned
+
+    def _memoized_supplier_name(self, supplier_name: Any) -> str:
+        """clean_supplier_name com memória entre lotes"""
+        if not isinstance(supplier_name, str):
+            return self.clean_supplier_name(supplier_name)
+
+        cleaned = self._supplier_name_memo.get(supplier_name)
+        if cleaned is None:
+            if len(self._supplier_name_memo) >= SUPPLIER_NAME_MEMO_SIZE:
+                self._supplier_name_memo.clear()
+            cleaned = self._supplier_name_memo[supplier_name] = self.clean_supplier_name(supplier_name)
+        return cleaned
+
+    def _clean_items_column(self, items_column: List[Any], money_memo: Dict) -> List[Any]:
+        """
+        Limpa os campos dos itens de todos os registros coluna a coluna;
+        retorna, por registro, a lista de campos limpos de cada item
+        """
+        positions = []
+        raw = {'description': [], 'quantity': [], 'unit_price': [], 'total_price': []}
+
+        for items in items_column:
+            if not items or not isinstance(items, list):
+                positions.append(None)
+                continue
+
+            start = len(raw['description'])
+            for item in items:
+                if isinstance(item, dict):
+                    raw['description'].append(item.get('description', ''))
+                    raw['quantity'].append(item.get('quantity', 1))
+                    raw['unit_price'].append(item.get('unit_price', 0))
+                    raw['total_price'].append(item.get('total_price', 0))
+            positions.append((start, len(raw['description'])))
+
+        descriptions = self._clean_column(self.clean_description, raw['description'], {})
+        quantities = self._clean_column(self.clean_quantity, raw['quantity'], {})
+        unit_prices = self._clean_column(self.clean_monetary_value, raw['unit_price'], money_memo)
+        total_prices = self._clean_column(self.clean_monetary_value, raw['total_price'], money_memo)
+
+        return [
+            None if position is None else [
+                (descriptions[j], quantities[j], unit_prices[j], total_prices[j])
+                for j in range(*position)
+            ]
+            for position in positions
+        ]
+
+    def _assemble_items(self, items: Optional[List[tuple]]) -> List[Dict[str, Any]]:
+        """Monta os itens limpos de um registro (mesma ordem de erros do unitário)"""
+        if items is None:
+            return []
+
+        cleaned_items = []
+        for description, quantity, unit_price, total_price in items:
+            cleaned_item = self._complete_item({
+                'description': _value(description),
+                'quantity': _value(quantity),
+                'unit_price': _value(unit_price),
+                'total_price': _value(total_price)
+            })
+            if cleaned_item:
+                cleaned_items.append(cleaned_item)
+
+        return cleaned_items
+
     def _validate_data_consistency(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Valida consistência entre os dados"""
 
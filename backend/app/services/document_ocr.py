@@ -0,0 +1,107 @@
+"""
+Resultado do OCR por documento, compartilhado entre os consumidores
+
+O OCR de uma página (palavras, caixas, confianças e o texto corrido
+reconstruído a partir delas) é feito uma única vez e reaproveitado pelo
+LayoutLM, pelo fallback de OCR + IA do DocumentProcessor e pelo fallback
+da Vision API no AIService, em vez de cada caminho rodar o Tesseract de novo
+sobre a mesma imagem.
+
+Um DocumentOcr vive apenas durante o processamento de um documento; as
+páginas são identificadas por uma chave (identificador da página ou caminho
+da imagem).
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Union
+from PIL import Image
+
+from app.services.pdf_page_pipeline import OcrRefinement, perform_ocr
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentOcr:
+    """
+    OCR das páginas de um documento, executado no máximo uma vez por página
+
+    Chamadas simultâneas para a mesma página aguardam o mesmo OCR.
+    """
+
+    def __init__(self):
+        self._pages: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.ocr_runs = 0
+        self.reuses = 0
+
+    def put(self, key: str, ocr_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Registra um OCR já feito (pool do pipeline de PDFs ou camada de texto)"""
+        self._pages[key] = ocr_result
+        return ocr_result
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """OCR da página, se já foi feito"""
+        return self._pages.get(key)
+
+    async def page(
+        self,
+        key: str,
+        image: Union[Image.Image, str],
+        refinement: Optional[OcrRefinement] = None
+    ) -> Dict[str, Any]:
+        """
+        OCR da página (formato de perform_ocr), feito em thread na primeira
+        chamada e reaproveitado nas seguintes
+
+        Args:
+            key: Identificador da página no documento
+            image: Imagem PIL ou caminho do arquivo de imagem
+            refinement: Página do PDF para refazer regiões fracas em alta resolução
+        """
+        if key in self._pages:
+            self.reuses += 1
+            return self._pages[key]
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.reuses += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            self.ocr_runs += 1
+            result = await asyncio.to_thread(_ocr_image, image, refinement)
+            self._pages[key] = result
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # evita aviso de exceção não recuperada sem outros consumidores
+            raise
+        finally:
+            del self._pending[key]
+
+    async def text(
+        self,
+        key: str,
+        image: Union[Image.Image, str],
+        refinement: Optional[OcrRefinement] = None
+    ) -> str:
+        """Texto corrido da página (linhas do OCR ou da camada de texto)"""
+        return (await self.page(key, image, refinement)).get('text', '')
+
+    def report(self) -> Dict[str, int]:
+        """Páginas com OCR, execuções do Tesseract e reaproveitamentos"""
+        return {'pages': len(self._pages), 'ocr_runs': self.ocr_runs, 'reuses': self.reuses}
+
+
+def _ocr_image(image: Union[Image.Image, str], refinement: Optional[OcrRefinement]) -> Dict[str, Any]:
+    if isinstance(image, str):
+        with Image.open(image) as opened:
+            return perform_ocr(opened.convert('RGB'), refinement)
+    return perform_ocr(image, refinement)
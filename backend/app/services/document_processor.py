@@ -1,18 +1,27 @@
 import os
+import asyncio
 import logging
+import time
 from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 from datetime import datetime
 from PIL import Image
 import numpy as np
-from pdf2image import convert_from_path
 import cv2
 import tempfile
+from concurrent.futures.process import BrokenProcessPool
 
 from app.services.layout_lm_service import LayoutLMService
 from app.services.ai_service import AIService
 from app.services.data_cleaner import DataCleaner
 from app.services.supplier_matcher import SupplierMatcher
+from app.services.pdf_page_pipeline import (
+    OcrRefinement, PdfPage, TEXT_LAYER_IMAGE_DPI, count_pdf_pages, extract_text_layers, rasterize_page,
+    perform_ocr, get_ocr_executor, replace_ocr_executor, resolve_ocr_workers, resolve_ocr_dpi,
+    ocr_refinement, new_stage_timings, round_timings, record_ocr_page_seconds, text_layer_report
+)
+from app.services.ocr_preprocessing import adaptive_ocr_report, ocr_page_report
+from app.services.document_ocr import DocumentOcr
 from app.utils.file_utils import FileUtils
 from app.core.config import settings
 from app.core.database import get_db
@@ -40,6 +49,10 @@ class DocumentProcessor:
         self.pdf_dpi = int(os.getenv("PDF_DPI", "300"))
         self.max_pages = int(os.getenv("MAX_PDF_PAGES", "5"))
 
+        # Concorrência do pipeline de PDFs
+        self.ocr_workers = resolve_ocr_workers()
+        self.layout_lm_batch_size = max(1, settings.LAYOUTLM_BATCH_SIZE)
+
         # Extensões suportadas
         self.supported_pdf_extensions = ['.pdf']
         self.supported_image_extensions = ['.jpg', '.jpeg', '.png', '.tiff', '.bmp']
@@ -82,7 +95,12 @@ class DocumentProcessor:
 
     async def _process_pdf_document(self, file_path: str, original_filename: str) -> Dict[str, Any]:
         """
-        Processa documento PDF convertendo para imagens e aplicando IA
+        Processa documento PDF página a página e combina os resultados
+
+        Páginas com camada de texto utilizável dispensam o OCR (palavras e
+        coordenadas lidas do PDF); as demais são rasterizadas sob demanda e
+        o OCR roda no pool de processos. O LayoutLM roda em lotes de páginas
+        (ver pdf_page_pipeline).
 
         Args:
             file_path: Caminho para o PDF
@@ -93,44 +111,39 @@ class DocumentProcessor:
         """
 
         try:
-            logger.info(f"Convertendo PDF para imagens: {original_filename}")
-
-            # Converte PDF para imagens com DPI configurável
-            images = convert_from_path(
-                file_path,
-                dpi=self.pdf_dpi,
-                first_page=1,
-                last_page=self.max_pages,
-                fmt='RGB'
-            )
-
-            if not images:
-                raise ValueError("Não foi possível extrair páginas do PDF")
+            started = time.perf_counter()
+            timings = new_stage_timings()
+            loop = asyncio.get_running_loop()
 
-            logger.info(f"PDF convertido: {len(images)} página(s) extraída(s)")
+            total_pages = min(await loop.run_in_executor(None, count_pdf_pages, file_path), self.max_pages)
 
-            # Processa cada página como imagem
-            processed_pages = []
-
-            for page_num, image in enumerate(images, 1):
-                logger.info(f"Processando página {page_num}/{len(images)}")
-
-                # Salva imagem temporária se necessário para debugging
-                temp_image_path = None
-                if os.getenv("DEBUG_SAVE_IMAGES", "false").lower() == "true":
-                    temp_image_path = await self._save_temp_image(image, original_filename, page_num)
+            if total_pages < 1:
+                raise ValueError("Não foi possível extrair páginas do PDF")
 
-                # Processa a imagem da página
-                page_result = await self._process_single_image(
-                    image,
-                    f"{original_filename}_page_{page_num}",
-                    temp_image_path
-                )
+            logger.info(
+                f"Processando PDF {original_filename}: {total_pages} página(s), "
+                f"lotes de {self.layout_lm_batch_size}, {self.ocr_workers} processo(s) de OCR"
+            )
 
-                page_result['page_number'] = page_num
-                processed_pages.append(page_result)
+            # Camada de texto (PDFs digitais): páginas com texto utilizável pulam o OCR
+            text_layers: List[Optional[Dict[str, Any]]] = [None] * total_pages
+            if settings.PDF_TEXT_LAYER_ENABLED:
+                text_layer_started = time.perf_counter()
+                text_layers = await loop.run_in_executor(None, extract_text_layers, file_path, total_pages)
+                timings['text_layer_seconds'] += time.perf_counter() - text_layer_started
+
+            # OCR de cada página feito uma vez e reaproveitado pelo fallback
+            document_ocr = DocumentOcr()
+            processed_pages = await self._run_page_pipeline(
+                file_path, original_filename, total_pages, timings, text_layers, document_ocr
+            )
+            text_layer = text_layer_report(
+                ['text_layer' if layer else 'ocr' for layer in text_layers],
+                timings['text_layer_seconds']
+            )
 
-            # Combina resultados de todas as páginas
+            # Combina resultados de todas as páginas (em ordem)
+            combine_started = time.perf_counter()
             combined_result = self._combine_pdf_pages(processed_pages)
 
             # Limpa e formata os dados extraídos
@@ -151,22 +164,224 @@ class DocumentProcessor:
                     supplier_suggestions = self._suggest_suppliers(cleaned_data)
                     combined_result['supplier_suggestions'] = supplier_suggestions
 
+            timings['combine_seconds'] += time.perf_counter() - combine_started
+            timings['total_seconds'] = time.perf_counter() - started
+
             # Adiciona metadados do PDF
             combined_result.update({
                 'original_filename': original_filename,
                 'file_type': 'pdf',
-                'total_pages': len(images),
+                'total_pages': total_pages,
                 'processing_method': 'PDF_to_Image_Pipeline',
                 'pdf_dpi': self.pdf_dpi,
+                'pipeline': {
+                    'ocr_workers': self.ocr_workers,
+                    'layout_lm_batch_size': self.layout_lm_batch_size,
+                    'text_layer': text_layer,
+                    'ocr': adaptive_ocr_report([page.get('ocr') for page in processed_pages]),
+                    'ocr_reuse': document_ocr.report(),
+                    'timings': round_timings(timings)
+                },
                 'processed_at': datetime.now().isoformat()
             })
 
+            logger.info(
+                f"PDF {original_filename} processado em {timings['total_seconds']:.2f}s "
+                f"(caminho {text_layer['path']}, ~{text_layer['estimated_seconds_saved']:.1f}s economizados): "
+                f"{round_timings(timings)}"
+            )
+
             return combined_result
 
         except Exception as e:
             logger.error(f"Erro no processamento do PDF {original_filename}: {e}")
             return self._create_error_response(str(e), original_filename, file_path, 'pdf')
 
+    async def _run_page_pipeline(
+        self,
+        file_path: str,
+        original_filename: str,
+        total_pages: int,
+        timings: Dict[str, float],
+        text_layers: Optional[List[Optional[Dict[str, Any]]]] = None,
+        document_ocr: Optional[DocumentOcr] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Rasteriza as páginas uma a uma e as processa em lotes
+
+        Enquanto um lote está na inferência/fallback, as páginas do próximo
+        já são rasterizadas e enviadas ao OCR; no máximo dois lotes de imagens
+        ficam em memória. Páginas com camada de texto não passam pelo OCR e
+        são rasterizadas em baixa resolução apenas para o LayoutLM; as demais
+        são rasterizadas a OCR_LOW_DPI (DPI adaptativo) e o worker do OCR
+        refaz a pdf_dpi apenas as regiões com confiança baixa.
+
+        Returns:
+            Resultados das páginas em ordem
+        """
+        loop = asyncio.get_running_loop()
+        processed_pages: List[Dict[str, Any]] = []
+        batch: List[PdfPage] = []
+        running: Optional[asyncio.Task] = None
+
+        try:
+            for page_num in range(1, total_pages + 1):
+                text_layer = text_layers[page_num - 1] if text_layers else None
+
+                # Sem LayoutLM a imagem vai inteira para o OCR da IA: mantém pdf_dpi
+                if text_layer:
+                    dpi = TEXT_LAYER_IMAGE_DPI
+                else:
+                    dpi = resolve_ocr_dpi(self.pdf_dpi) if self.use_layout_lm else self.pdf_dpi
+                refinement = None if text_layer else ocr_refinement(file_path, page_num, dpi, self.pdf_dpi)
+
+                image, rasterize_seconds = None, 0.0
+                if not text_layer or self.use_layout_lm:
+                    rasterize_started = time.perf_counter()
+                    image = await loop.run_in_executor(None, rasterize_page, file_path, page_num, dpi)
+                    rasterize_seconds = time.perf_counter() - rasterize_started
+                    timings['text_layer_seconds' if text_layer else 'rasterize_seconds'] += rasterize_seconds
+
+                # Salva imagem temporária se necessário para debugging
+                temp_image_path = None
+                if image is not None and os.getenv("DEBUG_SAVE_IMAGES", "false").lower() == "true":
+                    temp_image_path = await self._save_temp_image(image, original_filename, page_num)
+
+                ocr = self._submit_ocr(image, refinement) if self.use_layout_lm and not text_layer else None
+                batch.append(PdfPage(page_num, image, ocr, temp_image_path, rasterize_seconds, text_layer, refinement))
+
+                if len(batch) == self.layout_lm_batch_size or page_num == total_pages:
+                    if running:
+                        processed_pages.extend(await running)
+                    running = asyncio.ensure_future(
+                        self._process_page_batch(batch, original_filename, timings, document_ocr)
+                    )
+                    batch = []
+
+            if running:
+                processed_pages.extend(await running)
+                running = None
+
+            return processed_pages
+
+        finally:
+            if running and not running.done():
+                running.cancel()
+
+    def _submit_ocr(self, image: Image.Image, refinement: Optional[OcrRefinement] = None) -> asyncio.Future:
+        """Envia o OCR da página ao pool de processos (ou thread, se indisponível)"""
+        return asyncio.ensure_future(self._run_ocr(image, refinement))
+
+    async def _run_ocr(self, image: Image.Image, refinement: Optional[OcrRefinement]) -> Dict[str, Any]:
+        """OCR no pool compartilhado, refeito em thread se o pool quebrou"""
+        loop = asyncio.get_running_loop()
+        executor = None
+
+        try:
+            executor = get_ocr_executor(self.ocr_workers)
+            return await loop.run_in_executor(executor, perform_ocr, image, refinement)
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning(f"Pool de OCR indisponível, usando thread: {e}")
+            if executor is not None:
+                replace_ocr_executor(executor)
+            return await loop.run_in_executor(None, perform_ocr, image, refinement)
+
+    async def _await_ocr(self, page: PdfPage) -> Dict[str, Any]:
+        """Resultado do OCR da página (camada de texto ou pool)"""
+        if page.text_layer:
+            return page.text_layer
+        return await page.ocr
+
+    async def _process_page_batch(
+        self,
+        pages: List[PdfPage],
+        original_filename: str,
+        timings: Dict[str, float],
+        document_ocr: Optional[DocumentOcr] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Processa um lote de páginas: aguarda o OCR, executa o LayoutLM em um
+        único forward e usa a IA tradicional nas páginas com baixa confiança
+
+        O OCR de cada página fica em document_ocr e o fallback usa o texto
+        dele, sem refazer o OCR da imagem.
+
+        Returns:
+            Resultados das páginas na ordem do lote
+        """
+        document_ocr = document_ocr or DocumentOcr()
+        identifiers = [f"{original_filename}_page_{page.page_number}" for page in pages]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(pages)
+        ocr_seconds = [0.0] * len(pages)
+        ocr_reports: List[Optional[Dict[str, Any]]] = [None] * len(pages)
+
+        if self.use_layout_lm:
+            ocr_results = [
+                document_ocr.put(identifier, await self._await_ocr(page))
+                for page, identifier in zip(pages, identifiers)
+            ]
+            ocr_seconds = [
+                0.0 if page.text_layer else ocr_result.get('seconds', 0.0)
+                for page, ocr_result in zip(pages, ocr_results)
+            ]
+            timings['ocr_seconds'] += sum(ocr_seconds)
+            ocr_reports = [
+                None if page.text_layer else ocr_page_report(ocr_result)
+                for page, ocr_result in zip(pages, ocr_results)
+            ]
+
+            for page, page_ocr_seconds in zip(pages, ocr_seconds):
+                if not page.text_layer:
+                    record_ocr_page_seconds(page.rasterize_seconds + page_ocr_seconds)
+
+            inference_started = time.perf_counter()
+            try:
+                logger.info(f"Processando {len(pages)} página(s) de {original_filename} com LayoutLM")
+                layout_results = await self.layout_lm_service.process_batch(
+                    [page.image for page in pages], ocr_results, identifiers
+                )
+            except Exception as e:
+                logger.warning(f"Erro no LayoutLM para {original_filename}, usando fallback: {e}")
+                layout_results = [{} for _ in pages]
+            timings['layout_lm_seconds'] += time.perf_counter() - inference_started
+
+            for index, layout_result in enumerate(layout_results):
+                # Verifica se o resultado do LayoutLM é confiável
+                confidence = layout_result.get('confidence_score', 0.0)
+
+                if layout_result.get('extracted_fields') and confidence > 0.3:
+                    logger.info(f"LayoutLM bem-sucedido para {identifiers[index]} (confiança: {confidence:.2f})")
+                    results[index] = self._format_layout_result(layout_result, identifiers[index])
+                else:
+                    logger.info(f"LayoutLM com baixa confiança para {identifiers[index]} (confiança: {confidence:.2f})")
+
+        # Fallback para processamento tradicional com OCR + IA (páginas em
+        # paralelo); páginas com camada de texto vão direto para a IA
+        fallback_started = time.perf_counter()
+        pending = [index for index, result in enumerate(results) if result is None]
+        if pending:
+            fallback_results = await asyncio.gather(*[
+                self._process_with_traditional_ai(pages[index].text_layer['text'], identifiers[index])
+                if pages[index].text_layer else
+                self._process_with_fallback(pages[index].image, identifiers[index], document_ocr)
+                for index in pending
+            ])
+            for index, result in zip(pending, fallback_results):
+                results[index] = result
+        timings['fallback_seconds'] += time.perf_counter() - fallback_started
+
+        for page, page_result, page_ocr_seconds, ocr_report in zip(pages, results, ocr_seconds, ocr_reports):
+            page_result['page_number'] = page.page_number
+            page_result['text_source'] = 'text_layer' if page.text_layer else 'ocr'
+            if ocr_report:
+                page_result['ocr'] = ocr_report
+            page_result['timings'] = {
+                'rasterize_seconds': round(page.rasterize_seconds, 4),
+                'ocr_seconds': round(page_ocr_seconds, 4)
+            }
+
+        return results
+
     async def _process_image_document(self, file_path: str, original_filename: str) -> Dict[str, Any]:
         """
         Processa documento de imagem aplicando IA
@@ -228,7 +443,13 @@ class DocumentProcessor:
             logger.error(f"Erro no processamento da imagem {original_filename}: {e}")
             return self._create_error_response(str(e), original_filename, file_path, 'image')
 
-    async def _process_single_image(self, image: Image.Image, identifier: str, image_path: Optional[str] = None) -> Dict[str, Any]:
+    async def _process_single_image(
+        self,
+        image: Image.Image,
+        identifier: str,
+        image_path: Optional[str] = None,
+        document_ocr: Optional[DocumentOcr] = None
+    ) -> Dict[str, Any]:
         """
         Processa uma única imagem usando LayoutLM ou fallback para IA tradicional
 
@@ -236,24 +457,29 @@ class DocumentProcessor:
             image: Imagem PIL
             identifier: Identificador da imagem
             image_path: Caminho da imagem (opcional)
+            document_ocr: OCR do documento (o LayoutLM e o fallback usam o
+                mesmo OCR da imagem)
 
         Returns:
             Dict com dados extraídos
         """
 
+        document_ocr = document_ocr or DocumentOcr()
+
         try:
             # Tenta primeiro com LayoutLM se habilitado
             if self.use_layout_lm:
                 try:
                     logger.info(f"Processando {identifier} com LayoutLM")
 
-                    # Converte PIL para array numpy se necessário
-                    if isinstance(image, Image.Image):
-                        layout_result = await self.layout_lm_service._process_single_image(image, identifier)
-                    else:
-                        # Se já é um array, converte para PIL primeiro
-                        pil_image = Image.fromarray(image.astype('uint8'), 'RGB')
-                        layout_result = await self.layout_lm_service._process_single_image(pil_image, identifier)
+                    # Se já é um array, converte para PIL primeiro
+                    if not isinstance(image, Image.Image):
+                        image = Image.fromarray(image.astype('uint8'), 'RGB')
+
+                    ocr_result = await document_ocr.page(identifier, image)
+                    layout_result = await self.layout_lm_service._process_single_image(
+                        image, identifier, ocr_result=ocr_result
+                    )
 
                     # Verifica se o resultado do LayoutLM é confiável
                     confidence = layout_result.get('confidence_score', 0.0)
@@ -268,18 +494,37 @@ class DocumentProcessor:
                     logger.warning(f"Erro no LayoutLM para {identifier}, usando fallback: {e}")
 
             # Fallback para processamento tradicional com OCR + IA
+            return await self._process_with_fallback(image, identifier, document_ocr)
+
+        except Exception as e:
+            logger.error(f"Erro no processamento da imagem {identifier}: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'confidence_score': 0.0,
+                'extracted_data': {},
+                'processing_method': 'failed'
+            }
+
+    async def _process_with_fallback(
+        self,
+        image: Image.Image,
+        identifier: str,
+        document_ocr: Optional[DocumentOcr] = None
+    ) -> Dict[str, Any]:
+        """Processamento tradicional da imagem: OCR + IA"""
+
+        try:
             logger.info(f"Usando processamento tradicional para {identifier}")
 
-            # Extrai texto da imagem usando OCR
-            extracted_text = await self._extract_text_from_image(image)
+            # Texto do OCR da página (reaproveitado se o LayoutLM já o fez)
+            extracted_text = await self._extract_text_from_image(image, identifier, document_ocr)
 
             if not extracted_text or len(extracted_text.strip()) < 10:
                 raise ValueError("Texto insuficiente extraído da imagem")
 
             # Processa com IA tradicional
-            ai_result = await self._process_with_traditional_ai(extracted_text, identifier)
-
-            return ai_result
+            return await self._process_with_traditional_ai(extracted_text, identifier)
 
         except Exception as e:
             logger.error(f"Erro no processamento da imagem {identifier}: {e}")
@@ -291,22 +536,16 @@ class DocumentProcessor:
                 'processing_method': 'failed'
             }
 
-    async def _extract_text_from_image(self, image: Image.Image) -> str:
-        """Extrai texto da imagem usando OCR"""
+    async def _extract_text_from_image(
+        self,
+        image: Image.Image,
+        identifier: str = "image",
+        document_ocr: Optional[DocumentOcr] = None
+    ) -> str:
+        """Texto da imagem pelo OCR do documento (feito uma vez por página)"""
         try:
-            # Usa o serviço AI existente para OCR
-            # Cria arquivo temporário de forma segura
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
-                temp_path = temp_file.name
-                image.save(temp_path)
-
-            try:
-                text = await self.ai_service.ocr_image(temp_path)
-                return text
-            finally:
-                # Remove arquivo temporário
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
+            document_ocr = document_ocr or DocumentOcr()
+            return await document_ocr.text(identifier, image)
 
         except Exception as e:
             logger.error(f"Erro na extração de texto: {e}")
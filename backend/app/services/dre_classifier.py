@@ -0,0 +1,211 @@
+"""
+Motor de classificação de movimentações nas linhas do DRE
+
+O mapeamento categoria -> linha do DRE é compilado uma única vez em uma
+expressão regular (alternação) por linha, e cada string de categoria
+distinta tem sua linha memorizada. Para relatórios, o mesmo mapeamento é
+traduzido em uma expressão SQL CASE, de forma que o banco agrupa e soma por
+linha do DRE e retorna poucas linhas.
+
+Regras (mantidas do cálculo original do DRE):
+- Entradas: RECEITA se a categoria contiver uma palavra-chave de receita,
+  caso contrário NAO_CLASSIFICADO
+- Saídas: primeira linha que casar na ordem DEDUCOES, CMV,
+  DESPESAS_OPERACIONAIS, DEPRECIACAO, JUROS; sem correspondência,
+  DESPESAS_OPERACIONAIS
+"""
+
+import logging
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, func, case
+
+from app.models.cash_flow import CashFlowTransaction, TransactionType
+from app.models.financial_reporting import DreBucket, DreCategoryMapping
+
+logger = logging.getLogger(__name__)
+
+# Mapeamento padrão (usado quando o workspace não possui mapeamento próprio)
+DEFAULT_DRE_MAPPING: Dict[str, List[str]] = {
+    DreBucket.RECEITA.value: ['Venda', 'Receita', 'Receita de Serviço', 'Receita de Produto'],
+    DreBucket.DEDUCOES.value: ['Impostos', 'PIS', 'COFINS', 'ICMS', 'ISS', 'Taxas'],
+    DreBucket.CMV.value: ['CMV', 'Custo', 'Compra', 'Fornecedor'],
+    DreBucket.DESPESAS_OPERACIONAIS.value: ['Salários', 'Aluguel', 'Marketing', 'Administrativo', 'Vendas'],
+    DreBucket.DEPRECIACAO.value: ['Depreciação', 'Amortização'],
+    DreBucket.JUROS.value: ['Juros', 'Multas', 'Encargos Financeiros', 'Taxas Bancárias'],
+}
+
+# Ordem de avaliação das saídas
+EXIT_BUCKET_ORDER = (
+    DreBucket.DEDUCOES.value,
+    DreBucket.CMV.value,
+    DreBucket.DESPESAS_OPERACIONAIS.value,
+    DreBucket.DEPRECIACAO.value,
+    DreBucket.JUROS.value,
+)
+
+# Linhas aceitas no mapeamento (NAO_CLASSIFICADO é apenas resultado)
+MAPPABLE_BUCKETS = (DreBucket.RECEITA.value,) + EXIT_BUCKET_ORDER
+
+# Limite de categorias distintas memorizadas por classificador
+MAX_CACHED_CATEGORIES = 10000
+
+
+class DreBucketTotals(NamedTuple):
+    """Soma por linha do DRE e quantidade de transações do período"""
+    totals: Dict[str, float]
+    transactions_count: int
+
+    def get(self, bucket: DreBucket) -> float:
+        return self.totals.get(bucket.value, 0.0)
+
+
+class DreClassifier:
+    """
+    Classificador compilado de um mapeamento categoria -> linha do DRE
+    """
+
+    def __init__(self, mapping: Dict[str, Sequence[str]]):
+        self.keywords: Dict[str, Tuple[str, ...]] = {
+            bucket: tuple(sorted({keyword.strip().lower() for keyword in mapping.get(bucket, []) if keyword.strip()}))
+            for bucket in MAPPABLE_BUCKETS
+        }
+        self._patterns = {
+            bucket: re.compile("|".join(re.escape(keyword) for keyword in keywords))
+            for bucket, keywords in self.keywords.items()
+            if keywords
+        }
+        self._category_cache: Dict[Tuple[str, str], str] = {}
+
+    # ============================================
+    # CLASSIFICAÇÃO EM PYTHON
+    # ============================================
+
+    def classify(self, transaction_type: str, category: Optional[str]) -> str:
+        """Linha do DRE (DreBucket.value) de uma movimentação"""
+        key = (transaction_type, category or '')
+        bucket = self._category_cache.get(key)
+        if bucket is not None:
+            return bucket
+
+        bucket = self._classify(transaction_type, (category or '').lower())
+
+        if len(self._category_cache) >= MAX_CACHED_CATEGORIES:
+            self._category_cache.clear()
+        self._category_cache[key] = bucket
+        return bucket
+
+    def _classify(self, transaction_type: str, category_lower: str) -> str:
+        if transaction_type == TransactionType.ENTRADA.value:
+            if self._matches(DreBucket.RECEITA.value, category_lower):
+                return DreBucket.RECEITA.value
+            return DreBucket.NAO_CLASSIFICADO.value
+
+        if transaction_type == TransactionType.SAIDA.value:
+            for bucket in EXIT_BUCKET_ORDER:
+                if self._matches(bucket, category_lower):
+                    return bucket
+            return DreBucket.DESPESAS_OPERACIONAIS.value
+
+        return DreBucket.NAO_CLASSIFICADO.value
+
+    def _matches(self, bucket: str, category_lower: str) -> bool:
+        pattern = self._patterns.get(bucket)
+        return pattern is not None and pattern.search(category_lower) is not None
+
+    # ============================================
+    # CLASSIFICAÇÃO EM SQL
+    # ============================================
+
+    def case_expression(self, type_column, category_column):
+        """Expressão CASE equivalente a classify() para uso em GROUP BY"""
+        category_lower = func.lower(func.coalesce(category_column, ''))
+        is_entry = type_column == TransactionType.ENTRADA.value
+        is_exit = type_column == TransactionType.SAIDA.value
+
+        def contains_any(bucket: str):
+            return or_(*[category_lower.contains(keyword, autoescape=True) for keyword in self.keywords[bucket]])
+
+        whens = []
+        if self.keywords[DreBucket.RECEITA.value]:
+            whens.append((and_(is_entry, contains_any(DreBucket.RECEITA.value)), DreBucket.RECEITA.value))
+        for bucket in EXIT_BUCKET_ORDER:
+            if self.keywords[bucket]:
+                whens.append((and_(is_exit, contains_any(bucket)), bucket))
+        whens.append((is_exit, DreBucket.DESPESAS_OPERACIONAIS.value))
+
+        return case(*whens, else_=DreBucket.NAO_CLASSIFICADO.value)
+
+    def bucket_totals(
+        self,
+        db: Session,
+        workspace_id: int,
+        period_start: date,
+        period_end: date,
+        end_exclusive: bool = False
+    ) -> DreBucketTotals:
+        """
+        Soma das movimentações do período por linha do DRE (um GROUP BY)
+
+        Args:
+            end_exclusive: Exclui `period_end` (intervalo semiaberto)
+        """
+        bucket = self.case_expression(CashFlowTransaction.type, CashFlowTransaction.category).label('bucket')
+        tx_date = CashFlowTransaction.transaction_date
+
+        rows = db.query(
+            bucket,
+            func.coalesce(func.sum(CashFlowTransaction.value), 0.0),
+            func.count(CashFlowTransaction.id)
+        ).filter(
+            CashFlowTransaction.workspace_id == workspace_id,
+            tx_date >= period_start,
+            tx_date < period_end if end_exclusive else tx_date <= period_end
+        ).group_by(bucket).all()
+
+        return DreBucketTotals(
+            totals={row_bucket: float(total) for row_bucket, total, _ in rows},
+            transactions_count=sum(int(count) for _, _, count in rows)
+        )
+
+    # ============================================
+    # MAPEAMENTO POR WORKSPACE
+    # ============================================
+
+    @classmethod
+    def for_workspace(cls, db: Session, workspace_id: int) -> "DreClassifier":
+        """Classificador do workspace (mapeamento próprio ou padrão)"""
+        return compile_mapping(load_workspace_mapping(db, workspace_id))
+
+
+def load_workspace_mapping(db: Session, workspace_id: int) -> Dict[str, List[str]]:
+    """Mapeamento cadastrado do workspace, ou o padrão se não houver"""
+    rows = db.query(DreCategoryMapping.bucket, DreCategoryMapping.keyword).filter(
+        DreCategoryMapping.workspace_id == workspace_id
+    ).all()
+
+    if not rows:
+        return DEFAULT_DRE_MAPPING
+
+    mapping: Dict[str, List[str]] = {bucket: [] for bucket in MAPPABLE_BUCKETS}
+    for bucket, keyword in rows:
+        if bucket in mapping:
+            mapping[bucket].append(keyword)
+    return mapping
+
+
+def compile_mapping(mapping: Dict[str, Sequence[str]]) -> DreClassifier:
+    """Classificador compilado (reutilizado para mapeamentos iguais)"""
+    frozen = tuple(
+        (bucket, tuple(sorted(mapping.get(bucket, []))))
+        for bucket in MAPPABLE_BUCKETS
+    )
+    return _compile_frozen(frozen)
+
+
+@lru_cache(maxsize=256)
+def _compile_frozen(frozen: Tuple[Tuple[str, Tuple[str, ...]], ...]) -> DreClassifier:
+    return DreClassifier(dict(frozen))
@@ -0,0 +1,334 @@
+"""
+Cache persistente de extração de faturas endereçado pelo conteúdo
+
+Reenvios do mesmo arquivo (encaminhamentos de e-mail, novas tentativas após
+timeout) são servidos a partir do resultado já extraído, sem repetir OCR,
+LayoutLM e chamadas ao LLM. A chave é o hash do conteúdo
+(FileUtils.get_file_hash) + a versão do pipeline, derivada do modelo LayoutLM
+e dos modelos de IA configurados: qualquer mudança de modelo invalida o cache
+naturalmente. As entradas são isoladas por workspace.
+
+Backends (settings.EXTRACTION_CACHE_BACKEND):
+- "db": tabela invoice_extraction_cache (compartilhada entre instâncias)
+- "disk": um arquivo JSON por entrada em EXTRACTION_CACHE_DIR
+- "off": desativado
+
+Nos dois backends o tamanho total é limitado a EXTRACTION_CACHE_MAX_MB,
+removendo as entradas usadas há mais tempo. Falhas do cache são registradas
+e tratadas como miss, nunca propagadas para o upload.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.invoice_extraction import InvoiceExtractionCache
+
+logger = logging.getLogger(__name__)
+
+# Incrementar quando a lógica de extração/limpeza mudar o resultado
+EXTRACTION_PIPELINE_VERSION = "5"
+
+# Ao exceder o limite, remove entradas até esta fração do máximo
+EVICTION_TARGET_RATIO = 0.9
+
+
+class CachedExtraction(NamedTuple):
+    """Resultado encontrado no cache"""
+    result: Dict[str, Any]
+    cached_at: datetime
+    hit_count: int
+
+
+def pipeline_version(ai_service=None) -> str:
+    """
+    Versão do pipeline de extração (hash curto da configuração que afeta o
+    resultado)
+    """
+    components = {
+        "pipeline": EXTRACTION_PIPELINE_VERSION,
+        "layout_lm_model": settings.LAYOUTLM_MODEL_NAME,
+        "layout_lm_int8": settings.LAYOUTLM_QUANTIZE_INT8,
+        "use_layout_lm": os.getenv("USE_LAYOUT_LM", "true").lower() == "true",
+        "pdf_text_layer": settings.PDF_TEXT_LAYER_ENABLED,
+        "ocr_preprocess": settings.OCR_PREPROCESS_ENABLED,
+        "ocr_adaptive_dpi": settings.OCR_ADAPTIVE_DPI_ENABLED,
+        "ocr_low_dpi": settings.OCR_LOW_DPI,
+        "ocr_refine_min_confidence": settings.OCR_REFINE_MIN_CONFIDENCE,
+        "ai_model": getattr(ai_service, "model", None),
+        "ai_vision_model": getattr(ai_service, "vision_model", None),
+        # Sem chave de API a IA devolve respostas simuladas, que não podem
+        # ser servidas depois que a chave for configurada
+        "ai_enabled": bool(getattr(ai_service, "api_key", "")),
+    }
+    encoded = json.dumps(components, sort_keys=True)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def is_cacheable(result: Dict[str, Any]) -> bool:
+    """Somente extrações concluídas são guardadas"""
+    return bool(result) and result.get("success", True) is not False and not result.get("error")
+
+
+class DatabaseExtractionCacheBackend:
+    """Entradas na tabela invoice_extraction_cache"""
+
+    name = "db"
+
+    def __init__(self, db: Session, max_bytes: int):
+        self.db = db
+        self.max_bytes = max_bytes
+
+    def get(self, workspace_id: int, content_hash: str, version: str) -> Optional[CachedExtraction]:
+        entry = self.db.query(InvoiceExtractionCache).filter(
+            InvoiceExtractionCache.workspace_id == workspace_id,
+            InvoiceExtractionCache.content_hash == content_hash,
+            InvoiceExtractionCache.pipeline_version == version
+        ).first()
+        if entry is None:
+            return None
+
+        entry.hit_count += 1
+        entry.last_used_at = datetime.utcnow()
+        self.db.commit()
+
+        return CachedExtraction(json.loads(entry.result), entry.created_at, entry.hit_count)
+
+    def set(self, workspace_id: int, content_hash: str, version: str, payload: str) -> None:
+        now = datetime.utcnow()
+        self.db.add(InvoiceExtractionCache(
+            workspace_id=workspace_id,
+            content_hash=content_hash,
+            pipeline_version=version,
+            result=payload,
+            size_bytes=len(payload.encode("utf-8")),
+            hit_count=0,
+            created_at=now,
+            last_used_at=now
+        ))
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # Upload concorrente do mesmo arquivo já gravou a entrada
+            self.db.rollback()
+            return
+
+        self.evict()
+
+    def evict(self) -> int:
+        """Remove as entradas menos usadas recentemente até caber no limite"""
+        total = self.db.query(func.coalesce(func.sum(InvoiceExtractionCache.size_bytes), 0)).scalar()
+        if total <= self.max_bytes:
+            return 0
+
+        target = self.max_bytes * EVICTION_TARGET_RATIO
+        evicted_ids: List[int] = []
+        rows = self.db.query(InvoiceExtractionCache.id, InvoiceExtractionCache.size_bytes).order_by(
+            InvoiceExtractionCache.last_used_at, InvoiceExtractionCache.id
+        ).yield_per(500)
+        for entry_id, size_bytes in rows:
+            if total <= target:
+                break
+            evicted_ids.append(entry_id)
+            total -= size_bytes
+
+        self.db.query(InvoiceExtractionCache).filter(
+            InvoiceExtractionCache.id.in_(evicted_ids)
+        ).delete(synchronize_session=False)
+        self.db.commit()
+
+        logger.info(f"Cache de extração: {len(evicted_ids)} entrada(s) removida(s) por tamanho")
+        return len(evicted_ids)
+
+
+class DiskExtractionCacheBackend:
+    """
+    Um arquivo JSON por entrada (<raiz>/<workspace>/<hash>-<versão>.json)
+
+    O mtime do arquivo marca o último uso; o total em disco é acompanhado em
+    memória e recalculado percorrendo o diretório apenas quando excede o
+    limite.
+    """
+
+    name = "disk"
+
+    _lock = threading.Lock()
+    _known_bytes: Dict[str, int] = {}
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def get(self, workspace_id: int, content_hash: str, version: str) -> Optional[CachedExtraction]:
+        path = self._path(workspace_id, content_hash, version)
+        try:
+            with open(path, "r", encoding="utf-8") as cache_file:
+                entry = json.load(cache_file)
+        except FileNotFoundError:
+            return None
+
+        entry["hit_count"] = entry.get("hit_count", 0) + 1
+        self._write(path, entry)
+
+        return CachedExtraction(entry["result"], datetime.fromisoformat(entry["cached_at"]), entry["hit_count"])
+
+    def set(self, workspace_id: int, content_hash: str, version: str, payload: str) -> None:
+        path = self._path(workspace_id, content_hash, version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = self._write(path, {
+            "result": json.loads(payload),
+            "cached_at": datetime.utcnow().isoformat(),
+            "hit_count": 0
+        })
+
+        with self._lock:
+            if self.root not in self._known_bytes:
+                self._known_bytes[self.root] = self._disk_usage()
+            else:
+                self._known_bytes[self.root] += size
+            exceeded = self._known_bytes[self.root] > self.max_bytes
+
+        if exceeded:
+            self.evict()
+
+    def evict(self) -> int:
+        """Remove os arquivos com uso mais antigo até caber no limite"""
+        with self._lock:
+            files = []
+            for directory, _, names in os.walk(self.root):
+                for name in names:
+                    if name.endswith(".json"):
+                        path = os.path.join(directory, name)
+                        try:
+                            stat = os.stat(path)
+                        except FileNotFoundError:
+                            continue
+                        files.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in files)
+            target = self.max_bytes * EVICTION_TARGET_RATIO
+            evicted = 0
+            if total > self.max_bytes:
+                for _, size, path in sorted(files):
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+                    evicted += 1
+
+            self._known_bytes[self.root] = total
+
+        if evicted:
+            logger.info(f"Cache de extração em disco: {evicted} arquivo(s) removido(s) por tamanho")
+        return evicted
+
+    def _path(self, workspace_id: int, content_hash: str, version: str) -> str:
+        return os.path.join(self.root, str(int(workspace_id)), f"{content_hash}-{version}.json")
+
+    def _disk_usage(self) -> int:
+        total = 0
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith(".json"):
+                    try:
+                        total += os.path.getsize(os.path.join(directory, name))
+                    except FileNotFoundError:
+                        pass
+        return total
+
+    @staticmethod
+    def _write(path: str, entry: Dict[str, Any]) -> int:
+        """Grava de forma atômica (arquivo temporário + rename)"""
+        data = json.dumps(entry, ensure_ascii=False, default=str).encode("utf-8")
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return len(data)
+
+
+class ExtractionCache:
+    """
+    Cache de resultados de extração para uma requisição
+
+    Args:
+        db: Sessão do banco (backend "db")
+        ai_service: AIService usado na extração (entra na versão do pipeline)
+        backend_name: "db", "disk" ou "off" (padrão: EXTRACTION_CACHE_BACKEND)
+    """
+
+    def __init__(self, db: Session, ai_service=None, backend_name: Optional[str] = None):
+        backend_name = backend_name or settings.EXTRACTION_CACHE_BACKEND
+        max_bytes = settings.EXTRACTION_CACHE_MAX_MB * 1024 * 1024
+
+        if backend_name == "db":
+            self.backend = DatabaseExtractionCacheBackend(db, max_bytes)
+        elif backend_name == "disk":
+            self.backend = DiskExtractionCacheBackend(settings.EXTRACTION_CACHE_DIR, max_bytes)
+        else:
+            self.backend = None
+
+        self.version = pipeline_version(ai_service)
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @property
+    def backend_name(self) -> str:
+        return self.backend.name if self.backend else "off"
+
+    def get(self, workspace_id: int, content_hash: str) -> Optional[CachedExtraction]:
+        """Resultado guardado para o arquivo ou None"""
+        if not self.backend or not content_hash:
+            return None
+
+        try:
+            cached = self.backend.get(workspace_id, content_hash, self.version)
+        except Exception as e:
+            logger.warning(f"Erro ao ler cache de extração ({self.backend_name}): {e}")
+            self._rollback()
+            return None
+
+        if cached:
+            logger.info(f"Cache de extração: hit para {content_hash} (workspace {workspace_id})")
+        return cached
+
+    def set(self, workspace_id: int, content_hash: str, result: Dict[str, Any]) -> bool:
+        """Guarda o resultado se a extração foi concluída"""
+        if not self.backend or not content_hash or not is_cacheable(result):
+            return False
+
+        try:
+            payload = json.dumps(result, ensure_ascii=False, default=str)
+            self.backend.set(workspace_id, content_hash, self.version, payload)
+            return True
+        except Exception as e:
+            logger.warning(f"Erro ao gravar cache de extração ({self.backend_name}): {e}")
+            self._rollback()
+            return False
+
+    def _rollback(self) -> None:
+        if isinstance(self.backend, DatabaseExtractionCacheBackend):
+            try:
+                self.backend.db.rollback()
+            except Exception:
+                pass
@@ -0,0 +1,460 @@
+"""
+Cubo mensal pré-agregado de Fluxo de Caixa (monthly_financial_facts)
+
+Mantém uma linha por workspace/mês/tipo/categoria/conta com a soma e a
+quantidade de movimentações, já classificada na linha do DRE. DRE, gráficos
+mensais e comparações ano contra ano leem algumas centenas de linhas do cubo
+em vez de varrer todo o histórico de cash_flow_transactions.
+
+Os meses cobertos inteiramente pelo período vêm do cubo; as pontas parciais
+(início no meio de um mês, fim antes do mês acabar) são somadas direto das
+transações, de forma que o resultado é idêntico ao cálculo ao vivo.
+
+Atualização:
+- Incremental a cada movimentação (mesmos pontos do ledger diário)
+- Job periódico que recalcula os meses recentes (refresh)
+- Reconstrução completa (rebuild) e reclassificação ao mudar o mapeamento
+"""
+
+import logging
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from datetime import datetime, date
+from sqlalchemy.orm import Session
+from sqlalchemy import func, extract, tuple_
+
+from app.core.database import upsert_insert
+from app.models.cash_flow import CashFlowTransaction, TransactionType
+from app.models.financial_reporting import MonthlyFinancialFact
+from app.services.dre_classifier import DreClassifier, DreBucketTotals
+
+logger = logging.getLogger(__name__)
+
+# Conta usada no cubo para transações sem conta bancária vinculada
+NO_ACCOUNT_ID = 0
+
+
+class MonthlyMovement(NamedTuple):
+    """Entradas e saídas consolidadas de um mês"""
+    month: date
+    entries: float
+    exits: float
+
+    @property
+    def net_flow(self) -> float:
+        return self.entries - self.exits
+
+
+class PeriodSplit(NamedTuple):
+    """
+    Divisão de um período em meses completos e pontas parciais
+
+    Os meses completos são [full_start, full_end); quando não há nenhum,
+    ambos ficam None e o período inteiro é calculado ao vivo.
+    """
+    full_start: Optional[date]
+    full_end: Optional[date]
+
+
+def month_start(value) -> date:
+    """Primeiro dia do mês de uma data/datetime"""
+    return date(value.year, value.month, 1)
+
+
+def next_month(month: date) -> date:
+    """Primeiro dia do mês seguinte"""
+    if month.month == 12:
+        return date(month.year + 1, 1, 1)
+    return date(month.year, month.month + 1, 1)
+
+
+def split_period(period_start: date, period_end: date) -> PeriodSplit:
+    """
+    Meses inteiramente cobertos por [period_start, period_end]
+
+    Como transaction_date é DateTime e o fim é comparado com <= period_end
+    (meia-noite), um mês só é completo se o primeiro dia do mês seguinte
+    for <= period_end.
+    """
+    full_start = period_start if period_start.day == 1 else next_month(month_start(period_start))
+    full_end = month_start(period_end)
+
+    if full_start >= full_end:
+        return PeriodSplit(None, None)
+    return PeriodSplit(full_start, full_end)
+
+
+class MonthlyFinancialFacts:
+    """
+    Manutenção e consulta do cubo mensal
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._classifiers: Dict[int, DreClassifier] = {}
+
+    def classifier(self, workspace_id: int) -> DreClassifier:
+        """Classificador do workspace (carregado uma vez por instância)"""
+        if workspace_id not in self._classifiers:
+            self._classifiers[workspace_id] = DreClassifier.for_workspace(self.db, workspace_id)
+        return self._classifiers[workspace_id]
+
+    # ============================================
+    # MANUTENÇÃO INCREMENTAL
+    # ============================================
+
+    def record_transaction(self, transaction: CashFlowTransaction) -> None:
+        """Soma uma transação ao cubo (não faz commit)"""
+        self.apply_movement(
+            transaction.workspace_id,
+            transaction.account_id,
+            transaction.transaction_date,
+            transaction.type,
+            transaction.category,
+            transaction.value,
+            1
+        )
+
+    def revert_movement(
+        self,
+        workspace_id: int,
+        account_id: Optional[int],
+        transaction_date: datetime,
+        transaction_type: str,
+        category: str,
+        value: float
+    ) -> None:
+        """Desfaz uma movimentação já registrada (não faz commit)"""
+        self.apply_movement(workspace_id, account_id, transaction_date, transaction_type, category, -value, -1)
+
+    def apply_movement(
+        self,
+        workspace_id: int,
+        account_id: Optional[int],
+        transaction_date: datetime,
+        transaction_type: str,
+        category: str,
+        value: float,
+        count: int
+    ) -> None:
+        """
+        Soma `value`/`count` (negativos para reverter) à linha do mês; linhas
+        que ficam sem movimentações são removidas.
+
+        Somas usam um único upsert (ON CONFLICT) e reversões um único UPDATE,
+        seguidos de um DELETE condicional, de forma que movimentações
+        simultâneas na mesma linha não se perdem nem colidem na constraint
+        uq_monthly_fact_workspace_month_type_category_account.
+        """
+        transaction_type = getattr(transaction_type, 'value', transaction_type)
+        category = category or ''
+        account_key = account_id or NO_ACCOUNT_ID
+        month = month_start(transaction_date)
+
+        row_filter = (
+            MonthlyFinancialFact.workspace_id == workspace_id,
+            MonthlyFinancialFact.month == month,
+            MonthlyFinancialFact.type == transaction_type,
+            MonthlyFinancialFact.category == category,
+            MonthlyFinancialFact.account_id == account_key
+        )
+
+        if count > 0:
+            upsert = upsert_insert(self.db, MonthlyFinancialFact.__table__).values(
+                workspace_id=workspace_id,
+                month=month,
+                type=transaction_type,
+                category=category,
+                account_id=account_key,
+                bucket=self.classifier(workspace_id).classify(transaction_type, category),
+                total_value=value,
+                transaction_count=count,
+                updated_at=datetime.utcnow()
+            )
+            self.db.execute(upsert.on_conflict_do_update(
+                index_elements=['workspace_id', 'month', 'type', 'category', 'account_id'],
+                set_={
+                    'total_value': MonthlyFinancialFact.total_value + upsert.excluded.total_value,
+                    'transaction_count': MonthlyFinancialFact.transaction_count + upsert.excluded.transaction_count,
+                    'updated_at': upsert.excluded.updated_at
+                }
+            ))
+            return
+
+        updated = self.db.query(MonthlyFinancialFact).filter(*row_filter).update(
+            {
+                MonthlyFinancialFact.total_value: MonthlyFinancialFact.total_value + value,
+                MonthlyFinancialFact.transaction_count: MonthlyFinancialFact.transaction_count + count,
+                MonthlyFinancialFact.updated_at: datetime.utcnow()
+            },
+            synchronize_session=False
+        )
+
+        if not updated:
+            # Movimentação que nunca entrou no cubo (ex.: anterior ao backfill):
+            # nada a desfazer; o rebuild/refresh reconcilia a linha
+            logger.warning(
+                f"Cubo mensal sem linha para reverter: workspace {workspace_id}, "
+                f"{month.isoformat()}, {transaction_type}, '{category}', conta {account_key}"
+            )
+            return
+
+        self.db.query(MonthlyFinancialFact).filter(
+            *row_filter,
+            MonthlyFinancialFact.transaction_count <= 0
+        ).delete(synchronize_session=False)
+
+    # ============================================
+    # RECÁLCULO, RECONSTRUÇÃO E RECLASSIFICAÇÃO
+    # ============================================
+
+    def refresh(self, workspace_id: Optional[int] = None, since: Optional[date] = None) -> Dict[str, int]:
+        """
+        Recalcula o cubo a partir das transações (não faz commit)
+
+        Args:
+            workspace_id: Workspace a recalcular; None = todos
+            since: Recalcula apenas os meses a partir deste; None = tudo (rebuild)
+
+        Returns:
+            Dict com quantidade de linhas removidas e inseridas
+        """
+        delete_query = self.db.query(MonthlyFinancialFact)
+        if workspace_id is not None:
+            delete_query = delete_query.filter(MonthlyFinancialFact.workspace_id == workspace_id)
+        if since is not None:
+            since = month_start(since)
+            delete_query = delete_query.filter(MonthlyFinancialFact.month >= since)
+        deleted = delete_query.delete(synchronize_session=False)
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                'workspace_id': ws_id,
+                'month': month,
+                'type': transaction_type,
+                'category': category,
+                'account_id': account_key,
+                'bucket': self.classifier(ws_id).classify(transaction_type, category),
+                'total_value': total,
+                'transaction_count': count,
+                'updated_at': now
+            }
+            for ws_id, month, transaction_type, category, account_key, total, count
+            in self._aggregate_transactions(workspace_id, since)
+        ]
+
+        if rows:
+            self.db.bulk_insert_mappings(MonthlyFinancialFact, rows)
+        self.db.flush()
+
+        logger.info(
+            f"Cubo mensal recalculado (desde {since or 'o início'}): "
+            f"{deleted} linhas removidas, {len(rows)} inseridas"
+        )
+
+        return {'deleted': deleted, 'inserted': len(rows)}
+
+    def rebuild(self, workspace_id: Optional[int] = None) -> Dict[str, int]:
+        """Reconstrói o cubo do zero (não faz commit)"""
+        return self.refresh(workspace_id, since=None)
+
+    def reclassify(self, workspace_id: int) -> int:
+        """
+        Regrava a linha do DRE das categorias do workspace após mudança de
+        mapeamento (não faz commit)
+
+        Returns:
+            Quantidade de linhas do cubo alteradas
+        """
+        # O mapeamento recém-alterado pode estar pendente na sessão
+        self.db.flush()
+        self._classifiers.pop(workspace_id, None)
+        classifier = self.classifier(workspace_id)
+
+        pairs = self.db.query(
+            MonthlyFinancialFact.type,
+            MonthlyFinancialFact.category,
+            MonthlyFinancialFact.bucket
+        ).filter(
+            MonthlyFinancialFact.workspace_id == workspace_id
+        ).distinct().all()
+
+        changes: Dict[str, List[Tuple[str, str]]] = {}
+        for transaction_type, category, bucket in pairs:
+            new_bucket = classifier.classify(transaction_type, category)
+            if new_bucket != bucket:
+                changes.setdefault(new_bucket, []).append((transaction_type, category))
+
+        updated = 0
+        for new_bucket, keys in changes.items():
+            updated += self.db.query(MonthlyFinancialFact).filter(
+                MonthlyFinancialFact.workspace_id == workspace_id,
+                tuple_(MonthlyFinancialFact.type, MonthlyFinancialFact.category).in_(keys)
+            ).update({MonthlyFinancialFact.bucket: new_bucket}, synchronize_session=False)
+
+        logger.info(f"Cubo mensal reclassificado para workspace {workspace_id}: {updated} linhas")
+
+        return updated
+
+    def _aggregate_transactions(
+        self,
+        workspace_id: Optional[int] = None,
+        since: Optional[date] = None
+    ) -> List[tuple]:
+        """Soma/contagem por workspace/mês/tipo/categoria/conta das transações brutas"""
+        year = extract('year', CashFlowTransaction.transaction_date)
+        month = extract('month', CashFlowTransaction.transaction_date)
+        category = func.coalesce(CashFlowTransaction.category, '')
+        account_key = func.coalesce(CashFlowTransaction.account_id, NO_ACCOUNT_ID)
+
+        query = self.db.query(
+            CashFlowTransaction.workspace_id,
+            year,
+            month,
+            CashFlowTransaction.type,
+            category,
+            account_key,
+            func.coalesce(func.sum(CashFlowTransaction.value), 0.0),
+            func.count(CashFlowTransaction.id)
+        )
+        if workspace_id is not None:
+            query = query.filter(CashFlowTransaction.workspace_id == workspace_id)
+        if since is not None:
+            query = query.filter(CashFlowTransaction.transaction_date >= since)
+
+        query = query.group_by(
+            CashFlowTransaction.workspace_id, year, month, CashFlowTransaction.type, category, account_key
+        )
+
+        return [
+            (
+                ws_id,
+                date(int(row_year), int(row_month), 1),
+                getattr(transaction_type, 'value', transaction_type),
+                row_category,
+                int(account),
+                float(total),
+                int(count)
+            )
+            for ws_id, row_year, row_month, transaction_type, row_category, account, total, count in query.all()
+        ]
+
+    # ============================================
+    # CONSULTAS
+    # ============================================
+
+    def bucket_totals(
+        self,
+        workspace_id: int,
+        period_start: date,
+        period_end: date,
+        classifier: Optional[DreClassifier] = None
+    ) -> DreBucketTotals:
+        """
+        Soma por linha do DRE: meses completos do cubo + pontas ao vivo
+
+        Mesmo resultado de DreClassifier.bucket_totals sobre o período.
+        """
+        classifier = classifier or self.classifier(workspace_id)
+        split = split_period(period_start, period_end)
+
+        if split.full_start is None:
+            return classifier.bucket_totals(self.db, workspace_id, period_start, period_end)
+
+        rows = self.db.query(
+            MonthlyFinancialFact.bucket,
+            func.coalesce(func.sum(MonthlyFinancialFact.total_value), 0.0),
+            func.coalesce(func.sum(MonthlyFinancialFact.transaction_count), 0)
+        ).filter(
+            MonthlyFinancialFact.workspace_id == workspace_id,
+            MonthlyFinancialFact.month >= split.full_start,
+            MonthlyFinancialFact.month < split.full_end
+        ).group_by(MonthlyFinancialFact.bucket).all()
+
+        totals: Dict[str, float] = {bucket: float(total) for bucket, total, _ in rows}
+        transactions_count = sum(int(count) for _, _, count in rows)
+
+        edges = [classifier.bucket_totals(self.db, workspace_id, split.full_end, period_end)]
+        if period_start < split.full_start:
+            edges.append(classifier.bucket_totals(
+                self.db, workspace_id, period_start, split.full_start, end_exclusive=True
+            ))
+
+        for edge in edges:
+            for bucket, total in edge.totals.items():
+                totals[bucket] = totals.get(bucket, 0.0) + total
+            transactions_count += edge.transactions_count
+
+        return DreBucketTotals(totals=totals, transactions_count=transactions_count)
+
+    def monthly_totals(
+        self,
+        workspace_id: int,
+        period_start: date,
+        period_end: date
+    ) -> Dict[date, MonthlyMovement]:
+        """
+        Entradas/saídas por mês (chave = primeiro dia do mês) no período:
+        meses completos do cubo + pontas ao vivo
+        """
+        split = split_period(period_start, period_end)
+        sums: Dict[date, List[float]] = {}
+
+        def add(month: date, transaction_type, total) -> None:
+            transaction_type = getattr(transaction_type, 'value', transaction_type)
+            entry = sums.setdefault(month, [0.0, 0.0])
+            entry[0 if transaction_type == TransactionType.ENTRADA.value else 1] += float(total or 0.0)
+
+        if split.full_start is None:
+            live_ranges = [(period_start, period_end, False)]
+        else:
+            live_ranges = [(split.full_end, period_end, False)]
+            if period_start < split.full_start:
+                live_ranges.append((period_start, split.full_start, True))
+
+            facts = self.db.query(
+                MonthlyFinancialFact.month,
+                MonthlyFinancialFact.type,
+                func.sum(MonthlyFinancialFact.total_value)
+            ).filter(
+                MonthlyFinancialFact.workspace_id == workspace_id,
+                MonthlyFinancialFact.month >= split.full_start,
+                MonthlyFinancialFact.month < split.full_end
+            ).group_by(MonthlyFinancialFact.month, MonthlyFinancialFact.type).all()
+
+            for month, transaction_type, total in facts:
+                add(month, transaction_type, total)
+
+        for range_start, range_end, end_exclusive in live_ranges:
+            for year, month, transaction_type, total in self._live_monthly(
+                workspace_id, range_start, range_end, end_exclusive
+            ):
+                add(date(int(year), int(month), 1), transaction_type, total)
+
+        return {
+            month: MonthlyMovement(month, entries, exits)
+            for month, (entries, exits) in sorted(sums.items())
+        }
+
+    def _live_monthly(
+        self,
+        workspace_id: int,
+        range_start: date,
+        range_end: date,
+        end_exclusive: bool
+    ) -> List[tuple]:
+        """Soma por ano/mês/tipo direto das transações"""
+        year = extract('year', CashFlowTransaction.transaction_date)
+        month = extract('month', CashFlowTransaction.transaction_date)
+        tx_date = CashFlowTransaction.transaction_date
+
+        return self.db.query(
+            year,
+            month,
+            CashFlowTransaction.type,
+            func.sum(CashFlowTransaction.value)
+        ).filter(
+            CashFlowTransaction.workspace_id == workspace_id,
+            tx_date >= range_start,
+            tx_date < range_end if end_exclusive else tx_date <= range_end
+        ).group_by(year, month, CashFlowTransaction.type).all()
@@ -0,0 +1,662 @@
+"""
+Fila de jobs de extração de faturas
+
+O upload em modo job grava o arquivo e devolve o id do job imediatamente; um
+pool de workers (threads, cada tentativa com seu próprio event loop) executa
+InvoiceProcessorService.process_invoice fora da requisição HTTP. O cliente
+acompanha o status e os resultados parciais por página via polling ou
+Server-Sent Events.
+
+- Backpressure: no máximo INVOICE_JOB_MAX_QUEUED jobs aguardando no processo e
+  INVOICE_JOB_MAX_PER_WORKSPACE jobs ativos por workspace; acima disso o
+  envio é recusado com JobQueueFull (HTTP 429 com Retry-After).
+- Lotes: os arquivos de uma ingestão em lote entram juntos como um
+  ExtractionBatch (até INVOICE_JOB_MAX_BATCHES_PER_WORKSPACE lotes ativos por
+  workspace) e só são processados quando não há uploads individuais
+  aguardando.
+- Retentativas: extrações com erro ou que excedem INVOICE_JOB_TIMEOUT_SECONDS
+  são repetidas até INVOICE_JOB_MAX_RETRIES vezes, com backoff exponencial.
+- Métricas: tempo em fila, duração de cada tentativa e de cada página por
+  job, e agregados do processo em stats().
+
+Os jobs ficam em memória no processo que recebeu o upload (o polling precisa
+chegar ao mesmo processo, como no cache em memória dos relatórios) e são
+descartados INVOICE_JOB_RESULT_TTL_SECONDS após terminar.
+"""
+
+import asyncio
+import atexit
+import enum
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Sinal de parada dos workers
+_STOP = object()
+
+# Prioridade na fila (menor sai primeiro): parada, uploads individuais, lotes
+PRIORITY_STOP = 0
+PRIORITY_SINGLE = 1
+PRIORITY_BATCH = 2
+
+# Janela de jobs concluídos usada nas médias de stats()
+METRICS_WINDOW = 200
+
+_job_queue: Optional["InvoiceExtractionJobQueue"] = None
+_job_queue_lock = threading.Lock()
+
+
+class JobStatus(str, enum.Enum):
+    """Status de um job de extração"""
+    QUEUED = "queued"  # Aguardando worker
+    PROCESSING = "processing"  # Em extração (inclui retentativas)
+    COMPLETED = "completed"  # Extração concluída
+    FAILED = "failed"  # Falhou após todas as tentativas
+
+
+class JobQueueFull(Exception):
+    """Envio recusado por limite da fila"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def extraction_failed(result: Dict[str, Any]) -> bool:
+    """Resultado de process_invoice que indica falha (elegível a retentativa)"""
+    return not result or result.get("success") is False or bool(result.get("error"))
+
+
+def default_processor_factory():
+    """InvoiceProcessorService com AIService, criado por tentativa"""
+    # Import tardio: o processador carrega as dependências de PDF/OCR/IA
+    from app.services.ai_service import AIService
+    from app.services.invoice_processor import InvoiceProcessorService
+
+    return InvoiceProcessorService(AIService())
+
+
+def store_in_extraction_cache(job: "ExtractionJob", processor, result: Dict[str, Any]) -> None:
+    """Grava a extração concluída no cache por conteúdo (ver extraction_cache)"""
+    if not job.content_hash:
+        return
+
+    from app.core.database import SessionLocal
+    from app.services.extraction_cache import ExtractionCache
+
+    db = SessionLocal()
+    try:
+        ExtractionCache(db, getattr(processor, "ai_service", None)).set(job.workspace_id, job.content_hash, result)
+    finally:
+        db.close()
+
+
+class ExtractionJob:
+    """
+    Estado de um job de extração
+
+    Alterado apenas pelo worker que o executa; leituras usam snapshot().
+    """
+
+    def __init__(
+        self,
+        workspace_id: int,
+        file_path: Optional[str],
+        original_filename: str,
+        content_hash: Optional[str] = None
+    ):
+        self.job_id = uuid.uuid4().hex
+        self.workspace_id = workspace_id
+        self.file_path = file_path
+        self.original_filename = original_filename
+        self.content_hash = content_hash
+        self.batch_id: Optional[str] = None
+
+        self.status = JobStatus.QUEUED
+        self.attempts = 0
+        self.pages: List[Dict[str, Any]] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.cache_hit = False
+
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+        # Métricas (segundos)
+        self.enqueued_monotonic = time.monotonic()
+        self.finished_monotonic: Optional[float] = None
+        self.queue_seconds: Optional[float] = None
+        self.attempt_seconds: List[float] = []
+
+        # Incrementado a cada mudança (usado pelo streaming de eventos)
+        self.revision = 0
+
+    @classmethod
+    def from_cache(
+        cls,
+        workspace_id: int,
+        original_filename: str,
+        content_hash: Optional[str],
+        result: Dict[str, Any]
+    ) -> "ExtractionJob":
+        """Job já concluído com a extração guardada no cache"""
+        job = cls(workspace_id, None, original_filename, content_hash)
+        now = datetime.utcnow()
+        job.status = JobStatus.COMPLETED
+        job.cache_hit = True
+        job.result = result
+        job.queue_seconds = 0.0
+        job.started_at = job.finished_at = now
+        job.finished_monotonic = time.monotonic()
+        job.touch()
+        return job
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+    def touch(self) -> None:
+        self.revision += 1
+
+    def timings(self) -> Dict[str, Any]:
+        processing = sum(self.attempt_seconds)
+        end = self.finished_monotonic or time.monotonic()
+        return {
+            "queue_seconds": round(self.queue_seconds, 4) if self.queue_seconds is not None else None,
+            "processing_seconds": round(processing, 4),
+            "attempt_seconds": [round(seconds, 4) for seconds in self.attempt_seconds],
+            "total_seconds": round(end - self.enqueued_monotonic, 4)
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cópia do estado atual para a resposta da API"""
+        return {
+            "job_id": self.job_id,
+            "status": self.status.value,
+            "filename": self.original_filename,
+            "content_hash": self.content_hash,
+            "batch_id": self.batch_id,
+            "attempts": self.attempts,
+            "cache_hit": self.cache_hit,
+            "pages": list(self.pages),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "timings": self.timings(),
+            "revision": self.revision
+        }
+
+
+class BatchEntry(NamedTuple):
+    """Arquivo de um lote: o job da extração ou o motivo de ter sido ignorado"""
+    filename: str
+    content_hash: Optional[str]
+    size_bytes: int
+    job: Optional[ExtractionJob] = None
+    skip_reason: Optional[str] = None
+    duplicate_of: Optional[str] = None  # Mesmo conteúdo de um arquivo anterior (mesmo job)
+
+
+class ExtractionBatch:
+    """
+    Lote de arquivos enviados juntos; arquivos repetidos compartilham o job
+
+    Alterado apenas na criação; o andamento vem dos jobs.
+    """
+
+    def __init__(self, workspace_id: int, entries: List[BatchEntry]):
+        self.batch_id = uuid.uuid4().hex
+        self.workspace_id = workspace_id
+        self.entries = entries
+        self.created_at = datetime.utcnow()
+        self.created_monotonic = time.monotonic()
+
+        self.jobs: List[ExtractionJob] = []
+        for entry in entries:
+            if entry.job is not None and entry.duplicate_of is None:
+                entry.job.batch_id = self.batch_id
+                self.jobs.append(entry.job)
+
+    @property
+    def is_finished(self) -> bool:
+        return all(job.is_finished for job in self.jobs)
+
+    @property
+    def finished_monotonic(self) -> Optional[float]:
+        """Fim do último job (None enquanto houver job ativo)"""
+        if not self.is_finished:
+            return None
+        return max((job.finished_monotonic for job in self.jobs), default=self.created_monotonic)
+
+
+class InvoiceExtractionJobQueue:
+    """
+    Fila limitada + pool de workers para extração de faturas
+
+    Args:
+        workers: Threads de extração
+        max_queued: Jobs aguardando no processo (backpressure)
+        max_per_workspace: Jobs ativos (aguardando + em extração) por workspace,
+            fora os de lotes
+        max_batches_per_workspace: Lotes ativos por workspace
+        max_retries: Retentativas após a primeira tentativa
+        retry_backoff_seconds: Espera antes da 1ª retentativa (dobra a cada uma)
+        timeout_seconds: Tempo máximo de cada tentativa
+        result_ttl_seconds: Tempo que um job terminado fica disponível
+        processor_factory: Cria o processador (expõe process_invoice)
+        on_complete: Chamado com (job, processador, resultado) após sucesso
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_queued: int = 50,
+        max_per_workspace: int = 10,
+        max_batches_per_workspace: int = 1,
+        max_retries: int = 2,
+        retry_backoff_seconds: float = 2.0,
+        timeout_seconds: float = 300.0,
+        result_ttl_seconds: float = 3600.0,
+        processor_factory: Callable[[], Any] = default_processor_factory,
+        on_complete: Optional[Callable[[ExtractionJob, Any, Dict[str, Any]], None]] = store_in_extraction_cache
+    ):
+        self.workers = max(1, workers)
+        self.max_queued = max(1, max_queued)
+        self.max_per_workspace = max(1, max_per_workspace)
+        self.max_batches_per_workspace = max(1, max_batches_per_workspace)
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff_seconds = max(0.0, retry_backoff_seconds)
+        self.timeout_seconds = timeout_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self.processor_factory = processor_factory
+        self.on_complete = on_complete
+
+        self._queue: "queue.PriorityQueue[Any]" = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._jobs: Dict[str, ExtractionJob] = {}
+        self._batches: Dict[str, ExtractionBatch] = {}
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+        # Métricas do processo
+        self._submitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+        self._retries = 0
+        self._recent: Deque[ExtractionJob] = deque(maxlen=METRICS_WINDOW)
+
+    def submit(
+        self,
+        workspace_id: int,
+        file_path: str,
+        original_filename: str,
+        content_hash: Optional[str] = None
+    ) -> ExtractionJob:
+        """
+        Enfileira a extração de um arquivo já gravado; o job passa a ser dono
+        do arquivo e o remove ao terminar
+
+        Raises:
+            JobQueueFull: Fila do processo ou do workspace no limite
+        """
+        with self._lock:
+            self._purge_expired()
+
+            # Jobs de lotes saem depois dos uploads individuais e não os bloqueiam
+            queued = sum(
+                1 for job in self._jobs.values()
+                if job.status == JobStatus.QUEUED and job.batch_id is None
+            )
+            if queued >= self.max_queued:
+                self._rejected += 1
+                raise JobQueueFull(
+                    f"Fila de extração cheia ({queued} jobs aguardando)",
+                    self._estimated_wait(queued)
+                )
+
+            active = sum(
+                1 for job in self._jobs.values()
+                if job.workspace_id == workspace_id and job.batch_id is None and not job.is_finished
+            )
+            if active >= self.max_per_workspace:
+                self._rejected += 1
+                raise JobQueueFull(
+                    f"Limite de {self.max_per_workspace} extrações simultâneas por workspace atingido",
+                    self._estimated_wait(queued)
+                )
+
+            job = ExtractionJob(workspace_id, file_path, original_filename, content_hash)
+            self._jobs[job.job_id] = job
+            self._submitted += 1
+
+        self._ensure_started()
+        self._put(PRIORITY_SINGLE, job)
+        logger.info(f"Job de extração {job.job_id} enfileirado ({original_filename}, workspace {workspace_id})")
+        return job
+
+    def submit_batch(self, batch: ExtractionBatch) -> ExtractionBatch:
+        """
+        Enfileira os jobs pendentes de um lote (os já concluídos vêm do cache);
+        como em submit, cada job passa a ser dono do seu arquivo
+
+        O lote é aceito inteiro ou recusado: seu tamanho já é limitado por
+        BULK_UPLOAD_MAX_FILES, então só é recusado com a fila do processo já
+        cheia (contando os jobs de outros lotes) ou com o workspace no limite
+        de lotes ativos.
+
+        Raises:
+            JobQueueFull: Fila do processo ou lotes do workspace no limite
+        """
+        pending = [job for job in batch.jobs if job.status == JobStatus.QUEUED]
+
+        with self._lock:
+            self._purge_expired()
+
+            queued = sum(1 for job in self._jobs.values() if job.status == JobStatus.QUEUED)
+
+            active = sum(
+                1 for other in self._batches.values()
+                if other.workspace_id == batch.workspace_id and not other.is_finished
+            )
+            if active >= self.max_batches_per_workspace:
+                self._rejected += 1
+                raise JobQueueFull(
+                    f"Limite de {self.max_batches_per_workspace} lote(s) em extração por workspace atingido",
+                    self._estimated_wait(queued)
+                )
+
+            if pending and queued >= self.max_queued:
+                self._rejected += 1
+                raise JobQueueFull(
+                    f"Fila de extração cheia ({queued} jobs aguardando)",
+                    self._estimated_wait(queued)
+                )
+
+            self._batches[batch.batch_id] = batch
+            for job in batch.jobs:
+                self._jobs[job.job_id] = job
+            self._submitted += len(batch.jobs)
+
+        if pending:
+            self._ensure_started()
+            for job in pending:
+                self._put(PRIORITY_BATCH, job)
+
+        logger.info(
+            f"Lote de extração {batch.batch_id} enfileirado ({len(batch.entries)} arquivo(s), "
+            f"{len(pending)} job(s) pendente(s), workspace {batch.workspace_id})"
+        )
+        return batch
+
+    def add_completed(
+        self,
+        workspace_id: int,
+        original_filename: str,
+        content_hash: Optional[str],
+        result: Dict[str, Any]
+    ) -> ExtractionJob:
+        """Registra um job já concluído (resultado vindo do cache de extração)"""
+        job = ExtractionJob.from_cache(workspace_id, original_filename, content_hash, result)
+
+        with self._lock:
+            self._purge_expired()
+            self._jobs[job.job_id] = job
+            self._submitted += 1
+        return job
+
+    def get(self, job_id: str, workspace_id: int) -> Optional[ExtractionJob]:
+        """Job do workspace ou None"""
+        job = self._jobs.get(job_id)
+        if job is None or job.workspace_id != workspace_id:
+            return None
+        return job
+
+    def get_batch(self, batch_id: str, workspace_id: int) -> Optional[ExtractionBatch]:
+        """Lote do workspace ou None"""
+        batch = self._batches.get(batch_id)
+        if batch is None or batch.workspace_id != workspace_id:
+            return None
+        return batch
+
+    def stats(self) -> Dict[str, Any]:
+        """Profundidade da fila, contadores e tempos médios recentes"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+            batches = list(self._batches.values())
+            recent = [job for job in self._recent if job.queue_seconds is not None]
+
+        def average(values: List[float]) -> Optional[float]:
+            return round(sum(values) / len(values), 4) if values else None
+
+        return {
+            "workers": self.workers,
+            "queued": sum(1 for job in jobs if job.status == JobStatus.QUEUED),
+            "processing": sum(1 for job in jobs if job.status == JobStatus.PROCESSING),
+            "active_batches": sum(1 for batch in batches if not batch.is_finished),
+            "submitted": self._submitted,
+            "rejected": self._rejected,
+            "completed": self._completed,
+            "failed": self._failed,
+            "retries": self._retries,
+            "avg_queue_seconds": average([job.queue_seconds for job in recent]),
+            "avg_processing_seconds": average([sum(job.attempt_seconds) for job in recent])
+        }
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Para os workers após o job em andamento; jobs na fila falham"""
+        self._stopping.set()
+        for _ in self._threads:
+            self._put(PRIORITY_STOP, _STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+        while True:
+            try:
+                _, _, job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not _STOP:
+                self._finish(job, JobStatus.FAILED, error="Servidor encerrado antes do processamento")
+
+    def _put(self, priority: int, item: Any) -> None:
+        # A sequência mantém a ordem de chegada dentro da mesma prioridade
+        self._queue.put((priority, next(self._sequence), item))
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"invoice-extraction-{index + 1}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self) -> None:
+        while True:
+            _, _, job = self._queue.get()
+            if job is _STOP:
+                return
+            try:
+                self._execute(job)
+            except Exception as e:
+                logger.error(f"Erro inesperado no job de extração {job.job_id}: {e}")
+                self._finish(job, JobStatus.FAILED, error=str(e))
+
+    def _execute(self, job: ExtractionJob) -> None:
+        job.queue_seconds = time.monotonic() - job.enqueued_monotonic
+        job.started_at = datetime.utcnow()
+        job.status = JobStatus.PROCESSING
+        job.touch()
+
+        last_error = None
+        for attempt in range(1, self.max_retries + 2):
+            if self._stopping.is_set():
+                break
+
+            if attempt > 1:
+                self._retries += 1
+                delay = self.retry_backoff_seconds * (2 ** (attempt - 2))
+                logger.info(f"Job {job.job_id}: tentativa {attempt} em {delay:.1f}s ({last_error})")
+                if self._stopping.wait(delay):
+                    break
+
+            job.attempts = attempt
+            job.pages = []
+            job.touch()
+
+            started = time.monotonic()
+            processor = None
+            try:
+                processor = self.processor_factory()
+                result = asyncio.run(self._attempt(job, processor, started))
+                last_error = result.get("error") if extraction_failed(result) else None
+            except asyncio.TimeoutError:
+                result = None
+                last_error = f"Tempo limite de {self.timeout_seconds:.0f}s excedido"
+            except Exception as e:
+                result = None
+                last_error = str(e)
+            finally:
+                job.attempt_seconds.append(time.monotonic() - started)
+
+            if result is not None and last_error is None:
+                if self.on_complete:
+                    try:
+                        self.on_complete(job, processor, result)
+                    except Exception as e:
+                        logger.warning(f"Job {job.job_id}: falha no pós-processamento: {e}")
+                self._finish(job, JobStatus.COMPLETED, result=result)
+                return
+
+        self._finish(job, JobStatus.FAILED, error=last_error or "Extração interrompida")
+
+    async def _attempt(self, job: ExtractionJob, processor, started: float) -> Dict[str, Any]:
+        previous = [started]
+
+        def on_page(page_number: int, page_result: Dict[str, Any]) -> None:
+            now = time.monotonic()
+            job.pages.append({
+                "page_number": page_number,
+                "success": not page_result.get("error"),
+                "confidence_score": float(page_result.get("confidence_score", 0.0)),
+                "extracted_fields": page_result.get("extracted_fields", {}),
+                "error": page_result.get("error"),
+                "page_seconds": round(now - previous[0], 4),
+                "elapsed_seconds": round(now - started, 4)
+            })
+            previous[0] = now
+            job.touch()
+
+        return await asyncio.wait_for(
+            processor.process_invoice(job.file_path, job.original_filename, on_page=on_page),
+            timeout=self.timeout_seconds
+        )
+
+    def _finish(
+        self,
+        job: ExtractionJob,
+        status: JobStatus,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> None:
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        job.finished_monotonic = time.monotonic()
+        job.touch()
+
+        if job.file_path:
+            try:
+                os.unlink(job.file_path)
+            except FileNotFoundError:
+                pass
+
+        with self._lock:
+            if status == JobStatus.COMPLETED:
+                self._completed += 1
+            else:
+                self._failed += 1
+            self._recent.append(job)
+
+        timings = job.timings()
+        logger.info(
+            f"Job de extração {job.job_id} {status.value} em {timings['total_seconds']:.2f}s "
+            f"(fila {timings['queue_seconds'] or 0:.2f}s, {job.attempts} tentativa(s))"
+        )
+
+    def _purge_expired(self) -> None:
+        """Remove jobs terminados há mais de result_ttl_seconds (com o lock)"""
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_monotonic is not None and now - job.finished_monotonic > self.result_ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+        expired_batches = [
+            batch_id for batch_id, batch in self._batches.items()
+            if batch.finished_monotonic is not None and now - batch.finished_monotonic > self.result_ttl_seconds
+        ]
+        for batch_id in expired_batches:
+            del self._batches[batch_id]
+
+    def _estimated_wait(self, queued: int) -> int:
+        """Segundos sugeridos no Retry-After"""
+        recent = [sum(job.attempt_seconds) for job in self._recent if job.attempt_seconds]
+        average = sum(recent) / len(recent) if recent else 10.0
+        return max(1, int(average * (queued + 1) / self.workers))
+
+
+def get_invoice_job_queue() -> InvoiceExtractionJobQueue:
+    """Fila de jobs compartilhada pelo processo (criada sob demanda)"""
+    global _job_queue
+
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = InvoiceExtractionJobQueue(
+                workers=settings.INVOICE_JOB_WORKERS,
+                max_queued=settings.INVOICE_JOB_MAX_QUEUED,
+                max_per_workspace=settings.INVOICE_JOB_MAX_PER_WORKSPACE,
+                max_batches_per_workspace=settings.INVOICE_JOB_MAX_BATCHES_PER_WORKSPACE,
+                max_retries=settings.INVOICE_JOB_MAX_RETRIES,
+                retry_backoff_seconds=settings.INVOICE_JOB_RETRY_BACKOFF_SECONDS,
+                timeout_seconds=settings.INVOICE_JOB_TIMEOUT_SECONDS,
+                result_ttl_seconds=settings.INVOICE_JOB_RESULT_TTL_SECONDS
+            )
+        return _job_queue
+
+
+def shutdown_invoice_job_queue() -> None:
+    """Encerra os workers da fila compartilhada"""
+    global _job_queue
+
+    with _job_queue_lock:
+        job_queue, _job_queue = _job_queue, None
+
+    if job_queue is not None:
+        job_queue.shutdown(timeout=5)
+
+
+atexit.register(shutdown_invoice_job_queue)
@@ -1,11 +1,13 @@
 import os
 import json
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional
 from datetime import datetime
 from pathlib import Path
 
 from app.services.ai_service import AIService
+from app.services.document_ocr import DocumentOcr
 from app.services.layout_lm_service import LayoutLMService
+from app.services.pdf_page_pipeline import is_usable_text_layer
 from app.utils.file_utils import FileUtils
 from app.core.config import settings
 
@@ -20,13 +22,20 @@ class InvoiceProcessorService:
         self.file_utils = FileUtils()
         self.use_layout_lm = os.getenv("USE_LAYOUT_LM", "true").lower() == "true"
 
-    async def process_invoice(self, file_path: str, original_filename: str) -> Dict[str, Any]:
+    async def process_invoice(
+        self,
+        file_path: str,
+        original_filename: str,
+        on_page: Optional[Callable[[int, Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
         """
         Processa uma fatura usando IA para extrair dados
 
         Args:
             file_path: Caminho para o arquivo da fatura
             original_filename: Nome original do arquivo
+            on_page: Chamado com (número da página, resultado do LayoutLM) a
+                cada página de PDF processada
 
         Returns:
             Dict com os dados extraídos da fatura
@@ -41,7 +50,7 @@ class InvoiceProcessorService:
             file_extension = Path(file_path).suffix.lower()
 
             if file_extension == '.pdf':
-                return await self._process_pdf_invoice(file_path, original_filename)
+                return await self._process_pdf_invoice(file_path, original_filename, on_page)
             elif file_extension in ['.jpg', '.jpeg', '.png']:
                 return await self._process_image_invoice(file_path, original_filename)
             else:
@@ -55,13 +64,18 @@ class InvoiceProcessorService:
                 "ai_suggestions": [f"Erro no processamento: {str(e)}"]
             }
 
-    async def _process_pdf_invoice(self, file_path: str, original_filename: str) -> Dict[str, Any]:
+    async def _process_pdf_invoice(
+        self,
+        file_path: str,
+        original_filename: str,
+        on_page: Optional[Callable[[int, Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
         """Processa fatura em PDF"""
 
         # Tenta primeiro com LayoutLM se disponível
         if self.use_layout_lm:
             try:
-                layout_result = await self.layout_lm_service.process_pdf_document(file_path)
+                layout_result = await self.layout_lm_service.process_pdf_document(file_path, on_page=on_page)
 
                 if layout_result.get("success") and layout_result.get("confidence_score", 0) > 0.3:
                     return self._format_layout_lm_result(layout_result, original_filename, "pdf")
@@ -71,8 +85,8 @@ class InvoiceProcessorService:
         # Fallback para método tradicional
         pdf_text = self.file_utils.extract_pdf_text(file_path)
 
-        if not pdf_text:
-            # Tenta OCR se não conseguiu extrair texto
+        if not is_usable_text_layer(pdf_text.split()):
+            # PDF escaneado (ou camada de texto ilegível): recorre ao OCR
             pdf_text = await self.ai_service.ocr_pdf(file_path)
 
         # Processa com IA
@@ -81,10 +95,13 @@ class InvoiceProcessorService:
     async def _process_image_invoice(self, file_path: str, original_filename: str) -> Dict[str, Any]:
         """Processa fatura em imagem"""
 
+        # OCR da imagem feito uma única vez, compartilhado pelos três métodos
+        document_ocr = DocumentOcr()
+
         # Método 1: GPT-4o Vision (melhor precisão, não precisa OCR)
         try:
             print("Tentando processar com GPT-4o Vision...")
-            vision_response = await self.ai_service.extract_invoice_from_image(file_path)
+            vision_response = await self.ai_service.extract_invoice_from_image(file_path, document_ocr)
 
             # Parse da resposta
             extracted_data = self._parse_ai_response(vision_response)
@@ -106,7 +123,7 @@ class InvoiceProcessorService:
         # Método 2: LayoutLM se disponível
         if self.use_layout_lm:
             try:
-                layout_result = await self.layout_lm_service.process_image_document(file_path)
+                layout_result = await self.layout_lm_service.process_image_document(file_path, document_ocr)
 
                 if layout_result.get("success") and layout_result.get("confidence_score", 0) > 0.3:
                     return self._format_layout_lm_result(layout_result, original_filename, "image")
@@ -115,7 +132,7 @@ class InvoiceProcessorService:
 
         # Método 3: Fallback - OCR tradicional + GPT
         print("Usando OCR tradicional como fallback...")
-        image_text = await self.ai_service.ocr_image(file_path)
+        image_text = await self.ai_service.ocr_image(file_path, document_ocr)
 
         # Processa com IA
         return await self._extract_invoice_data(image_text, original_filename, "image")
@@ -305,6 +322,10 @@ class InvoiceProcessorService:
             "processing_method": "LayoutLM"
         }
 
+        # Caminho do PDF (camada de texto/OCR) e tempo economizado
+        if layout_result.get("text_layer"):
+            formatted_data["pdf_text_layer"] = layout_result["text_layer"]
+
         return formatted_data
 
     def _generate_description_from_items(self, items: list) -> str:
@@ -0,0 +1,201 @@
+"""
+Servidor de inferência do LayoutLM com micro-batching dinâmico
+
+Um único worker (thread) por processo é dono do modelo carregado e recebe as
+páginas já com OCR de todas as requisições concorrentes. As páginas que
+chegam juntas são agrupadas em micro-lotes (até LAYOUTLM_MICRO_BATCH_SIZE
+páginas, esperando no máximo LAYOUTLM_MICRO_BATCH_WAIT_MS pela primeira da
+fila), executadas em um único forward sob torch.no_grad() e as predições
+devolvidas a cada chamador.
+
+Em CPU o custo fixo de cada forward é amortizado entre as páginas do lote e
+a inferência deixa de disputar os núcleos com ela mesma, já que só o worker
+executa o modelo.
+"""
+
+import asyncio
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Sinal de parada do worker
+_STOP = object()
+
+_batcher: Optional["LayoutLMBatcher"] = None
+_batcher_lock = threading.Lock()
+
+
+class BatchRequest(NamedTuple):
+    """Página aguardando inferência"""
+    image: Any
+    ocr_result: Dict[str, Any]
+    page_id: str
+    future: Future
+    enqueued_at: float
+
+
+class LayoutLMBatcher:
+    """
+    Worker de inferência com micro-batching dinâmico
+
+    O serviço recebido precisa expor load_model() e predict_batch(images,
+    ocr_results, page_ids) (ver LayoutLMService).
+    """
+
+    def __init__(self, service, max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        self.service = service
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        # Estatísticas
+        self._batches = 0
+        self._pages = 0
+        self._largest_batch = 0
+        self._inference_seconds = 0.0
+
+    def submit(self, image: Any, ocr_result: Dict[str, Any], page_id: str) -> Future:
+        """Enfileira uma página; o Future recebe o resultado de predict_batch"""
+        future: Future = Future()
+        self._ensure_started()
+        self._queue.put(BatchRequest(image, ocr_result, page_id, future, time.perf_counter()))
+        return future
+
+    async def predict(self, image: Any, ocr_result: Dict[str, Any], page_id: str) -> Dict[str, Any]:
+        """Versão assíncrona de submit (aguarda sem bloquear o event loop)"""
+        return await asyncio.wrap_future(self.submit(image, ocr_result, page_id))
+
+    def stats(self) -> Dict[str, Any]:
+        """Lotes executados, páginas e tamanho médio dos lotes"""
+        return {
+            'batches': self._batches,
+            'pages': self._pages,
+            'average_batch_size': round(self._pages / self._batches, 2) if self._batches else 0.0,
+            'largest_batch': self._largest_batch,
+            'inference_seconds': round(self._inference_seconds, 4),
+            'queued': self._queue.qsize()
+        }
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Processa o que já está na fila e encerra o worker"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="layoutlm-batcher", daemon=True)
+                self._thread.start()
+                logger.info(
+                    f"Worker LayoutLM iniciado (lotes de até {self.max_batch_size} páginas, "
+                    f"espera máxima {self.max_wait * 1000:.0f} ms)"
+                )
+
+    def _run(self) -> None:
+        stopping = False
+
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+
+            batch = [first]
+            deadline = first.enqueued_at + self.max_wait
+
+            # Completa o lote com o que chegar até o prazo da primeira página
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[BatchRequest]) -> None:
+        # Ignora chamadores que já desistiram (Future cancelado)
+        pending = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not pending:
+            return
+
+        started = time.perf_counter()
+        try:
+            if not self._ensure_model():
+                raise RuntimeError("Falha ao carregar modelo LayoutLM")
+
+            results = self.service.predict_batch(
+                [request.image for request in pending],
+                [request.ocr_result for request in pending],
+                [request.page_id for request in pending]
+            )
+        except Exception as e:
+            logger.error(f"Erro na inferência em lote do LayoutLM ({len(pending)} página(s)): {e}")
+            for request in pending:
+                request.future.set_exception(e)
+            return
+
+        self._batches += 1
+        self._pages += len(pending)
+        self._largest_batch = max(self._largest_batch, len(pending))
+        self._inference_seconds += time.perf_counter() - started
+
+        for request, result in zip(pending, results):
+            request.future.set_result(result)
+
+    def _ensure_model(self) -> bool:
+        """Carrega o modelo no worker na primeira inferência"""
+        if getattr(self.service, '_model_loaded', False):
+            return True
+        return asyncio.run(self.service.load_model())
+
+
+def get_layout_lm_batcher() -> LayoutLMBatcher:
+    """Worker de inferência compartilhado pelo processo (criado sob demanda)"""
+    global _batcher
+
+    with _batcher_lock:
+        if _batcher is None:
+            # Import tardio: layout_lm_service usa este módulo
+            from app.services.layout_lm_service import LayoutLMService
+
+            _batcher = LayoutLMBatcher(
+                LayoutLMService(),
+                max_batch_size=settings.LAYOUTLM_MICRO_BATCH_SIZE,
+                max_wait_ms=settings.LAYOUTLM_MICRO_BATCH_WAIT_MS
+            )
+        return _batcher
+
+
+def shutdown_layout_lm_batcher() -> None:
+    """Encerra o worker compartilhado (recriado na próxima inferência)"""
+    global _batcher
+
+    with _batcher_lock:
+        batcher, _batcher = _batcher, None
+
+    if batcher is not None:
+        batcher.shutdown(timeout=5)
+
+
+atexit.register(shutdown_layout_lm_batcher)
@@ -0,0 +1,198 @@
+"""
+Registro compartilhado dos modelos LayoutLM do processo
+
+Cada modelo (nome + variante fp32/int8) é carregado uma única vez por
+processo, opcionalmente já na inicialização da API (LAYOUTLM_PRELOAD), e
+passa por uma inferência de aquecimento antes de atender requisições. Todas
+as instâncias de LayoutLMService compartilham o mesmo modelo.
+
+Em CPU, LAYOUTLM_QUANTIZE_INT8 carrega a variante com quantização dinâmica
+int8 das camadas Linear (torch.quantization.quantize_dynamic), e
+TORCH_NUM_THREADS limita as threads usadas pelo torch (0 = padrão do torch).
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+import torch
+from transformers import (
+    AutoModelForTokenClassification,
+    AutoProcessor,
+    LayoutLMv3ForTokenClassification,
+    LayoutLMv3Processor
+)
+from PIL import Image
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Quantidade de labels BIO do LayoutLMService
+DEFAULT_NUM_LABELS = 23
+
+# Entrada do aquecimento (palavras e caixas normalizadas 0-1000)
+WARMUP_WORDS = ["NOTA", "FISCAL", "CNPJ", "12.345.678/0001-90", "TOTAL", "R$", "1.000,00"]
+WARMUP_BOXES = [[60 + 120 * i, 80, 160 + 120 * i, 110] for i in range(len(WARMUP_WORDS))]
+
+
+class LoadedModel(NamedTuple):
+    """Modelo carregado e métricas do carregamento"""
+    model_name: str
+    processor: Any
+    model: Any
+    device: Any
+    quantized: bool
+    load_seconds: float
+    warmup_seconds: float
+    size_mb: float
+
+
+def load_pretrained(model_name: str, num_labels: int) -> Tuple[Any, Any]:
+    """Processor e modelo de classificação de tokens do Hugging Face"""
+    if "layoutlmv3" in model_name.lower():
+        processor = LayoutLMv3Processor.from_pretrained(model_name)
+        model = LayoutLMv3ForTokenClassification.from_pretrained(model_name, num_labels=num_labels)
+    else:
+        processor = AutoProcessor.from_pretrained(model_name)
+        model = AutoModelForTokenClassification.from_pretrained(model_name, num_labels=num_labels)
+    return processor, model
+
+
+def model_size_mb(model) -> float:
+    """Tamanho dos pesos do modelo (state_dict serializado em memória)"""
+    total = 0
+    for value in model.state_dict().values():
+        # Camadas quantizadas guardam (peso, bias) empacotados em uma tupla
+        for tensor in (value if isinstance(value, (tuple, list)) else (value,)):
+            if torch.is_tensor(tensor):
+                total += tensor.numel() * tensor.element_size()
+    return total / (1024 * 1024)
+
+
+class LayoutLMModelRegistry:
+    """Modelos carregados por (nome, quantizado), com carga única por processo"""
+
+    def __init__(self, loader: Callable[[str, int], Tuple[Any, Any]] = load_pretrained):
+        self._loader = loader
+        self._models: Dict[Tuple[str, bool], LoadedModel] = {}
+        self._lock = threading.Lock()
+        self._threads_configured = False
+
+    def get(
+        self,
+        model_name: Optional[str] = None,
+        quantize: Optional[bool] = None,
+        num_labels: int = DEFAULT_NUM_LABELS
+    ) -> LoadedModel:
+        """Modelo compartilhado, carregado e aquecido na primeira chamada"""
+        model_name = model_name or settings.LAYOUTLM_MODEL_NAME
+        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        if quantize is None:
+            quantize = settings.LAYOUTLM_QUANTIZE_INT8
+        if quantize and device.type != 'cpu':
+            logger.warning("Quantização int8 dinâmica disponível apenas em CPU; usando fp32")
+            quantize = False
+
+        key = (model_name, quantize)
+        loaded = self._models.get(key)
+        if loaded is not None:
+            return loaded
+
+        with self._lock:
+            loaded = self._models.get(key)
+            if loaded is None:
+                loaded = self._load(model_name, quantize, num_labels, device)
+                self._models[key] = loaded
+            return loaded
+
+    def preload(self) -> LoadedModel:
+        """Carrega o modelo configurado (chamado na inicialização da API)"""
+        return self.get()
+
+    def loaded_models(self) -> Dict[str, Dict[str, Any]]:
+        """Resumo dos modelos carregados (tempos e tamanho)"""
+        return {
+            f"{name}{' (int8)' if quantized else ''}": {
+                'device': str(loaded.device),
+                'load_seconds': round(loaded.load_seconds, 3),
+                'warmup_seconds': round(loaded.warmup_seconds, 3),
+                'size_mb': round(loaded.size_mb, 1)
+            }
+            for (name, quantized), loaded in self._models.items()
+        }
+
+    def clear(self) -> None:
+        """Descarta os modelos carregados (testes)"""
+        with self._lock:
+            self._models.clear()
+
+    def configure_threads(self) -> None:
+        """Aplica TORCH_NUM_THREADS uma vez por processo"""
+        if self._threads_configured:
+            return
+        if settings.TORCH_NUM_THREADS > 0:
+            torch.set_num_threads(settings.TORCH_NUM_THREADS)
+        self._threads_configured = True
+        logger.info(f"Torch usando {torch.get_num_threads()} thread(s)")
+
+    def _load(self, model_name: str, quantize: bool, num_labels: int, device) -> LoadedModel:
+        self.configure_threads()
+
+        logger.info(f"Carregando modelo LayoutLM {model_name}{' (int8)' if quantize else ''}...")
+        started = time.perf_counter()
+
+        processor, model = self._loader(model_name, num_labels)
+        model.eval()
+
+        if quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        model.to(device)
+
+        load_seconds = time.perf_counter() - started
+        warmup_seconds = self.warm_up(processor, model, device)
+
+        loaded = LoadedModel(
+            model_name=model_name,
+            processor=processor,
+            model=model,
+            device=device,
+            quantized=quantize,
+            load_seconds=load_seconds,
+            warmup_seconds=warmup_seconds,
+            size_mb=model_size_mb(model)
+        )
+        logger.info(
+            f"Modelo {model_name} carregado em {load_seconds:.2f}s no device {device} "
+            f"({loaded.size_mb:.0f} MB, aquecimento {warmup_seconds:.2f}s)"
+        )
+        return loaded
+
+    @staticmethod
+    def warm_up(processor, model, device) -> float:
+        """
+        Inferência com uma página sintética para inicializar kernels e
+        alocações antes da primeira requisição
+        """
+        started = time.perf_counter()
+        try:
+            encoding = processor(
+                Image.new('RGB', (850, 1100), 'white'),
+                WARMUP_WORDS,
+                boxes=WARMUP_BOXES,
+                return_tensors="pt",
+                padding=True,
+                truncation=True
+            )
+            for key in encoding:
+                if torch.is_tensor(encoding[key]):
+                    encoding[key] = encoding[key].to(device)
+
+            with torch.no_grad():
+                model(**encoding)
+        except Exception as e:
+            logger.warning(f"Falha no aquecimento do modelo LayoutLM: {e}")
+        return time.perf_counter() - started
+
+
+model_registry = LayoutLMModelRegistry()
@@ -1,18 +1,20 @@
 import os
+import time
+import asyncio
 import torch
 import logging
-from typing import Dict, List, Any, Optional, Tuple
-from transformers import (
-    LayoutLMv3Processor,
-    LayoutLMv3ForTokenClassification
-)
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from PIL import Image
 import numpy as np
-from pdf2image import convert_from_path
-import cv2
-import pytesseract
 
 from app.core.config import settings
+from app.services.pdf_page_pipeline import (
+    OcrRefinement, TEXT_LAYER_IMAGE_DPI, count_pdf_pages, extract_text_layers, ocr_refinement, perform_ocr,
+    rasterize_page, record_ocr_page_seconds, resolve_ocr_dpi, text_layer_report
+)
+from app.services.document_ocr import DocumentOcr
+from app.services.layout_lm_batcher import get_layout_lm_batcher
+from app.services.layout_lm_registry import model_registry
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -23,14 +25,14 @@ class LayoutLMService:
     Serviço para processamento de documentos usando LayoutLM
     """
 
-    def __init__(self, model_name: str = "microsoft/layoutlmv3-base"):
+    def __init__(self, model_name: Optional[str] = None):
         """
         Inicializa o serviço LayoutLM
 
         Args:
-            model_name: Nome do modelo Hugging Face a ser utilizado
+            model_name: Nome do modelo Hugging Face (padrão: LAYOUTLM_MODEL_NAME)
         """
-        self.model_name = model_name
+        self.model_name = model_name or settings.LAYOUTLM_MODEL_NAME
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.processor = None
         self.model = None
@@ -65,11 +67,12 @@ class LayoutLMService:
             'I-ITEM_TOTAL'
         ]
 
-        logger.info(f"LayoutLMService inicializado com modelo: {model_name}")
+        logger.info(f"LayoutLMService inicializado com modelo: {self.model_name}")
 
     async def load_model(self) -> bool:
         """
-        Carrega o modelo LayoutLM
+        Carrega o modelo LayoutLM pelo registro compartilhado do processo
+        (carregado e aquecido uma única vez)
 
         Returns:
             True se carregou com sucesso
@@ -78,66 +81,85 @@ class LayoutLMService:
             return True
 
         try:
-            logger.info("Carregando modelo LayoutLM...")
-
-            # Determina qual versão do LayoutLM usar
-            if "layoutlmv3" in self.model_name.lower():
-                self.processor = LayoutLMv3Processor.from_pretrained(self.model_name)
-                self.model = LayoutLMv3ForTokenClassification.from_pretrained(
-                    self.model_name,
-                    num_labels=len(self.label_list)
-                )
-            else:
-                # LayoutLM v1/v2
-                self.processor = LayoutLMProcessor.from_pretrained(self.model_name)
-                self.model = LayoutLMForTokenClassification.from_pretrained(
-                    self.model_name,
-                    num_labels=len(self.label_list)
-                )
+            loaded = model_registry.get(self.model_name, num_labels=len(self.label_list))
 
-            # Move modelo para GPU se disponível
-            self.model.to(self.device)
-            self.model.eval()
+            self.processor = loaded.processor
+            self.model = loaded.model
+            self.device = loaded.device
 
             self._model_loaded = True
-            logger.info(f"Modelo carregado com sucesso no device: {self.device}")
             return True
 
         except Exception as e:
             logger.error(f"Erro ao carregar modelo LayoutLM: {e}")
             return False
 
-    async def process_pdf_document(self, pdf_path: str) -> Dict[str, Any]:
+    async def process_pdf_document(
+        self,
+        pdf_path: str,
+        on_page: Optional[Callable[[int, Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
         """
         Processa documento PDF usando LayoutLM
 
         Args:
             pdf_path: Caminho para o arquivo PDF
+            on_page: Chamado com (número da página, resultado) a cada página
+                processada, para acompanhamento parcial
 
         Returns:
             Dados extraídos do documento
         """
         try:
-            # Converte PDF para imagens
-            images = convert_from_path(pdf_path, dpi=300, first_page=1, last_page=3)
+            total_pages = min(await asyncio.to_thread(count_pdf_pages, pdf_path), 3)
+
+            # Páginas com camada de texto usam as palavras do PDF e uma
+            # imagem em baixa resolução; as demais são rasterizadas para OCR
+            text_layer_started = time.perf_counter()
+            text_layers: List[Optional[Dict[str, Any]]] = [None] * total_pages
+            if settings.PDF_TEXT_LAYER_ENABLED:
+                text_layers = await asyncio.to_thread(extract_text_layers, pdf_path, total_pages)
+            text_layer_seconds = time.perf_counter() - text_layer_started
 
             all_results = []
 
-            for page_num, image in enumerate(images, 1):
+            for page_num, text_layer in enumerate(text_layers, 1):
                 logger.info(f"Processando página {page_num}")
 
-                # Processa cada página
-                page_result = await self._process_single_image(image, f"page_{page_num}")
+                if text_layer:
+                    started = time.perf_counter()
+                    image = await asyncio.to_thread(rasterize_page, pdf_path, page_num, TEXT_LAYER_IMAGE_DPI)
+                    text_layer_seconds += time.perf_counter() - started
+                    page_result = (await self.process_batch([image], [text_layer], [f"page_{page_num}"]))[0]
+                else:
+                    # DPI adaptativo: regiões com confiança baixa refeitas a 300 DPI
+                    # (custo medido: rasterização + OCR, sem a inferência)
+                    started = time.perf_counter()
+                    dpi = resolve_ocr_dpi(300)
+                    image = await asyncio.to_thread(rasterize_page, pdf_path, page_num, dpi)
+                    ocr_result = await asyncio.to_thread(
+                        self._perform_ocr, image, ocr_refinement(pdf_path, page_num, dpi, 300)
+                    )
+                    record_ocr_page_seconds(time.perf_counter() - started)
+                    page_result = await self._process_single_image(image, f"page_{page_num}", ocr_result=ocr_result)
+
+                page_result["text_source"] = "text_layer" if text_layer else "ocr"
                 all_results.append(page_result)
 
+                if on_page:
+                    on_page(page_num, page_result)
+
             # Combina resultados de todas as páginas
             combined_result = self._combine_page_results(all_results)
 
             return {
                 "success": True,
-                "pages_processed": len(images),
+                "pages_processed": total_pages,
                 "extracted_data": combined_result,
-                "confidence_score": self._calculate_overall_confidence(all_results)
+                "confidence_score": self._calculate_overall_confidence(all_results),
+                "text_layer": text_layer_report(
+                    ["text_layer" if layer else "ocr" for layer in text_layers], text_layer_seconds
+                )
             }
 
         except Exception as e:
@@ -148,12 +170,14 @@ class LayoutLMService:
                 "confidence_score": 0.0
             }
 
-    async def process_image_document(self, image_path: str) -> Dict[str, Any]:
+    async def process_image_document(self, image_path: str, document_ocr: Optional[DocumentOcr] = None) -> Dict[str, Any]:
         """
         Processa imagem usando LayoutLM
 
         Args:
             image_path: Caminho para a imagem
+            document_ocr: OCR do documento compartilhado com os fallbacks
+                (chave: image_path)
 
         Returns:
             Dados extraídos da imagem
@@ -162,8 +186,9 @@ class LayoutLMService:
             # Carrega imagem
             image = Image.open(image_path).convert('RGB')
 
-            # Processa imagem
-            result = await self._process_single_image(image, "single_image")
+            # Processa imagem (reaproveitando o OCR do documento, se houver)
+            ocr_result = await document_ocr.page(image_path, image) if document_ocr else None
+            result = await self._process_single_image(image, "single_image", ocr_result=ocr_result)
 
             return {
                 "success": True,
@@ -180,38 +205,100 @@ class LayoutLMService:
                 "confidence_score": 0.0
             }
 
-    async def _process_single_image(self, image: Image.Image, page_id: str) -> Dict[str, Any]:
+    async def _process_single_image(
+        self,
+        image: Image.Image,
+        page_id: str,
+        refinement: Optional[OcrRefinement] = None,
+        ocr_result: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Processa uma única imagem com LayoutLM
 
         Args:
             image: Imagem PIL
             page_id: Identificador da página
+            refinement: Página do PDF para refazer regiões fracas do OCR em
+                alta resolução
+            ocr_result: OCR já feito da imagem (ver document_ocr); None = fazer
 
         Returns:
             Dados extraídos da imagem
         """
-        # Garante que o modelo está carregado
-        if not await self.load_model():
-            raise RuntimeError("Falha ao carregar modelo LayoutLM")
+        # OCR para extrair texto e coordenadas (fora do event loop)
+        if ocr_result is None:
+            loop = asyncio.get_running_loop()
+            ocr_result = await loop.run_in_executor(None, self._perform_ocr, image, refinement)
+
+        results = await self.process_batch([image], [ocr_result], [page_id])
+        return results[0]
+
+    async def process_batch(
+        self,
+        images: List[Image.Image],
+        ocr_results: List[Dict[str, Any]],
+        page_ids: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Inferência de páginas já com OCR pelo worker de micro-batching do
+        processo, que agrupa as páginas de requisições concorrentes em um
+        único forward do modelo (ver layout_lm_batcher)
 
-        try:
-            # OCR para extrair texto e coordenadas
-            ocr_result = self._perform_ocr(image)
+        Returns:
+            Resultados na mesma ordem das imagens
+        """
+        batcher = get_layout_lm_batcher()
+
+        return list(await asyncio.gather(*[
+            batcher.predict(image, ocr_result, page_id)
+            for image, ocr_result, page_id in zip(images, ocr_results, page_ids)
+        ]))
+
+    def predict_batch(
+        self,
+        images: List[Image.Image],
+        ocr_results: List[Dict[str, Any]],
+        page_ids: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Executa o LayoutLM em lote (modelo já carregado); chamado pelo worker
+        de micro-batching
+
+        As páginas sem texto não entram no lote. O padding do lote é
+        descartado pela attention_mask, de forma que cada página tem o mesmo
+        resultado que teria sozinha.
+
+        Args:
+            images: Imagens PIL das páginas
+            ocr_results: Resultado de _perform_ocr de cada página
+            page_ids: Identificadores das páginas
+
+        Returns:
+            Dados extraídos de cada página, na ordem recebida
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(images)
+        batch = []
 
-            if not ocr_result['words']:
-                return {
+        for index, (ocr_result, page_id) in enumerate(zip(ocr_results, page_ids)):
+            if ocr_result['words']:
+                batch.append(index)
+            else:
+                results[index] = {
                     "page_id": page_id,
                     "extracted_fields": {},
                     "confidence_score": 0.0,
                     "error": "Nenhum texto detectado na imagem"
                 }
 
+        if not batch:
+            return results
+
+        try:
             # Prepara inputs para LayoutLM
             encoding = self.processor(
-                image,
-                ocr_result['words'],
-                boxes=ocr_result['boxes'],
+                [images[index] for index in batch],
+                [ocr_results[index]['words'] for index in batch],
+                boxes=[ocr_results[index]['boxes'] for index in batch],
                 return_tensors="pt",
                 padding=True,
                 truncation=True
@@ -229,83 +316,50 @@ class LayoutLMService:
             # Processa resultados
             predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
             predicted_labels = torch.argmax(predictions, dim=-1)
+            lengths = encoding['attention_mask'].sum(dim=1).tolist()
 
-            # Extrai campos estruturados
-            extracted_fields = self._extract_structured_fields(
-                ocr_result['words'],
-                predicted_labels[0].cpu().numpy(),
-                predictions[0].cpu().numpy()
-            )
+            for row, index in enumerate(batch):
+                length = int(lengths[row])
+                page_predictions = predictions[row, :length].cpu().numpy()
 
-            return {
-                "page_id": page_id,
-                "extracted_fields": extracted_fields,
-                "confidence_score": self._calculate_confidence(predictions[0].cpu().numpy()),
-                "total_tokens": len(ocr_result['words'])
-            }
+                # Extrai campos estruturados
+                extracted_fields = self._extract_structured_fields(
+                    ocr_results[index]['words'],
+                    predicted_labels[row, :length].cpu().numpy(),
+                    page_predictions
+                )
+
+                results[index] = {
+                    "page_id": page_ids[index],
+                    "extracted_fields": extracted_fields,
+                    "confidence_score": self._calculate_confidence(page_predictions),
+                    "total_tokens": len(ocr_results[index]['words'])
+                }
 
         except Exception as e:
-            logger.error(f"Erro no processamento de imagem única: {e}")
-            return {
-                "page_id": page_id,
-                "extracted_fields": {},
-                "confidence_score": 0.0,
-                "error": str(e)
-            }
+            logger.error(f"Erro no processamento de imagem em lote: {e}")
+            for index in batch:
+                results[index] = {
+                    "page_id": page_ids[index],
+                    "extracted_fields": {},
+                    "confidence_score": 0.0,
+                    "error": str(e)
+                }
 
-    def _perform_ocr(self, image: Image.Image) -> Dict[str, List]:
+        return results
+
+    def _perform_ocr(self, image: Image.Image, refinement: Optional[OcrRefinement] = None) -> Dict[str, List]:
         """
-        Realiza OCR na imagem para extrair texto e coordenadas
+        Realiza OCR na imagem (pré-processada) para extrair texto e coordenadas
 
         Args:
             image: Imagem PIL
+            refinement: Origem para refazer regiões fracas em alta resolução
 
         Returns:
             Dicionário com palavras e suas coordenadas
         """
-        try:
-            # Converte PIL para OpenCV
-            cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-
-            # Configuração do Tesseract para português
-            custom_config = r'--oem 3 --psm 6 -l por'
-
-            # Extrai dados detalhados
-            data = pytesseract.image_to_data(
-                cv_image,
-                config=custom_config,
-                output_type=pytesseract.Output.DICT
-            )
-
-            words = []
-            boxes = []
-
-            width, height = image.size
-
-            for i, word in enumerate(data['text']):
-                if word.strip() and int(data['conf'][i]) > 30:  # Confiança mínima
-                    x, y, w, h = data['left'][i], data['top'][i], data['width'][i], data['height'][i]
-
-                    # Normaliza coordenadas (0-1000 como esperado pelo LayoutLM)
-                    normalized_box = [
-                        int(1000 * x / width),
-                        int(1000 * y / height),
-                        int(1000 * (x + w) / width),
-                        int(1000 * (y + h) / height)
-                    ]
-
-                    words.append(word.strip())
-                    boxes.append(normalized_box)
-
-            return {
-                "words": words,
-                "boxes": boxes,
-                "image_size": (width, height)
-            }
-
-        except Exception as e:
-            logger.error(f"Erro no OCR: {e}")
-            return {"words": [], "boxes": [], "image_size": (0, 0)}
+        return perform_ocr(image, refinement)
 
     def _extract_structured_fields(self, words: List[str], labels: np.ndarray, confidences: np.ndarray) -> Dict[str, Any]:
         """
@@ -0,0 +1,295 @@
+"""
+Cliente HTTP compartilhado para as chamadas de LLM
+
+Uma única ClientSession por processo, com pool de conexões keep-alive,
+limite de chamadas simultâneas (semáforo), limite de requisições por segundo
+(token bucket) e retentativas com backoff exponencial em 429/5xx e erros de
+conexão.
+
+A sessão pertence a um event loop dedicado (thread), já que as extrações
+rodam em loops diferentes (requisições, workers da fila de jobs e da
+ingestão em lote) e uma ClientSession não pode ser usada fora do loop em que
+foi criada. Os chamadores aguardam o resultado sem bloquear o próprio loop,
+e os limites valem para o processo inteiro.
+"""
+
+import asyncio
+import atexit
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Respostas que valem nova tentativa
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+_client: Optional["LLMHttpClient"] = None
+_client_lock = threading.Lock()
+
+
+class LLMHttpError(Exception):
+    """Falha definitiva na chamada (status não recuperável ou retentativas esgotadas)"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class TokenBucket:
+    """
+    Limite de requisições por segundo com rajadas de até `capacity`
+
+    Usado apenas dentro do loop do cliente, por isso dispensa lock.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> float:
+        """Consome um token, esperando a reposição se preciso; retorna a espera em segundos"""
+        if self.rate <= 0:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return waited
+
+            delay = (1 - self._tokens) / self.rate
+            await asyncio.sleep(delay)
+            waited += delay
+
+
+class LLMHttpClient:
+    """
+    Cliente HTTP com pool de conexões, limites e retentativas
+
+    Args:
+        max_connections: Conexões mantidas no pool
+        max_concurrency: Requisições em andamento ao mesmo tempo
+        requests_per_second: Taxa do token bucket (0 desativa)
+        burst: Requisições liberadas de uma vez antes do limite de taxa
+        max_retries: Novas tentativas em 429/5xx e erros de conexão
+        backoff_seconds: Espera da primeira retentativa (dobra a cada uma)
+        backoff_max_seconds: Espera máxima entre tentativas
+        timeout_seconds: Tempo limite de cada tentativa
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_concurrency: int = 8,
+        requests_per_second: float = 8.0,
+        burst: int = 8,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+        backoff_max_seconds: float = 8.0,
+        timeout_seconds: float = 60.0
+    ):
+        self.max_connections = max(1, max_connections)
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_retries = max(0, max_retries)
+        self.backoff_seconds = max(0.0, backoff_seconds)
+        self.backoff_max_seconds = max(self.backoff_seconds, backoff_max_seconds)
+        self.timeout_seconds = timeout_seconds
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        # Criados dentro do loop do cliente
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bucket: Optional[TokenBucket] = None
+
+        # Estatísticas
+        self._requests = 0
+        self._attempts = 0
+        self._retries = 0
+        self._failures = 0
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._throttled_seconds = 0.0
+
+    async def post_json(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        POST com corpo JSON executado no loop do cliente
+
+        Returns:
+            Corpo JSON da resposta 200
+
+        Raises:
+            LLMHttpError: Status não recuperável ou retentativas esgotadas
+        """
+        loop = self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(self._request(url, payload, headers or {}), loop)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        """Requisições, retentativas, falhas e tempo de espera pelo limite de taxa"""
+        return {
+            'requests': self._requests,
+            'attempts': self._attempts,
+            'retries': self._retries,
+            'failures': self._failures,
+            'in_flight': self._in_flight,
+            'peak_in_flight': self._peak_in_flight,
+            'throttled_seconds': round(self._throttled_seconds, 4),
+            'max_connections': self.max_connections,
+            'max_concurrency': self.max_concurrency
+        }
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Fecha a sessão (e as conexões do pool) e encerra o loop do cliente"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+
+        if loop is None:
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_session(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"Erro ao fechar sessão HTTP do LLM: {e}")
+
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout)
+        if not loop.is_running():
+            loop.close()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="llm-http-client", daemon=True)
+                self._thread.start()
+                self._loop = loop
+                logger.info(
+                    f"Cliente HTTP do LLM iniciado ({self.max_connections} conexões, "
+                    f"{self.max_concurrency} simultâneas, {self.requests_per_second} req/s)"
+                )
+            return self._loop
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=30, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout_seconds)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._bucket = TokenBucket(self.requests_per_second, self.burst)
+        return self._session
+
+    async def _close_session(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _request(self, url: str, payload: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
+        session = self._ensure_session()
+        self._requests += 1
+
+        for attempt in range(self.max_retries + 1):
+            self._throttled_seconds += await self._bucket.acquire()
+
+            retry_after = None
+            async with self._semaphore:
+                self._attempts += 1
+                self._in_flight += 1
+                self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+                try:
+                    async with session.post(url, json=payload, headers=headers) as response:
+                        if response.status == 200:
+                            return await response.json()
+
+                        body = await response.text()
+                        error = LLMHttpError(f"HTTP {response.status}: {body[:500]}", response.status)
+                        if response.status not in RETRYABLE_STATUS:
+                            self._failures += 1
+                            raise error
+                        retry_after = self._parse_retry_after(response.headers.get('Retry-After'))
+
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = LLMHttpError(f"Erro de conexão: {e.__class__.__name__}: {e}")
+                finally:
+                    self._in_flight -= 1
+
+            if attempt == self.max_retries:
+                break
+
+            self._retries += 1
+            delay = retry_after if retry_after is not None else self._backoff(attempt)
+            logger.warning(f"Chamada ao LLM falhou ({error}); nova tentativa em {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+        self._failures += 1
+        raise error
+
+    def _backoff(self, attempt: int) -> float:
+        """Backoff exponencial com jitter (metade fixa, metade aleatória)"""
+        delay = min(self.backoff_max_seconds, self.backoff_seconds * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _parse_retry_after(self, value: Optional[str]) -> Optional[float]:
+        """Retry-After em segundos (datas HTTP caem no backoff padrão)"""
+        try:
+            return min(self.backoff_max_seconds, max(0.0, float(value)))
+        except (TypeError, ValueError):
+            return None
+
+
+def get_llm_http_client() -> LLMHttpClient:
+    """Cliente HTTP compartilhado pelo processo (criado sob demanda)"""
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            _client = LLMHttpClient(
+                max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                max_concurrency=settings.LLM_HTTP_MAX_CONCURRENCY,
+                requests_per_second=settings.LLM_HTTP_REQUESTS_PER_SECOND,
+                burst=settings.LLM_HTTP_BURST,
+                max_retries=settings.LLM_HTTP_MAX_RETRIES,
+                backoff_seconds=settings.LLM_HTTP_BACKOFF_SECONDS,
+                timeout_seconds=settings.LLM_HTTP_TIMEOUT_SECONDS
+            )
+        return _client
+
+
+def shutdown_llm_http_client() -> None:
+    """Encerra o cliente compartilhado (recriado na próxima chamada)"""
+    global _client
+
+    with _client_lock:
+        client, _client = _client, None
+
+    if client is not None:
+        client.shutdown(timeout=5)
+
+
+atexit.register(shutdown_llm_http_client)
@@ -0,0 +1,228 @@
+"""
+Cache das respostas do LLM e coalescência de chamadas idênticas
+
+As extrações usam prompts determinísticos (temperature 0.1) e páginas
+duplicadas geram exatamente o mesmo texto de OCR, então a resposta é
+reaproveitada pela chave modelo + hash do payload normalizado (espaços
+colapsados no conteúdo das mensagens, mais temperature e max_tokens).
+
+Backends de app.core.cache: LRU em processo com TTL ("memory") ou Redis
+("redis", persistente e compartilhado entre processos, uma chave por
+resposta com TTL próprio e limite de LLM_CACHE_MAX_ENTRIES). Com "off" nada é
+guardado, mas chamadas idênticas simultâneas continuam coalescidas: a
+primeira faz a requisição e as demais aguardam o mesmo resultado, inclusive
+vindas de outros event loops (workers da fila de jobs e da ingestão em lote).
+
+Só respostas bem-sucedidas são guardadas; erros são repassados a todos os
+chamadores que aguardavam a mesma requisição.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.cache import build_cache_backend
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# As respostas não pertencem a um workspace: o backend recebe um grupo fixo
+LLM_CACHE_BUCKET = 0
+
+
+class _LeaderCancelled(Exception):
+    """A chamada aguardada foi cancelada; quem aguardava deve refazê-la"""
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _normalize_content(content: Any) -> Any:
+    """Colapsa espaços do texto (string ou partes 'text' do formato multimodal)"""
+    if isinstance(content, str):
+        return _normalize_text(content)
+    if isinstance(content, list):
+        return [
+            dict(part, text=_normalize_text(part["text"]))
+            if isinstance(part, dict) and part.get("type") == "text" and isinstance(part.get("text"), str)
+            else part
+            for part in content
+        ]
+    return content
+
+
+class LLMResponseCache:
+    """
+    Cache de respostas por modelo + prompt normalizado com coalescência
+
+    Args:
+        backend: Backend de app.core.cache (None = apenas coalescência)
+        ttl_seconds: Validade de cada resposta
+    """
+
+    def __init__(self, backend=None, ttl_seconds: int = 86400):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, int] = defaultdict(int)
+
+    @property
+    def backend_name(self) -> str:
+        return self.backend.name if self.backend is not None else "off"
+
+    @staticmethod
+    def build_key(payload: Dict[str, Any]) -> str:
+        """Chave estável: modelo + sha256 do payload normalizado"""
+        normalized = {
+            "model": payload.get("model"),
+            "temperature": payload.get("temperature"),
+            "max_tokens": payload.get("max_tokens"),
+            "messages": [
+                {"role": message.get("role"), "content": _normalize_content(message.get("content"))}
+                for message in payload.get("messages", [])
+            ]
+        }
+        encoded = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+        digest = hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+        return f"llm:{payload.get('model')}:{digest}"
+
+    async def get_or_call(self, payload: Dict[str, Any], call: Callable[[], Awaitable[str]]) -> str:
+        """
+        Resposta em cache, a de uma chamada idêntica em andamento ou o
+        resultado de call() (guardado no cache)
+
+        Se a chamada em andamento for cancelada, a vaga é liberada e um dos
+        chamadores que aguardavam refaz a requisição.
+        """
+        key = self.build_key(payload)
+
+        while True:
+            with self._lock:
+                future = self._in_flight.get(key)
+                leader = future is None
+                if leader:
+                    future = Future()
+                    # Em andamento: cancelar a espera de um chamador não cancela a chamada
+                    future.set_running_or_notify_cancel()
+                    self._in_flight[key] = future
+                else:
+                    self._metrics["coalesced"] += 1
+
+            if leader:
+                break
+
+            try:
+                return await asyncio.wrap_future(future)
+            except _LeaderCancelled:
+                with self._lock:
+                    self._metrics["coalesced"] -= 1
+
+        try:
+            value = self._get(key)
+            if value is None:
+                with self._lock:
+                    self._metrics["upstream_calls"] += 1
+                value = await call()
+                self._set(key, value)
+        except Exception as e:
+            self._finish(key)
+            future.set_exception(e)
+            raise
+        except BaseException:
+            # Cancelamento do chamador: não é o resultado da requisição
+            self._finish(key)
+            future.set_exception(_LeaderCancelled())
+            raise
+
+        self._finish(key)
+        future.set_result(value)
+        return value
+
+    def clear(self) -> None:
+        """Limpa o cache e zera as métricas"""
+        if self.backend is not None:
+            self.backend.clear()
+        with self._lock:
+            self._metrics.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hits, misses, chamadas coalescidas e chamadas ao LLM evitadas"""
+        with self._lock:
+            hits = self._metrics["hits"]
+            misses = self._metrics["misses"]
+            coalesced = self._metrics["coalesced"]
+            metrics = {
+                "backend": self.backend_name,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "coalesced": coalesced,
+                "upstream_calls": self._metrics["upstream_calls"],
+                "saved_calls": hits + coalesced,
+                "sets": self._metrics["sets"],
+                "errors": self._metrics["errors"],
+                "in_flight": len(self._in_flight),
+                "evictions": getattr(self.backend, "evictions", 0)
+            }
+
+        try:
+            metrics["entries"] = self.backend.size() if self.backend is not None else 0
+        except Exception:
+            metrics["entries"] = None
+        return metrics
+
+    def _get(self, key: str) -> Optional[str]:
+        if self.backend is None:
+            return None
+
+        try:
+            value = self.backend.get(LLM_CACHE_BUCKET, key)
+        except Exception as e:
+            logger.warning(f"Erro ao ler cache do LLM ({self.backend.name}): {e}")
+            value = None
+            with self._lock:
+                self._metrics["errors"] += 1
+
+        with self._lock:
+            self._metrics["hits" if value is not None else "misses"] += 1
+        return value
+
+    def _set(self, key: str, value: str) -> None:
+        if self.backend is None:
+            return
+
+        try:
+            self.backend.set(LLM_CACHE_BUCKET, key, value, self.ttl_seconds)
+            counter = "sets"
+        except Exception as e:
+            logger.warning(f"Erro ao gravar cache do LLM ({self.backend.name}): {e}")
+            counter = "errors"
+
+        with self._lock:
+            self._metrics[counter] += 1
+
+    def _finish(self, key: str) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+
+def build_llm_cache_backend(backend_name: str):
+    """Backend configurado ou None quando o cache está desligado ("off")"""
+    if backend_name == "off":
+        return None
+    return build_cache_backend(
+        backend_name, settings.REDIS_URL, settings.LLM_CACHE_MAX_ENTRIES, prefix="orion:llm"
+    )
+
+
+llm_response_cache = LLMResponseCache(
+    build_llm_cache_backend(settings.LLM_CACHE_BACKEND),
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS
+)
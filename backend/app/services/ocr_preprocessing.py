@@ -0,0 +1,318 @@
+"""
+Pré-processamento de imagens para OCR e refinamento por regiões
+
+Antes do Tesseract, cada página é convertida uma única vez para tons de
+cinza (um canal, sem a cópia RGB -> BGR), tem a inclinação corrigida e é
+binarizada; as etapas seguintes alteram o mesmo array.
+
+DPI adaptativo: as páginas são rasterizadas em baixa resolução
+(OCR_LOW_DPI) e apenas as linhas com confiança média baixa são refeitas em
+alta resolução (ver pdf_page_pipeline.perform_ocr). Este módulo agrupa as
+linhas fracas em regiões e substitui as palavras dessas regiões pelas do
+novo OCR quando ele é mais confiável.
+
+Funções puras sobre arrays numpy, executadas dentro dos workers do pool de
+OCR.
+"""
+
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from PIL import Image
+import numpy as np
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# Correção de inclinação: ângulos testados (graus) e largura da imagem
+# reduzida usada na estimativa
+MAX_SKEW_ANGLE = 5.0
+SKEW_COARSE_STEP = 1.0
+SKEW_FINE_STEP = 0.25
+SKEW_ESTIMATE_WIDTH = 800
+
+# Inclinações menores que isto não justificam rotacionar a página
+MIN_DESKEW_ANGLE = 0.3
+
+# Margem em volta das linhas refeitas, em alturas de linha
+REGION_PADDING_LINES = 0.5
+
+# Acima desta fração da página em regiões fracas, a página inteira é refeita
+MAX_REGION_PAGE_RATIO = 0.6
+
+Box = Tuple[int, int, int, int]  # left, top, right, bottom (pixels)
+
+
+class PreprocessedImage(NamedTuple):
+    """Página pronta para o Tesseract"""
+    image: np.ndarray      # tons de cinza (binarizada, se habilitado)
+    skew_angle: float      # rotação aplicada, em graus (anti-horário)
+
+
+class OcrWord(NamedTuple):
+    """Palavra do Tesseract em pixels da imagem de baixa resolução"""
+    text: str
+    confidence: float
+    box: Box
+    line: Tuple[int, ...]  # (bloco, parágrafo, linha) do Tesseract, com o prefixo do recorte
+
+
+def to_grayscale(image: Image.Image) -> np.ndarray:
+    """Array de um canal (uint8) da imagem PIL"""
+    if image.mode != 'L':
+        image = image.convert('L')
+    return np.array(image)
+
+
+def estimate_skew(gray: np.ndarray) -> float:
+    """
+    Inclinação do texto em graus, pelo perfil de projeção horizontal: o
+    ângulo que deixa as linhas de texto mais bem separadas (maior variação
+    entre somas de linhas consecutivas)
+    """
+    height, width = gray.shape[:2]
+    if not height or not width:
+        return 0.0
+
+    scale = min(1.0, SKEW_ESTIMATE_WIDTH / width)
+    small = cv2.resize(gray, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+    _, ink = cv2.threshold(small, 0, 1, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    if not ink.any():
+        return 0.0
+
+    center = (ink.shape[1] / 2, ink.shape[0] / 2)
+
+    def score(angle: float) -> float:
+        matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+        rotated = cv2.warpAffine(ink, matrix, (ink.shape[1], ink.shape[0]), flags=cv2.INTER_NEAREST)
+        profile = rotated.sum(axis=1, dtype=np.int64)
+        return float(np.square(np.diff(profile)).sum())
+
+    coarse = np.arange(-MAX_SKEW_ANGLE, MAX_SKEW_ANGLE + SKEW_COARSE_STEP / 2, SKEW_COARSE_STEP)
+    best = max(coarse, key=score)
+    fine = np.arange(best - SKEW_COARSE_STEP, best + SKEW_COARSE_STEP + SKEW_FINE_STEP / 2, SKEW_FINE_STEP)
+    best = max((angle for angle in fine if abs(angle) <= MAX_SKEW_ANGLE), key=score)
+
+    return round(float(best), 2)
+
+
+def rotate(gray: np.ndarray, angle: float) -> np.ndarray:
+    """Rotaciona em torno do centro, mantendo o tamanho e fundo branco"""
+    height, width = gray.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(
+        gray, matrix, (width, height),
+        flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=255
+    )
+
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    """Binarização de Otsu no próprio array"""
+    cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=gray)
+    return gray
+
+
+def preprocess_for_ocr(
+    image: Image.Image,
+    skew_angle: Optional[float] = None,
+    deskew: bool = True,
+    threshold: bool = True
+) -> PreprocessedImage:
+    """
+    Tons de cinza, correção de inclinação e binarização
+
+    Args:
+        image: Página PIL (RGB ou L)
+        skew_angle: Ângulo já estimado (ex.: na versão em baixa resolução
+            da mesma página); None = estimar
+        deskew: Corrigir a inclinação
+        threshold: Binarizar
+    """
+    gray = to_grayscale(image)
+
+    angle = 0.0
+    if deskew:
+        angle = estimate_skew(gray) if skew_angle is None else skew_angle
+        if abs(angle) >= MIN_DESKEW_ANGLE:
+            gray = rotate(gray, angle)
+        else:
+            angle = 0.0
+
+    if threshold:
+        binarize(gray)
+
+    return PreprocessedImage(gray, angle)
+
+
+def tesseract_words(
+    data: Dict[str, List],
+    offset: Tuple[int, int] = (0, 0),
+    scale: float = 1.0,
+    line_prefix: Tuple[int, ...] = ()
+) -> List[OcrWord]:
+    """
+    Palavras de pytesseract.image_to_data (Output.DICT), com as caixas
+    deslocadas/escaladas para a imagem de baixa resolução
+
+    Args:
+        data: Saída do Tesseract
+        offset: Canto (left, top) do recorte, já na escala de destino
+        scale: Fator de conversão das coordenadas do recorte
+        line_prefix: Prefixo das linhas (distingue as linhas de cada recorte
+            das linhas da página)
+    """
+    words = []
+    for i, text in enumerate(data['text']):
+        text = text.strip()
+        if not text:
+            continue
+
+        left = offset[0] + data['left'][i] * scale
+        top = offset[1] + data['top'][i] * scale
+        words.append(OcrWord(
+            text,
+            float(data['conf'][i]),
+            (int(left), int(top), int(left + data['width'][i] * scale), int(top + data['height'][i] * scale)),
+            line_prefix + (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        ))
+    return words
+
+
+def ocr_text(words: Sequence[OcrWord]) -> str:
+    """Texto corrido das palavras, uma linha do Tesseract por linha de texto"""
+    lines: List[List[str]] = []
+    previous = None
+    for word in words:
+        if not lines or word.line != previous:
+            lines.append([])
+        lines[-1].append(word.text)
+        previous = word.line
+    return "\n".join(" ".join(line) for line in lines)
+
+
+def mean_confidence(words: Sequence[OcrWord]) -> float:
+    """Confiança média das palavras (0 sem palavras)"""
+    return sum(word.confidence for word in words) / len(words) if words else 0.0
+
+
+def low_confidence_regions(words: Sequence[OcrWord], image_size: Tuple[int, int], min_confidence: float) -> List[Box]:
+    """
+    Regiões (em pixels) das linhas com confiança média abaixo de
+    min_confidence, com margem e unidas quando se sobrepõem
+
+    Se as regiões cobrem mais de MAX_REGION_PAGE_RATIO da página, retorna
+    a página inteira.
+    """
+    lines: Dict[Tuple[int, ...], List[OcrWord]] = {}
+    for word in words:
+        lines.setdefault(word.line, []).append(word)
+
+    width, height = image_size
+    regions: List[Box] = []
+    for line_words in lines.values():
+        if mean_confidence(line_words) >= min_confidence:
+            continue
+
+        left = min(word.box[0] for word in line_words)
+        top = min(word.box[1] for word in line_words)
+        right = max(word.box[2] for word in line_words)
+        bottom = max(word.box[3] for word in line_words)
+        padding = int((bottom - top) * REGION_PADDING_LINES) + 1
+        regions.append((
+            max(0, left - padding), max(0, top - padding),
+            min(width, right + padding), min(height, bottom + padding)
+        ))
+
+    regions = _merge_boxes(regions)
+
+    area = sum((right - left) * (bottom - top) for left, top, right, bottom in regions)
+    if regions and area > MAX_REGION_PAGE_RATIO * width * height:
+        return [(0, 0, width, height)]
+
+    return regions
+
+
+def _merge_boxes(boxes: List[Box]) -> List[Box]:
+    """Une caixas que se sobrepõem até não haver mais sobreposição"""
+    merged = sorted(boxes, key=lambda box: (box[1], box[0]))
+    changed = True
+    while changed:
+        changed = False
+        result: List[Box] = []
+        for box in merged:
+            for index, other in enumerate(result):
+                if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                    result[index] = (
+                        min(box[0], other[0]), min(box[1], other[1]),
+                        max(box[2], other[2]), max(box[3], other[3])
+                    )
+                    changed = True
+                    break
+            else:
+                result.append(box)
+        merged = result
+    return merged
+
+
+def _in_region(word: OcrWord, region: Box) -> bool:
+    x = (word.box[0] + word.box[2]) / 2
+    y = (word.box[1] + word.box[3]) / 2
+    return region[0] <= x <= region[2] and region[1] <= y <= region[3]
+
+
+def merge_refined_words(
+    words: Sequence[OcrWord],
+    regions: Sequence[Box],
+    refined: Sequence[Sequence[OcrWord]]
+) -> Tuple[List[OcrWord], int]:
+    """
+    Substitui as palavras de cada região pelas do OCR em alta resolução
+    quando a confiança média melhora; as palavras refeitas entram na posição
+    da primeira palavra da região (ordem de leitura do Tesseract)
+
+    Returns:
+        Palavras resultantes e quantidade de regiões substituídas
+    """
+    replaced: Dict[int, Sequence[OcrWord]] = {}
+    for index, region in enumerate(regions):
+        original = [word for word in words if _in_region(word, region)]
+        if refined[index] and mean_confidence(refined[index]) > mean_confidence(original):
+            replaced[index] = refined[index]
+
+    result: List[OcrWord] = []
+    emitted = set()
+    for word in words:
+        region_index = next((index for index in replaced if _in_region(word, regions[index])), None)
+        if region_index is None:
+            result.append(word)
+        elif region_index not in emitted:
+            result.extend(replaced[region_index])
+            emitted.add(region_index)
+
+    return result, len(replaced)
+
+
+def ocr_page_report(ocr_result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Resolução, regiões refeitas, inclinação e confiança do OCR de uma página"""
+    if 'mean_confidence' not in ocr_result:
+        return None
+    return {
+        key: ocr_result.get(key)
+        for key in ('dpi', 'refined_dpi', 'refined_regions', 'skew_angle', 'mean_confidence')
+    }
+
+
+def adaptive_ocr_report(ocr_results: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Resumo do OCR das páginas de um documento: resoluções usadas, páginas e
+    regiões refeitas em alta resolução e inclinações corrigidas
+    """
+    pages = [result for result in ocr_results if result and 'mean_confidence' in result]
+    confidences = [result['mean_confidence'] for result in pages]
+    return {
+        'ocr_pages': len(pages),
+        'dpi': sorted({result['dpi'] for result in pages if result.get('dpi')}),
+        'refined_pages': sum(1 for result in pages if result.get('refined_regions')),
+        'refined_regions': sum(result.get('refined_regions', 0) for result in pages),
+        'deskewed_pages': sum(1 for result in pages if result.get('skew_angle')),
+        'mean_confidence': round(sum(confidences) / len(confidences), 1) if confidences else 0.0
+    }
@@ -0,0 +1,410 @@
+"""
+Pipeline por página para extração de PDFs (camada de texto, rasterização,
+OCR e LayoutLM)
+
+Em vez de converter o PDF inteiro para imagens de uma vez e processar as
+páginas em sequência no event loop:
+- PDFs gerados digitalmente (DANFE de NF-e) têm camada de texto: as palavras
+  e coordenadas são lidas direto do PDF (pdfplumber) e vão para o LayoutLM
+  ou para a IA sem OCR. O LayoutLM ainda recebe uma imagem da página, mas
+  rasterizada a TEXT_LAYER_IMAGE_DPI (o modelo a reduz para 224x224)
+- Páginas sem camada de texto utilizável (digitalizadas) seguem para OCR,
+  rasterizadas em baixa resolução (OCR_LOW_DPI); as linhas com confiança
+  baixa são refeitas em alta resolução dentro do worker do OCR (ver
+  ocr_preprocessing)
+- As páginas são rasterizadas uma a uma (pdftoppm em thread), mantendo em
+  memória apenas as imagens das páginas ainda em processamento
+- O OCR (Tesseract) de cada página roda em um pool de processos limitado,
+  compartilhado pelo processo da API
+- A inferência do LayoutLM é feita em lotes de páginas (ver
+  LayoutLMService.predict_batch), fora do event loop
+
+A orquestração fica em DocumentProcessor._process_pdf_document; este módulo
+contém as etapas e o pool. Funções executadas no pool devem permanecer no
+nível do módulo para poderem ser serializadas.
+"""
+
+import asyncio
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from PIL import Image
+import numpy as np
+from pdf2image import convert_from_path, pdfinfo_from_path
+import pdfplumber
+import pytesseract
+
+from app.core.config import settings
+from app.services.ocr_preprocessing import (
+    OcrWord, PreprocessedImage, low_confidence_regions, mean_confidence, merge_refined_words,
+    ocr_text, preprocess_for_ocr, tesseract_words
+)
+
+logger = logging.getLogger(__name__)
+
+# Configuração do Tesseract para português
+TESSERACT_CONFIG = r'--oem 3 --psm 6 -l por'
+
+# Confiança mínima do Tesseract para manter uma palavra
+MIN_WORD_CONFIDENCE = 30
+
+# Etapas medidas em cada processamento (segundos somados por etapa)
+PIPELINE_STAGES = ('text_layer', 'rasterize', 'ocr', 'layout_lm', 'fallback', 'combine')
+
+# Resolução da imagem enviada ao LayoutLM nas páginas com camada de texto
+TEXT_LAYER_IMAGE_DPI = 72
+
+# Fração mínima de caracteres legíveis para aceitar a camada de texto
+# (fontes sem mapeamento Unicode geram "(cid:NN)" ou caracteres inválidos)
+TEXT_LAYER_MIN_READABLE_RATIO = 0.85
+
+# Custo estimado de rasterizar a 300 DPI + OCR de uma página, usado no
+# cálculo do tempo economizado até haver medições no processo
+DEFAULT_OCR_PAGE_SECONDS = 2.0
+
+# Peso de cada nova medição na média móvel do custo de OCR por página
+OCR_COST_SMOOTHING = 0.2
+
+# Início dos processos do pool de OCR: o pool é criado sob demanda, depois
+# das threads do batcher do LayoutLM, do cliente de LLM e do torch, e o fork
+# de um processo com threads pode deixar os workers travados
+OCR_MP_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+_ocr_page_seconds = DEFAULT_OCR_PAGE_SECONDS
+_ocr_page_measured = False
+
+
+class OcrRefinement(NamedTuple):
+    """Página de origem para refazer em alta resolução as regiões fracas do OCR"""
+    file_path: str
+    page_number: int
+    dpi: int         # resolução da imagem enviada ao OCR
+    high_dpi: int    # resolução das regiões refeitas
+
+
+class PdfPage(NamedTuple):
+    """Página rasterizada aguardando OCR/inferência"""
+    page_number: int
+    image: Optional[Image.Image]
+    ocr: Optional[asyncio.Future]    # OCR em andamento no pool (None sem LayoutLM)
+    image_path: Optional[str]        # imagem salva para debug
+    rasterize_seconds: float
+    text_layer: Optional[Dict[str, Any]] = None  # palavras lidas do PDF (sem OCR)
+    refinement: Optional[OcrRefinement] = None   # DPI adaptativo do OCR
+
+
+def count_pdf_pages(file_path: str) -> int:
+    """Quantidade de páginas do PDF (pdfinfo, sem rasterizar)"""
+    return int(pdfinfo_from_path(file_path)["Pages"])
+
+
+def rasterize_page(file_path: str, page_number: int, dpi: int, grayscale: bool = False) -> Image.Image:
+    """Converte uma única página do PDF para imagem RGB (ou tons de cinza)"""
+    images = convert_from_path(
+        file_path,
+        dpi=dpi,
+        first_page=page_number,
+        last_page=page_number,
+        fmt='ppm' if grayscale else 'RGB',
+        grayscale=grayscale
+    )
+    if not images:
+        raise ValueError(f"Não foi possível extrair a página {page_number} do PDF")
+    return images[0]
+
+
+def resolve_ocr_dpi(high_dpi: int) -> int:
+    """Resolução da rasterização para OCR: OCR_LOW_DPI com DPI adaptativo"""
+    if settings.OCR_ADAPTIVE_DPI_ENABLED and 0 < settings.OCR_LOW_DPI < high_dpi:
+        return settings.OCR_LOW_DPI
+    return high_dpi
+
+
+def ocr_refinement(file_path: str, page_number: int, dpi: int, high_dpi: int) -> Optional[OcrRefinement]:
+    """Refinamento das regiões fracas, quando a página foi rasterizada abaixo de high_dpi"""
+    return OcrRefinement(file_path, page_number, dpi, high_dpi) if dpi < high_dpi else None
+
+
+def is_usable_text_layer(words: List[str], min_words: Optional[int] = None) -> bool:
+    """
+    Camada de texto suficiente para dispensar o OCR: quantidade mínima de
+    palavras e texto legível (sem glifos "(cid:NN)" ou caracteres inválidos)
+    """
+    min_words = settings.PDF_TEXT_LAYER_MIN_WORDS if min_words is None else min_words
+    if len(words) < min_words:
+        return False
+
+    text = "".join(words)
+    if not text:
+        return False
+
+    unreadable = sum(len(word) for word in words if "(cid:" in word)
+    unreadable += sum(1 for char in text if char == "\ufffd" or not char.isprintable())
+    return 1 - unreadable / len(text) >= TEXT_LAYER_MIN_READABLE_RATIO
+
+
+def extract_text_layers(file_path: str, max_pages: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    Palavras e coordenadas da camada de texto de cada página, no mesmo
+    formato de perform_ocr (caixas normalizadas 0-1000) mais o texto
+    corrido da página ('text') para a IA
+
+    Returns:
+        Uma entrada por página (até max_pages); None nas páginas sem camada
+        de texto utilizável, que precisam de OCR
+    """
+    layers: List[Optional[Dict[str, Any]]] = []
+
+    try:
+        with pdfplumber.open(file_path) as pdf:
+            for page in pdf.pages[:max_pages]:
+                started = time.perf_counter()
+                width, height = float(page.width), float(page.height)
+
+                words, boxes = [], []
+                for word in page.extract_words(use_text_flow=True):
+                    text = word['text'].strip()
+                    if not text:
+                        continue
+                    words.append(text)
+                    boxes.append([
+                        max(0, min(1000, int(1000 * word['x0'] / width))),
+                        max(0, min(1000, int(1000 * word['top'] / height))),
+                        max(0, min(1000, int(1000 * word['x1'] / width))),
+                        max(0, min(1000, int(1000 * word['bottom'] / height)))
+                    ])
+
+                if is_usable_text_layer(words):
+                    layers.append({
+                        "words": words,
+                        "boxes": boxes,
+                        "text": page.extract_text() or " ".join(words),
+                        "image_size": (int(width), int(height)),
+                        "seconds": time.perf_counter() - started,
+                        "source": "text_layer"
+                    })
+                else:
+                    layers.append(None)
+
+                # Libera os objetos de layout já lidos da página
+                page.flush_cache()
+
+    except Exception as e:
+        logger.warning(f"Não foi possível ler a camada de texto de {os.path.basename(file_path)}: {e}")
+        return [None] * max_pages
+
+    return layers + [None] * (max_pages - len(layers))
+
+
+def record_ocr_page_seconds(seconds: float) -> None:
+    """Atualiza a média do custo de rasterização em alta resolução + OCR"""
+    global _ocr_page_seconds, _ocr_page_measured
+
+    if _ocr_page_measured:
+        _ocr_page_seconds += OCR_COST_SMOOTHING * (seconds - _ocr_page_seconds)
+    else:
+        _ocr_page_seconds, _ocr_page_measured = seconds, True
+
+
+def estimated_ocr_page_seconds() -> float:
+    """Custo médio de OCR por página observado no processo"""
+    return _ocr_page_seconds
+
+
+def text_layer_report(page_sources: List[str], text_layer_seconds: float) -> Dict[str, Any]:
+    """
+    Caminho usado no documento e tempo economizado (estimado) em relação a
+    rasterizar e fazer OCR de todas as páginas
+
+    Args:
+        page_sources: 'text_layer' ou 'ocr' para cada página
+        text_layer_seconds: Tempo gasto lendo a camada de texto e
+            rasterizando as imagens em baixa resolução
+    """
+    text_pages = page_sources.count('text_layer')
+    ocr_pages = len(page_sources) - text_pages
+
+    if text_pages and ocr_pages:
+        path = 'mixed'
+    elif text_pages:
+        path = 'text_layer'
+    else:
+        path = 'ocr'
+
+    saved = text_pages * estimated_ocr_page_seconds() - text_layer_seconds if text_pages else 0.0
+    return {
+        'path': path,
+        'text_layer_pages': text_pages,
+        'ocr_pages': ocr_pages,
+        'page_sources': page_sources,
+        'estimated_seconds_saved': round(max(saved, 0.0), 3)
+    }
+
+
+def perform_ocr(image: Image.Image, refinement: Optional[OcrRefinement] = None) -> Dict[str, Any]:
+    """
+    OCR da imagem com palavras, coordenadas normalizadas (0-1000, como
+    esperado pelo LayoutLM), confianças e o texto corrido (para a IA, ver
+    document_ocr)
+
+    Palavras com confiança até MIN_WORD_CONFIDENCE ficam fora das palavras e
+    caixas do LayoutLM, mas entram no texto corrido: o fallback de OCR + IA
+    roda justamente nas páginas ruins, em que elas fazem falta.
+
+    A imagem é pré-processada (tons de cinza, inclinação e binarização). Com
+    refinement, as linhas de confiança média baixa são refeitas a partir da
+    página rasterizada em refinement.high_dpi.
+
+    Executado dentro dos workers do pool; 'seconds' é o tempo gasto no worker.
+    """
+    started = time.perf_counter()
+    try:
+        preprocessed = preprocess_for_ocr(
+            image,
+            deskew=settings.OCR_PREPROCESS_ENABLED,
+            threshold=settings.OCR_PREPROCESS_ENABLED
+        )
+        words = tesseract_words(_image_to_data(preprocessed.image))
+
+        refined_regions = 0
+        if refinement is not None:
+            words, refined_regions = _refine_low_confidence_regions(words, preprocessed, refinement)
+
+        width, height = image.size
+        kept = [word for word in words if int(word.confidence) > MIN_WORD_CONFIDENCE]
+
+        return {
+            "words": [word.text for word in kept],
+            "boxes": [
+                [
+                    max(0, min(1000, int(1000 * left / width))),
+                    max(0, min(1000, int(1000 * top / height))),
+                    max(0, min(1000, int(1000 * right / width))),
+                    max(0, min(1000, int(1000 * bottom / height)))
+                ]
+                for left, top, right, bottom in (word.box for word in kept)
+            ],
+            "confidences": [word.confidence for word in kept],
+            "text": ocr_text(words),
+            "image_size": (width, height),
+            "seconds": time.perf_counter() - started,
+            "dpi": refinement.dpi if refinement else None,
+            "refined_dpi": refinement.high_dpi if refined_regions else None,
+            "refined_regions": refined_regions,
+            "skew_angle": preprocessed.skew_angle,
+            "mean_confidence": round(mean_confidence(kept), 1)
+        }
+
+    except Exception as e:
+        logger.error(f"Erro no OCR: {e}")
+        return {
+            "words": [], "boxes": [], "confidences": [], "text": "",
+            "image_size": (0, 0), "seconds": time.perf_counter() - started
+        }
+
+
+def _image_to_data(image: np.ndarray) -> Dict[str, List]:
+    return pytesseract.image_to_data(image, config=TESSERACT_CONFIG, output_type=pytesseract.Output.DICT)
+
+
+def _refine_low_confidence_regions(
+    words: List[OcrWord],
+    preprocessed: PreprocessedImage,
+    refinement: OcrRefinement
+) -> Tuple[List[OcrWord], int]:
+    """
+    Refaz o OCR das regiões fracas na página rasterizada em alta resolução
+    (tons de cinza, com a mesma inclinação corrigida) e junta as palavras
+    """
+    height, width = preprocessed.image.shape[:2]
+    regions = low_confidence_regions(words, (width, height), settings.OCR_REFINE_MIN_CONFIDENCE)
+    if not regions:
+        return words, 0
+
+    page = rasterize_page(refinement.file_path, refinement.page_number, refinement.high_dpi, grayscale=True)
+    high = preprocess_for_ocr(
+        page,
+        skew_angle=preprocessed.skew_angle,
+        deskew=settings.OCR_PREPROCESS_ENABLED,
+        threshold=settings.OCR_PREPROCESS_ENABLED
+    ).image
+    del page
+
+    scale = high.shape[1] / width
+    refined = [
+        tesseract_words(
+            _image_to_data(high[int(top * scale):int(bottom * scale), int(left * scale):int(right * scale)]),
+            offset=(left, top),
+            scale=1 / scale,
+            line_prefix=(index,)
+        )
+        for index, (left, top, right, bottom) in enumerate(regions)
+    ]
+
+    return merge_refined_words(words, regions, refined)
+
+
+def new_stage_timings() -> Dict[str, float]:
+    """Acumulador de tempo por etapa (chaves '<etapa>_seconds')"""
+    return {f"{stage}_seconds": 0.0 for stage in PIPELINE_STAGES}
+
+
+def round_timings(timings: Dict[str, float]) -> Dict[str, float]:
+    """Arredonda os tempos para os metadados da resposta"""
+    return {key: round(value, 4) for key, value in timings.items()}
+
+
+def resolve_ocr_workers(workers: Optional[int] = None) -> int:
+    """Processos do pool de OCR (0/None = configuração ou CPUs disponíveis)"""
+    return workers or settings.PDF_OCR_WORKERS or os.cpu_count() or 1
+
+
+def get_ocr_executor(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Pool de processos de OCR compartilhado (criado sob demanda)"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            workers = resolve_ocr_workers(workers)
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(OCR_MP_START_METHOD)
+            )
+            logger.info(f"Pool de OCR iniciado com {workers} processos")
+        return _executor
+
+
+def replace_ocr_executor(broken: ProcessPoolExecutor) -> None:
+    """
+    Descarta um pool quebrado; o próximo get_ocr_executor cria outro
+
+    O OCR de outros documentos em andamento no pool atual não é cancelado.
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False)
+
+
+def shutdown_ocr_executor() -> None:
+    """Encerra o pool compartilhado (saída do processo)"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+atexit.register(shutdown_ocr_executor)
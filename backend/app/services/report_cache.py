@@ -0,0 +1,68 @@
+"""
+Cache das respostas do Executive Dashboard
+
+Instância compartilhada de ResponseCache para KPIs, gráficos e insights, com
+invalidação dirigida por eventos do SQLAlchemy: toda sessão que gravar
+movimentações de caixa, contas a receber/pagar ou vendas invalida, após o
+commit, apenas os workspaces afetados.
+"""
+
+import logging
+from typing import Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.cache import ResponseCache, build_cache_backend
+from app.core.config import settings
+from app.models.cash_flow import CashFlowTransaction
+from app.models.accounts_receivable import AccountsReceivable
+from app.models.accounts_payable import AccountsPayableInvoice
+from app.models.sale import Sale
+
+logger = logging.getLogger(__name__)
+
+# Modelos cujas gravações alteram os números do dashboard
+INVALIDATING_MODELS = (CashFlowTransaction, AccountsReceivable, AccountsPayableInvoice, Sale)
+
+# Chave em Session.info com os workspaces pendentes de invalidação
+_PENDING_KEY = "report_cache_workspaces"
+
+report_cache = ResponseCache(
+    build_cache_backend(
+        settings.REPORTS_CACHE_BACKEND,
+        settings.REDIS_URL,
+        settings.REPORTS_CACHE_MAX_ENTRIES
+    ),
+    default_ttl=settings.REPORTS_CACHE_TTL_SECONDS,
+    namespace="reports"
+)
+
+
+def invalidate_workspace(workspace_id: int) -> int:
+    """Remove as respostas em cache de um workspace"""
+    removed = report_cache.invalidate_workspace(workspace_id)
+    logger.debug(f"Cache de relatórios invalidado: workspace {workspace_id}, {removed} entradas")
+    return removed
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_workspaces(session: Session, flush_context) -> None:
+    """Registra os workspaces das instâncias gravadas neste flush"""
+    workspaces: Set[int] = session.info.setdefault(_PENDING_KEY, set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, INVALIDATING_MODELS) and instance.workspace_id is not None:
+            workspaces.add(instance.workspace_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    """Invalida os workspaces alterados somente após o commit"""
+    for workspace_id in session.info.pop(_PENDING_KEY, set()):
+        invalidate_workspace(workspace_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    """Alterações desfeitas não invalidam o cache"""
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,146 @@
+"""
+Motor vetorizado de projeção de cenários de Fluxo de Caixa
+
+Calcula todos os dias de N cenários de uma só vez com arrays NumPy (somas
+acumuladas, mínimo/máximo, decaimento de confiança). A conversão para
+schemas Pydantic acontece apenas na borda, permitindo avaliar centenas de
+combinações de premissas por requisição (grades de sensibilidade).
+"""
+
+import logging
+from typing import List, NamedTuple
+from datetime import date, timedelta
+import numpy as np
+
+from app.schemas.cash_flow import ScenarioProjectionPoint
+
+logger = logging.getLogger(__name__)
+
+
+class ScenarioBatch(NamedTuple):
+    """Resultado da projeção de N cenários por D dias (arrays N x D ou N)"""
+    entries: np.ndarray
+    exits: np.ndarray
+    net_flow: np.ndarray
+    balances: np.ndarray
+    confidence: np.ndarray
+    final_balance: np.ndarray
+    minimum_balance: np.ndarray
+    maximum_balance: np.ndarray
+    average_balance: np.ndarray
+    total_entries: np.ndarray
+    total_exits: np.ndarray
+    first_negative_day: np.ndarray
+
+    @property
+    def size(self) -> int:
+        return self.balances.shape[0]
+
+
+def confidence_curve(days_ahead: int) -> np.ndarray:
+    """Nível de confiança por dia (decai linearmente de 1.0 até 0.5)"""
+    day_index = np.arange(days_ahead, dtype=np.float64)
+    return np.maximum(0.5, 1.0 - (day_index / days_ahead) * 0.5)
+
+
+def project_scenarios(
+    days_ahead: int,
+    opening_balance,
+    base_entries,
+    receivable_entries,
+    delay_days,
+    base_exits,
+    one_time_income=0.0,
+    one_time_expense=0.0
+) -> ScenarioBatch:
+    """
+    Projeta N cenários simultaneamente
+
+    Para cada cenário i e dia d (0-based):
+        entradas[i, d] = base_entries[i] + receivable_entries[i] se d >= delay_days[i]
+        saídas[i, d] = base_exits[i]
+        saldo[i, d] = opening_balance[i] + one_time_income[i] - one_time_expense[i]
+                      + soma acumulada de (entradas - saídas) até d
+
+    Todos os parâmetros aceitam escalares ou arrays de tamanho N (broadcast).
+    O mínimo/máximo consideram também o saldo de abertura, e os totais incluem
+    receitas/despesas únicas.
+
+    Returns:
+        ScenarioBatch com arrays por cenário/dia e métricas por cenário
+    """
+    parameters = np.broadcast_arrays(
+        np.asarray(opening_balance, dtype=np.float64),
+        np.asarray(base_entries, dtype=np.float64),
+        np.asarray(receivable_entries, dtype=np.float64),
+        np.asarray(delay_days, dtype=np.float64),
+        np.asarray(base_exits, dtype=np.float64),
+        np.asarray(one_time_income, dtype=np.float64),
+        np.asarray(one_time_expense, dtype=np.float64),
+    )
+    opening, entries_base, receivables, delays, exits_base, income, expense = (
+        np.atleast_1d(p) for p in parameters
+    )
+
+    day_index = np.arange(days_ahead)
+    collecting = day_index[np.newaxis, :] >= delays[:, np.newaxis]
+
+    entries = np.where(
+        collecting,
+        entries_base[:, np.newaxis] + receivables[:, np.newaxis],
+        entries_base[:, np.newaxis]
+    )
+    exits = np.broadcast_to(exits_base[:, np.newaxis], entries.shape)
+    net_flow = entries - exits
+
+    # Saldo inicial como primeira coluna para acumular na mesma ordem do loop diário
+    start = opening + income - expense
+    balances = np.cumsum(np.column_stack([start, net_flow]), axis=1)[:, 1:]
+
+    negative = balances < 0
+    first_negative_day = np.where(negative.any(axis=1), negative.argmax(axis=1), -1)
+
+    if days_ahead > 0:
+        minimum_balance = np.minimum(opening, balances.min(axis=1))
+        maximum_balance = np.maximum(opening, balances.max(axis=1))
+        average_balance = balances.mean(axis=1)
+        final_balance = balances[:, -1]
+    else:
+        minimum_balance = maximum_balance = final_balance = start
+        average_balance = np.zeros_like(start)
+
+    return ScenarioBatch(
+        entries=entries,
+        exits=exits,
+        net_flow=net_flow,
+        balances=balances,
+        confidence=confidence_curve(days_ahead),
+        final_balance=final_balance,
+        minimum_balance=minimum_balance,
+        maximum_balance=maximum_balance,
+        average_balance=average_balance,
+        total_entries=income + entries.sum(axis=1),
+        total_exits=expense + exits.sum(axis=1),
+        first_negative_day=first_negative_day
+    )
+
+
+def to_projection_points(batch: ScenarioBatch, index: int, start_date: date) -> List[ScenarioProjectionPoint]:
+    """Serializa os dias de um cenário do lote em ScenarioProjectionPoint"""
+    entries = batch.entries[index].tolist()
+    exits = batch.exits[index].tolist()
+    net_flow = batch.net_flow[index].tolist()
+    balances = batch.balances[index].tolist()
+    confidence = batch.confidence.tolist()
+
+    return [
+        ScenarioProjectionPoint(
+            projection_date=start_date + timedelta(days=day + 1),
+            projected_balance=balances[day],
+            projected_entries=entries[day],
+            projected_exits=exits[day],
+            net_flow=net_flow[day],
+            confidence_level=confidence[day]
+        )
+        for day in range(len(balances))
+    ]
@@ -0,0 +1,215 @@
+"""
+Cache de índices de fornecedores por workspace
+
+Compartilhado por todas as requisições do processo: o SupplierMatcher de cada
+upload reaproveita o SupplierMatchIndex do workspace em vez de recarregar e
+normalizar a tabela de fornecedores.
+
+Cada workspace tem um número de versão, incrementado na invalidação. Um
+índice carregado enquanto a versão mudou (fornecedor gravado durante a
+carga) é usado pela requisição que o carregou, mas não é guardado.
+
+A invalidação é dirigida por eventos do SQLAlchemy, como em report_cache:
+toda sessão que criar, alterar, excluir ou mesclar fornecedores (endpoints de
+fornecedores e de contas a pagar, SupplierMatcher.create_or_get_supplier)
+invalida, após o commit, apenas os workspaces afetados. Outros processos não
+recebem a invalidação; para eles vale a validade (TTL) de cada índice.
+
+Limites de memória: número de workspaces e total de fornecedores indexados,
+com descarte do workspace usado há mais tempo (LRU).
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.supplier_model import Supplier
+from app.services.supplier_match_index import SupplierMatchIndex
+
+logger = logging.getLogger(__name__)
+
+# Chave em Session.info com os workspaces pendentes de invalidação
+_PENDING_KEY = "supplier_index_workspaces"
+
+
+class CachedSupplierIndex(NamedTuple):
+    """Índice guardado com a versão do workspace em que foi carregado"""
+    index: SupplierMatchIndex
+    version: int
+    expires_at: float
+
+
+class SupplierIndexCache:
+    """
+    Índices de fornecedores por workspace, com versão, TTL e limites LRU
+
+    Args:
+        max_workspaces: Workspaces mantidos em memória
+        max_suppliers: Total de fornecedores indexados entre todos os workspaces
+        ttl_seconds: Validade de cada índice (0 = sem expiração)
+    """
+
+    def __init__(self, max_workspaces: int = 64, max_suppliers: int = 200000, ttl_seconds: float = 600):
+        self.max_workspaces = max_workspaces
+        self.max_suppliers = max_suppliers
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, CachedSupplierIndex]" = OrderedDict()
+        self._versions: Dict[int, int] = defaultdict(int)
+        self._suppliers = 0
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, int] = defaultdict(int)
+
+    def get(self, workspace_id: int, load: Callable[[], List[Dict[str, Any]]]) -> SupplierMatchIndex:
+        """
+        Índice do workspace em cache ou montado com load() (lista no formato
+        de SupplierMatcher._get_suppliers_cache)
+        """
+        with self._lock:
+            version = self._versions[workspace_id]
+            entry = self._entries.get(workspace_id)
+            if entry is not None and entry.version == version and not self._expired(entry):
+                self._entries.move_to_end(workspace_id)
+                self._metrics["hits"] += 1
+                return entry.index
+            self._metrics["misses"] += 1
+
+        started = time.perf_counter()
+        index = SupplierMatchIndex(load())
+        load_seconds = time.perf_counter() - started
+
+        with self._lock:
+            self._metrics["loads"] += 1
+            if self._versions[workspace_id] != version:
+                self._metrics["stale_loads"] += 1
+            else:
+                self._store(workspace_id, CachedSupplierIndex(index, version, self._expiry()))
+
+        logger.debug(
+            f"Índice de fornecedores carregado: workspace {workspace_id}, "
+            f"{len(index)} fornecedores em {load_seconds * 1000:.0f} ms"
+        )
+        return index
+
+    def invalidate_workspace(self, workspace_id: int) -> bool:
+        """Descarta o índice do workspace; retorna se havia um em cache"""
+        with self._lock:
+            self._versions[workspace_id] += 1
+            self._metrics["invalidations"] += 1
+            removed = self._remove(workspace_id)
+
+        logger.debug(f"Índice de fornecedores invalidado: workspace {workspace_id}")
+        return removed
+
+    def clear(self) -> None:
+        """Descarta todos os índices e zera as métricas"""
+        with self._lock:
+            for workspace_id in list(self._entries):
+                self._versions[workspace_id] += 1
+            self._entries.clear()
+            self._suppliers = 0
+            self._metrics.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hits, misses, cargas, invalidações e ocupação"""
+        with self._lock:
+            hits = self._metrics["hits"]
+            misses = self._metrics["misses"]
+            return {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "loads": self._metrics["loads"],
+                "stale_loads": self._metrics["stale_loads"],
+                "invalidations": self._metrics["invalidations"],
+                "evictions": self._metrics["evictions"],
+                "workspaces": len(self._entries),
+                "suppliers": self._suppliers,
+                "max_workspaces": self.max_workspaces,
+                "max_suppliers": self.max_suppliers
+            }
+
+    def _store(self, workspace_id: int, entry: CachedSupplierIndex) -> None:
+        self._remove(workspace_id)
+        self._entries[workspace_id] = entry
+        self._suppliers += len(entry.index)
+
+        # Mantém ao menos o índice recém-carregado, mesmo acima do limite
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_workspaces or self._suppliers > self.max_suppliers
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._metrics["evictions"] += 1
+
+    def _remove(self, workspace_id: int) -> bool:
+        entry = self._entries.pop(workspace_id, None)
+        if entry is None:
+            return False
+        self._suppliers -= len(entry.index)
+        return True
+
+    def _expiry(self) -> float:
+        return time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else float("inf")
+
+    @staticmethod
+    def _expired(entry: CachedSupplierIndex) -> bool:
+        return time.monotonic() >= entry.expires_at
+
+
+supplier_index_cache = SupplierIndexCache(
+    max_workspaces=settings.SUPPLIER_INDEX_CACHE_MAX_WORKSPACES,
+    max_suppliers=settings.SUPPLIER_INDEX_CACHE_MAX_SUPPLIERS,
+    ttl_seconds=settings.SUPPLIER_INDEX_CACHE_TTL_SECONDS
+)
+
+
+def warm_supplier_index_cache(db: Session, max_workspaces: Optional[int] = None) -> int:
+    """
+    Carrega os índices dos workspaces com mais fornecedores ativos
+    (na inicialização da API); retorna quantos foram carregados
+    """
+    from app.services.supplier_matcher import SupplierMatcher
+
+    limit = max_workspaces or supplier_index_cache.max_workspaces
+    workspace_ids = [
+        workspace_id
+        for workspace_id, _ in db.query(Supplier.workspace_id, func.count(Supplier.id))
+        .filter(Supplier.active == True)
+        .group_by(Supplier.workspace_id)
+        .order_by(func.count(Supplier.id).desc())
+        .limit(limit)
+        .all()
+    ]
+
+    for workspace_id in workspace_ids:
+        SupplierMatcher(db, workspace_id)._get_suppliers_cache()
+
+    return len(workspace_ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_workspaces(session: Session, flush_context) -> None:
+    """Registra os workspaces dos fornecedores gravados neste flush"""
+    workspaces: Set[int] = session.info.setdefault(_PENDING_KEY, set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, Supplier) and instance.workspace_id is not None:
+            workspaces.add(instance.workspace_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    """Invalida os workspaces alterados somente após o commit"""
+    for workspace_id in session.info.pop(_PENDING_KEY, set()):
+        supplier_index_cache.invalidate_workspace(workspace_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    """Alterações desfeitas não invalidam o cache"""
+    session.info.pop(_PENDING_KEY, None)
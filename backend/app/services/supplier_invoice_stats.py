@@ -0,0 +1,168 @@
+"""
+Histórico agregado de faturas por fornecedor (supplier_invoice_stats)
+
+Mantém uma linha por workspace/fornecedor/nome/CNPJ com a quantidade de
+faturas e a data da mais recente. O SupplierMatcher lê o histórico de um
+workspace e as contagens de faturas dos candidatos em uma consulta cada, em
+vez de varrer invoices por candidato.
+
+Atualização incremental a cada fatura inserida (endpoints de faturas e de
+contas a pagar), com o nome e o documento do fornecedor naquele momento:
+um fornecedor renomeado continua encontrável pelos nomes antigos. Exclusões
+de faturas não são descontadas (é um histórico de nomes vistos); o backfill
+inicial está em migration_020_supplier_invoice_stats.sql.
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.core.database import upsert_insert
+from app.models.supplier_model import Supplier, SupplierInvoiceStat
+from app.services.supplier_match_index import normalize_cnpj
+
+logger = logging.getLogger(__name__)
+
+
+class SupplierHistoryEntry(NamedTuple):
+    """Nome/CNPJ com que um fornecedor apareceu nas faturas"""
+    supplier_id: int
+    name: str
+    cnpj: str
+    invoice_count: int
+    last_seen_date: Optional[date]
+
+
+class SupplierInvoiceStats:
+    """
+    Manutenção e consulta do histórico de faturas por fornecedor
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # ============================================
+    # MANUTENÇÃO INCREMENTAL
+    # ============================================
+
+    def record_invoice(
+        self,
+        invoice,
+        supplier_name: Optional[str] = None,
+        supplier_cnpj: Optional[str] = None
+    ) -> None:
+        """
+        Conta uma fatura nova (Invoice ou AccountsPayableInvoice) no histórico
+        do fornecedor (não faz commit)
+
+        Args:
+            invoice: Fatura com workspace_id, supplier_id e invoice_date
+            supplier_name: Nome impresso na fatura (padrão: nome atual do fornecedor)
+            supplier_cnpj: CNPJ impresso na fatura (padrão: documento do fornecedor)
+        """
+        if not invoice.supplier_id:
+            return
+
+        if supplier_name is None or supplier_cnpj is None:
+            supplier = self.db.query(Supplier).filter(
+                Supplier.id == invoice.supplier_id,
+                Supplier.workspace_id == invoice.workspace_id
+            ).first()
+            if not supplier:
+                return
+            supplier_name = supplier_name or supplier.name
+            supplier_cnpj = supplier_cnpj if supplier_cnpj is not None else supplier.document
+
+        self.record(invoice.workspace_id, invoice.supplier_id, supplier_name, supplier_cnpj, invoice.invoice_date)
+
+    def record(
+        self,
+        workspace_id: int,
+        supplier_id: int,
+        name: str,
+        cnpj: Optional[str],
+        invoice_date: Optional[date]
+    ) -> None:
+        """
+        Soma uma fatura à linha do nome/CNPJ do fornecedor (não faz commit)
+
+        Um único upsert (ON CONFLICT): faturas simultâneas do mesmo
+        fornecedor não colidem na constraint única nem perdem incrementos.
+        """
+        name = (name or '').strip()[:255]
+        cnpj = normalize_cnpj(cnpj)
+        if isinstance(invoice_date, datetime):
+            invoice_date = invoice_date.date()
+
+        table = SupplierInvoiceStat.__table__
+        upsert = upsert_insert(self.db, table).values(
+            workspace_id=workspace_id,
+            supplier_id=supplier_id,
+            name=name,
+            cnpj=cnpj,
+            invoice_count=1,
+            last_seen_date=invoice_date,
+            updated_at=datetime.utcnow()
+        )
+        # GREATEST das datas ignorando NULL (também no SQLite dos testes)
+        last_seen_date = case(
+            (upsert.excluded.last_seen_date.is_(None), table.c.last_seen_date),
+            (table.c.last_seen_date.is_(None), upsert.excluded.last_seen_date),
+            (upsert.excluded.last_seen_date > table.c.last_seen_date, upsert.excluded.last_seen_date),
+            else_=table.c.last_seen_date
+        )
+
+        self.db.execute(upsert.on_conflict_do_update(
+            index_elements=['workspace_id', 'supplier_id', 'name', 'cnpj'],
+            set_={
+                'invoice_count': table.c.invoice_count + 1,
+                'last_seen_date': last_seen_date,
+                'updated_at': upsert.excluded.updated_at
+            }
+        ))
+
+    # ============================================
+    # CONSULTAS
+    # ============================================
+
+    def history(self, workspace_id: Optional[int]) -> List[SupplierHistoryEntry]:
+        """Todos os nomes/CNPJs do histórico do workspace (None = todos)"""
+        query = self.db.query(
+            SupplierInvoiceStat.supplier_id,
+            SupplierInvoiceStat.name,
+            SupplierInvoiceStat.cnpj,
+            SupplierInvoiceStat.invoice_count,
+            SupplierInvoiceStat.last_seen_date
+        )
+        if workspace_id is not None:
+            query = query.filter(SupplierInvoiceStat.workspace_id == workspace_id)
+
+        return [SupplierHistoryEntry(*row) for row in query.order_by(SupplierInvoiceStat.id).all()]
+
+    def invoice_counts(self, supplier_ids: Iterable[int], workspace_id: Optional[int] = None) -> Dict[int, int]:
+        """Total de faturas de cada fornecedor (ausentes = 0)"""
+        supplier_ids = {supplier_id for supplier_id in supplier_ids if supplier_id}
+        if not supplier_ids:
+            return {}
+
+        query = self.db.query(
+            SupplierInvoiceStat.supplier_id,
+            func.sum(SupplierInvoiceStat.invoice_count)
+        ).filter(SupplierInvoiceStat.supplier_id.in_(supplier_ids))
+        if workspace_id is not None:
+            query = query.filter(SupplierInvoiceStat.workspace_id == workspace_id)
+
+        return {supplier_id: int(count or 0) for supplier_id, count in query.group_by(SupplierInvoiceStat.supplier_id).all()}
+
+    def count_for_name(self, name: str, cnpj: Optional[str] = None, workspace_id: Optional[int] = None) -> int:
+        """Faturas registradas com um nome (e CNPJ, se informado)"""
+        query = self.db.query(func.sum(SupplierInvoiceStat.invoice_count)).filter(SupplierInvoiceStat.name == name)
+        if cnpj:
+            query = query.filter(SupplierInvoiceStat.cnpj == normalize_cnpj(cnpj))
+        if workspace_id is not None:
+            query = query.filter(SupplierInvoiceStat.workspace_id == workspace_id)
+
+        return int(query.scalar() or 0)
@@ -0,0 +1,154 @@
+"""
+Índice de matching de fornecedores
+
+Montado uma vez por lista de fornecedores (um workspace) e reaproveitado em
+todas as buscas:
+- CNPJ: mapa dígitos normalizados -> fornecedor (O(1) por consulta)
+- Nome: índice invertido de trigramas por palavra (" ab", "abc", "bc ")
+  usado como bloqueio; só os nomes que compartilham ao menos
+  BLOCKING_MIN_OVERLAP dos trigramas do menor dos dois textos são pontuados
+- Pontuação: rapidfuzz (ratio, token_sort_ratio e partial_ratio) em lote
+  sobre os candidatos, com os nomes já pré-processados
+
+Os resultados reproduzem a varredura completa anterior (thefuzz
+process.extract sobre todos os nomes): mesmo pré-processamento
+(full_process), mesmos scores arredondados e o mesmo desempate pela ordem
+dos fornecedores na lista (o bloqueio é conferido contra ela nos testes).
+"""
+
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from thefuzz.utils import full_process
+
+# Fração mínima de trigramas em comum (relativa ao menor dos dois textos)
+# para um nome ser pontuado. Com 0.2 o partial_ratio já perdia nomes com
+# score 70+ em alguns erros de OCR; 0.1 reproduz a varredura completa nos
+# testes (tests/unit/test_supplier_match_index.py)
+BLOCKING_MIN_OVERLAP = 0.1
+
+# Consultas mais curtas que isso são comparadas com todos os nomes: o
+# partial_ratio alinha pedaços de 2-3 caracteres ("123" x "512" = 80) que
+# não compartilham trigramas
+BLOCKING_MIN_QUERY_LENGTH = 6
+
+# Algoritmos de similaridade aplicados aos candidatos, na ordem de prioridade
+# do desempate (o primeiro com o maior score define o método)
+NAME_SCORERS = (
+    ('ratio', fuzz.ratio),
+    ('token_sort', fuzz.token_sort_ratio),
+    ('partial', fuzz.partial_ratio),
+)
+
+
+class NameMatch(NamedTuple):
+    """Fornecedor encontrado por nome"""
+    supplier: Dict[str, Any]
+    score: int
+    method: str
+
+
+def normalize_cnpj(cnpj: Optional[str]) -> str:
+    """Apenas os dígitos do CNPJ/CPF"""
+    return re.sub(r'\D', '', cnpj or '')
+
+
+def name_trigrams(text: str) -> set:
+    """Trigramas de cada palavra, com espaço nas bordas"""
+    trigrams = set()
+    for token in text.split():
+        padded = f" {token} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+class SupplierMatchIndex:
+    """
+    Índice de busca por CNPJ e nome sobre uma lista de fornecedores
+
+    Args:
+        suppliers: Dicionários com supplier_id, name, cnpj, category e
+            normalized_name (ver SupplierMatcher._get_suppliers_cache)
+    """
+
+    def __init__(self, suppliers: List[Dict[str, Any]]):
+        self.suppliers = suppliers
+
+        self._by_cnpj: Dict[str, Dict[str, Any]] = {}
+        for supplier in suppliers:
+            if supplier.get('cnpj'):
+                self._by_cnpj.setdefault(normalize_cnpj(supplier['cnpj']), supplier)
+
+        # Nomes repetidos apontam para o primeiro fornecedor com o mesmo nome
+        first_by_name: Dict[str, Dict[str, Any]] = {}
+        for supplier in suppliers:
+            first_by_name.setdefault(supplier['normalized_name'], supplier)
+        self._owners = [first_by_name[supplier['normalized_name']] for supplier in suppliers]
+        self._names = [full_process(supplier['normalized_name']) for supplier in suppliers]
+
+        postings: Dict[str, List[int]] = {}
+        self._trigram_counts = np.zeros(len(suppliers), dtype=np.int32)
+        for position, name in enumerate(self._names):
+            trigrams = name_trigrams(name)
+            self._trigram_counts[position] = len(trigrams)
+            for trigram in trigrams:
+                postings.setdefault(trigram, []).append(position)
+
+        self._postings = {trigram: np.array(positions, dtype=np.int32) for trigram, positions in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.suppliers)
+
+    def find_by_cnpj(self, cnpj: str) -> Optional[Dict[str, Any]]:
+        """Primeiro fornecedor com o mesmo CNPJ (ignorando formatação)"""
+        return self._by_cnpj.get(normalize_cnpj(cnpj))
+
+    def candidates(self, query: str) -> np.ndarray:
+        """Posições (em ordem) dos nomes que passam pelo bloqueio de trigramas"""
+        if len(query) < BLOCKING_MIN_QUERY_LENGTH:
+            return np.arange(len(self._names))
+
+        trigrams = name_trigrams(query)
+        arrays = [self._postings[trigram] for trigram in trigrams if trigram in self._postings]
+        if not arrays:
+            return np.empty(0, dtype=np.int64)
+
+        shared = np.bincount(np.concatenate(arrays), minlength=len(self._names))
+        smaller = np.maximum(np.minimum(self._trigram_counts, len(trigrams)), 1)
+        required = np.maximum(np.ceil(smaller * BLOCKING_MIN_OVERLAP), 1)
+        return np.flatnonzero(shared >= required)
+
+    def search(self, normalized_target: str, limit: int, min_score: int) -> List[NameMatch]:
+        """
+        Melhores fornecedores por nome (score >= min_score), ordenados por score
+
+        Cada algoritmo contribui com seus limit * 2 melhores nomes e cada
+        fornecedor fica com o maior score obtido.
+        """
+        query = full_process(normalized_target)
+        if not query:
+            return []
+
+        positions = self.candidates(query)
+        if not len(positions):
+            return []
+
+        choices = [self._names[position] for position in positions]
+        best: Dict[Any, NameMatch] = {}
+
+        for method, scorer in NAME_SCORERS:
+            for _, raw_score, choice_index in process.extract(
+                query, choices, scorer=scorer, processor=None, limit=limit * 2
+            ):
+                score = int(round(raw_score))
+                if score < min_score:
+                    continue
+
+                supplier = self._owners[positions[choice_index]]
+                current = best.get(supplier['supplier_id'])
+                if current is None or current.score < score:
+                    best[supplier['supplier_id']] = NameMatch(supplier, score, method)
+
+        return sorted(best.values(), key=lambda match: match.score, reverse=True)[:limit]
@@ -8,6 +8,9 @@ from sqlalchemy.orm import Session
 from app.models.supplier_model import Supplier
 from app.models.invoice_model import Invoice
 from app.core.database import get_db
+from app.services.supplier_match_index import SupplierMatchIndex, normalize_cnpj
+from app.services.supplier_invoice_stats import SupplierInvoiceStats
+from app.services.supplier_index_cache import supplier_index_cache
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -18,15 +21,22 @@ class SupplierMatcher:
     Serviço para fuzzy matching de fornecedores existentes
     """
 
-    def __init__(self, db: Session):
-        """Inicializa o matcher"""
+    def __init__(self, db: Session, workspace_id: Optional[int] = None):
+        """
+        Inicializa o matcher
+
+        Args:
+            db: Sessão do banco
+            workspace_id: Restringe a busca aos fornecedores do workspace
+        """
         self.db = db
+        self.workspace_id = workspace_id
         self.min_score = 70  # Score mínimo para considerar uma correspondência
         self.excellent_score = 90  # Score para consideração como correspondência excelente
 
-        # Cache para fornecedores
+        # Cache para fornecedores e índice de busca montado sobre ele
         self._suppliers_cache = None
-        self._suppliers_normalized_cache = None
+        self._match_index: Optional[SupplierMatchIndex] = None
 
         logger.info("SupplierMatcher inicializado")
 
@@ -184,49 +194,58 @@ class SupplierMatcher:
         """Obtém fornecedores do cache ou carrega do banco"""
 
         if self._suppliers_cache is None:
-            suppliers = self.db.query(Supplier).filter(Supplier.is_active == True).all()
-
-            self._suppliers_cache = []
-            self._suppliers_normalized_cache = {}
-
-            for supplier in suppliers:
-                supplier_dict = {
-                    'supplier_id': supplier.id,
-                    'name': supplier.name,
-                    'cnpj': supplier.cnpj,
-                    'category': supplier.category,
-                    'normalized_name': self._normalize_text(supplier.name)
-                }
-
-                self._suppliers_cache.append(supplier_dict)
-                self._suppliers_normalized_cache[supplier.id] = supplier_dict
+            if self.workspace_id is not None:
+                # Índice do workspace compartilhado entre as requisições
+                self._match_index = supplier_index_cache.get(self.workspace_id, self._load_suppliers)
+                self._suppliers_cache = self._match_index.suppliers
+            else:
+                self._suppliers_cache = self._load_suppliers()
 
         return self._suppliers_cache
 
+    def _load_suppliers(self) -> List[Dict[str, Any]]:
+        """Carrega e normaliza os fornecedores ativos do banco"""
+
+        query = self.db.query(Supplier).filter(Supplier.active == True)
+        if self.workspace_id is not None:
+            query = query.filter(Supplier.workspace_id == self.workspace_id)
+
+        return [
+            {
+                'supplier_id': supplier.id,
+                'name': supplier.name,
+                'cnpj': supplier.document,
+                'category': None,  # Supplier não tem categoria
+                'normalized_name': self._normalize_text(supplier.name)
+            }
+            for supplier in query.all()
+        ]
+
+    def _get_match_index(self, suppliers: List[Dict[str, Any]]) -> SupplierMatchIndex:
+        """Índice de busca da lista de fornecedores (montado uma vez por lista)"""
+        if self._match_index is None or self._match_index.suppliers is not suppliers:
+            self._match_index = SupplierMatchIndex(suppliers)
+        return self._match_index
+
     def _find_by_cnpj(self, cnpj: str, suppliers: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
         """Busca fornecedor por CNPJ exato"""
 
         if not cnpj:
             return None
 
-        # Normaliza CNPJ (remove formatação)
-        clean_cnpj = re.sub(r'\D', '', cnpj)
+        # CNPJ normalizado (sem formatação) no mapa do índice
+        supplier = self._get_match_index(suppliers).find_by_cnpj(cnpj)
 
-        for supplier in suppliers:
-            supplier_cnpj = supplier.get('cnpj', '')
-            if supplier_cnpj:
-                clean_supplier_cnpj = re.sub(r'\D', '', supplier_cnpj)
-
-                if clean_cnpj == clean_supplier_cnpj:
-                    return {
-                        'supplier_id': supplier['supplier_id'],
-                        'name': supplier['name'],
-                        'cnpj': supplier['cnpj'],
-                        'category': supplier['category'],
-                        'score': 100,
-                        'match_reason': 'CNPJ exato',
-                        'match_type': 'exact_cnpj'
-                    }
+        if supplier:
+            return {
+                'supplier_id': supplier['supplier_id'],
+                'name': supplier['name'],
+                'cnpj': supplier['cnpj'],
+                'category': supplier['category'],
+                'score': 100,
+                'match_reason': 'CNPJ exato',
+                'match_type': 'exact_cnpj'
+            }
 
         return None
 
@@ -243,67 +262,22 @@ class SupplierMatcher:
 
         normalized_target = self._normalize_text(target_name)
 
-        # Lista de nomes para matching
-        supplier_names = [supplier['normalized_name'] for supplier in suppliers]
-
-        # Fuzzy matching usando diferentes algoritmos
-        matches = []
-
-        # 1. Ratio simples
-        ratio_matches = process.extract(
-            normalized_target,
-            supplier_names,
-            scorer=fuzz.ratio,
-            limit=limit * 2
-        )
-
-        # 2. Token sort ratio (ignora ordem das palavras)
-        token_sort_matches = process.extract(
-            normalized_target,
-            supplier_names,
-            scorer=fuzz.token_sort_ratio,
-            limit=limit * 2
-        )
-
-        # 3. Partial ratio (substring matching)
-        partial_matches = process.extract(
-            normalized_target,
-            supplier_names,
-            scorer=fuzz.partial_ratio,
-            limit=limit * 2
-        )
-
-        # Combina resultados
-        all_matches = {}
-
-        for match_list, method in [
-            (ratio_matches, 'ratio'),
-            (token_sort_matches, 'token_sort'),
-            (partial_matches, 'partial')
-        ]:
-            for name, score in match_list:
-                if score >= self.min_score:
-                    # Encontra fornecedor original
-                    supplier = next((s for s in suppliers if s['normalized_name'] == name), None)
-
-                    if supplier:
-                        supplier_id = supplier['supplier_id']
-
-                        if supplier_id not in all_matches or all_matches[supplier_id]['score'] < score:
-                            all_matches[supplier_id] = {
-                                'supplier_id': supplier_id,
-                                'name': supplier['name'],
-                                'cnpj': supplier['cnpj'],
-                                'category': supplier['category'],
-                                'score': score,
-                                'match_reason': f'Fuzzy matching ({method})',
-                                'match_type': f'fuzzy_{method}'
-                            }
-
-        # Ordena por score e limita resultados
-        sorted_matches = sorted(all_matches.values(), key=lambda x: x['score'], reverse=True)
-
-        return sorted_matches[:limit]
+        # Candidatos pelo índice de trigramas, pontuados com ratio, token sort
+        # ratio (ignora ordem das palavras) e partial ratio (substring)
+        name_matches = self._get_match_index(suppliers).search(normalized_target, limit, self.min_score)
+
+        return [
+            {
+                'supplier_id': match.supplier['supplier_id'],
+                'name': match.supplier['name'],
+                'cnpj': match.supplier['cnpj'],
+                'category': match.supplier['category'],
+                'score': match.score,
+                'match_reason': f'Fuzzy matching ({match.method})',
+                'match_type': f'fuzzy_{match.method}'
+            }
+            for match in name_matches
+        ]
 
     def _find_in_invoice_history(
         self,
@@ -311,80 +285,55 @@ class SupplierMatcher:
         supplier_cnpj: str,
         limit: int
     ) -> List[Dict[str, Any]]:
-        """Busca em histórico de faturas"""
+        """Busca nos nomes/CNPJs com que os fornecedores apareceram nas faturas"""
 
         try:
-            # Busca faturas com nomes similares
-            invoices_query = self.db.query(Invoice).filter(Invoice.supplier_name.isnot(None))
+            # Histórico agregado do workspace em uma consulta
+            history = SupplierInvoiceStats(self.db).history(self.workspace_id)
+            if not history:
+                return []
 
             if supplier_cnpj:
                 # Primeiro tenta por CNPJ
-                clean_cnpj = re.sub(r'\D', '', supplier_cnpj)
-                cnpj_invoices = invoices_query.filter(
-                    Invoice.supplier_cnpj.isnot(None)
-                ).all()
-
-                for invoice in cnpj_invoices:
-                    if invoice.supplier_cnpj:
-                        clean_invoice_cnpj = re.sub(r'\D', '', invoice.supplier_cnpj)
-                        if clean_cnpj == clean_invoice_cnpj:
-                            return [{
-                                'supplier_id': None,
-                                'name': invoice.supplier_name,
-                                'cnpj': invoice.supplier_cnpj,
-                                'category': invoice.category,
-                                'score': 100,
-                                'match_reason': 'Histórico de faturas (CNPJ)',
-                                'match_type': 'historical_cnpj',
-                                'invoice_count': self._count_invoices_for_supplier(invoice.supplier_name, invoice.supplier_cnpj)
-                            }]
-
-            # Fuzzy matching em nomes de faturas
-            all_invoices = invoices_query.all()
-            unique_suppliers = {}
-
-            for invoice in all_invoices:
-                key = f"{invoice.supplier_name}|{invoice.supplier_cnpj or ''}"
-                if key not in unique_suppliers:
-                    unique_suppliers[key] = {
-                        'name': invoice.supplier_name,
-                        'cnpj': invoice.supplier_cnpj,
-                        'category': invoice.category,
-                        'count': 0
-                    }
-                unique_suppliers[key]['count'] += 1
-
-            # Aplica fuzzy matching nos nomes únicos
-            supplier_names = [data['name'] for data in unique_suppliers.values()]
-            normalized_target = self._normalize_text(supplier_name)
+                clean_cnpj = normalize_cnpj(supplier_cnpj)
+                for entry in history:
+                    if entry.cnpj and entry.cnpj == clean_cnpj:
+                        return [{
+                            'supplier_id': entry.supplier_id,
+                            'name': entry.name,
+                            'cnpj': entry.cnpj,
+                            'category': None,
+                            'score': 100,
+                            'match_reason': 'Histórico de faturas (CNPJ)',
+                            'match_type': 'historical_cnpj',
+                            'invoice_count': entry.invoice_count
+                        }]
+
+            if not supplier_name:
+                return []
 
+            # Fuzzy matching nos nomes do histórico
             fuzzy_matches = process.extract(
-                normalized_target,
-                supplier_names,
+                self._normalize_text(supplier_name),
+                {position: self._normalize_text(entry.name) for position, entry in enumerate(history)},
                 scorer=fuzz.token_sort_ratio,
                 limit=limit
             )
 
             results = []
-            for name, score in fuzzy_matches:
+            for _, score, position in fuzzy_matches:
                 if score >= self.min_score:
-                    # Encontra dados do fornecedor
-                    supplier_data = next(
-                        (data for data in unique_suppliers.values() if data['name'] == name),
-                        None
-                    )
-
-                    if supplier_data:
-                        results.append({
-                            'supplier_id': None,
-                            'name': supplier_data['name'],
-                            'cnpj': supplier_data['cnpj'],
-                            'category': supplier_data['category'],
-                            'score': score,
-                            'match_reason': f'Histórico de faturas ({supplier_data["count"]} faturas)',
-                            'match_type': 'historical_fuzzy',
-                            'invoice_count': supplier_data['count']
-                        })
+                    entry = history[position]
+                    results.append({
+                        'supplier_id': entry.supplier_id,
+                        'name': entry.name,
+                        'cnpj': entry.cnpj,
+                        'category': None,
+                        'score': score,
+                        'match_reason': f'Histórico de faturas ({entry.invoice_count} faturas)',
+                        'match_type': 'historical_fuzzy',
+                        'invoice_count': entry.invoice_count
+                    })
 
             return results
 
@@ -394,12 +343,7 @@ class SupplierMatcher:
 
     def _count_invoices_for_supplier(self, name: str, cnpj: str = None) -> int:
         """Conta faturas para um fornecedor"""
-        query = self.db.query(Invoice).filter(Invoice.supplier_name == name)
-
-        if cnpj:
-            query = query.filter(Invoice.supplier_cnpj == cnpj)
-
-        return query.count()
+        return SupplierInvoiceStats(self.db).count_for_name(name, cnpj, self.workspace_id)
 
     def _deduplicate_and_rank(
         self,
@@ -423,6 +367,18 @@ class SupplierMatcher:
                 seen.add(key)
                 unique_matches.append(match)
 
+        # Contagem de faturas dos candidatos para o desempate, em uma consulta
+        missing_counts = [match['supplier_id'] for match in unique_matches
+                          if match.get('supplier_id') and 'invoice_count' not in match]
+        if missing_counts:
+            try:
+                counts = SupplierInvoiceStats(self.db).invoice_counts(missing_counts, self.workspace_id)
+                for match in unique_matches:
+                    if match.get('supplier_id') and 'invoice_count' not in match:
+                        match['invoice_count'] = counts.get(match['supplier_id'], 0)
+            except Exception as e:
+                logger.error(f"Erro ao contar faturas dos fornecedores: {e}")
+
         # Ordena por score, depois por tipo de match, depois por contagem de faturas
         def sort_key(match):
             score = match['score']
@@ -507,7 +463,7 @@ class SupplierMatcher:
     def _clear_cache(self):
         """Limpa cache de fornecedores"""
         self._suppliers_cache = None
-        self._suppliers_normalized_cache = None
+        self._match_index = None
 
     def get_supplier_statistics(self) -> Dict[str, Any]:
         """Retorna estatísticas dos fornecedores"""
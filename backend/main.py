@@ -1,7 +1,7 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
-from app.core.database import init_db, engine
+from app.core.database import init_db, engine, SessionLocal
 from app.core.config import settings
 from app.api.api_v1.api import api_router
 from app.models import Base
@@ -137,6 +137,38 @@ async def startup_event():
         print(f"WARNING: Could not create database tables: {e}")
         print("Application will continue, but database operations may fail")
 
+    # Carrega e aquece o LayoutLM uma vez por processo antes da primeira requisição
+    if settings.LAYOUTLM_PRELOAD:
+        try:
+            import asyncio
+            from app.services.layout_lm_registry import model_registry
+
+            loaded = await asyncio.get_running_loop().run_in_executor(None, model_registry.preload)
+            print(
+                f"LayoutLM model loaded: {loaded.model_name} on {loaded.device} "
+                f"(int8={loaded.quantized}, load {loaded.load_seconds:.1f}s, warm-up {loaded.warmup_seconds:.1f}s)"
+            )
+        except Exception as e:
+            print(f"WARNING: Could not preload LayoutLM model: {e}")
+
+    # Monta os índices de fornecedores dos maiores workspaces para o matching
+    if settings.SUPPLIER_INDEX_PRELOAD:
+        try:
+            import asyncio
+            from app.services.supplier_index_cache import warm_supplier_index_cache
+
+            def warm():
+                db = SessionLocal()
+                try:
+                    return warm_supplier_index_cache(db)
+                finally:
+                    db.close()
+
+            warmed = await asyncio.get_running_loop().run_in_executor(None, warm)
+            print(f"Supplier indexes loaded for {warmed} workspaces")
+        except Exception as e:
+            print(f"WARNING: Could not preload supplier indexes: {e}")
+
 
 # Health check endpoints
 @app.get("/")
@@ -0,0 +1,74 @@
+-- Migration 016: Ledger diário materializado de Fluxo de Caixa
+-- Data: 2026-10-16
+-- Autor: Sistema Orion ERP
+-- Descrição: Tabela cash_flow_daily_balances com entradas, saídas e saldo de
+--            fechamento por workspace/conta/dia, mantida incrementalmente pelos
+--            endpoints de movimentação (histórico de saldo vira range scan)
+
+-- ============================================
+-- TABELA: cash_flow_daily_balances (Ledger Diário)
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS cash_flow_daily_balances (
+    -- Primary Key
+    id SERIAL PRIMARY KEY,
+
+    -- Multi-tenant (OBRIGATÓRIO)
+    workspace_id INTEGER NOT NULL REFERENCES workspaces(id) ON DELETE CASCADE,
+
+    -- Conta bancária (0 = transações sem conta vinculada)
+    account_id INTEGER NOT NULL DEFAULT 0,
+
+    -- Dia e movimentações
+    balance_date DATE NOT NULL,
+    entries DOUBLE PRECISION NOT NULL DEFAULT 0.0,
+    exits DOUBLE PRECISION NOT NULL DEFAULT 0.0,
+
+    -- Saldo acumulado das movimentações da conta até o dia
+    -- (sem o saldo inicial, que permanece em bank_accounts)
+    closing_balance DOUBLE PRECISION NOT NULL DEFAULT 0.0,
+
+    -- Metadata
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT uq_daily_balance_account_date UNIQUE (workspace_id, account_id, balance_date)
+);
+
+-- ============================================
+-- ÍNDICES para Performance
+-- ============================================
+
+-- Range scan de histórico por workspace
+CREATE INDEX IF NOT EXISTS ix_daily_balance_workspace_date
+    ON cash_flow_daily_balances(workspace_id, balance_date);
+
+-- ============================================
+-- BACKFILL
+-- ============================================
+
+-- Popular o ledger a partir das transações existentes
+INSERT INTO cash_flow_daily_balances (workspace_id, account_id, balance_date, entries, exits, closing_balance)
+SELECT
+    workspace_id,
+    account_id,
+    balance_date,
+    entries,
+    exits,
+    SUM(entries - exits) OVER (
+        PARTITION BY workspace_id, account_id
+        ORDER BY balance_date
+    ) AS closing_balance
+FROM (
+    SELECT
+        workspace_id,
+        COALESCE(account_id, 0) AS account_id,
+        DATE(transaction_date) AS balance_date,
+        COALESCE(SUM(CASE WHEN type = 'entrada' THEN value ELSE 0 END), 0) AS entries,
+        COALESCE(SUM(CASE WHEN type = 'saida' THEN value ELSE 0 END), 0) AS exits
+    FROM cash_flow_transactions
+    GROUP BY workspace_id, COALESCE(account_id, 0), DATE(transaction_date)
+) daily
+ON CONFLICT (workspace_id, account_id, balance_date) DO NOTHING;
+
+-- Reconstrução posterior: python -m app.jobs.cash_flow_jobs rebuild
+-- Verificação: python -m app.jobs.cash_flow_jobs check
@@ -0,0 +1,35 @@
+-- Migration 017: Mapeamento de categorias do DRE por workspace
+-- Data: 2026-10-16
+-- Autor: Sistema Orion ERP
+-- Descrição: Tabela dre_category_mappings com as palavras-chave de categoria
+--            de cada linha do DRE. Workspaces sem linhas usam o mapeamento
+--            padrão definido em app/services/dre_classifier.py
+
+-- ============================================
+-- TABELA: dre_category_mappings
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS dre_category_mappings (
+    -- Primary Key
+    id SERIAL PRIMARY KEY,
+
+    -- Multi-tenant (OBRIGATÓRIO)
+    workspace_id INTEGER NOT NULL REFERENCES workspaces(id) ON DELETE CASCADE,
+
+    -- Mapeamento
+    -- receita, deducoes, cmv, despesas_operacionais, depreciacao, juros
+    bucket VARCHAR(50) NOT NULL,
+    keyword VARCHAR(100) NOT NULL,
+
+    -- Metadata
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT uq_dre_mapping_workspace_bucket_keyword UNIQUE (workspace_id, bucket, keyword)
+);
+
+-- ============================================
+-- ÍNDICES para Performance
+-- ============================================
+
+CREATE INDEX IF NOT EXISTS ix_dre_mapping_workspace
+    ON dre_category_mappings(workspace_id);
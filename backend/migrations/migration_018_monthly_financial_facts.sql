@@ -0,0 +1,112 @@
+-- Migration 018: Cubo mensal pré-agregado de relatórios financeiros
+-- Data: 2026-10-16
+-- Autor: Sistema Orion ERP
+-- Descrição: Tabela monthly_financial_facts com soma e quantidade de
+--            movimentações por workspace/mês/tipo/categoria/conta, já
+--            classificadas na linha do DRE. DRE, gráficos mensais e
+--            comparações ano contra ano leem o cubo em vez das transações.
+
+-- ============================================
+-- TABELA: monthly_financial_facts (Cubo Mensal)
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS monthly_financial_facts (
+    -- Primary Key
+    id SERIAL PRIMARY KEY,
+
+    -- Multi-tenant (OBRIGATÓRIO)
+    workspace_id INTEGER NOT NULL REFERENCES workspaces(id) ON DELETE CASCADE,
+
+    -- Dimensões
+    month DATE NOT NULL,                      -- primeiro dia do mês
+    type VARCHAR(20) NOT NULL,                -- entrada / saida
+    category VARCHAR(100) NOT NULL,
+    account_id INTEGER NOT NULL DEFAULT 0,    -- 0 = sem conta vinculada
+    bucket VARCHAR(50) NOT NULL,              -- linha do DRE
+
+    -- Medidas
+    total_value DOUBLE PRECISION NOT NULL DEFAULT 0.0,
+    transaction_count INTEGER NOT NULL DEFAULT 0,
+
+    -- Metadata
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT uq_monthly_fact_workspace_month_type_category_account
+        UNIQUE (workspace_id, month, type, category, account_id)
+);
+
+-- ============================================
+-- ÍNDICES para Performance
+-- ============================================
+
+-- Range scan de meses por workspace
+CREATE INDEX IF NOT EXISTS ix_monthly_fact_workspace_month
+    ON monthly_financial_facts(workspace_id, month);
+
+-- ============================================
+-- BACKFILL
+-- ============================================
+
+-- Popular o cubo a partir das transações existentes. A linha do DRE segue o
+-- mapeamento padrão (DEFAULT_DRE_MAPPING em app/services/dre_classifier.py:
+-- a categoria contém uma das palavras-chave; saídas na ordem deduções, CMV,
+-- despesas operacionais, depreciação, juros).
+INSERT INTO monthly_financial_facts (
+    workspace_id, month, type, category, account_id, bucket, total_value, transaction_count
+)
+SELECT
+    workspace_id,
+    month,
+    type,
+    category,
+    account_id,
+    CASE
+        WHEN type = 'entrada' AND (
+            LOWER(category) LIKE '%receita%' OR LOWER(category) LIKE '%venda%'
+        ) THEN 'receita'
+        WHEN type = 'saida' AND (
+            LOWER(category) LIKE '%cofins%' OR LOWER(category) LIKE '%icms%'
+            OR LOWER(category) LIKE '%impostos%' OR LOWER(category) LIKE '%iss%'
+            OR LOWER(category) LIKE '%pis%' OR LOWER(category) LIKE '%taxas%'
+        ) THEN 'deducoes'
+        WHEN type = 'saida' AND (
+            LOWER(category) LIKE '%cmv%' OR LOWER(category) LIKE '%compra%'
+            OR LOWER(category) LIKE '%custo%' OR LOWER(category) LIKE '%fornecedor%'
+        ) THEN 'cmv'
+        WHEN type = 'saida' AND (
+            LOWER(category) LIKE '%administrativo%' OR LOWER(category) LIKE '%aluguel%'
+            OR LOWER(category) LIKE '%marketing%' OR LOWER(category) LIKE '%salários%'
+            OR LOWER(category) LIKE '%vendas%'
+        ) THEN 'despesas_operacionais'
+        WHEN type = 'saida' AND (
+            LOWER(category) LIKE '%amortização%' OR LOWER(category) LIKE '%depreciação%'
+        ) THEN 'depreciacao'
+        WHEN type = 'saida' AND (
+            LOWER(category) LIKE '%encargos financeiros%' OR LOWER(category) LIKE '%juros%'
+            OR LOWER(category) LIKE '%multas%' OR LOWER(category) LIKE '%taxas bancárias%'
+        ) THEN 'juros'
+        WHEN type = 'saida' THEN 'despesas_operacionais'
+        ELSE 'nao_classificado'
+    END AS bucket,
+    total_value,
+    transaction_count
+FROM (
+    SELECT
+        workspace_id,
+        DATE_TRUNC('month', transaction_date)::DATE AS month,
+        type,
+        COALESCE(category, '') AS category,
+        COALESCE(account_id, 0) AS account_id,
+        COALESCE(SUM(value), 0) AS total_value,
+        COUNT(*) AS transaction_count
+    FROM cash_flow_transactions
+    GROUP BY workspace_id, DATE_TRUNC('month', transaction_date), type,
+        COALESCE(category, ''), COALESCE(account_id, 0)
+) monthly
+ON CONFLICT (workspace_id, month, type, category, account_id) DO NOTHING;
+
+-- Workspaces que já tinham mapeamento próprio em dre_category_mappings:
+--     python -m app.jobs.financial_reporting_jobs rebuild
+--
+-- Recálculo periódico dos meses recentes (agendar no cron):
+--     python -m app.jobs.financial_reporting_jobs refresh --months 2
@@ -0,0 +1,43 @@
+-- Migration 019: Cache de extração de faturas endereçado pelo conteúdo
+-- Data: 2026-10-16
+-- Autor: Sistema Orion ERP
+-- Descrição: Tabela invoice_extraction_cache com o resultado da extração
+--            (OCR + LayoutLM + LLM) por workspace, hash do arquivo e versão
+--            do pipeline. Reenvios do mesmo arquivo são servidos sem
+--            reprocessar; mudar o modelo gera uma nova versão.
+
+-- ============================================
+-- TABELA: invoice_extraction_cache
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS invoice_extraction_cache (
+    -- Primary Key
+    id SERIAL PRIMARY KEY,
+
+    -- Multi-tenant (OBRIGATÓRIO)
+    workspace_id INTEGER NOT NULL REFERENCES workspaces(id) ON DELETE CASCADE,
+
+    -- Chave
+    content_hash VARCHAR(64) NOT NULL,        -- MD5 do arquivo enviado
+    pipeline_version VARCHAR(40) NOT NULL,    -- modelos/configuração da extração
+
+    -- Resultado (JSON) e tamanho usado na evicção
+    result TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+
+    -- Uso
+    hit_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_used_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT uq_extraction_cache_workspace_hash_version
+        UNIQUE (workspace_id, content_hash, pipeline_version)
+);
+
+-- ============================================
+-- ÍNDICES para Performance
+-- ============================================
+
+-- Evicção por tamanho a partir da entrada usada há mais tempo
+CREATE INDEX IF NOT EXISTS ix_extraction_cache_last_used
+    ON invoice_extraction_cache(last_used_at);
@@ -0,0 +1,72 @@
+-- Migration 020: Histórico agregado de faturas por fornecedor
+-- Data: 2026-10-17
+-- Autor: Sistema Orion ERP
+-- Descrição: Tabela supplier_invoice_stats com os nomes e CNPJs com que
+--            cada fornecedor apareceu nas faturas, a quantidade de faturas
+--            e a data da mais recente. O matching de fornecedores lê o
+--            histórico em uma consulta em vez de varrer as faturas.
+
+-- ============================================
+-- TABELA: supplier_invoice_stats
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS supplier_invoice_stats (
+    -- Primary Key
+    id SERIAL PRIMARY KEY,
+
+    -- Multi-tenant (OBRIGATÓRIO)
+    workspace_id INTEGER NOT NULL REFERENCES workspaces(id) ON DELETE CASCADE,
+    supplier_id INTEGER NOT NULL REFERENCES suppliers(id) ON DELETE CASCADE,
+
+    -- Chave
+    name VARCHAR(255) NOT NULL,
+    cnpj VARCHAR(20) NOT NULL DEFAULT '',     -- apenas dígitos ('' = sem documento)
+
+    -- Medidas
+    invoice_count INTEGER NOT NULL DEFAULT 0,
+    last_seen_date DATE,                      -- data da fatura mais recente
+
+    -- Metadata
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT uq_supplier_invoice_stats_workspace_supplier_name_cnpj
+        UNIQUE (workspace_id, supplier_id, name, cnpj)
+);
+
+-- ============================================
+-- ÍNDICES para Performance
+-- ============================================
+
+-- Busca do histórico por CNPJ dentro do workspace
+CREATE INDEX IF NOT EXISTS ix_supplier_invoice_stats_workspace_cnpj
+    ON supplier_invoice_stats(workspace_id, cnpj);
+
+-- ============================================
+-- BACKFILL
+-- ============================================
+
+-- Faturas já existentes (invoices e accounts_payable_invoices), agrupadas
+-- pelo nome e documento atuais do fornecedor
+INSERT INTO supplier_invoice_stats (workspace_id, supplier_id, name, cnpj, invoice_count, last_seen_date)
+SELECT
+    history.workspace_id,
+    history.supplier_id,
+    s.name,
+    regexp_replace(COALESCE(s.document, ''), '\D', '', 'g'),
+    SUM(history.invoice_count),
+    MAX(history.last_seen_date)
+FROM (
+    SELECT workspace_id, supplier_id, COUNT(*) AS invoice_count, MAX(invoice_date) AS last_seen_date
+    FROM invoices
+    WHERE supplier_id IS NOT NULL
+    GROUP BY workspace_id, supplier_id
+
+    UNION ALL
+
+    SELECT workspace_id, supplier_id, COUNT(*), MAX(invoice_date)
+    FROM accounts_payable_invoices
+    GROUP BY workspace_id, supplier_id
+) AS history
+JOIN suppliers s ON s.id = history.supplier_id
+GROUP BY history.workspace_id, history.supplier_id, s.name, s.document
+ON CONFLICT (workspace_id, supplier_id, name, cnpj) DO NOTHING;
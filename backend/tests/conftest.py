@@ -5,17 +5,17 @@ import pytest
 import asyncio
 import tempfile
 import os
+from contextlib import contextmanager
 from unittest.mock import MagicMock, AsyncMock
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
 from PIL import Image
 import numpy as np
 
-from app.main import app
 from app.core.database import Base, get_db
 from app.services.ai_service import AIService
-from app.services.layout_lm_service import LayoutLMService
 
 # Database de teste na memória
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -41,9 +41,39 @@ def db_session():
         session.close()
         Base.metadata.drop_all(bind=engine)
 
+@contextmanager
+def _sqlite_session(tables):
+    """Abre uma sessão SQLite em memória com apenas as tabelas informadas"""
+    memory_engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=memory_engine, tables=tables)
+
+    session = sessionmaker(autocommit=False, autoflush=False, bind=memory_engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=memory_engine, tables=tables)
+        memory_engine.dispose()
+
+@pytest.fixture(scope="session")
+def sqlite_session():
+    """
+    Fábrica de sessões SQLite em memória.
+
+    Uso: ``with sqlite_session([Model.__table__, ...]) as db:`` — cada
+    módulo de teste popula seus próprios dados sobre a sessão.
+    """
+    return _sqlite_session
+
 @pytest.fixture(scope="function")
 def client(db_session):
     """Cliente de teste para a API"""
+    from app.main import app
+
     def override_get_db():
         try:
             yield db_session
@@ -98,6 +128,8 @@ def mock_ai_service():
 @pytest.fixture
 def mock_layout_lm_service():
     """Mock do serviço LayoutLM"""
+    from app.services.layout_lm_service import LayoutLMService
+
     layout_service = MagicMock(spec=LayoutLMService)
 
     # Mock para load_model
@@ -365,4 +365,68 @@ QUALITY_THRESHOLDS = {
         "total_amount",
         "issue_date"
     ]
-}
\ No newline at end of file
+}
+
+def messy_invoice_records(count: int, seed: int = 11, suppliers: int = 50):
+    """
+    Registros brutos de extração com a bagunça típica de importações:
+    fornecedores repetidos com espaços/caixa variados, CNPJs e datas em
+    vários formatos (e inválidos), valores em texto, itens malformados,
+    campos ausentes e alguns registros que nem são dicionários
+    """
+    import random
+
+    rng = random.Random(seed)
+    names = [f"empresa  {n}  comercio ltda" for n in range(suppliers)] + ["JOÃO & FILHOS S/A", "Café\nBrasil  ME"]
+    money = ["1.234,56", "R$ 99,90", "1500", "abc", "", None, 1200, 35.5, -10, "R$ 1.000.000,00", "$1,500.00"]
+    dates = ["15/01/2024", "2024-02-30", "5/3/2024", "20240115", "15012024", "", None, "data: 01.12.2023", "31/12/1980"]
+
+    records = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.01:
+            records.append(rng.choice([None, "string_instead_of_dict", 42]))
+            continue
+
+        digits = f"{rng.randint(10**13, 10**14 - 1)}"
+        record = {
+            "supplier_name": rng.choice(names).upper() if rng.random() < 0.3 else rng.choice(names),
+            "supplier_cnpj": rng.choice([
+                digits,
+                f"{digits[:2]}.{digits[2:5]}.{digits[5:8]}/{digits[8:12]}-{digits[12:]}",
+                f"CNPJ: {digits[:2]} {digits[2:5]} {digits[5:8]} {digits[8:12]} {digits[12:]}",
+                "11111111111111",
+                "invalid",
+                None,
+            ]),
+            "invoice_number": rng.choice([f"  nf-{i:06d} ", f"NF {i}", "", None]),
+            "issue_date": rng.choice(dates),
+            "due_date": rng.choice(dates),
+            "total_amount": rng.choice(money),
+            "tax_amount": rng.choice(money),
+            "description": rng.choice(["  serviço\tde manutenção\n", "", None, "x" * 600]),
+            "category": rng.choice(["servicos de TI", "Material de escritório", "", None, "outros"]),
+            "payment_method": rng.choice(["pix", "Boleto Bancário", "cartão de crédito", "", "Transferência #1"]),
+            "items": rng.choice([
+                [],
+                None,
+                "not a list",
+                [{"description": "Produto A", "quantity": "2", "unit_price": "10,00", "total_price": ""}],
+                [{"description": "", "quantity": 3, "unit_price": 0, "total_price": "30,00"}, "not a dict"],
+            ]),
+            "confidence_score": rng.choice([0.85, "0.7", "abc", 1.5, None]),
+            "ai_suggestions": rng.choice([[], ["Revisar", "Revisar", "  "], None]),
+        }
+
+        # Item que quebra a limpeza (registro vira fallback)
+        if rng.random() < 0.02:
+            record["items"] = [{"description": "Item", "quantity": float("nan"), "unit_price": "1,00"}]
+
+        # Campos ausentes
+        for field in list(record):
+            if rng.random() < 0.05:
+                del record[field]
+
+        records.append(record)
+
+    return records
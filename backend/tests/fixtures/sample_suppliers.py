@@ -0,0 +1,94 @@
+"""
+Fixtures com cadastros de fornecedores gerados para testes de matching
+
+Inclui a varredura linear usada antes do índice (thefuzz process.extract
+sobre todos os nomes), como referência de resultados e de desempenho.
+"""
+import random
+import re
+from typing import Any, Dict, List
+
+from thefuzz import fuzz, process
+
+FIRST_WORDS = [
+    "Alfa", "Beta", "Brasil", "Norte", "Sul", "Central", "Nova", "Real", "Global", "Prime",
+    "Mega", "Super", "Agro", "Tech", "Eletro", "Metal", "Pão", "Casa", "Auto", "Rede",
+    "Grupo", "Max", "Top", "União", "Vale", "Rio", "São Paulo", "Minas", "Serra", "Mar"
+]
+SECOND_WORDS = [
+    "Distribuidora", "Comércio", "Indústria", "Transportes", "Alimentos", "Materiais",
+    "Construções", "Logística", "Tecnologia", "Consultoria", "Engenharia", "Papelaria",
+    "Farmácia", "Móveis", "Plásticos", "Química", "Têxtil", "Embalagens", "Informática", "Segurança"
+]
+SUFFIXES = ["Ltda", "ME", "EIRELI", "S.A.", "", "Comercial", "do Brasil", "e Filhos", "& Cia", "Serviços"]
+
+
+def supplier_name(rng: random.Random) -> str:
+    words = [rng.choice(FIRST_WORDS), rng.choice(SECOND_WORDS)]
+    if rng.random() < 0.5:
+        words.insert(1, rng.choice(FIRST_WORDS))
+    if rng.random() < 0.6:
+        words.append(rng.choice(SUFFIXES))
+    if rng.random() < 0.3:
+        words.append(str(rng.randint(1, 999)))
+    return " ".join(word for word in words if word)
+
+
+def with_typos(rng: random.Random, text: str, max_typos: int = 3) -> str:
+    """Troca, remove ou insere até max_typos caracteres (erros de OCR)"""
+    chars = list(text)
+    for _ in range(rng.randint(0, max_typos)):
+        position = rng.randrange(len(chars))
+        operation = rng.random()
+        if operation < 0.33:
+            chars[position] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        elif operation < 0.66 and len(chars) > 1:
+            del chars[position]
+        else:
+            chars.insert(position, rng.choice("abcdefghijklmnopqrstuvwxyz"))
+    return "".join(chars)
+
+
+def supplier_cache(count: int, normalize, seed: int = 7) -> List[Dict[str, Any]]:
+    """Lista no formato de SupplierMatcher._get_suppliers_cache"""
+    rng = random.Random(seed)
+    suppliers = []
+    for supplier_id in range(1, count + 1):
+        name = supplier_name(rng)
+        suppliers.append({
+            'supplier_id': supplier_id,
+            'name': name,
+            'cnpj': f"{rng.randint(10, 99)}.{rng.randint(100, 999)}.{rng.randint(100, 999)}/0001-{rng.randint(10, 99)}",
+            'category': None,
+            'normalized_name': normalize(name)
+        })
+    return suppliers
+
+
+def linear_scan(normalized_target: str, suppliers: List[Dict[str, Any]], limit: int, min_score: int = 70):
+    """Matching por nome anterior ao índice: três varreduras completas"""
+    supplier_names = [supplier['normalized_name'] for supplier in suppliers]
+    all_matches = {}
+
+    for scorer, method in [(fuzz.ratio, 'ratio'), (fuzz.token_sort_ratio, 'token_sort'), (fuzz.partial_ratio, 'partial')]:
+        for name, score in process.extract(normalized_target, supplier_names, scorer=scorer, limit=limit * 2):
+            if score >= min_score:
+                supplier = next((s for s in suppliers if s['normalized_name'] == name), None)
+                if supplier and (supplier['supplier_id'] not in all_matches
+                                 or all_matches[supplier['supplier_id']]['score'] < score):
+                    all_matches[supplier['supplier_id']] = {
+                        'supplier_id': supplier['supplier_id'],
+                        'score': score,
+                        'match_type': f'fuzzy_{method}'
+                    }
+
+    return sorted(all_matches.values(), key=lambda match: match['score'], reverse=True)[:limit]
+
+
+def linear_cnpj(cnpj: str, suppliers: List[Dict[str, Any]]):
+    """Busca por CNPJ anterior ao índice (re.sub em cada fornecedor)"""
+    clean_cnpj = re.sub(r'\D', '', cnpj)
+    for supplier in suppliers:
+        if supplier.get('cnpj') and re.sub(r'\D', '', supplier['cnpj']) == clean_cnpj:
+            return supplier
+    return None
@@ -0,0 +1,340 @@
+"""
+Testes de regressão e benchmark da agregação SQL de analytics de Fluxo de Caixa
+
+Compara a camada CashFlowAggregator (GROUP BY / agregação condicional) com a
+implementação anterior em Python (query.all() + sum(...)).
+"""
+import pytest
+import random
+import time
+from datetime import datetime, date, timedelta
+from types import SimpleNamespace
+from collections import defaultdict
+from sqlalchemy import and_, event
+
+from app.models.cash_flow import BankAccount, CashFlowTransaction, CashFlowDailyBalance, TransactionType
+from app.models.accounts_receivable import AccountsReceivable
+from app.models.accounts_payable import AccountsPayableInvoice
+from app.services.cash_flow_aggregator import CashFlowAggregator
+from app.services.cash_flow_ledger import CashFlowLedger
+from app.api.api_v1.endpoints import cash_flow_analytics
+
+
+WORKSPACE_ID = 1
+CATEGORIES = [
+    ("Vendas", "Marketplace", TransactionType.ENTRADA.value, "Venda de produto"),
+    ("Serviços", None, TransactionType.ENTRADA.value, "Serviço prestado"),
+    ("Aluguel", None, TransactionType.SAIDA.value, "Aluguel do galpão"),
+    ("Fornecedor", "Mercadoria", TransactionType.SAIDA.value, "Compra de mercadoria"),
+    ("Despesas", "Diversos", TransactionType.SAIDA.value, "Conta de energia"),
+    ("Outros", None, TransactionType.SAIDA.value, "Despesa não identificada"),
+]
+
+
+def _seed_transactions(session, count: int, accounts: int = 3, days: int = 365):
+    """Popula contas e transações determinísticas"""
+    rng = random.Random(42)
+
+    for account_id in range(1, accounts + 1):
+        session.add(BankAccount(
+            id=account_id,
+            workspace_id=WORKSPACE_ID,
+            bank_name=f"Banco {account_id}",
+            account_type="corrente",
+            current_balance=1000.0 * account_id,
+            initial_balance=500.0 * account_id,
+            is_active=True
+        ))
+
+    start = datetime.combine(date.today() - timedelta(days=days), datetime.min.time())
+    rows = []
+    for i in range(count):
+        category, subcategory, trans_type, description = CATEGORIES[i % len(CATEGORIES)]
+        rows.append({
+            "workspace_id": WORKSPACE_ID,
+            "transaction_date": start + timedelta(minutes=rng.randint(0, days * 24 * 60)),
+            "type": trans_type,
+            "category": category,
+            "subcategory": subcategory,
+            "description": description,
+            "value": round(rng.uniform(10, 5000), 2),
+            "account_id": (i % accounts) + 1,
+            "is_recurring": False,
+            "is_reconciled": False,
+            "created_at": start,
+            "updated_at": start,
+        })
+
+    session.bulk_insert_mappings(CashFlowTransaction, rows)
+    CashFlowLedger(session).rebuild(WORKSPACE_ID)
+    session.commit()
+
+
+@pytest.fixture
+def analytics_session(sqlite_session):
+    """Sessão SQLite em memória com as tabelas de fluxo de caixa"""
+    tables = [
+        BankAccount.__table__,
+        CashFlowTransaction.__table__,
+        CashFlowDailyBalance.__table__,
+        AccountsReceivable.__table__,
+        AccountsPayableInvoice.__table__,
+    ]
+
+    with sqlite_session(tables) as session:
+        yield session
+
+
+@pytest.fixture
+def current_user():
+    return SimpleNamespace(id=1, workspace_id=WORKSPACE_ID)
+
+
+# ============================================
+# IMPLEMENTAÇÃO ANTERIOR (REFERÊNCIA)
+# ============================================
+
+def _legacy_period_transactions(db, start_date, end_date, account_id=None):
+    query = db.query(CashFlowTransaction).filter(
+        and_(
+            CashFlowTransaction.workspace_id == WORKSPACE_ID,
+            CashFlowTransaction.transaction_date >= datetime.combine(start_date, datetime.min.time()),
+            CashFlowTransaction.transaction_date <= datetime.combine(end_date, datetime.max.time())
+        )
+    )
+    if account_id:
+        query = query.filter(CashFlowTransaction.account_id == account_id)
+    return query.all()
+
+
+def _legacy_type_totals(db, start_date, end_date, account_id=None):
+    transactions = _legacy_period_transactions(db, start_date, end_date, account_id)
+    return (
+        sum(t.value for t in transactions if t.type == TransactionType.ENTRADA.value),
+        sum(t.value for t in transactions if t.type == TransactionType.SAIDA.value),
+        sum(1 for t in transactions if t.type == TransactionType.ENTRADA.value),
+        sum(1 for t in transactions if t.type == TransactionType.SAIDA.value),
+    )
+
+
+def _legacy_category_totals(db, start_date, end_date):
+    category_data = defaultdict(lambda: [0.0, 0])
+    for t in _legacy_period_transactions(db, start_date, end_date):
+        key = (t.category, t.subcategory, t.type)
+        category_data[key][0] += t.value
+        category_data[key][1] += 1
+    return category_data
+
+
+def _legacy_cost_breakdown(db, start_date, end_date):
+    transactions = _legacy_period_transactions(db, start_date, end_date)
+    total_revenue = sum(t.value for t in transactions if t.type == TransactionType.ENTRADA.value)
+    fixed_costs = 0.0
+    variable_costs = 0.0
+    for t in transactions:
+        if t.type != TransactionType.SAIDA.value:
+            continue
+        category_lower = (t.category or '').lower()
+        description_lower = (t.description or '').lower()
+        if any(k in category_lower or k in description_lower
+               for k in cash_flow_analytics.FIXED_COST_KEYWORDS):
+            fixed_costs += t.value
+        else:
+            variable_costs += t.value
+    return total_revenue, fixed_costs, variable_costs
+
+
+def _legacy_balance_at(db, target_date, account_id=None):
+    query = db.query(CashFlowTransaction).filter(
+        CashFlowTransaction.workspace_id == WORKSPACE_ID,
+        CashFlowTransaction.transaction_date <= datetime.combine(target_date, datetime.max.time())
+    )
+    if account_id:
+        query = query.filter(CashFlowTransaction.account_id == account_id)
+        initial_balance = db.query(BankAccount).filter(BankAccount.id == account_id).first().initial_balance
+    else:
+        initial_balance = sum(
+            acc.initial_balance
+            for acc in db.query(BankAccount).filter(BankAccount.workspace_id == WORKSPACE_ID).all()
+        )
+    transactions = query.all()
+    return initial_balance + sum(t.net_value for t in transactions)
+
+
+class TestCashFlowAggregatorParity:
+    """A agregação SQL deve reproduzir os resultados do loop em Python"""
+
+    @pytest.fixture(autouse=True)
+    def seeded(self, analytics_session):
+        _seed_transactions(analytics_session, count=600)
+
+    def test_type_totals_match_legacy(self, analytics_session):
+        start_date = date.today() - timedelta(days=180)
+        end_date = date.today()
+
+        for account_id in (None, 1, 2):
+            totals = CashFlowAggregator(analytics_session).type_totals(
+                WORKSPACE_ID, start_date, end_date, account_id
+            )
+            entries, exits, entries_count, exits_count = _legacy_type_totals(
+                analytics_session, start_date, end_date, account_id
+            )
+
+            assert totals.total_entries == pytest.approx(entries)
+            assert totals.total_exits == pytest.approx(exits)
+            assert totals.entries_count == entries_count
+            assert totals.exits_count == exits_count
+
+    def test_empty_period_returns_zeros(self, analytics_session):
+        future = date.today() + timedelta(days=30)
+        totals = CashFlowAggregator(analytics_session).type_totals(WORKSPACE_ID, future, future)
+
+        assert totals == (0.0, 0.0, 0, 0)
+        assert totals.net_flow == 0.0
+
+    def test_category_totals_match_legacy(self, analytics_session):
+        start_date = date.today() - timedelta(days=365)
+        end_date = date.today()
+
+        rows = CashFlowAggregator(analytics_session).category_totals(WORKSPACE_ID, start_date, end_date)
+        legacy = _legacy_category_totals(analytics_session, start_date, end_date)
+
+        assert len(rows) == len(legacy)
+        for row in rows:
+            total_value, count = legacy[(row.category, row.subcategory, row.type)]
+            assert row.total_value == pytest.approx(total_value)
+            assert row.transaction_count == count
+
+    def test_cost_breakdown_matches_legacy(self, analytics_session):
+        start_date = date.today() - timedelta(days=90)
+        end_date = date.today()
+
+        breakdown = CashFlowAggregator(analytics_session).cost_breakdown(
+            WORKSPACE_ID, start_date, end_date, cash_flow_analytics.FIXED_COST_KEYWORDS
+        )
+        revenue, fixed_costs, variable_costs = _legacy_cost_breakdown(analytics_session, start_date, end_date)
+
+        assert breakdown.total_revenue == pytest.approx(revenue)
+        assert breakdown.fixed_costs == pytest.approx(fixed_costs)
+        assert breakdown.variable_costs == pytest.approx(variable_costs)
+        assert breakdown.fixed_costs > 0
+
+    def test_balance_at_matches_legacy(self, analytics_session):
+        target_date = date.today() - timedelta(days=100)
+
+        for account_id in (None, 3):
+            balance = CashFlowAggregator(analytics_session).balance_at(WORKSPACE_ID, target_date, account_id)
+            assert balance == pytest.approx(_legacy_balance_at(analytics_session, target_date, account_id))
+
+    def test_summary_endpoint_uses_aggregated_totals(self, analytics_session, current_user):
+        start_date = date.today() - timedelta(days=30)
+        end_date = date.today()
+
+        summary = cash_flow_analytics.get_cash_flow_summary(
+            start_date, end_date, None, analytics_session, current_user
+        )
+        entries, exits, entries_count, exits_count = _legacy_type_totals(analytics_session, start_date, end_date)
+
+        assert summary.total_entries == pytest.approx(entries)
+        assert summary.total_exits == pytest.approx(exits)
+        assert summary.entries_count == entries_count
+        assert summary.exits_count == exits_count
+        assert summary.closing_balance == pytest.approx(
+            _legacy_balance_at(analytics_session, end_date)
+        )
+
+
+class TestByAccountQueryCount:
+    """O resumo por conta deve usar um número constante de queries"""
+
+    @staticmethod
+    def _count_statements(session, func):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = session.get_bind()
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            result = func()
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        return result, len(statements)
+
+    @pytest.mark.parametrize("accounts", [1, 5, 40])
+    def test_by_account_constant_statement_count(self, analytics_session, current_user, accounts):
+        _seed_transactions(analytics_session, count=accounts * 10, accounts=accounts, days=20)
+        analytics_session.expunge_all()
+
+        start_date = date.today() - timedelta(days=30)
+        end_date = date.today()
+
+        result, statement_count = self._count_statements(
+            analytics_session,
+            lambda: cash_flow_analytics.get_by_account(start_date, end_date, analytics_session, current_user)
+        )
+
+        assert len(result) == accounts
+        assert statement_count == 2  # contas + agregação agrupada por account_id
+
+    def test_by_account_matches_per_account_sums(self, analytics_session, current_user):
+        _seed_transactions(analytics_session, count=300, accounts=6, days=60)
+        # Conta sem movimentação deve aparecer zerada
+        analytics_session.add(BankAccount(
+            id=99, workspace_id=WORKSPACE_ID, bank_name="Carteira vazia",
+            account_type="corrente", current_balance=0.0, initial_balance=0.0, is_active=True
+        ))
+        analytics_session.commit()
+
+        start_date = date.today() - timedelta(days=30)
+        end_date = date.today()
+
+        result = cash_flow_analytics.get_by_account(start_date, end_date, analytics_session, current_user)
+        by_id = {summary.account_id: summary for summary in result}
+
+        for account_id in range(1, 7):
+            entries, exits, _, _ = _legacy_type_totals(analytics_session, start_date, end_date, account_id)
+            assert by_id[account_id].month_entries == pytest.approx(entries)
+            assert by_id[account_id].month_exits == pytest.approx(exits)
+            assert by_id[account_id].month_net_flow == pytest.approx(entries - exits)
+
+        assert by_id[99].month_entries == 0.0
+        assert by_id[99].month_exits == 0.0
+
+
+class TestCashFlowAggregatorPerformance:
+    """Benchmark: agregação SQL vs loop em Python"""
+
+    @pytest.mark.slow
+    def test_aggregation_faster_than_python_loop(self, analytics_session):
+        _seed_transactions(analytics_session, count=20000)
+        start_date = date.today() - timedelta(days=365)
+        end_date = date.today()
+        aggregator = CashFlowAggregator(analytics_session)
+
+        def run_legacy():
+            _legacy_type_totals(analytics_session, start_date, end_date)
+            _legacy_category_totals(analytics_session, start_date, end_date)
+            _legacy_cost_breakdown(analytics_session, start_date, end_date)
+
+        def run_aggregated():
+            aggregator.type_totals(WORKSPACE_ID, start_date, end_date)
+            aggregator.category_totals(WORKSPACE_ID, start_date, end_date)
+            aggregator.cost_breakdown(
+                WORKSPACE_ID, start_date, end_date, cash_flow_analytics.FIXED_COST_KEYWORDS
+            )
+
+        timings = {}
+        for name, runner in (("legacy", run_legacy), ("aggregated", run_aggregated)):
+            start_time = time.perf_counter()
+            for _ in range(3):
+                runner()
+                analytics_session.expunge_all()
+            timings[name] = (time.perf_counter() - start_time) / 3
+
+        print(f"Loop Python: {timings['legacy'] * 1000:.1f}ms")
+        print(f"Agregação SQL: {timings['aggregated'] * 1000:.1f}ms")
+        print(f"Speedup: {timings['legacy'] / timings['aggregated']:.1f}x")
+
+        assert timings['aggregated'] < timings['legacy']
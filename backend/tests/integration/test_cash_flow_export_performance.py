@@ -0,0 +1,125 @@
+"""
+Benchmark da exportação em streaming de movimentações (CSV/XLSX)
+
+Mede linhas/s e o pico de memória (tracemalloc e RSS) exportando volumes
+diferentes: com o cursor em lotes o pico não deve crescer com a quantidade
+de linhas, ao contrário da carga completa com query.all().
+
+Execução com os números impressos:
+    pytest tests/integration/test_cash_flow_export_performance.py -s -m slow
+"""
+import gc
+import pytest
+import random
+import resource
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from app.models.cash_flow import BankAccount, CashFlowTransaction, TransactionType
+from app.models.accounts_payable import AccountsPayableInvoice  # noqa: F401 (referenciado por Supplier)
+from app.services.cash_flow_export import export_rows, stream_csv, stream_xlsx
+
+
+SMALL_EXPORT = 10_000
+LARGE_EXPORT = 50_000
+
+
+def _seed(session, count: int, workspace_id: int):
+    rng = random.Random(workspace_id)
+    start = datetime(2020, 1, 1)
+    batch = []
+    for i in range(count):
+        batch.append({
+            "workspace_id": workspace_id,
+            "transaction_date": start + timedelta(minutes=rng.randint(0, 5 * 365 * 24 * 60)),
+            "type": TransactionType.ENTRADA.value if i % 3 else TransactionType.SAIDA.value,
+            "category": f"Categoria {i % 40}",
+            "description": f"Movimentação de teste número {i} com descrição média",
+            "value": round(rng.uniform(1, 10000), 2),
+            "account_id": 1 + i % 3,
+            "is_recurring": False,
+            "is_reconciled": bool(i % 2),
+            "created_at": start,
+            "updated_at": start,
+        })
+        if len(batch) == 10_000:
+            session.bulk_insert_mappings(CashFlowTransaction, batch)
+            batch = []
+    if batch:
+        session.bulk_insert_mappings(CashFlowTransaction, batch)
+    session.commit()
+
+
+@pytest.fixture(scope="module")
+def export_session(sqlite_session):
+    """SQLite em memória com um workspace pequeno e um grande"""
+    tables = [BankAccount.__table__, CashFlowTransaction.__table__]
+    with sqlite_session(tables) as session:
+        for account_id in (1, 2, 3):
+            session.add(BankAccount(
+                id=account_id, workspace_id=1, bank_name=f"Banco {account_id}", account_type="corrente",
+                current_balance=0.0, initial_balance=0.0, is_active=True
+            ))
+        _seed(session, SMALL_EXPORT, workspace_id=1)
+        _seed(session, LARGE_EXPORT, workspace_id=2)
+
+        yield session
+
+
+def _query(session, workspace_id):
+    return session.query(CashFlowTransaction).filter(
+        CashFlowTransaction.workspace_id == workspace_id
+    ).order_by(CashFlowTransaction.transaction_date.desc(), CashFlowTransaction.id.desc())
+
+
+def _consume(chunks) -> int:
+    return sum(len(chunk) for chunk in chunks)
+
+
+def _measure(label, run, rows):
+    """Executa `run` duas vezes: throughput sem e pico de memória com tracemalloc"""
+    gc.collect()
+    started = time.perf_counter()
+    size = run()
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"\n{label}: {rows} linhas em {elapsed:.2f}s ({rows / elapsed:,.0f} linhas/s), "
+        f"{size / 1024 / 1024:.1f} MB, pico Python {peak / 1024 / 1024:.1f} MB, "
+        f"RSS máximo do processo {max_rss_mb:.0f} MB"
+    )
+    return peak
+
+
+@pytest.mark.slow
+class TestCashFlowExportBenchmark:
+    """Throughput e memória constante da exportação"""
+
+    def test_csv_memory_is_flat(self, export_session):
+        small = _measure("CSV", lambda: _consume(stream_csv(export_rows(_query(export_session, 1)))), SMALL_EXPORT)
+        large = _measure("CSV", lambda: _consume(stream_csv(export_rows(_query(export_session, 2)))), LARGE_EXPORT)
+
+        assert large < small * 1.5 + 1024 * 1024
+
+    def test_xlsx_memory_is_flat(self, export_session):
+        small = _measure("XLSX", lambda: _consume(stream_xlsx(export_rows(_query(export_session, 1)))), SMALL_EXPORT)
+        large = _measure("XLSX", lambda: _consume(stream_xlsx(export_rows(_query(export_session, 2)))), LARGE_EXPORT)
+
+        assert large < small * 1.5 + 1024 * 1024
+
+    def test_full_load_reference(self, export_session):
+        """Referência: carregar a lista completa cresce linearmente com o volume"""
+        small = _measure("query.all()", lambda: len(_query(export_session, 1).all()), SMALL_EXPORT)
+        export_session.expunge_all()
+        large = _measure("query.all()", lambda: len(_query(export_session, 2).all()), LARGE_EXPORT)
+        export_session.expunge_all()
+
+        assert large > small * 3
@@ -0,0 +1,44 @@
+"""
+Benchmark do DataCleaner: laço de clean_extracted_data vs clean_batch
+
+Registros bagunçados (fixtures.sample_invoices.messy_invoice_records) com
+nomes, CNPJs, datas e valores repetidos como em uma importação real. O lote
+limpa cada valor distinto de uma coluna uma única vez e tem de produzir
+exatamente a mesma saída que o caminho unitário.
+
+Execução com os números impressos:
+    pytest tests/integration/test_data_cleaner_performance.py -s -m slow
+"""
+import logging
+import time
+import pytest
+
+from app.services.data_cleaner import DataCleaner
+from tests.fixtures.sample_invoices import messy_invoice_records
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("record_count", [1000, 10000])
+def test_batch_vs_scalar_throughput(record_count):
+    records = messy_invoice_records(record_count)
+    logging.disable(logging.ERROR)  # fallbacks registram um erro por registro
+
+    try:
+        started = time.perf_counter()
+        cleaner = DataCleaner()
+        expected = [cleaner.clean_extracted_data(record) for record in records]
+        scalar_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = DataCleaner().clean_batch(records)
+        batch_seconds = time.perf_counter() - started
+    finally:
+        logging.disable(logging.NOTSET)
+
+    print(
+        f"\n{record_count} registros: unitário {record_count / scalar_seconds:,.0f} reg/s | "
+        f"lote {record_count / batch_seconds:,.0f} reg/s ({scalar_seconds / batch_seconds:.1f}x)"
+    )
+
+    assert result == expected
+    assert batch_seconds < scalar_seconds
@@ -0,0 +1,148 @@
+"""
+Benchmark do worker de micro-batching do LayoutLM
+
+Simula uploads concorrentes (várias requisições enviando páginas ao mesmo
+tempo) e compara lotes de 1 página com micro-lotes, medindo páginas/s e a
+latência por página (p50/p95).
+
+- TestBatcherOverhead: serviço falso com custo fixo por forward; mede o
+  overhead da fila e o ganho quando o custo fixo é amortizado
+- TestLayoutLMv3Batching: LayoutLMv3 (pesos aleatórios, sem download) em
+  CPU com entradas sintéticas do tamanho de uma página de nota fiscal
+
+Execução com os números impressos:
+    pytest tests/integration/test_layout_lm_batching_performance.py -s -m slow
+"""
+import asyncio
+import statistics
+import time
+import pytest
+
+from app.services.layout_lm_batcher import LayoutLMBatcher
+
+
+CONCURRENT_UPLOADS = 8
+PAGES_PER_UPLOAD = 4
+
+
+class FixedCostService:
+    """Forward com custo fixo + custo por página (em segundos)"""
+
+    _model_loaded = True
+
+    def __init__(self, fixed_cost: float, per_page_cost: float):
+        self.fixed_cost = fixed_cost
+        self.per_page_cost = per_page_cost
+
+    async def load_model(self):
+        return True
+
+    def predict_batch(self, images, ocr_results, page_ids):
+        time.sleep(self.fixed_cost + self.per_page_cost * len(images))
+        return [{"page_id": page_id, "extracted_fields": {}, "confidence_score": 0.9} for page_id in page_ids]
+
+
+def _run_uploads(batcher: LayoutLMBatcher):
+    """Uploads concorrentes; retorna (páginas/s, latências por página)"""
+    latencies = []
+
+    async def predict_page(upload, page):
+        started = time.perf_counter()
+        await batcher.predict(f"imagem_{upload}_{page}", {"words": ["x"], "boxes": [[0, 0, 1, 1]]}, f"{upload}_{page}")
+        latencies.append(time.perf_counter() - started)
+
+    async def upload(upload_id):
+        await asyncio.gather(*[predict_page(upload_id, page) for page in range(PAGES_PER_UPLOAD)])
+
+    async def run():
+        await asyncio.gather(*[upload(upload_id) for upload_id in range(CONCURRENT_UPLOADS)])
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    return len(latencies) / elapsed, latencies
+
+
+def _report(label, throughput, latencies, batcher):
+    ordered = sorted(latencies)
+    p95 = ordered[int(0.95 * (len(ordered) - 1))]
+    stats = batcher.stats()
+    print(
+        f"\n{label}: {throughput:.1f} páginas/s, latência p50 {statistics.median(ordered) * 1000:.0f} ms, "
+        f"p95 {p95 * 1000:.0f} ms, lote médio {stats['average_batch_size']}"
+    )
+
+
+@pytest.mark.slow
+class TestBatcherOverhead:
+    """Mecânica da fila com um modelo de custo conhecido"""
+
+    def test_micro_batching_amortizes_fixed_cost(self):
+        results = {}
+        for max_batch_size in (1, 8):
+            batcher = LayoutLMBatcher(FixedCostService(0.02, 0.002), max_batch_size=max_batch_size, max_wait_ms=10)
+            try:
+                throughput, latencies = _run_uploads(batcher)
+                _report(f"custo fixo, lote máximo {max_batch_size}", throughput, latencies, batcher)
+                results[max_batch_size] = throughput
+            finally:
+                batcher.shutdown(timeout=5)
+
+        assert results[8] > results[1] * 3
+
+
+@pytest.mark.slow
+@pytest.mark.requires_ai
+class TestLayoutLMv3Batching:
+    """LayoutLMv3 real em CPU (pesos aleatórios)"""
+
+    SEQUENCE_LENGTH = 384
+
+    @pytest.fixture(scope="class")
+    def synthetic_service(self):
+        torch = pytest.importorskip("torch")
+        transformers = pytest.importorskip("transformers")
+
+        model = transformers.LayoutLMv3ForTokenClassification(transformers.LayoutLMv3Config(num_labels=23))
+        model.eval()
+        sequence_length = self.SEQUENCE_LENGTH
+
+        class SyntheticService:
+            """Encodings sintéticos do tamanho de uma página, forward real"""
+            _model_loaded = True
+
+            async def load_model(self):
+                return True
+
+            def predict_batch(self, images, ocr_results, page_ids):
+                size = len(page_ids)
+                top_left = torch.randint(0, 500, (size, sequence_length, 2))
+                encoding = {
+                    "input_ids": torch.randint(5, 50000, (size, sequence_length)),
+                    "attention_mask": torch.ones(size, sequence_length, dtype=torch.long),
+                    "bbox": torch.cat([top_left, top_left + 20], dim=-1),
+                    "pixel_values": torch.randn(size, 3, 224, 224),
+                }
+                with torch.no_grad():
+                    logits = model(**encoding).logits
+                confidences = torch.softmax(logits, dim=-1).max(dim=-1).values.mean(dim=-1)
+                return [
+                    {"page_id": page_id, "extracted_fields": {}, "confidence_score": float(confidence)}
+                    for page_id, confidence in zip(page_ids, confidences)
+                ]
+
+        return SyntheticService()
+
+    def test_micro_batching_throughput(self, synthetic_service):
+        results = {}
+        for max_batch_size in (1, 8):
+            batcher = LayoutLMBatcher(synthetic_service, max_batch_size=max_batch_size, max_wait_ms=10)
+            try:
+                _run_uploads(batcher)  # aquecimento
+                throughput, latencies = _run_uploads(batcher)
+                _report(f"LayoutLMv3 CPU, lote máximo {max_batch_size}", throughput, latencies, batcher)
+                results[max_batch_size] = throughput
+            finally:
+                batcher.shutdown(timeout=60)
+
+        assert results[8] > results[1]
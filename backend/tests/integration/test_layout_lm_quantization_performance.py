@@ -0,0 +1,134 @@
+"""
+Benchmark do LayoutLM em CPU: fp32 x int8 (quantização dinâmica)
+
+Para cada variante mede o tempo de carga + aquecimento, o tamanho dos pesos,
+o crescimento do RSS do processo e a latência por página; a precisão do int8
+é comparada com o fp32 (referência) nas páginas montadas a partir dos textos
+de OCR de tests/fixtures/sample_invoices.py:
+- concordância dos labels preditos por token
+- campos extraídos idênticos por página
+- diferença da confiança média
+
+Requer torch/transformers e acesso ao modelo LAYOUTLM_MODEL_NAME.
+
+Execução com os números impressos:
+    pytest tests/integration/test_layout_lm_quantization_performance.py -s -m slow
+"""
+import gc
+import resource
+import statistics
+import time
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from PIL import Image
+
+from app.core.config import settings
+from app.services.layout_lm_registry import LayoutLMModelRegistry
+from app.services.layout_lm_service import LayoutLMService
+from tests.fixtures.sample_invoices import SAMPLE_OCR_TEXTS
+
+LATENCY_REPEATS = 5
+
+# Concordância mínima de labels do int8 em relação ao fp32
+MIN_LABEL_AGREEMENT = 0.9
+
+
+def _page_from_text(text: str):
+    """Imagem em branco + palavras com caixas dispostas linha a linha (0-1000)"""
+    words, boxes = [], []
+    lines = [line for line in text.strip().splitlines() if line.strip()]
+    for row, line in enumerate(lines):
+        x = 40
+        for word in line.split():
+            width = 12 * len(word)
+            words.append(word)
+            boxes.append([x, 40 + 30 * row, min(x + width, 1000), 60 + 30 * row])
+            x = min(x + width + 10, 990)
+    return Image.new('RGB', (850, 1100), 'white'), {"words": words, "boxes": boxes}
+
+
+def _max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _labels(loaded, image, ocr_result):
+    encoding = loaded.processor(
+        image, ocr_result["words"], boxes=ocr_result["boxes"],
+        return_tensors="pt", padding=True, truncation=True
+    )
+    with torch.no_grad():
+        logits = loaded.model(**encoding).logits
+    return torch.argmax(logits, dim=-1)[0]
+
+
+@pytest.mark.slow
+@pytest.mark.requires_ai
+class TestLayoutLMQuantization:
+    """Carga, memória, latência e precisão fp32 x int8"""
+
+    @pytest.fixture(scope="class")
+    def pages(self):
+        return {name: _page_from_text(text) for name, text in SAMPLE_OCR_TEXTS.items()}
+
+    @pytest.fixture(scope="class")
+    def variants(self, pages):
+        results = {}
+        for quantize in (False, True):
+            gc.collect()
+            rss_before = _max_rss_mb()
+            loaded = LayoutLMModelRegistry().get(settings.LAYOUTLM_MODEL_NAME, quantize=quantize)
+            rss_growth = _max_rss_mb() - rss_before
+
+            service = LayoutLMService()
+            service.processor, service.model, service.device = loaded.processor, loaded.model, loaded.device
+            service._model_loaded = True
+
+            latencies = []
+            for _ in range(LATENCY_REPEATS):
+                for image, ocr_result in pages.values():
+                    started = time.perf_counter()
+                    service.predict_batch([image], [ocr_result], ["page"])
+                    latencies.append(time.perf_counter() - started)
+
+            label = "int8" if quantize else "fp32"
+            print(
+                f"\n{label}: carga {loaded.load_seconds:.2f}s, aquecimento {loaded.warmup_seconds:.2f}s, "
+                f"pesos {loaded.size_mb:.0f} MB, RSS +{rss_growth:.0f} MB, "
+                f"latência por página p50 {statistics.median(latencies) * 1000:.0f} ms "
+                f"({torch.get_num_threads()} threads)"
+            )
+            results[label] = (loaded, service, statistics.median(latencies))
+        return results
+
+    def test_int8_is_smaller_and_not_slower(self, variants):
+        fp32, _, fp32_latency = variants["fp32"]
+        int8, _, int8_latency = variants["int8"]
+
+        assert int8.size_mb < fp32.size_mb * 0.6
+        assert int8_latency < fp32_latency * 1.1
+
+    def test_int8_accuracy_against_fp32(self, variants, pages):
+        fp32, fp32_service, _ = variants["fp32"]
+        int8, int8_service, _ = variants["int8"]
+
+        agreements, same_fields, confidence_deltas = [], 0, []
+        for name, (image, ocr_result) in pages.items():
+            reference = _labels(fp32, image, ocr_result)
+            quantized = _labels(int8, image, ocr_result)
+            agreements.append(float((reference == quantized).float().mean()))
+
+            fp32_result = fp32_service.predict_batch([image], [ocr_result], [name])[0]
+            int8_result = int8_service.predict_batch([image], [ocr_result], [name])[0]
+            same_fields += fp32_result["extracted_fields"] == int8_result["extracted_fields"]
+            confidence_deltas.append(abs(fp32_result["confidence_score"] - int8_result["confidence_score"]))
+
+        print(
+            f"\nint8 x fp32 em {len(pages)} página(s): concordância de labels {statistics.mean(agreements):.1%} "
+            f"(mín. {min(agreements):.1%}), campos idênticos {same_fields}/{len(pages)}, "
+            f"diferença máxima de confiança {max(confidence_deltas):.3f}"
+        )
+
+        assert statistics.mean(agreements) >= MIN_LABEL_AGREEMENT
@@ -0,0 +1,155 @@
+"""
+Benchmark do cliente HTTP compartilhado em rajadas de 100 extrações
+
+Compara uma ClientSession por chamada (implementação anterior) com o cliente
+compartilhado contra um servidor local que simula a latência do modelo e o
+custo de estabelecer cada conexão (handshake TCP/TLS, atrasando a primeira
+requisição de cada conexão) e que responde 429 acima de um limite de
+requisições simultâneas, como a API.
+
+Execução com os números impressos:
+    pytest tests/integration/test_llm_http_client_performance.py -s -m slow
+"""
+import asyncio
+import statistics
+import threading
+import time
+import aiohttp
+import pytest
+from aiohttp import web
+
+from app.services.llm_http_client import LLMHttpClient, LLMHttpError
+
+BURST = 100
+MODEL_SECONDS = 0.02
+HANDSHAKE_SECONDS = 0.03
+SERVER_CONCURRENCY = 16
+
+
+class SimulatedLLMServer:
+    def __init__(self, concurrency_limit=None):
+        self.concurrency_limit = concurrency_limit
+        self.active = 0
+        self.connections = set()
+        self.throttled = 0
+
+    async def handle(self, request):
+        peer = request.transport.get_extra_info("peername")
+        if peer not in self.connections:
+            self.connections.add(peer)
+            await asyncio.sleep(HANDSHAKE_SECONDS)
+
+        if self.concurrency_limit and self.active >= self.concurrency_limit:
+            self.throttled += 1
+            return web.json_response({"error": "rate_limit"}, status=429, headers={"Retry-After": "0.05"})
+
+        self.active += 1
+        try:
+            await asyncio.sleep(MODEL_SECONDS)
+        finally:
+            self.active -= 1
+        return web.json_response({"choices": [{"message": {"content": "{}"}}]})
+
+    def __enter__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._serve(), self._loop).result(5)
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop.close()
+
+    async def _serve(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/v1/chat/completions"
+
+
+async def _session_per_call(url):
+    """Implementação anterior: nova sessão (e conexão) a cada extração"""
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json={}) as response:
+            if response.status != 200:
+                raise LLMHttpError(f"HTTP {response.status}", response.status)
+            return await response.json()
+
+
+async def _burst(call, concurrency=BURST):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed():
+        started = time.perf_counter()
+        try:
+            async with semaphore:
+                await call()
+            ok = True
+        except LLMHttpError:
+            ok = False
+        return ok, time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[timed() for _ in range(BURST)])
+    return time.perf_counter() - started, results
+
+
+def _report(label, elapsed, results, server):
+    latencies = sorted(latency for _, latency in results)
+    failures = sum(1 for ok, _ in results if not ok)
+    print(
+        f"\n{label}: {BURST} extrações em {elapsed:.2f}s, latência p50 "
+        f"{statistics.median(latencies) * 1000:.0f} ms / p95 {latencies[int(BURST * 0.95)] * 1000:.0f} ms, "
+        f"{len(server.connections)} conexões, {server.throttled} respostas 429, {failures} falhas"
+    )
+    return failures
+
+
+@pytest.mark.slow
+class TestLLMHttpClientBenchmark:
+    """Reuso de conexões e rajadas acima do limite da API"""
+
+    def test_connection_reuse(self):
+        """Mesmo paralelismo (20): só o custo de abrir conexões muda"""
+        with SimulatedLLMServer() as server:
+            elapsed_baseline, results = asyncio.run(_burst(lambda: _session_per_call(server.url), 20))
+            _report("Sessão por chamada", elapsed_baseline, results, server)
+            baseline_connections = len(server.connections)
+
+        client = LLMHttpClient(max_connections=20, max_concurrency=20, requests_per_second=0)
+        try:
+            with SimulatedLLMServer() as server:
+                # Rajada de aquecimento abre as conexões do pool
+                asyncio.run(_burst(lambda: client.post_json(server.url, {})))
+                elapsed_pooled, results = asyncio.run(_burst(lambda: client.post_json(server.url, {})))
+                _report("Cliente compartilhado (2a rajada)", elapsed_pooled, results, server)
+                pooled_connections = len(server.connections)
+        finally:
+            client.shutdown(timeout=5)
+
+        assert baseline_connections == BURST
+        assert pooled_connections <= 20
+        assert elapsed_pooled < elapsed_baseline
+
+    def test_burst_above_api_limit(self):
+        with SimulatedLLMServer(concurrency_limit=SERVER_CONCURRENCY) as server:
+            elapsed, results = asyncio.run(_burst(lambda: _session_per_call(server.url)))
+            baseline_failures = _report("Sessão por chamada", elapsed, results, server)
+
+        client = LLMHttpClient(max_connections=SERVER_CONCURRENCY, max_concurrency=SERVER_CONCURRENCY,
+                               requests_per_second=0, backoff_seconds=0.05)
+        try:
+            with SimulatedLLMServer(concurrency_limit=SERVER_CONCURRENCY) as server:
+                elapsed, results = asyncio.run(_burst(lambda: client.post_json(server.url, {})))
+                pooled_failures = _report("Cliente compartilhado", elapsed, results, server)
+        finally:
+            client.shutdown(timeout=5)
+
+        assert baseline_failures > 0
+        assert pooled_failures == 0
@@ -0,0 +1,126 @@
+"""
+Benchmark do OCR de notas digitalizadas: 300 DPI sem pré-processamento vs
+pré-processamento + DPI adaptativo
+
+Gera PDFs de notas "digitalizadas" (imagem da página levemente inclinada,
+com ruído e um trecho em fonte pequena) e compara, por página, o tempo de
+rasterização + OCR, os pixels em memória e a fração das palavras esperadas
+encontradas pelo Tesseract.
+
+Requer os binários do Tesseract (idioma por) e do Poppler (pdftoppm).
+
+Execução com os números impressos:
+    pytest tests/integration/test_ocr_preprocessing_performance.py -s -m slow
+"""
+import shutil
+import time
+from collections import Counter
+import cv2
+import numpy as np
+import pytest
+import pytesseract
+from PIL import Image
+
+from app.services.pdf_page_pipeline import (
+    MIN_WORD_CONFIDENCE, TESSERACT_CONFIG, ocr_refinement, perform_ocr, rasterize_page, resolve_ocr_dpi
+)
+from app.services.ocr_preprocessing import rotate
+
+pytestmark = pytest.mark.skipif(
+    not (shutil.which("tesseract") and shutil.which("pdftoppm")),
+    reason="Tesseract/Poppler não instalados"
+)
+
+HIGH_DPI = 300
+PAGE_SIZE = (2480, 3508)  # A4 a 300 DPI
+
+INVOICE_LINES = [
+    "DANFE DOCUMENTO AUXILIAR DA NOTA FISCAL ELETRONICA",
+    "NF-e No 000.123.456 SERIE 1",
+    "EMITENTE PAPELARIA CENTRAL LTDA",
+    "CNPJ 12.345.678/0001-90 INSCRICAO ESTADUAL 123456789",
+    "DATA DE EMISSAO 15/03/2024 VENCIMENTO 15/04/2024",
+    "DESCRICAO DO PRODUTO QTD VALOR UNITARIO VALOR TOTAL",
+    "PAPEL A4 500 FOLHAS 10 25,90 259,00",
+    "CANETA ESFEROGRAFICA AZUL 50 1,80 90,00",
+    "GRAMPEADOR METALICO 2 45,00 90,00",
+    "BASE DE CALCULO DO ICMS 439,00 VALOR DO ICMS 79,02",
+    "VALOR TOTAL DA NOTA 439,00",
+]
+
+
+def _scanned_invoice(tmp_path, index, skew):
+    """PDF de uma página com a imagem da nota e as palavras esperadas"""
+    page = np.full(PAGE_SIZE[::-1], 255, np.uint8)
+    y = 200
+    for row, line in enumerate(INVOICE_LINES):
+        # Itens em fonte pequena: os trechos que precisam de alta resolução
+        scale = 1.0 if 6 <= row <= 8 else 2.0
+        cv2.putText(page, line, (150, y), cv2.FONT_HERSHEY_SIMPLEX, scale, 0, 2 if scale < 2 else 4)
+        y += int(45 * scale) + 40
+
+    page = rotate(page, skew)
+    noise = np.random.default_rng(index).normal(0, 18, page.shape)
+    page = np.clip(page + noise, 0, 255).astype(np.uint8)
+
+    path = tmp_path / f"nota_{index}.pdf"
+    Image.fromarray(page).convert('RGB').save(path, resolution=HIGH_DPI)
+    return str(path), Counter(word for line in INVOICE_LINES for word in line.split())
+
+
+def _legacy_ocr(image):
+    """OCR anterior: imagem RGB a 300 DPI, cópia BGR e Tesseract sem pré-processamento"""
+    cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+    data = pytesseract.image_to_data(cv_image, config=TESSERACT_CONFIG, output_type=pytesseract.Output.DICT)
+    return [
+        word.strip() for word, conf in zip(data['text'], data['conf'])
+        if word.strip() and int(float(conf)) > MIN_WORD_CONFIDENCE
+    ]
+
+
+def _recall(found, expected):
+    return sum((Counter(found) & expected).values()) / sum(expected.values())
+
+
+@pytest.mark.slow
+def test_adaptive_dpi_report(tmp_path):
+    samples = [_scanned_invoice(tmp_path, index, skew) for index, skew in enumerate([0.0, 1.5, -2.5])]
+    rows = []
+
+    for path, expected in samples:
+        started = time.perf_counter()
+        image = rasterize_page(path, 1, HIGH_DPI)
+        legacy_words = _legacy_ocr(image)
+        legacy_seconds = time.perf_counter() - started
+        legacy_bytes = image.width * image.height * 3 * 2  # RGB + cópia BGR
+
+        dpi = resolve_ocr_dpi(HIGH_DPI)
+        started = time.perf_counter()
+        image = rasterize_page(path, 1, dpi)
+        result = perform_ocr(image, ocr_refinement(path, 1, dpi, HIGH_DPI))
+        adaptive_seconds = time.perf_counter() - started
+        adaptive_bytes = image.width * image.height * 4  # RGB + tons de cinza
+
+        rows.append((
+            legacy_seconds, adaptive_seconds,
+            _recall(legacy_words, expected), _recall(result['words'], expected),
+            legacy_bytes, adaptive_bytes, result['refined_regions'], result['skew_angle']
+        ))
+
+    print("\npágina | 300 DPI: s / acerto / MB | adaptativo: s / acerto / MB | regiões refeitas | inclinação")
+    for number, row in enumerate(rows, 1):
+        print(
+            f"{number:6} | {row[0]:.2f} s / {row[2]:.0%} / {row[4] / 2**20:.0f} | "
+            f"{row[1]:.2f} s / {row[3]:.0%} / {row[5] / 2**20:.0f} | {row[6]} | {row[7]:+.2f}°"
+        )
+
+    legacy_seconds, adaptive_seconds = sum(row[0] for row in rows), sum(row[1] for row in rows)
+    legacy_recall = sum(row[2] for row in rows) / len(rows)
+    adaptive_recall = sum(row[3] for row in rows) / len(rows)
+    print(
+        f"total: {legacy_seconds:.2f} s -> {adaptive_seconds:.2f} s "
+        f"({legacy_seconds / adaptive_seconds:.1f}x), acerto {legacy_recall:.0%} -> {adaptive_recall:.0%}"
+    )
+
+    assert adaptive_seconds < legacy_seconds
+    assert adaptive_recall >= legacy_recall - 0.05
@@ -0,0 +1,57 @@
+"""
+Benchmark do matching de fornecedores por tamanho de cadastro
+
+Compara a varredura linear anterior (thefuzz sobre todos os nomes e re.sub
+em cada CNPJ) com o SupplierMatchIndex (mapa de CNPJ, bloqueio por
+trigramas e rapidfuzz nos candidatos) para 1k, 5k e 20k fornecedores.
+
+Execução com os números impressos:
+    pytest tests/integration/test_supplier_matching_performance.py -s -m slow
+"""
+import random
+import time
+import pytest
+from unittest.mock import MagicMock
+
+from app.services.supplier_match_index import SupplierMatchIndex
+from app.services.supplier_matcher import SupplierMatcher
+from tests.fixtures.sample_suppliers import linear_cnpj, linear_scan, supplier_cache, with_typos
+
+QUERIES = 30
+LIMIT = 5
+
+
+def _per_query_ms(function, queries):
+    started = time.perf_counter()
+    results = [function(query) for query in queries]
+    return (time.perf_counter() - started) / len(queries) * 1000, results
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("supplier_count", [1000, 5000, 20000])
+def test_index_vs_linear_scan(supplier_count):
+    matcher = SupplierMatcher(MagicMock())
+    suppliers = supplier_cache(supplier_count, matcher._normalize_text)
+    rng = random.Random(supplier_count)
+    sample = [rng.choice(suppliers) for _ in range(QUERIES)]
+    names = [matcher._normalize_text(with_typos(rng, supplier['name'])) for supplier in sample]
+    cnpjs = [supplier['cnpj'] for supplier in sample]
+
+    started = time.perf_counter()
+    index = SupplierMatchIndex(suppliers)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    linear_ms, expected = _per_query_ms(lambda name: linear_scan(name, suppliers, LIMIT), names)
+    indexed_ms, found = _per_query_ms(lambda name: index.search(name, LIMIT, 70), names)
+    linear_cnpj_ms, _ = _per_query_ms(lambda cnpj: linear_cnpj(cnpj, suppliers), cnpjs)
+    indexed_cnpj_ms, _ = _per_query_ms(index.find_by_cnpj, cnpjs)
+
+    print(
+        f"\n{supplier_count} fornecedores: índice montado em {build_ms:.0f} ms | nome "
+        f"{linear_ms:.1f} ms -> {indexed_ms:.2f} ms por consulta ({linear_ms / indexed_ms:.0f}x) | CNPJ "
+        f"{linear_cnpj_ms:.2f} ms -> {indexed_cnpj_ms * 1000:.1f} µs"
+    )
+
+    assert [[(match.supplier['supplier_id'], match.score) for match in matches] for matches in found] == \
+        [[(match['supplier_id'], match['score']) for match in matches] for matches in expected]
+    assert indexed_ms < linear_ms
@@ -0,0 +1,271 @@
+"""
+Testes unitários para a ingestão em lote de faturas
+"""
+import asyncio
+import io
+import os
+import threading
+import time
+import zipfile
+from datetime import datetime
+import pytest
+from fastapi import UploadFile
+
+from app.services.bulk_invoice_ingestion import (
+    BatchStager,
+    BulkIngestionError,
+    BulkIngestionLimitError,
+    BulkInvoiceIngestion,
+    entry_status,
+    summarize,
+)
+from app.services.extraction_cache import CachedExtraction
+from app.services.invoice_extraction_jobs import InvoiceExtractionJobQueue, JobQueueFull
+
+RESULT = {
+    "supplier_name": "Fornecedor Teste LTDA",
+    "invoice_number": "NF-123",
+    "total_amount": 1500.0,
+    "confidence_score": 0.92,
+    "success": True,
+}
+
+
+def _upload(filename: str, content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename=filename)
+
+
+def _zip(members) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+async def _stage(stager, *uploads):
+    for upload in uploads:
+        await stager.add_upload(upload)
+    return stager.files
+
+
+class RecordingProcessor:
+    """Processador que registra os arquivos extraídos"""
+
+    def __init__(self, delay=0.0, fail_on=(), gate=None):
+        self.delay = delay
+        self.fail_on = set(fail_on)
+        self.gate = gate
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        return self
+
+    async def process_invoice(self, file_path, original_filename, on_page=None):
+        assert os.path.exists(file_path)
+        with self.lock:
+            self.calls.append(original_filename)
+        if self.gate is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.gate.wait)
+        await asyncio.sleep(self.delay)
+
+        if original_filename in self.fail_on:
+            return {"success": False, "error": "Falha na IA", "confidence_score": 0.0}
+        return dict(RESULT, original_filename=original_filename)
+
+
+class DictCache:
+    def __init__(self, entries=None):
+        self.entries = dict(entries or {})
+        self.stored = []
+
+    def get(self, workspace_id, content_hash):
+        result = self.entries.get((workspace_id, content_hash))
+        return CachedExtraction(result, datetime(2024, 1, 1), 1) if result else None
+
+    def set(self, workspace_id, content_hash, result):
+        self.stored.append(content_hash)
+        self.entries[(workspace_id, content_hash)] = result
+        return True
+
+
+class TestBatchStager:
+    """Gravação em disco, ZIPs e limites"""
+
+    def test_zip_members_are_staged_with_generated_paths(self):
+        archive = _zip({
+            "faturas/nf1.pdf": b"%PDF-1.4 nf1",
+            "../../fora.png": b"png",
+            "leia-me.txt": b"texto",
+            "__MACOSX/faturas/._nf1.pdf": b"meta",
+            "faturas/": b"",
+        })
+
+        with BatchStager() as stager:
+            files = asyncio.run(_stage(stager, _upload("lote.zip", archive), _upload("avulsa.jpg", b"jpg")))
+
+            staged = [item for item in files if item.path]
+            skipped = [item for item in files if item.skip_reason]
+
+            assert [item.filename for item in staged] == ["faturas/nf1.pdf", "../../fora.png", "avulsa.jpg"]
+            assert all(os.path.dirname(item.path) == stager.directory for item in staged)
+            assert [os.path.splitext(item.path)[1] for item in staged] == [".pdf", ".png", ".jpg"]
+            assert [item.filename for item in skipped] == ["leia-me.txt"]
+            assert staged[0].size_bytes == len(b"%PDF-1.4 nf1")
+            directory = stager.directory
+
+        assert not os.path.exists(directory)
+
+    def test_zip_is_expanded_off_the_event_loop(self):
+        threads = []
+
+        class RecordingStager(BatchStager):
+            def add_zip(self, zip_path):
+                threads.append(threading.current_thread())
+                super().add_zip(zip_path)
+
+        with RecordingStager() as stager:
+            files = asyncio.run(_stage(stager, _upload("lote.zip", _zip({"nf1.pdf": b"%PDF nf1"}))))
+
+        assert [item.filename for item in files] == ["nf1.pdf"]
+        assert threads and threads[0] is not threading.main_thread()
+
+    def test_oversized_document_is_skipped(self):
+        with BatchStager(max_document_bytes=10) as stager:
+            files = asyncio.run(_stage(
+                stager,
+                _upload("grande.pdf", b"x" * 100),
+                _upload("lote.zip", _zip({"grande2.pdf": b"y" * 100, "ok.pdf": b"ok"}))
+            ))
+
+            assert [(item.filename, bool(item.skip_reason)) for item in files] == [
+                ("grande.pdf", True), ("grande2.pdf", True), ("ok.pdf", False)
+            ]
+            assert stager.total_bytes == 2
+
+    def test_batch_limits(self):
+        with BatchStager(max_files=2) as stager:
+            with pytest.raises(BulkIngestionLimitError):
+                asyncio.run(_stage(stager, *[_upload(f"{i}.pdf", b"pdf") for i in range(3)]))
+
+        with BatchStager(max_total_bytes=150) as stager:
+            with pytest.raises(BulkIngestionLimitError):
+                asyncio.run(_stage(stager, _upload("lote.zip", _zip({"a.pdf": b"a" * 100, "b.pdf": b"b" * 100}))))
+
+    def test_invalid_zip(self):
+        with BatchStager() as stager:
+            with pytest.raises(BulkIngestionError):
+                asyncio.run(_stage(stager, _upload("lote.zip", b"not a zip")))
+
+
+@pytest.fixture
+def make_queue():
+    queues = []
+
+    def factory(processor, **kwargs):
+        job_queue = InvoiceExtractionJobQueue(
+            processor_factory=processor, on_complete=None, max_retries=0, **kwargs
+        )
+        queues.append(job_queue)
+        return job_queue
+
+    yield factory
+
+    for job_queue in queues:
+        job_queue.shutdown(timeout=5)
+
+
+def _wait(batch, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not batch.is_finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert batch.is_finished
+    return batch
+
+
+class TestBulkInvoiceIngestion:
+    """Envio do lote à fila de jobs, cache e manifesto"""
+
+    def _staged(self, stager, count, duplicate=False, extra=()):
+        uploads = [_upload(f"nf{i}.pdf", f"%PDF nf{i}".encode()) for i in range(count)]
+        if duplicate:
+            uploads.append(_upload("copia.pdf", b"%PDF nf0"))
+        uploads.extend(extra)
+        return asyncio.run(_stage(stager, *uploads))
+
+    def test_batch_is_extracted_by_job_queue(self, make_queue):
+        gate = threading.Event()
+        processor = RecordingProcessor(gate=gate)
+        job_queue = make_queue(processor, workers=2)
+
+        try:
+            with BatchStager() as stager:
+                self._staged(stager, 6)
+                batch = BulkInvoiceIngestion(1, job_queue).submit(stager)
+                directory = stager.directory
+
+            # Resposta antes da extração; os arquivos sobrevivem ao cleanup do lote
+            assert not os.path.exists(directory)
+            assert not batch.is_finished
+            assert summarize(batch)["queued"] + summarize(batch)["processing"] == 6
+        finally:
+            gate.set()
+
+        _wait(batch)
+        assert [entry.filename for entry in batch.entries] == [f"nf{i}.pdf" for i in range(6)]
+        assert all(entry_status(entry) == "completed" for entry in batch.entries)
+        assert all(entry.job.result["original_filename"] == entry.filename for entry in batch.entries)
+        assert all(entry.job.batch_id == batch.batch_id for entry in batch.entries)
+        assert job_queue.get_batch(batch.batch_id, 1) is batch
+
+    def test_duplicates_cache_failures_and_skipped(self, make_queue):
+        processor = RecordingProcessor(fail_on={"nf2.pdf"})
+        job_queue = make_queue(processor)
+
+        with BatchStager() as stager:
+            files = self._staged(stager, 3, duplicate=True, extra=[_upload("notas.txt", b"txt")])
+            cache = DictCache({(1, files[1].content_hash): dict(RESULT)})
+            batch = BulkInvoiceIngestion(1, job_queue, extraction_cache=cache).submit(stager)
+
+        _wait(batch)
+        entries = {entry.filename: entry for entry in batch.entries}
+
+        assert sorted(processor.calls) == ["nf0.pdf", "nf2.pdf"]
+        assert entries["nf1.pdf"].job.cache_hit
+        assert entry_status(entries["nf2.pdf"]) == "failed" and entries["nf2.pdf"].job.error == "Falha na IA"
+        assert entries["copia.pdf"].duplicate_of == "nf0.pdf"
+        assert entries["copia.pdf"].job is entries["nf0.pdf"].job
+        assert entry_status(entries["notas.txt"]) == "skipped"
+        assert len(batch.jobs) == 3
+
+        summary = summarize(batch)
+        assert summary["total_files"] == 5
+        assert (summary["completed"], summary["failed"], summary["skipped"]) == (3, 1, 1)
+        assert (summary["queued"], summary["processing"]) == (0, 0)
+        assert summary["cache_hits"] == 1
+        assert summary["duplicates"] == 1
+        assert summary["documents_per_second"] > 0
+
+    def test_rejected_batch_keeps_no_files(self, make_queue):
+        gate = threading.Event()
+        job_queue = make_queue(RecordingProcessor(gate=gate), workers=1)
+
+        try:
+            with BatchStager() as stager:
+                self._staged(stager, 2)
+                BulkInvoiceIngestion(1, job_queue).submit(stager)
+
+            with BatchStager() as stager:
+                self._staged(stager, 2)
+                detached = []
+                detach = stager.detach
+                stager.detach = lambda staged: detached.append(detach(staged)) or detached[-1]
+
+                with pytest.raises(JobQueueFull):
+                    BulkInvoiceIngestion(1, job_queue).submit(stager)
+        finally:
+            gate.set()
+
+        assert len(detached) == 2
+        assert not any(os.path.exists(path) for path in detached)
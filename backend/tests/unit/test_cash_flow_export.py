@@ -0,0 +1,127 @@
+"""
+Testes unitários para a exportação em streaming de movimentações
+"""
+import csv
+import io
+import pytest
+from datetime import datetime, date, timedelta
+from types import SimpleNamespace
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from openpyxl import load_workbook
+
+from app.core.database import get_db
+from app.core.deps import get_current_user
+from app.models.cash_flow import BankAccount, CashFlowTransaction, TransactionType
+from app.models.accounts_payable import AccountsPayableInvoice  # noqa: F401 (referenciado por Supplier)
+from app.services.cash_flow_export import EXPORT_HEADERS, export_rows, stream_csv
+from app.api.api_v1.endpoints import cash_flow
+
+
+WORKSPACE_ID = 1
+
+
+@pytest.fixture
+def db(sqlite_session):
+    tables = [BankAccount.__table__, CashFlowTransaction.__table__]
+    with sqlite_session(tables) as session:
+        session.add(BankAccount(
+            id=1, workspace_id=WORKSPACE_ID, bank_name="Banco Azul", account_type="corrente",
+            current_balance=0.0, initial_balance=0.0, is_active=True
+        ))
+        start = datetime(2024, 1, 1, 9)
+        for i in range(250):
+            session.add(CashFlowTransaction(
+                workspace_id=WORKSPACE_ID if i % 5 else 2,
+                transaction_date=start + timedelta(hours=7 * i),
+                type=TransactionType.ENTRADA.value if i % 3 else TransactionType.SAIDA.value,
+                category="Vendas" if i % 2 else "Fornecedor",
+                description=f"Movimentação {i}, \"especial\"",
+                value=10.0 + i,
+                account_id=1 if i % 4 else None,
+                is_reconciled=bool(i % 2),
+                notes="linha\ncom quebra\x07" if i == 7 else None
+            ))
+        session.commit()
+
+        yield session
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(cash_flow.router, prefix="/cash-flow")
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, workspace_id=WORKSPACE_ID)
+    return TestClient(app)
+
+
+def _listed_ids(db, **filters):
+    user = SimpleNamespace(id=1, workspace_id=WORKSPACE_ID)
+    defaults = dict(skip=0, limit=1000, start_date=None, end_date=None, type=None, category=None,
+                    account_id=None, is_reconciled=None, search=None)
+    defaults.update(filters)
+    return [t.id for t in cash_flow.get_transactions(**defaults, db=db, current_user=user)]
+
+
+class TestCashFlowExport:
+    """Exportação CSV/XLSX com os filtros da listagem"""
+
+    def test_csv_matches_listing(self, client, db):
+        response = client.get("/cash-flow/transactions/export")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert "attachment; filename=\"movimentacoes_" in response.headers["content-disposition"]
+
+        text = response.content.decode("utf-8")
+        assert text.startswith("\ufeff")
+        rows = list(csv.reader(io.StringIO(text[1:])))
+
+        assert rows[0] == EXPORT_HEADERS
+        assert [int(row[0]) for row in rows[1:]] == _listed_ids(db)
+        by_id = {int(row[0]): row for row in rows[1:]}
+        assert by_id[8][EXPORT_HEADERS.index("Observações")] == "linha\ncom quebra\x07"
+        assert by_id[10][EXPORT_HEADERS.index("Conta")] == "Banco Azul"
+
+    @pytest.mark.parametrize("filters", [
+        {"type": "saida"},
+        {"category": "Vendas", "is_reconciled": True},
+        {"account_id": 1, "start_date": "2024-01-20", "end_date": "2024-02-10"},
+        {"search": "especial"},
+    ])
+    def test_export_uses_listing_filters(self, client, db, filters):
+        response = client.get("/cash-flow/transactions/export", params=filters)
+        rows = list(csv.reader(io.StringIO(response.content.decode("utf-8")[1:])))
+
+        listing_filters = dict(filters)
+        for key in ("start_date", "end_date"):
+            if key in listing_filters:
+                listing_filters[key] = date.fromisoformat(listing_filters[key])
+        if "type" in listing_filters:
+            listing_filters["type"] = cash_flow.TransactionTypeEnum(listing_filters["type"])
+
+        assert [int(row[0]) for row in rows[1:]] == _listed_ids(db, **listing_filters)
+
+    def test_xlsx_export(self, client, db):
+        response = client.get("/cash-flow/transactions/export", params={"format": "xlsx"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/vnd.openxmlformats")
+
+        sheet = load_workbook(io.BytesIO(response.content)).active
+        rows = list(sheet.iter_rows(values_only=True))
+
+        assert list(rows[0]) == EXPORT_HEADERS
+        assert [row[0] for row in rows[1:]] == _listed_ids(db)
+        by_id = {row[0]: row for row in rows[1:]}
+        assert by_id[8][EXPORT_HEADERS.index("Observações")] == "linha\ncom quebra"
+        assert by_id[10][EXPORT_HEADERS.index("Valor")] == pytest.approx(19.0)
+
+    def test_csv_is_written_in_chunks(self, db):
+        query = db.query(CashFlowTransaction).filter(CashFlowTransaction.workspace_id == WORKSPACE_ID)
+        chunks = list(stream_csv(export_rows(query, batch_size=16), chunk_size=1024))
+
+        assert len(chunks) > 5
+        assert all(isinstance(chunk, bytes) for chunk in chunks)
+        assert b"".join(chunks).decode("utf-8").count("Movimentação") == 200
@@ -0,0 +1,184 @@
+"""
+Testes unitários para o ledger diário de saldos (CashFlowLedger)
+"""
+import pytest
+from datetime import datetime, date, timedelta
+from types import SimpleNamespace
+
+from app.models.cash_flow import BankAccount, CashFlowTransaction, CashFlowDailyBalance
+from app.models.financial_reporting import DreCategoryMapping, MonthlyFinancialFact
+from app.services.cash_flow_aggregator import CashFlowAggregator
+from app.services.cash_flow_ledger import CashFlowLedger
+from app.schemas.cash_flow import (
+    CashFlowTransactionCreate,
+    CashFlowTransactionUpdate,
+    TransferRequest,
+    TransactionTypeEnum,
+)
+from app.api.api_v1.endpoints import cash_flow, cash_flow_analytics
+
+
+WORKSPACE_ID = 1
+
+
+class TestCashFlowLedger:
+    """Testes para manutenção incremental e consultas do ledger diário"""
+
+    @pytest.fixture
+    def db(self, sqlite_session):
+        """Sessão SQLite em memória com as tabelas de fluxo de caixa"""
+        tables = [
+            BankAccount.__table__, CashFlowTransaction.__table__, CashFlowDailyBalance.__table__,
+            DreCategoryMapping.__table__, MonthlyFinancialFact.__table__
+        ]
+
+        with sqlite_session(tables) as session:
+            for account_id in (1, 2):
+                session.add(BankAccount(
+                    id=account_id,
+                    workspace_id=WORKSPACE_ID,
+                    bank_name=f"Banco {account_id}",
+                    account_type="corrente",
+                    current_balance=1000.0,
+                    initial_balance=1000.0,
+                    is_active=True
+                ))
+            session.commit()
+
+            yield session
+
+    @pytest.fixture
+    def current_user(self):
+        return SimpleNamespace(id=1, workspace_id=WORKSPACE_ID)
+
+    @staticmethod
+    def _create(db, user, day: date, type_: str, value: float, account_id=1):
+        return cash_flow.create_transaction(
+            CashFlowTransactionCreate(
+                transaction_date=datetime.combine(day, datetime.min.time()) + timedelta(hours=10),
+                type=TransactionTypeEnum(type_),
+                category="Vendas" if type_ == "entrada" else "Despesas",
+                description="Movimentação de teste",
+                value=value,
+                account_id=account_id
+            ),
+            db,
+            user
+        )
+
+    def test_create_transaction_updates_ledger(self, db, current_user):
+        day = date(2024, 3, 10)
+        self._create(db, current_user, day, "entrada", 500.0)
+        self._create(db, current_user, day, "saida", 200.0)
+
+        row = db.query(CashFlowDailyBalance).filter_by(account_id=1, balance_date=day).one()
+        assert row.entries == pytest.approx(500.0)
+        assert row.exits == pytest.approx(200.0)
+        assert row.closing_balance == pytest.approx(300.0)
+
+    def test_backdated_transaction_propagates_closing_balance(self, db, current_user):
+        self._create(db, current_user, date(2024, 3, 10), "entrada", 500.0)
+        self._create(db, current_user, date(2024, 3, 20), "saida", 100.0)
+        self._create(db, current_user, date(2024, 3, 5), "entrada", 50.0)
+
+        closings = {
+            row.balance_date: row.closing_balance
+            for row in db.query(CashFlowDailyBalance).filter_by(account_id=1).all()
+        }
+        assert closings[date(2024, 3, 5)] == pytest.approx(50.0)
+        assert closings[date(2024, 3, 10)] == pytest.approx(550.0)
+        assert closings[date(2024, 3, 20)] == pytest.approx(450.0)
+        assert CashFlowLedger(db).check_consistency(WORKSPACE_ID) == []
+
+    def test_update_and_delete_keep_ledger_consistent(self, db, current_user):
+        first = self._create(db, current_user, date(2024, 3, 10), "entrada", 500.0)
+        second = self._create(db, current_user, date(2024, 3, 12), "saida", 120.0)
+
+        cash_flow.update_transaction(
+            first.id,
+            CashFlowTransactionUpdate(
+                transaction_date=datetime(2024, 3, 15, 9, 0),
+                value=700.0,
+                account_id=2
+            ),
+            db,
+            current_user
+        )
+        cash_flow.delete_transaction(second.id, db, current_user)
+
+        ledger = CashFlowLedger(db)
+        assert ledger.check_consistency(WORKSPACE_ID) == []
+        assert ledger.balance_at(WORKSPACE_ID, date(2024, 3, 31), 2) == pytest.approx(1700.0)
+        assert ledger.balance_at(WORKSPACE_ID, date(2024, 3, 31), 1) == pytest.approx(1000.0)
+
+    def test_transfer_records_both_accounts(self, db, current_user):
+        cash_flow.create_transfer(
+            TransferRequest(
+                from_account_id=1,
+                to_account_id=2,
+                value=250.0,
+                transaction_date=datetime(2024, 4, 1, 12, 0),
+                description="Reserva"
+            ),
+            db,
+            current_user
+        )
+
+        ledger = CashFlowLedger(db)
+        assert ledger.balance_at(WORKSPACE_ID, date(2024, 4, 1), 1) == pytest.approx(750.0)
+        assert ledger.balance_at(WORKSPACE_ID, date(2024, 4, 1), 2) == pytest.approx(1250.0)
+        assert ledger.balance_at(WORKSPACE_ID, date(2024, 4, 1)) == pytest.approx(2000.0)
+
+    def test_balance_at_matches_raw_aggregation(self, db, current_user):
+        for offset, (type_, value, account_id) in enumerate([
+            ("entrada", 300.0, 1), ("saida", 80.0, 2), ("entrada", 45.5, 2),
+            ("saida", 10.0, 1), ("entrada", 999.0, 1)
+        ]):
+            self._create(db, current_user, date(2024, 5, 1) + timedelta(days=offset * 3), type_, value, account_id)
+
+        ledger = CashFlowLedger(db)
+        aggregator = CashFlowAggregator(db)
+        for target in (date(2024, 4, 30), date(2024, 5, 4), date(2024, 5, 8), date(2024, 6, 1)):
+            for account_id in (None, 1, 2):
+                assert ledger.balance_at(WORKSPACE_ID, target, account_id) == pytest.approx(
+                    aggregator.balance_at(WORKSPACE_ID, target, account_id)
+                )
+
+    def test_balance_history_from_ledger(self, db, current_user):
+        self._create(db, current_user, date(2024, 6, 1), "entrada", 100.0)
+        self._create(db, current_user, date(2024, 6, 3), "saida", 40.0, account_id=2)
+
+        history = cash_flow_analytics.get_balance_history(
+            date(2024, 6, 1), date(2024, 6, 4), None, db, current_user
+        )
+
+        assert [point.balance for point in history] == pytest.approx([2100.0, 2100.0, 2060.0, 2060.0])
+        assert history[2].exits == pytest.approx(40.0)
+
+    def test_check_consistency_detects_drift_and_rebuild_fixes(self, db, current_user):
+        self._create(db, current_user, date(2024, 7, 1), "entrada", 100.0)
+        self._create(db, current_user, date(2024, 7, 2), "saida", 30.0)
+
+        # Simula transação inserida sem passar pelo ledger
+        db.add(CashFlowTransaction(
+            workspace_id=WORKSPACE_ID,
+            transaction_date=datetime(2024, 7, 1, 15, 0),
+            type="entrada",
+            category="Vendas",
+            description="Importação direta",
+            value=20.0,
+            account_id=1
+        ))
+        db.commit()
+
+        ledger = CashFlowLedger(db)
+        discrepancies = ledger.check_consistency(WORKSPACE_ID)
+        assert {d['balance_date'] for d in discrepancies} == {"2024-07-01", "2024-07-02"}
+        assert all(d['reason'] == 'value_mismatch' for d in discrepancies)
+
+        stats = ledger.rebuild(WORKSPACE_ID)
+        db.commit()
+
+        assert stats['inserted'] == 2
+        assert ledger.check_consistency(WORKSPACE_ID) == []
+        assert ledger.balance_at(WORKSPACE_ID, date(2024, 7, 2), 1) == pytest.approx(1090.0)
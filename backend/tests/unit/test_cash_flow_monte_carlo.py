@@ -0,0 +1,235 @@
+"""
+Testes unitários para a simulação Monte Carlo de Fluxo de Caixa
+"""
+import pytest
+import time
+from datetime import datetime, date, timedelta
+from types import SimpleNamespace
+import numpy as np
+
+from app.models.cash_flow import BankAccount, CashFlowTransaction, CashFlowDailyBalance
+from app.models.accounts_receivable import AccountsReceivable
+from app.models.accounts_payable import AccountsPayableInvoice, InvoiceStatus
+from app.services import cash_flow_monte_carlo
+from app.services.cash_flow_monte_carlo import MonteCarloInputs, run_simulation, simulate_chunk
+from app.services.cash_flow_ledger import CashFlowLedger
+from app.schemas.cash_flow import MonteCarloRequest
+from app.api.api_v1.endpoints import cash_flow_analytics
+
+
+WORKSPACE_ID = 1
+
+
+def _inputs(**overrides):
+    values = dict(
+        opening_balance=10000.0,
+        historical_entries=np.array([1200.0, 0.0, 800.0, 1500.0, 300.0]),
+        historical_exits=np.array([900.0, 400.0, 1000.0, 700.0, 1200.0]),
+        receivable_amounts=np.array([2000.0, 500.0, 3500.0]),
+        receivable_due_offsets=np.array([-3, 10, 40]),
+        payment_delays=np.array([0, 2, 5, 15]),
+        collection_rate=0.85,
+        payable_schedule=np.zeros(180)
+    )
+    values.update(overrides)
+    return MonteCarloInputs(**values)
+
+
+class TestMonteCarloSimulation:
+    """Testes do gerador de trajetórias"""
+
+    def test_same_seed_is_reproducible(self):
+        first = run_simulation(_inputs(), 180, 3000, seed=7)
+        second = run_simulation(_inputs(), 180, 3000, seed=7)
+        other = run_simulation(_inputs(), 180, 3000, seed=8)
+
+        assert np.array_equal(first.percentiles, second.percentiles)
+        assert first.expected_shortfall == second.expected_shortfall
+        assert not np.array_equal(first.percentiles, other.percentiles)
+
+    def test_pool_matches_in_process_execution(self, monkeypatch):
+        pooled = run_simulation(_inputs(), 180, 6000, seed=11, workers=2)
+
+        monkeypatch.setattr(cash_flow_monte_carlo, "PARALLEL_MIN_CELLS", float("inf"))
+        serial = run_simulation(_inputs(), 180, 6000, seed=11)
+
+        assert np.array_equal(pooled.percentiles, serial.percentiles)
+        assert pooled.probability_negative == serial.probability_negative
+
+    def test_deterministic_inputs_collapse_bands(self):
+        schedule = np.zeros(10)
+        schedule[4] = 600.0
+        inputs = _inputs(
+            opening_balance=1000.0,
+            historical_entries=np.array([100.0]),
+            historical_exits=np.array([50.0]),
+            receivable_amounts=np.array([300.0]),
+            receivable_due_offsets=np.array([2]),
+            payment_delays=np.array([1]),
+            collection_rate=1.0,
+            payable_schedule=schedule
+        )
+        result = run_simulation(inputs, 10, 200, seed=1)
+
+        expected = 1000.0 + 50.0 * np.arange(1, 11)
+        expected[3:] += 300.0   # recebível chega no dia 2 + 1 de atraso
+        expected[4:] -= 600.0   # pagável no dia 4
+        for band in result.percentiles:
+            assert band.tolist() == pytest.approx(expected.tolist())
+        assert result.probability_negative == 0.0
+
+    def test_negative_probability_and_shortfall(self):
+        inputs = _inputs(
+            opening_balance=100.0,
+            historical_entries=np.array([0.0, 0.0]),
+            historical_exits=np.array([0.0, 200.0]),
+            receivable_amounts=np.array([]),
+            receivable_due_offsets=np.array([], dtype=np.int64),
+            payable_schedule=np.zeros(30)
+        )
+        result = run_simulation(inputs, 30, 2000, seed=3)
+
+        # Qualquer dia com saída de 200 deixa o saldo negativo
+        assert result.probability_negative == pytest.approx(1.0, abs=1e-3)
+        assert result.expected_shortfall <= result.final_percentiles[0]
+
+    def test_uncollected_receivables_never_arrive(self):
+        inputs = _inputs(
+            historical_entries=np.array([0.0]),
+            historical_exits=np.array([0.0]),
+            collection_rate=0.0,
+            payable_schedule=np.zeros(60)
+        )
+        balances = simulate_chunk(inputs, 60, 100, np.random.SeedSequence(0))
+        assert np.all(balances == 10000.0)
+
+    @pytest.mark.slow
+    def test_ten_thousand_paths_under_one_second(self):
+        inputs = _inputs(
+            historical_entries=np.random.default_rng(0).gamma(2.0, 500.0, 90),
+            historical_exits=np.random.default_rng(1).gamma(2.0, 480.0, 90),
+            receivable_amounts=np.full(200, 750.0),
+            receivable_due_offsets=np.arange(-20, 180),
+            payment_delays=np.arange(0, 30)
+        )
+        run_simulation(inputs, 180, 10000, seed=42)  # aquece o pool
+
+        start_time = time.perf_counter()
+        run_simulation(inputs, 180, 10000, seed=42)
+        elapsed = time.perf_counter() - start_time
+
+        print(f"10k trajetórias x 180 dias: {elapsed * 1000:.1f}ms")
+        assert elapsed < 1.0
+
+
+class TestMonteCarloEndpoint:
+    """Endpoint /scenarios/monte-carlo"""
+
+    @pytest.fixture
+    def db(self, sqlite_session):
+        """Sessão SQLite em memória com histórico, recebíveis e pagáveis"""
+        tables = [
+            BankAccount.__table__,
+            CashFlowTransaction.__table__,
+            CashFlowDailyBalance.__table__,
+            AccountsReceivable.__table__,
+            AccountsPayableInvoice.__table__,
+        ]
+
+        with sqlite_session(tables) as session:
+            session.add(BankAccount(
+                id=1,
+                workspace_id=WORKSPACE_ID,
+                bank_name="Banco 1",
+                account_type="corrente",
+                current_balance=20000.0,
+                initial_balance=20000.0,
+                is_active=True
+            ))
+
+            today = date.today()
+            for offset in range(1, 60):
+                day = datetime.combine(today - timedelta(days=offset), datetime.min.time())
+                session.add(CashFlowTransaction(
+                    workspace_id=WORKSPACE_ID, transaction_date=day, type="entrada",
+                    category="Vendas", description="Venda", value=500.0 + offset * 10, account_id=1
+                ))
+                session.add(CashFlowTransaction(
+                    workspace_id=WORKSPACE_ID, transaction_date=day, type="saida",
+                    category="Despesas", description="Despesa", value=450.0, account_id=1
+                ))
+
+            for index, (status, due_offset, payment_offset, paid_value) in enumerate([
+                ("recebido", -20, -15, 1000.0), ("recebido", -10, -10, 1000.0), ("pendente", 5, None, 0.0),
+                ("vencido", -3, None, 0.0), ("parcial", 8, None, 400.0), ("cancelado", 6, None, 0.0)
+            ]):
+                session.add(AccountsReceivable(
+                    workspace_id=WORKSPACE_ID,
+                    document_number=f"NF-{index}",
+                    customer_name="Cliente",
+                    issue_date=today - timedelta(days=25),
+                    due_date=today + timedelta(days=due_offset),
+                    payment_date=today + timedelta(days=payment_offset) if payment_offset is not None else None,
+                    value=1000.0,
+                    paid_value=paid_value,
+                    status=status
+                ))
+
+            for index, (status, due_offset, value) in enumerate([
+                (InvoiceStatus.PENDING, 10, 5000.0), (InvoiceStatus.APPROVED, 15, 2000.0),
+                (InvoiceStatus.OVERDUE, -2, 3000.0), (InvoiceStatus.PAID, 12, 9000.0),
+                (InvoiceStatus.CANCELLED, 12, 9000.0)
+            ]):
+                session.add(AccountsPayableInvoice(
+                    workspace_id=WORKSPACE_ID,
+                    supplier_id=1,
+                    invoice_number=f"AP-{index}",
+                    invoice_date=today - timedelta(days=20),
+                    due_date=today + timedelta(days=due_offset),
+                    gross_value=value,
+                    total_value=value,
+                    paid_value=value if status == InvoiceStatus.PAID else 0.0,
+                    status=status
+                ))
+            session.flush()
+            CashFlowLedger(session).rebuild(WORKSPACE_ID)
+            session.commit()
+
+            yield session
+
+    def test_monte_carlo_endpoint(self, db):
+        current_user = SimpleNamespace(id=1, workspace_id=WORKSPACE_ID)
+        request = MonteCarloRequest(days_ahead=30, paths=1000, seed=5)
+
+        first = cash_flow_analytics.calculate_monte_carlo(request, db, current_user)
+        second = cash_flow_analytics.calculate_monte_carlo(request, db, current_user)
+
+        assert first.paths == 1000
+        assert len(first.bands) == 30
+        assert first.bands[0].projection_date == date.today() + timedelta(days=1)
+        assert all(band.p5 <= band.p50 <= band.p95 for band in first.bands)
+        assert first.final_balance_p5 <= first.final_balance_p50 <= first.final_balance_p95
+        assert 0.0 <= first.probability_negative_balance <= 1.0
+        assert first.payment_delay_samples == 2
+        assert first.model_dump() == second.model_dump()
+
+    def test_open_payables_and_receivables_shift_bands(self, db):
+        current_user = SimpleNamespace(id=1, workspace_id=WORKSPACE_ID)
+        request = MonteCarloRequest(days_ahead=30, paths=1000, seed=5)
+        with_open = cash_flow_analytics.calculate_monte_carlo(request, db, current_user)
+
+        # Sem pagáveis em aberto: mesmas trajetórias, sem os 10.000 debitados
+        db.query(AccountsPayableInvoice).update({AccountsPayableInvoice.status: InvoiceStatus.PAID})
+        db.commit()
+        without_payables = cash_flow_analytics.calculate_monte_carlo(request, db, current_user)
+
+        assert without_payables.bands[0].p50 - with_open.bands[0].p50 == pytest.approx(3000.0)
+        assert without_payables.final_balance_p50 - with_open.final_balance_p50 == pytest.approx(10000.0)
+        assert with_open.probability_negative_balance >= without_payables.probability_negative_balance
+
+        # Sem recebíveis em aberto (pendente, parcial e vencido)
+        db.query(AccountsReceivable).update({AccountsReceivable.status: "recebido"})
+        db.commit()
+        without_receivables = cash_flow_analytics.calculate_monte_carlo(request, db, current_user)
+
+        assert without_receivables.final_balance_p95 < without_payables.final_balance_p95
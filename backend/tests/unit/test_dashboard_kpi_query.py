@@ -0,0 +1,161 @@
+"""
+Testes unitários para a query única de KPIs do Executive Dashboard
+"""
+import asyncio
+import pytest
+import random
+from datetime import datetime, date, timedelta
+from types import SimpleNamespace
+from sqlalchemy import event, func, and_
+
+from app.models.cash_flow import CashFlowTransaction, TransactionType
+from app.models.accounts_receivable import AccountsReceivable
+from app.models.accounts_payable import AccountsPayableInvoice
+from app.services.dashboard_kpi_query import DashboardKPIQuery
+from app.services.report_cache import report_cache
+from app.api.api_v1.endpoints import reports
+
+
+PERIOD_START = date(2024, 3, 1)
+PERIOD_END = date(2024, 3, 31)
+COMPARISON_START = date(2024, 1, 30)
+COMPARISON_END = date(2024, 2, 29)
+
+
+def _legacy_period(db, workspace_id, start, end):
+    """Somas por query separada, como o endpoint fazia antes"""
+    def cash_flow_sum(transaction_type):
+        return db.query(func.coalesce(func.sum(CashFlowTransaction.value), 0)).filter(and_(
+            CashFlowTransaction.workspace_id == workspace_id,
+            CashFlowTransaction.type == transaction_type,
+            CashFlowTransaction.transaction_date >= start,
+            CashFlowTransaction.transaction_date <= end
+        )).scalar() or 0.0
+
+    received = db.query(func.coalesce(func.sum(AccountsReceivable.paid_value), 0)).filter(and_(
+        AccountsReceivable.workspace_id == workspace_id,
+        AccountsReceivable.payment_date >= start,
+        AccountsReceivable.payment_date <= end,
+        AccountsReceivable.paid_value > 0
+    )).scalar() or 0.0
+
+    paid = db.query(func.coalesce(func.sum(AccountsPayableInvoice.paid_value), 0)).filter(and_(
+        AccountsPayableInvoice.workspace_id == workspace_id,
+        AccountsPayableInvoice.payment_date >= start,
+        AccountsPayableInvoice.payment_date <= end,
+        AccountsPayableInvoice.paid_value > 0
+    )).scalar() or 0.0
+
+    sales = db.query(func.count(CashFlowTransaction.id)).filter(and_(
+        CashFlowTransaction.workspace_id == workspace_id,
+        CashFlowTransaction.type == TransactionType.ENTRADA.value,
+        CashFlowTransaction.transaction_date >= start,
+        CashFlowTransaction.transaction_date <= end
+    )).scalar() or 0
+
+    return (
+        cash_flow_sum(TransactionType.ENTRADA.value),
+        received,
+        cash_flow_sum(TransactionType.SAIDA.value),
+        paid,
+        sales
+    )
+
+
+class TestDashboardKPIQuery:
+    """Paridade com as queries separadas e contagem de round trips"""
+
+    @pytest.fixture
+    def db(self, sqlite_session):
+        tables = [CashFlowTransaction.__table__, AccountsReceivable.__table__, AccountsPayableInvoice.__table__]
+        with sqlite_session(tables) as session:
+            rng = random.Random(3)
+            window_start = datetime(2024, 1, 15)
+            for i in range(400):
+                workspace_id = 1 + i % 2
+                moment = window_start + timedelta(hours=rng.randint(0, 24 * 90))
+                session.add(CashFlowTransaction(
+                    workspace_id=workspace_id,
+                    transaction_date=moment,
+                    type=TransactionType.ENTRADA.value if i % 3 else TransactionType.SAIDA.value,
+                    category="Vendas",
+                    description="Movimentação",
+                    value=round(rng.uniform(10, 5000), 2)
+                ))
+                payment_date = (window_start + timedelta(days=rng.randint(0, 90))).date()
+                session.add(AccountsReceivable(
+                    workspace_id=workspace_id,
+                    document_number=f"NF-{i}",
+                    customer_name="Cliente",
+                    issue_date=payment_date - timedelta(days=30),
+                    due_date=payment_date,
+                    payment_date=payment_date if i % 4 else None,
+                    value=1000.0,
+                    paid_value=rng.choice([0.0, 300.0, 1000.0]),
+                    status="recebido"
+                ))
+                session.add(AccountsPayableInvoice(
+                    workspace_id=workspace_id,
+                    supplier_id=1,
+                    invoice_number=f"AP-{i}",
+                    invoice_date=payment_date - timedelta(days=20),
+                    due_date=payment_date,
+                    payment_date=payment_date if i % 5 else None,
+                    gross_value=800.0,
+                    total_value=800.0,
+                    paid_value=rng.choice([0.0, 800.0])
+                ))
+            session.commit()
+            report_cache.clear()
+
+            try:
+                yield session
+            finally:
+                report_cache.clear()
+
+    def test_matches_separate_queries(self, db):
+        for workspace_id in (1, 2):
+            result = DashboardKPIQuery(db).fetch(
+                PERIOD_START, PERIOD_END, COMPARISON_START, COMPARISON_END, workspace_id=workspace_id
+            )
+
+            expected_current = _legacy_period(db, workspace_id, PERIOD_START, PERIOD_END)
+            expected_previous = _legacy_period(db, workspace_id, COMPARISON_START, COMPARISON_END)
+
+            assert tuple(result.current) == pytest.approx(expected_current)
+            assert tuple(result.previous) == pytest.approx(expected_previous)
+            assert result.current.sales_count > 0
+
+    def test_single_statement_with_ctes(self, db):
+        statement = DashboardKPIQuery(db).build(PERIOD_START, PERIOD_END, COMPARISON_START, COMPARISON_END, 1)
+        sql = str(statement.compile()).upper()
+        assert sql.startswith("WITH")
+        for cte_name in ("CASH_FLOW_KPIS", "RECEIVABLE_KPIS", "PAYABLE_KPIS"):
+            assert cte_name in sql
+
+        statements = []
+        engine = db.get_bind()
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = asyncio.run(reports.get_executive_dashboard_kpis(
+                PERIOD_START, PERIOD_END, db, SimpleNamespace(id=1, workspace_id=1)
+            ))
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert len(statements) == 1
+        by_id = {kpi.id: kpi for kpi in response.kpis}
+        expected = _legacy_period(db, 1, PERIOD_START, PERIOD_END)
+        assert by_id["receita-total"].valor == pytest.approx(expected[0] + expected[1])
+        assert by_id["despesa-total"].valor == pytest.approx(expected[2] + expected[3])
+        assert by_id["vendas-total"].valor == expected[4]
+
+    def test_empty_tables_return_zeros(self, db):
+        result = DashboardKPIQuery(db).fetch(
+            date(2030, 1, 1), date(2030, 1, 31), date(2029, 12, 1), date(2029, 12, 31), workspace_id=1
+        )
+
+        assert tuple(result.current) == (0.0, 0.0, 0.0, 0.0, 0)
+        assert result.current.profit_margin == 0
+        assert result.current.average_ticket == 0
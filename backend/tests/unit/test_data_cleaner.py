@@ -3,6 +3,7 @@ Testes unitários para o DataCleaner
 """
 import pytest
 from app.services.data_cleaner import DataCleaner
+from tests.fixtures.sample_invoices import messy_invoice_records
 
 
 class TestDataCleaner:
@@ -394,4 +395,56 @@ class TestDataCleaner:
     def test_monetary_variations(self, data_cleaner, input_value, expected):
         """Testa diferentes variações de valores monetários"""
         result = data_cleaner.clean_monetary_value(input_value)
-        assert result == expected
\ No newline at end of file
+        assert result == expected
+
+@pytest.fixture(scope="module")
+def messy_records():
+    return messy_invoice_records(1500)
+
+
+class TestDataCleanerBatch:
+    """Lote coluna a coluna idêntico ao caminho unitário"""
+
+    @staticmethod
+    def _scalar(records):
+        cleaner = DataCleaner()
+        return [cleaner.clean_extracted_data(record) for record in records]
+
+    def test_batch_matches_scalar_path(self, messy_records):
+        expected = self._scalar(messy_records)
+        result = DataCleaner().clean_batch(messy_records)
+
+        # Mesmos valores, tipos e ordem de chaves
+        mismatches = [i for i, (a, b) in enumerate(zip(result, expected)) if a != b or list(a) != list(b)]
+        assert len(result) == len(expected)
+        assert mismatches == []
+
+        # Fallbacks (registros inválidos e erros de limpeza) também coincidem
+        assert any("Erro na limpeza dos dados" in r["ai_suggestions"][0] for r in result if r["ai_suggestions"])
+
+    def test_columnar_input(self, messy_records):
+        dict_records = [record for record in messy_records if isinstance(record, dict)]
+        fields = {"supplier_name", "supplier_cnpj", "issue_date", "total_amount", "items"}
+        columns = {field: [record.get(field) for record in dict_records] for field in fields}
+        expected = self._scalar([{field: columns[field][i] for field in fields} for i in range(len(dict_records))])
+
+        assert DataCleaner().clean_batch(columns) == expected
+
+    def test_supplier_names_are_memoized(self):
+        cleaner = DataCleaner()
+        calls = []
+        original = cleaner.clean_supplier_name
+        cleaner.clean_supplier_name = lambda name: calls.append(name) or original(name)
+
+        cleaner.clean_batch([{"supplier_name": "empresa  x ltda"}] * 20)
+        cleaner.clean_batch([{"supplier_name": "empresa  x ltda"}, {"supplier_name": "outra"}])
+
+        assert calls == ["empresa  x ltda", "outra"]
+
+    def test_empty_and_mismatched_columns(self):
+        cleaner = DataCleaner()
+        assert cleaner.clean_batch([]) == []
+        assert cleaner.clean_batch({}) == []
+
+        with pytest.raises(ValueError):
+            cleaner.clean_batch({"supplier_name": ["a", "b"], "total_amount": [1]})
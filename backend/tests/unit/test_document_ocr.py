@@ -0,0 +1,99 @@
+"""
+Testes unitários para o OCR por documento compartilhado entre os consumidores
+"""
+import asyncio
+import threading
+import pytest
+from unittest.mock import AsyncMock, patch
+from PIL import Image
+
+from app.services.ai_service import AIService
+from app.services.document_ocr import DocumentOcr
+
+
+def _ocr_result(text):
+    return {'words': text.split(), 'boxes': [[0, 0, 1, 1]] * len(text.split()), 'confidences': [90.0], 'text': text}
+
+
+class TestDocumentOcr:
+    """OCR executado no máximo uma vez por página"""
+
+    @pytest.mark.asyncio
+    @patch('app.services.document_ocr.perform_ocr')
+    async def test_concurrent_consumers_share_one_ocr(self, mock_ocr):
+        release = threading.Event()
+
+        def slow_ocr(image, refinement):
+            release.wait(5)
+            return _ocr_result("NOTA FISCAL 123")
+
+        mock_ocr.side_effect = slow_ocr
+        document_ocr = DocumentOcr()
+        image = Image.new('RGB', (10, 10))
+
+        tasks = [asyncio.ensure_future(document_ocr.page("page_1", image)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        assert results[0] is results[1] is results[2]
+        assert await document_ocr.text("page_1", image) == "NOTA FISCAL 123"
+        assert mock_ocr.call_count == 1
+        assert document_ocr.report() == {'pages': 1, 'ocr_runs': 1, 'reuses': 3}
+
+    @pytest.mark.asyncio
+    @patch('app.services.document_ocr.perform_ocr')
+    async def test_registered_result_is_reused(self, mock_ocr):
+        document_ocr = DocumentOcr()
+        ocr_result = document_ocr.put("page_2", _ocr_result("TOTAL 10,00"))
+
+        assert await document_ocr.page("page_2", Image.new('RGB', (10, 10))) is ocr_result
+        mock_ocr.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch('app.services.document_ocr.perform_ocr')
+    async def test_failure_is_not_cached(self, mock_ocr):
+        mock_ocr.side_effect = [RuntimeError("tesseract"), _ocr_result("ok")]
+        document_ocr = DocumentOcr()
+
+        with pytest.raises(RuntimeError):
+            await document_ocr.page("page_1", Image.new('RGB', (10, 10)))
+
+        assert (await document_ocr.page("page_1", Image.new('RGB', (10, 10))))['text'] == "ok"
+
+    @pytest.mark.asyncio
+    @patch('app.services.document_ocr.perform_ocr')
+    async def test_image_path_is_opened_once(self, mock_ocr, tmp_path):
+        path = str(tmp_path / "nota.png")
+        Image.new('L', (20, 10), 255).save(path)
+        mock_ocr.return_value = _ocr_result("NOTA")
+
+        document_ocr = DocumentOcr()
+        await document_ocr.page(path, path)
+        await document_ocr.page(path, path)
+
+        image, refinement = mock_ocr.call_args.args
+        assert (image.mode, image.size, refinement) == ('RGB', (20, 10), None)
+        assert mock_ocr.call_count == 1
+
+
+class TestAIServiceOcrReuse:
+    """Fallbacks do AIService usam o OCR do documento"""
+
+    @pytest.mark.asyncio
+    @patch('app.services.document_ocr.perform_ocr')
+    async def test_vision_fallback_and_ocr_image_share_ocr(self, mock_ocr, tmp_path):
+        path = str(tmp_path / "nota.png")
+        Image.new('RGB', (20, 10)).save(path)
+        mock_ocr.return_value = _ocr_result("Fornecedor Alfa CNPJ 12345678000190")
+
+        ai_service = AIService()
+        ai_service.extract_invoice_data = AsyncMock(return_value='{"supplier_name": "Alfa"}')
+        document_ocr = DocumentOcr()
+
+        assert await ai_service._ocr_image_fallback(path, document_ocr) == '{"supplier_name": "Alfa"}'
+        assert await ai_service.ocr_image(path, document_ocr) == "Fornecedor Alfa CNPJ 12345678000190"
+
+        prompt = ai_service.extract_invoice_data.call_args.args[0]
+        assert "Fornecedor Alfa CNPJ 12345678000190" in prompt
+        assert mock_ocr.call_count == 1
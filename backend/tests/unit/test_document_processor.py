@@ -5,6 +5,7 @@ import pytest
 from unittest.mock import MagicMock, AsyncMock, patch
 from PIL import Image
 from app.services.document_processor import DocumentProcessor
+from app.services.pdf_page_pipeline import OcrRefinement
 
 
 class TestDocumentProcessor:
@@ -121,20 +122,22 @@ class TestDocumentProcessor:
         assert 'não encontrado' in result['error']
 
     @pytest.mark.asyncio
-    @patch('app.services.document_processor.convert_from_path')
-    async def test_process_pdf_document_success(self, mock_convert, document_processor, temp_pdf_file):
+    @patch('app.services.document_processor.rasterize_page')
+    @patch('app.services.document_processor.count_pdf_pages', return_value=1)
+    async def test_process_pdf_document_success(self, mock_count, mock_rasterize, document_processor, temp_pdf_file):
         """Testa processamento bem-sucedido de PDF"""
-        # Mock da conversão PDF para imagem
+        # Mock da rasterização da página
         mock_image = MagicMock(spec=Image.Image)
-        mock_convert.return_value = [mock_image]
+        mock_rasterize.return_value = mock_image
 
-        # Mock do processamento de página individual
+        # Mock do processamento do lote de páginas
         page_result = {
             'success': True,
             'extracted_data': {'supplier_name': 'Test PDF Company'},
-            'confidence_score': 0.80
+            'confidence_score': 0.80,
+            'page_number': 1
         }
-        document_processor._process_single_image = AsyncMock(return_value=page_result)
+        document_processor._process_page_batch = AsyncMock(return_value=[page_result])
 
         # Mock da combinação de resultados
         combined_result = {
@@ -151,6 +154,7 @@ class TestDocumentProcessor:
         document_processor.data_cleaner.get_cleaning_stats = MagicMock(
             return_value={'fields_cleaned': 5}
         )
+        document_processor.use_layout_lm = False
 
         result = await document_processor._process_pdf_document(temp_pdf_file, "test.pdf")
 
@@ -158,7 +162,168 @@ class TestDocumentProcessor:
         assert result['file_type'] == 'pdf'
         assert result['total_pages'] == 1
         assert 'processed_at' in result
-        mock_convert.assert_called_once()
+        assert set(result['pipeline']['timings']) >= {
+            'rasterize_seconds', 'ocr_seconds', 'layout_lm_seconds',
+            'fallback_seconds', 'combine_seconds', 'total_seconds'
+        }
+        # DPI adaptativo: rasterização em baixa resolução para o OCR
+        mock_rasterize.assert_called_once_with(temp_pdf_file, 1, 150)
+        document_processor._combine_pdf_pages.assert_called_once_with([page_result])
+
+    @pytest.mark.asyncio
+    @patch('app.services.document_processor.get_ocr_executor')
+    @patch('app.services.document_processor.perform_ocr')
+    @patch('app.services.document_processor.rasterize_page')
+    @patch('app.services.document_processor.count_pdf_pages', return_value=8)
+    async def test_pdf_pipeline_batches_pages_in_order(
+        self, mock_count, mock_rasterize, mock_ocr, mock_get_executor, document_processor, temp_pdf_file
+    ):
+        """Testa rasterização por página, LayoutLM em lotes e fallback mantendo a ordem"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        mock_rasterize.side_effect = lambda path, page_number, dpi: f"imagem_{page_number}"
+        mock_ocr.side_effect = lambda image, refinement: {'words': [image], 'boxes': [[0, 0, 10, 10]], 'seconds': 0.01}
+        executor = ThreadPoolExecutor(max_workers=2)
+        mock_get_executor.return_value = executor
+
+        document_processor.max_pages = 5
+        document_processor.layout_lm_batch_size = 2
+
+        async def fake_batch(images, ocr_results, identifiers):
+            # Página 3 com baixa confiança cai no fallback
+            return [
+                {
+                    'extracted_fields': {'supplier_name': image, 'total_amount': 10.0},
+                    'confidence_score': 0.1 if image == 'imagem_3' else 0.9
+                }
+                for image in images
+            ]
+
+        document_processor.layout_lm_service.process_batch = AsyncMock(side_effect=fake_batch)
+        document_processor._process_with_fallback = AsyncMock(return_value={
+            'success': True,
+            'extracted_data': {'supplier_name': 'Fallback Company'},
+            'confidence_score': 0.7,
+            'processing_method': 'Traditional_AI_OCR'
+        })
+        document_processor.data_cleaner.clean_extracted_data = MagicMock(side_effect=lambda data: data)
+        document_processor.data_cleaner.get_cleaning_stats = MagicMock(return_value={})
+
+        try:
+            result = await document_processor._process_pdf_document(temp_pdf_file, "test.pdf")
+        finally:
+            executor.shutdown()
+
+        assert result['success'] is True
+        assert result['total_pages'] == 5
+        assert [call.args[1] for call in mock_rasterize.call_args_list] == [1, 2, 3, 4, 5]
+
+        # Lotes de 2 páginas: [1, 2], [3, 4], [5]
+        batches = [call.args[0] for call in document_processor.layout_lm_service.process_batch.call_args_list]
+        assert batches == [['imagem_1', 'imagem_2'], ['imagem_3', 'imagem_4'], ['imagem_5']]
+
+        # Fallback com o OCR já feito da página (sem novo OCR)
+        image, identifier, document_ocr = document_processor._process_with_fallback.call_args.args
+        assert (image, identifier) == ('imagem_3', 'test.pdf_page_3')
+        assert document_ocr.get('test.pdf_page_3')['words'] == ['imagem_3']
+        assert mock_ocr.call_count == 5
+
+        timings = result['pipeline']['timings']
+        assert timings['ocr_seconds'] == pytest.approx(0.05)
+        assert timings['total_seconds'] >= timings['combine_seconds']
+        assert result['pipeline']['layout_lm_batch_size'] == 2
+
+    @pytest.mark.asyncio
+    @patch('app.services.document_processor.get_ocr_executor')
+    @patch('app.services.document_processor.perform_ocr')
+    @patch('app.services.document_processor.extract_text_layers')
+    @patch('app.services.document_processor.rasterize_page')
+    @patch('app.services.document_processor.count_pdf_pages', return_value=3)
+    async def test_pdf_pipeline_text_layer_skips_ocr(
+        self, mock_count, mock_rasterize, mock_text_layers, mock_ocr, mock_get_executor,
+        document_processor, temp_pdf_file
+    ):
+        """Testa páginas com camada de texto sem OCR e com imagem em baixa resolução"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        text_layer = {'words': ['NF-e', '123'], 'boxes': [[0, 0, 10, 10]] * 2, 'text': 'NF-e 123', 'seconds': 0.01}
+        mock_text_layers.return_value = [text_layer, None, text_layer]
+        mock_rasterize.side_effect = lambda path, page_number, dpi: f"imagem_{page_number}_{dpi}"
+        mock_ocr.side_effect = lambda image, refinement: {'words': [image], 'boxes': [[0, 0, 10, 10]], 'seconds': 0.01}
+        executor = ThreadPoolExecutor(max_workers=2)
+        mock_get_executor.return_value = executor
+
+        document_processor.layout_lm_batch_size = 3
+        document_processor.layout_lm_service.process_batch = AsyncMock(side_effect=lambda images, ocr_results, ids: [
+            {'extracted_fields': {'supplier_name': 'Test'}, 'confidence_score': 0.9} for _ in images
+        ])
+        document_processor.data_cleaner.clean_extracted_data = MagicMock(side_effect=lambda data: data)
+        document_processor.data_cleaner.get_cleaning_stats = MagicMock(return_value={})
+
+        try:
+            result = await document_processor._process_pdf_document(temp_pdf_file, "test.pdf")
+        finally:
+            executor.shutdown()
+
+        assert [call.args[1:] for call in mock_rasterize.call_args_list] == [(1, 72), (2, 150), (3, 72)]
+        mock_ocr.assert_called_once_with('imagem_2_150', OcrRefinement(temp_pdf_file, 2, 150, 300))
+
+        images, ocr_results, _ = document_processor.layout_lm_service.process_batch.call_args.args
+        assert images == ['imagem_1_72', 'imagem_2_150', 'imagem_3_72']
+        assert ocr_results[0] is text_layer and ocr_results[2] is text_layer
+
+        report = result['pipeline']['text_layer']
+        assert report['path'] == 'mixed'
+        assert report['page_sources'] == ['text_layer', 'ocr', 'text_layer']
+        assert result['pipeline']['timings']['ocr_seconds'] == pytest.approx(0.01)
+
+    @pytest.mark.asyncio
+    async def test_process_page_batch_layout_lm_failure_uses_fallback(self, document_processor):
+        """Testa fallback de todas as páginas do lote quando o LayoutLM falha"""
+        import asyncio
+        from app.services.pdf_page_pipeline import PdfPage, new_stage_timings
+
+        loop = asyncio.get_running_loop()
+        pages = []
+        for page_number in (1, 2):
+            ocr = loop.create_future()
+            ocr.set_result({'words': ['texto'], 'boxes': [[0, 0, 1, 1]], 'seconds': 0.5})
+            pages.append(PdfPage(page_number, MagicMock(spec=Image.Image), ocr, None, 0.25))
+
+        document_processor.layout_lm_service.process_batch = AsyncMock(side_effect=RuntimeError("modelo"))
+        document_processor._process_with_fallback = AsyncMock(side_effect=lambda image, identifier, document_ocr: {
+            'success': True,
+            'extracted_data': {'supplier_name': identifier},
+            'confidence_score': 0.6
+        })
+        timings = new_stage_timings()
+
+        results = await document_processor._process_page_batch(pages, "doc.pdf", timings)
+
+        assert [r['extracted_data']['supplier_name'] for r in results] == ['doc.pdf_page_1', 'doc.pdf_page_2']
+        assert [r['page_number'] for r in results] == [1, 2]
+        assert results[0]['timings'] == {'rasterize_seconds': 0.25, 'ocr_seconds': 0.5}
+        assert timings['ocr_seconds'] == pytest.approx(1.0)
+
+    @pytest.mark.asyncio
+    @patch('app.services.document_processor.replace_ocr_executor')
+    @patch('app.services.document_processor.get_ocr_executor')
+    @patch('app.services.document_processor.perform_ocr', return_value={'words': ['texto'], 'boxes': [[0, 0, 1, 1]]})
+    async def test_broken_ocr_pool_is_replaced_without_cancelling(
+        self, mock_ocr, mock_get_executor, mock_replace, document_processor
+    ):
+        """Testa OCR em thread e troca apenas do pool quebrado, sem cancelar o OCR de outros documentos"""
+        from concurrent.futures.process import BrokenProcessPool
+
+        broken = MagicMock()
+        broken.submit.side_effect = BrokenProcessPool("worker morreu")
+        mock_get_executor.return_value = broken
+
+        result = await document_processor._submit_ocr(MagicMock(spec=Image.Image))
+
+        assert result['words'] == ['texto']
+        mock_replace.assert_called_once_with(broken)
+        broken.shutdown.assert_not_called()
 
     @pytest.mark.asyncio
     @patch('app.services.document_processor.Image.open')
@@ -203,7 +368,8 @@ class TestDocumentProcessor:
         assert 'muito pequena' in result['error']
 
     @pytest.mark.asyncio
-    async def test_process_single_image_with_layout_lm(self, document_processor):
+    @patch('app.services.document_ocr.perform_ocr')
+    async def test_process_single_image_with_layout_lm(self, mock_ocr, document_processor):
         """Testa processamento de imagem individual com LayoutLM"""
         document_processor.use_layout_lm = True
 
@@ -219,14 +385,20 @@ class TestDocumentProcessor:
             return_value=layout_result
         )
 
+        ocr_result = {'words': ['NF'], 'boxes': [[0, 0, 1, 1]], 'text': 'NF'}
+        mock_ocr.return_value = ocr_result
+
         result = await document_processor._process_single_image(mock_image, "test_image")
 
         assert result['success'] is True
         assert 'LayoutLM' in result['processing_method']
-        document_processor.layout_lm_service._process_single_image.assert_called_once()
+        document_processor.layout_lm_service._process_single_image.assert_called_once_with(
+            mock_image, "test_image", ocr_result=ocr_result
+        )
 
     @pytest.mark.asyncio
-    async def test_process_single_image_layout_lm_fallback(self, document_processor):
+    @patch('app.services.document_ocr.perform_ocr')
+    async def test_process_single_image_layout_lm_fallback(self, mock_ocr, document_processor):
         """Testa fallback quando LayoutLM falha ou tem baixa confiança"""
         document_processor.use_layout_lm = True
 
@@ -242,10 +414,8 @@ class TestDocumentProcessor:
             return_value=layout_result
         )
 
-        # Mock do processamento tradicional
-        document_processor._extract_text_from_image = AsyncMock(
-            return_value="Extracted text from image"
-        )
+        # OCR único, usado pelo LayoutLM e pelo processamento tradicional
+        mock_ocr.return_value = {'words': ['Extracted'], 'boxes': [[0, 0, 1, 1]], 'text': "Extracted text from image"}
         document_processor._process_with_traditional_ai = AsyncMock(return_value={
             'success': True,
             'extracted_data': {'supplier_name': 'Traditional AI Company'},
@@ -255,26 +425,26 @@ class TestDocumentProcessor:
         result = await document_processor._process_single_image(mock_image, "test_image")
 
         assert result['success'] is True
-        # Deve ter usado o método tradicional
-        document_processor._process_with_traditional_ai.assert_called_once()
+        # Deve ter usado o método tradicional, com o texto do mesmo OCR
+        document_processor._process_with_traditional_ai.assert_called_once_with("Extracted text from image", "test_image")
+        mock_ocr.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_extract_text_from_image(self, document_processor):
-        """Testa extração de texto de imagem"""
-        mock_image = MagicMock(spec=Image.Image)
-
-        # Mock do AI service OCR
-        document_processor.ai_service.ocr_image = AsyncMock(
-            return_value="Extracted text from image"
-        )
+    @patch('app.services.document_ocr.perform_ocr')
+    async def test_extract_text_from_image(self, mock_ocr, document_processor):
+        """Testa extração de texto de imagem pelo OCR do documento"""
+        from app.services.document_ocr import DocumentOcr
 
-        with patch('tempfile.NamedTemporaryFile') as mock_temp:
-            mock_temp.return_value.__enter__.return_value.name = "/tmp/test.png"
+        mock_image = MagicMock(spec=Image.Image)
+        mock_ocr.return_value = {'words': ['Extracted'], 'boxes': [[0, 0, 1, 1]], 'text': "Extracted text from image"}
+        document_ocr = DocumentOcr()
 
-            result = await document_processor._extract_text_from_image(mock_image)
+        first = await document_processor._extract_text_from_image(mock_image, "page_1", document_ocr)
+        second = await document_processor._extract_text_from_image(mock_image, "page_1", document_ocr)
 
-            assert result == "Extracted text from image"
-            document_processor.ai_service.ocr_image.assert_called_once()
+        assert first == second == "Extracted text from image"
+        mock_ocr.assert_called_once_with(mock_image, None)
+        assert document_ocr.report() == {'pages': 1, 'ocr_runs': 1, 'reuses': 1}
 
     @pytest.mark.asyncio
     async def test_process_with_traditional_ai(self, document_processor):
@@ -0,0 +1,127 @@
+"""
+Testes unitários para o classificador de categorias do DRE
+"""
+import asyncio
+import pytest
+import random
+from datetime import datetime, date, timedelta
+from types import SimpleNamespace
+
+from app.models.cash_flow import CashFlowTransaction, TransactionType
+from app.models.financial_reporting import DreCategoryMapping, MonthlyFinancialFact
+from app.services.dre_classifier import DreClassifier, DEFAULT_DRE_MAPPING, compile_mapping
+from app.schemas.report import DreCategoryMappingUpdate
+from app.api.api_v1.endpoints import reports
+
+
+WORKSPACE_ID = 1
+CATEGORIES = [
+    "Venda Balcão", "Receita de Serviço", "Aporte", "Impostos Federais", "ICMS ST", "CMV",
+    "Compra de insumos", "Fornecedor XPTO", "Salários", "Marketing digital", "Depreciação",
+    "Juros bancários", "Taxas Bancárias", "Vendas - comissão", "Outros", "", "50% desconto_especial"
+]
+
+
+def _legacy_classify(transaction_type: str, category: str):
+    """Loop de any(...) usado anteriormente em get_dre_report"""
+    category_lower = (category or '').lower()
+    if transaction_type == TransactionType.ENTRADA.value:
+        if any(cat.lower() in category_lower for cat in DEFAULT_DRE_MAPPING['receita']):
+            return 'receita'
+        return 'nao_classificado'
+
+    for bucket in ('deducoes', 'cmv', 'despesas_operacionais', 'depreciacao', 'juros'):
+        if any(cat.lower() in category_lower for cat in DEFAULT_DRE_MAPPING[bucket]):
+            return bucket
+    return 'despesas_operacionais'
+
+
+class TestDreClassifier:
+    """Classificação em Python e em SQL"""
+
+    @pytest.fixture
+    def db(self, sqlite_session):
+        tables = [CashFlowTransaction.__table__, DreCategoryMapping.__table__, MonthlyFinancialFact.__table__]
+        with sqlite_session(tables) as session:
+            rng = random.Random(5)
+            for i in range(600):
+                session.add(CashFlowTransaction(
+                    workspace_id=WORKSPACE_ID,
+                    transaction_date=datetime(2024, 5, 1) + timedelta(hours=rng.randint(0, 24 * 29)),
+                    type=rng.choice([TransactionType.ENTRADA.value, TransactionType.SAIDA.value]),
+                    category=CATEGORIES[i % len(CATEGORIES)],
+                    description="Movimentação",
+                    value=round(rng.uniform(1, 1000), 2)
+                ))
+            session.commit()
+
+            yield session
+
+    @pytest.mark.parametrize("transaction_type", [TransactionType.ENTRADA.value, TransactionType.SAIDA.value])
+    def test_matches_legacy_rules(self, transaction_type):
+        classifier = compile_mapping(DEFAULT_DRE_MAPPING)
+        for category in CATEGORIES:
+            assert classifier.classify(transaction_type, category) == _legacy_classify(transaction_type, category)
+
+    def test_compiled_once_per_mapping(self):
+        assert compile_mapping(DEFAULT_DRE_MAPPING) is compile_mapping(dict(DEFAULT_DRE_MAPPING))
+
+    def test_special_characters_are_literal(self, db):
+        classifier = DreClassifier({'receita': ['50%'], 'cmv': ['_especial']})
+
+        assert classifier.classify('entrada', '50% desconto_especial') == 'receita'
+        assert classifier.classify('entrada', '500 desconto') == 'nao_classificado'
+        assert classifier.classify('saida', 'sem especial') == 'despesas_operacionais'
+
+        totals = classifier.bucket_totals(db, WORKSPACE_ID, date(2024, 5, 1), date(2024, 5, 31))
+        expected = self._python_totals(db, classifier)
+        assert totals.totals == pytest.approx(expected)
+
+    def test_sql_case_matches_python(self, db):
+        classifier = DreClassifier.for_workspace(db, WORKSPACE_ID)
+        totals = classifier.bucket_totals(db, WORKSPACE_ID, date(2024, 5, 1), date(2024, 5, 31))
+
+        assert totals.totals == pytest.approx(self._python_totals(db, classifier))
+        assert totals.transactions_count == 600
+
+    def test_workspace_mapping_overrides_default(self, db):
+        db.add(DreCategoryMapping(workspace_id=WORKSPACE_ID, bucket='receita', keyword='Aporte'))
+        db.add(DreCategoryMapping(workspace_id=WORKSPACE_ID, bucket='juros', keyword='Taxas'))
+        db.commit()
+
+        classifier = DreClassifier.for_workspace(db, WORKSPACE_ID)
+        assert classifier.classify('entrada', 'Aporte') == 'receita'
+        assert classifier.classify('entrada', 'Venda Balcão') == 'nao_classificado'
+        assert classifier.classify('saida', 'Taxas Bancárias') == 'juros'
+        assert DreClassifier.for_workspace(db, 2).classify('entrada', 'Aporte') == 'nao_classificado'
+
+    def test_dre_report_uses_mapping_endpoints(self, db):
+        admin = SimpleNamespace(id=1, workspace_id=WORKSPACE_ID, role='admin')
+        period = (date(2024, 5, 1), date(2024, 5, 31))
+
+        default_report = asyncio.run(reports.get_dre_report(*period, db, admin))
+        expected = self._python_totals(db, compile_mapping(DEFAULT_DRE_MAPPING))
+        assert default_report["receita_bruta"] == pytest.approx(expected['receita'])
+        assert default_report["transactions_count"] == 600
+
+        updated = asyncio.run(reports.update_dre_category_mappings(
+            DreCategoryMappingUpdate(mappings={'receita': ['Aporte', 'Aporte']}), db, admin
+        ))
+        assert updated.is_default is False
+        assert updated.mappings['receita'] == ['Aporte']
+
+        custom_report = asyncio.run(reports.get_dre_report(*period, db, admin))
+        assert custom_report["receita_bruta"] == pytest.approx(
+            sum(t.value for t in db.query(CashFlowTransaction).filter_by(category='Aporte', type='entrada'))
+        )
+
+        reset = asyncio.run(reports.reset_dre_category_mappings(db, admin))
+        assert reset.is_default is True
+
+    @staticmethod
+    def _python_totals(db, classifier):
+        totals = {}
+        for transaction in db.query(CashFlowTransaction).all():
+            bucket = classifier.classify(transaction.type, transaction.category)
+            totals[bucket] = totals.get(bucket, 0.0) + transaction.value
+        return totals
@@ -0,0 +1,180 @@
+"""
+Testes unitários para o cache de extração de faturas
+"""
+import os
+import pytest
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.models.invoice_extraction import InvoiceExtractionCache
+from app.models.accounts_payable import AccountsPayableInvoice  # noqa: F401 (referenciado por Supplier)
+from app.services.extraction_cache import (
+    DatabaseExtractionCacheBackend,
+    DiskExtractionCacheBackend,
+    ExtractionCache,
+    pipeline_version,
+)
+
+RESULT = {
+    "supplier_name": "Fornecedor Teste LTDA",
+    "supplier_cnpj": "12.345.678/0001-90",
+    "invoice_number": "NF-123",
+    "total_amount": 1500.0,
+    "confidence_score": 0.92,
+}
+
+
+class FailingBackend:
+    """Backend que simula falha de armazenamento"""
+    name = "failing"
+
+    def get(self, workspace_id, content_hash, version):
+        raise OSError("disk full")
+
+    def set(self, workspace_id, content_hash, version, payload):
+        raise OSError("disk full")
+
+
+@pytest.fixture
+def db(sqlite_session):
+    tables = [InvoiceExtractionCache.__table__]
+    with sqlite_session(tables) as session:
+        yield session
+
+
+@pytest.fixture
+def disk_cache_dir(tmp_path, monkeypatch):
+    root = str(tmp_path / "extraction_cache")
+    monkeypatch.setattr(settings, "EXTRACTION_CACHE_DIR", root)
+    yield root
+    DiskExtractionCacheBackend._known_bytes.pop(root, None)
+
+
+@pytest.mark.parametrize("backend_name", ["db", "disk"])
+class TestExtractionCache:
+    """Comportamento comum aos backends"""
+
+    @pytest.fixture
+    def cache_factory(self, db, disk_cache_dir, backend_name):
+        return lambda ai_service=None: ExtractionCache(db, ai_service, backend_name=backend_name)
+
+    def test_miss_then_hit(self, cache_factory):
+        cache = cache_factory()
+
+        assert cache.get(1, "abc") is None
+        assert cache.set(1, "abc", RESULT)
+
+        first = cache.get(1, "abc")
+        second = cache_factory().get(1, "abc")
+
+        assert first.result == RESULT
+        assert first.hit_count == 1
+        assert second.hit_count == 2
+        assert second.cached_at == first.cached_at
+
+    def test_workspaces_are_isolated(self, cache_factory):
+        cache = cache_factory()
+        cache.set(1, "abc", RESULT)
+
+        assert cache.get(2, "abc") is None
+
+    def test_pipeline_version_change_is_a_miss(self, cache_factory):
+        cache_factory(SimpleNamespace(model="gpt-4o-mini", vision_model="gpt-4o", api_key="k")).set(1, "abc", RESULT)
+
+        upgraded = cache_factory(SimpleNamespace(model="gpt-4.1-mini", vision_model="gpt-4o", api_key="k"))
+        assert upgraded.get(1, "abc") is None
+
+    def test_failed_extractions_are_not_cached(self, cache_factory):
+        cache = cache_factory()
+
+        assert not cache.set(1, "abc", {"success": False, "error": "timeout", "confidence_score": 0.0})
+        assert not cache.set(1, "def", {**RESULT, "error": "Falha na IA"})
+        assert cache.get(1, "abc") is None
+        assert cache.get(1, "def") is None
+
+
+class TestPipelineVersion:
+
+    def test_depends_on_models_and_api_key(self, monkeypatch):
+        ai = SimpleNamespace(model="gpt-4o-mini", vision_model="gpt-4o", api_key="k")
+        base = pipeline_version(ai)
+
+        assert pipeline_version(SimpleNamespace(model="gpt-4o-mini", vision_model="gpt-4o", api_key="k")) == base
+        assert pipeline_version(SimpleNamespace(model="gpt-4o-mini", vision_model="gpt-4o", api_key="")) != base
+
+        monkeypatch.setattr(settings, "LAYOUTLM_QUANTIZE_INT8", not settings.LAYOUTLM_QUANTIZE_INT8)
+        assert pipeline_version(ai) != base
+
+    @pytest.mark.parametrize("setting, value", [
+        ("PDF_TEXT_LAYER_ENABLED", not settings.PDF_TEXT_LAYER_ENABLED),
+        ("OCR_PREPROCESS_ENABLED", not settings.OCR_PREPROCESS_ENABLED),
+        ("OCR_ADAPTIVE_DPI_ENABLED", not settings.OCR_ADAPTIVE_DPI_ENABLED),
+        ("OCR_LOW_DPI", settings.OCR_LOW_DPI + 50),
+        ("OCR_REFINE_MIN_CONFIDENCE", settings.OCR_REFINE_MIN_CONFIDENCE + 10),
+    ])
+    def test_depends_on_extraction_settings(self, monkeypatch, setting, value):
+        base = pipeline_version()
+
+        monkeypatch.setattr(settings, setting, value)
+
+        assert pipeline_version() != base
+
+
+class TestEviction:
+    """Limite de tamanho com remoção da entrada usada há mais tempo"""
+
+    def test_database_evicts_least_recently_used(self, db):
+        backend = DatabaseExtractionCacheBackend(db, max_bytes=250)
+        payload = '{"data": "' + "x" * 90 + '"}'
+
+        backend.set(1, "a", "v1", payload)
+        backend.set(1, "b", "v1", payload)
+        assert backend.get(1, "a", "v1") is not None  # "a" passa a ser a mais recente
+        backend.set(1, "c", "v1", payload)
+
+        assert backend.get(1, "b", "v1") is None
+        assert backend.get(1, "a", "v1") is not None
+        assert backend.get(1, "c", "v1") is not None
+
+    def test_database_duplicate_insert_is_ignored(self, db):
+        backend = DatabaseExtractionCacheBackend(db, max_bytes=10_000)
+
+        backend.set(1, "a", "v1", '{"n": 1}')
+        backend.set(1, "a", "v1", '{"n": 2}')
+
+        assert db.query(InvoiceExtractionCache).count() == 1
+        assert backend.get(1, "a", "v1").result == {"n": 1}
+
+    def test_disk_evicts_least_recently_used(self, disk_cache_dir):
+        backend = DiskExtractionCacheBackend(disk_cache_dir, max_bytes=400)
+        payload = '{"data": "' + "x" * 90 + '"}'
+
+        backend.set(1, "a", "v1", payload)
+        backend.set(1, "b", "v1", payload)
+        path_a, path_b = backend._path(1, "a", "v1"), backend._path(1, "b", "v1")
+        os.utime(path_a, (1000, 1000))
+        os.utime(path_b, (2000, 2000))
+        backend.set(1, "c", "v1", payload)
+        backend.set(1, "d", "v1", payload)
+
+        assert not os.path.exists(path_a)
+        assert backend.get(1, "d", "v1") is not None
+        assert not any(name.endswith(".tmp") for name in os.listdir(os.path.dirname(path_a)))
+
+
+class TestFailures:
+
+    def test_backend_errors_are_treated_as_miss(self, db):
+        cache = ExtractionCache(db, backend_name="db")
+        cache.backend = FailingBackend()
+
+        assert cache.get(1, "abc") is None
+        assert not cache.set(1, "abc", RESULT)
+
+    def test_disabled_cache(self, db):
+        cache = ExtractionCache(db, backend_name="off")
+
+        assert not cache.enabled
+        assert not cache.set(1, "abc", RESULT)
+        assert cache.get(1, "abc") is None
+        assert cache.backend_name == "off"
@@ -0,0 +1,243 @@
+"""
+Testes unitários para o cubo mensal de relatórios financeiros
+"""
+import asyncio
+import pytest
+import random
+from datetime import datetime, date, timedelta
+from types import SimpleNamespace
+from sqlalchemy import extract, func, and_
+from sqlalchemy.orm import sessionmaker
+
+from app.models.cash_flow import CashFlowTransaction, BankAccount, TransactionType
+from app.models.financial_reporting import DreCategoryMapping, MonthlyFinancialFact
+from app.services.dre_classifier import DreClassifier
+from app.services.financial_facts import MonthlyFinancialFacts, PeriodSplit, split_period
+from app.services.report_cache import report_cache
+from app.schemas.report import DreCategoryMappingUpdate
+from app.api.api_v1.endpoints import reports
+
+
+CATEGORIES = ["Venda Balcão", "Receita de Serviço", "Aporte", "ICMS", "Compra de insumos",
+              "Salários", "Depreciação", "Juros bancários", "Outros"]
+
+PERIODS = [
+    (date(2024, 1, 1), date(2024, 12, 31)),
+    (date(2023, 3, 15), date(2024, 6, 10)),
+    (date(2024, 2, 1), date(2024, 3, 1)),
+    (date(2024, 2, 29), date(2024, 3, 1)),
+    (date(2024, 5, 10), date(2024, 5, 20)),
+    (date(2022, 1, 1), date(2025, 1, 1)),
+]
+
+
+def _legacy_monthly(db, workspace_id, start, end):
+    """GROUP BY por ano/mês nas transações, como o gráfico mensal fazia antes"""
+    rows = db.query(
+        extract('year', CashFlowTransaction.transaction_date).label('ano'),
+        extract('month', CashFlowTransaction.transaction_date).label('mes'),
+        CashFlowTransaction.type,
+        func.sum(CashFlowTransaction.value)
+    ).filter(and_(
+        CashFlowTransaction.workspace_id == workspace_id,
+        CashFlowTransaction.transaction_date >= start,
+        CashFlowTransaction.transaction_date <= end
+    )).group_by('ano', 'mes', CashFlowTransaction.type).all()
+
+    result = {}
+    for year, month, transaction_type, total in rows:
+        entries, exits = result.get(date(int(year), int(month), 1), (0.0, 0.0))
+        if transaction_type == TransactionType.ENTRADA.value:
+            entries += total
+        else:
+            exits += total
+        result[date(int(year), int(month), 1)] = (entries, exits)
+    return result
+
+
+def _facts_snapshot(db):
+    return {
+        (f.workspace_id, f.month, f.type, f.category, f.account_id): (f.bucket, round(f.total_value, 6), f.transaction_count)
+        for f in db.query(MonthlyFinancialFact).all()
+    }
+
+
+class TestMonthlyFinancialFacts:
+    """Paridade do cubo mensal com o cálculo ao vivo"""
+
+    @pytest.fixture
+    def db(self, sqlite_session):
+        tables = [
+            CashFlowTransaction.__table__, BankAccount.__table__,
+            DreCategoryMapping.__table__, MonthlyFinancialFact.__table__
+        ]
+        with sqlite_session(tables) as session:
+            rng = random.Random(9)
+            moments = [datetime(2024, 3, 1), datetime(2024, 2, 29, 23, 59), datetime(2024, 6, 10, 8, 30)]
+            moments += [datetime(2023, 1, 1) + timedelta(hours=rng.randint(0, 24 * 730)) for _ in range(900)]
+            for i, moment in enumerate(moments):
+                session.add(CashFlowTransaction(
+                    workspace_id=1 + i % 2,
+                    transaction_date=moment,
+                    type=rng.choice([TransactionType.ENTRADA.value, TransactionType.SAIDA.value]),
+                    category=CATEGORIES[i % len(CATEGORIES)],
+                    description="Movimentação",
+                    value=round(rng.uniform(1, 2000), 2),
+                    account_id=rng.choice([None, 1, 2])
+                ))
+            session.commit()
+
+            MonthlyFinancialFacts(session).rebuild()
+            session.commit()
+            report_cache.clear()
+
+            try:
+                yield session
+            finally:
+                report_cache.clear()
+
+    def test_split_period(self):
+        assert split_period(date(2024, 1, 1), date(2024, 12, 31)) == PeriodSplit(date(2024, 1, 1), date(2024, 12, 1))
+        assert split_period(date(2024, 1, 15), date(2024, 3, 1)) == PeriodSplit(date(2024, 2, 1), date(2024, 3, 1))
+        assert split_period(date(2024, 5, 10), date(2024, 5, 20)) == PeriodSplit(None, None)
+        assert split_period(date(2024, 1, 1), date(2024, 1, 31)) == PeriodSplit(None, None)
+
+    @pytest.mark.parametrize("period", PERIODS)
+    def test_bucket_totals_match_live(self, db, period):
+        for workspace_id in (1, 2):
+            classifier = DreClassifier.for_workspace(db, workspace_id)
+            live = classifier.bucket_totals(db, workspace_id, *period)
+            from_facts = MonthlyFinancialFacts(db).bucket_totals(workspace_id, *period)
+
+            assert from_facts.totals == pytest.approx(live.totals)
+            assert from_facts.transactions_count == live.transactions_count
+
+    @pytest.mark.parametrize("period", PERIODS)
+    def test_monthly_totals_match_live(self, db, period):
+        monthly = MonthlyFinancialFacts(db).monthly_totals(1, *period)
+        expected = _legacy_monthly(db, 1, *period)
+
+        assert set(monthly) == set(expected)
+        for month, (entries, exits) in expected.items():
+            assert monthly[month].entries == pytest.approx(entries)
+            assert monthly[month].exits == pytest.approx(exits)
+
+    def test_incremental_updates_match_rebuild(self, db):
+        facts = MonthlyFinancialFacts(db)
+
+        new_transaction = CashFlowTransaction(
+            workspace_id=1, transaction_date=datetime(2024, 7, 4, 10), type=TransactionType.SAIDA.value,
+            category="Categoria Nova", description="Nova", value=321.0, account_id=2
+        )
+        db.add(new_transaction)
+        db.flush()
+        facts.record_transaction(new_transaction)
+
+        changed = db.query(CashFlowTransaction).filter_by(workspace_id=1).first()
+        facts.revert_movement(
+            changed.workspace_id, changed.account_id, changed.transaction_date,
+            changed.type, changed.category, changed.value
+        )
+        changed.category = "Marketing"
+        changed.transaction_date = datetime(2024, 8, 1)
+        facts.record_transaction(changed)
+
+        removed = db.query(CashFlowTransaction).filter_by(workspace_id=2).first()
+        facts.revert_movement(
+            removed.workspace_id, removed.account_id, removed.transaction_date,
+            removed.type, removed.category, removed.value
+        )
+        db.delete(removed)
+        db.commit()
+
+        incremental = _facts_snapshot(db)
+        MonthlyFinancialFacts(db).rebuild()
+        db.commit()
+
+        assert incremental == _facts_snapshot(db)
+
+    def test_revert_without_fact_row_is_skipped(self, db):
+        db.query(MonthlyFinancialFact).delete()
+        db.commit()
+
+        MonthlyFinancialFacts(db).revert_movement(
+            1, 2, datetime(2024, 7, 4, 10), TransactionType.SAIDA.value, "Salários", 100.0
+        )
+        db.commit()
+
+        assert db.query(MonthlyFinancialFact).count() == 0
+
+    def test_interleaved_sessions_do_not_lose_increments(self, db):
+        before = db.query(MonthlyFinancialFact).filter_by(workspace_id=1, account_id=2).first()
+        total, count = before.total_value, before.transaction_count
+        movement = (1, 2, datetime.combine(before.month, datetime.min.time()), before.type, before.category)
+
+        # Outra sessão grava na mesma linha depois que esta já a carregou
+        other = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())()
+        MonthlyFinancialFacts(other).apply_movement(*movement, 50.0, 1)
+        other.commit()
+        other.close()
+
+        MonthlyFinancialFacts(db).apply_movement(*movement, 70.0, 1)
+        db.commit()
+
+        after = db.query(MonthlyFinancialFact).filter_by(id=before.id).one()
+        assert after.total_value == pytest.approx(total + 120.0)
+        assert after.transaction_count == count + 2
+
+    def test_refresh_only_recomputes_recent_months(self, db):
+        db.query(MonthlyFinancialFact).update({MonthlyFinancialFact.total_value: 0.0}, synchronize_session=False)
+        db.commit()
+
+        MonthlyFinancialFacts(db).refresh(1, since=date(2024, 11, 20))
+        db.commit()
+
+        stale = db.query(func.sum(MonthlyFinancialFact.total_value)).filter(
+            MonthlyFinancialFact.month < date(2024, 11, 1)
+        ).scalar()
+        refreshed = db.query(func.sum(MonthlyFinancialFact.total_value)).filter(
+            MonthlyFinancialFact.workspace_id == 1,
+            MonthlyFinancialFact.month >= date(2024, 11, 1)
+        ).scalar()
+
+        assert stale == 0.0
+        assert refreshed == pytest.approx(sum(
+            t.value for t in db.query(CashFlowTransaction).filter(
+                CashFlowTransaction.workspace_id == 1,
+                CashFlowTransaction.transaction_date >= datetime(2024, 11, 1)
+            )
+        ))
+
+    def test_mapping_change_reclassifies_facts(self, db):
+        admin = SimpleNamespace(id=1, workspace_id=1, role='admin')
+        period = (date(2024, 1, 1), date(2024, 12, 31))
+
+        asyncio.run(reports.update_dre_category_mappings(
+            DreCategoryMappingUpdate(mappings={'receita': ['Aporte'], 'juros': ['Juros', 'Compra']}), db, admin
+        ))
+        report = asyncio.run(reports.get_dre_report(*period, db, admin))
+
+        live = DreClassifier.for_workspace(db, 1).bucket_totals(db, 1, *period)
+        assert report["receita_bruta"] == pytest.approx(live.totals['receita'])
+        assert report["transactions_count"] == live.transactions_count
+
+        incremental = _facts_snapshot(db)
+        MonthlyFinancialFacts(db).rebuild()
+        db.commit()
+        assert incremental == _facts_snapshot(db)
+
+    def test_charts_read_monthly_facts(self, db):
+        response = asyncio.run(reports.get_executive_dashboard_charts(
+            date(2024, 6, 15), date(2024, 12, 20), db, SimpleNamespace(id=1, workspace_id=1)
+        ))
+        charts = {chart.id: chart for chart in response.graficos}
+
+        expected = _legacy_monthly(db, 1, date(2024, 6, 15), date(2024, 12, 20))
+        monthly = charts["receita-despesa-mensal"].dados
+        assert monthly.datasets[0].data == pytest.approx([expected[date(2024, m, 1)][0] for m in range(6, 13)])
+        assert monthly.datasets[1].data == pytest.approx([expected[date(2024, m, 1)][1] for m in range(6, 13)])
+
+        year_over_year = charts["receita-ano-contra-ano"].dados
+        previous_year = _legacy_monthly(db, 1, date(2023, 1, 1), date(2023, 12, 31))
+        assert len(year_over_year.labels) == 12
+        assert year_over_year.datasets[1].data[0] == pytest.approx(previous_year[date(2023, 1, 1)][0])
@@ -0,0 +1,278 @@
+"""
+Testes unitários para a fila de jobs de extração de faturas
+"""
+import asyncio
+import os
+import threading
+import time
+import pytest
+
+from app.services.invoice_extraction_jobs import (
+    BatchEntry,
+    ExtractionBatch,
+    ExtractionJob,
+    InvoiceExtractionJobQueue,
+    JobQueueFull,
+    JobStatus,
+)
+
+RESULT = {
+    "supplier_name": "Fornecedor Teste LTDA",
+    "invoice_number": "NF-123",
+    "total_amount": 1500.0,
+    "confidence_score": 0.92,
+    "success": True,
+}
+
+
+class FakeProcessor:
+    """Processador com páginas simuladas e falhas programadas"""
+
+    def __init__(self, pages=2, failures=0, delay=0.0, gate=None):
+        self.pages = pages
+        self.failures = failures
+        self.delay = delay
+        self.gate = gate
+        self.calls = 0
+        self.filenames = []
+
+    def __call__(self):
+        return self
+
+    async def process_invoice(self, file_path, original_filename, on_page=None):
+        self.calls += 1
+        self.filenames.append(original_filename)
+        assert os.path.exists(file_path)
+
+        if self.gate is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.gate.wait)
+
+        for page_number in range(1, self.pages + 1):
+            await asyncio.sleep(self.delay)
+            if on_page:
+                on_page(page_number, {"extracted_fields": {"invoice_number": "NF-123"}, "confidence_score": 0.9})
+
+        if self.calls <= self.failures:
+            return {"success": False, "error": "Falha temporária na IA", "confidence_score": 0.0}
+        return dict(RESULT)
+
+
+def _upload(tmp_path, name="fatura.pdf"):
+    path = tmp_path / f"{time.monotonic_ns()}-{name}"
+    path.write_bytes(b"%PDF-1.4 fake")
+    return str(path)
+
+
+def _wait(job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not job.is_finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.is_finished, f"job ainda em {job.status}"
+    return job
+
+
+def _batch(tmp_path, workspace_id, names):
+    entries = [
+        BatchEntry(name, name, 10, job=ExtractionJob(workspace_id, _upload(tmp_path, name), name, name))
+        for name in names
+    ]
+    return ExtractionBatch(workspace_id, entries)
+
+
+def _wait_processing(job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while job.status != JobStatus.PROCESSING and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def make_queue():
+    queues = []
+
+    def factory(processor, **kwargs):
+        kwargs.setdefault("retry_backoff_seconds", 0.0)
+        job_queue = InvoiceExtractionJobQueue(processor_factory=processor, on_complete=None, **kwargs)
+        queues.append(job_queue)
+        return job_queue
+
+    yield factory
+
+    for job_queue in queues:
+        job_queue.shutdown(timeout=5)
+
+
+class TestInvoiceExtractionJobQueue:
+    """Execução, resultados parciais, retentativas e backpressure"""
+
+    def test_job_completes_with_pages_and_timings(self, make_queue, tmp_path):
+        completed = []
+        job_queue = make_queue(FakeProcessor(pages=3))
+        job_queue.on_complete = lambda job, processor, result: completed.append(job.job_id)
+        path = _upload(tmp_path)
+
+        job = _wait(job_queue.submit(1, path, "fatura.pdf", "abc"))
+        snapshot = job.snapshot()
+
+        assert snapshot["status"] == JobStatus.COMPLETED.value
+        assert snapshot["result"]["invoice_number"] == "NF-123"
+        assert [page["page_number"] for page in snapshot["pages"]] == [1, 2, 3]
+        assert snapshot["timings"]["queue_seconds"] >= 0
+        assert len(snapshot["timings"]["attempt_seconds"]) == 1
+        assert completed == [job.job_id]
+        assert not os.path.exists(path)
+
+    def test_failed_attempts_are_retried(self, make_queue, tmp_path):
+        processor = FakeProcessor(failures=2)
+        job_queue = make_queue(processor, max_retries=2)
+
+        job = _wait(job_queue.submit(1, _upload(tmp_path), "fatura.pdf"))
+
+        assert job.status == JobStatus.COMPLETED
+        assert job.attempts == 3
+        assert processor.calls == 3
+        assert job_queue.stats()["retries"] == 2
+
+    def test_job_fails_after_retries(self, make_queue, tmp_path):
+        job_queue = make_queue(FakeProcessor(failures=10), max_retries=1)
+        path = _upload(tmp_path)
+
+        job = _wait(job_queue.submit(1, path, "fatura.pdf"))
+
+        assert job.status == JobStatus.FAILED
+        assert job.attempts == 2
+        assert job.error == "Falha temporária na IA"
+        assert job.result is None
+        assert not os.path.exists(path)
+        assert job_queue.stats()["failed"] == 1
+
+    def test_attempt_timeout(self, make_queue, tmp_path):
+        job_queue = make_queue(FakeProcessor(pages=5, delay=0.2), max_retries=0, timeout_seconds=0.1)
+
+        job = _wait(job_queue.submit(1, _upload(tmp_path), "fatura.pdf"))
+
+        assert job.status == JobStatus.FAILED
+        assert "Tempo limite" in job.error
+
+    def test_backpressure_limits(self, make_queue, tmp_path):
+        gate = threading.Event()
+        job_queue = make_queue(FakeProcessor(gate=gate), workers=1, max_queued=2, max_per_workspace=3)
+
+        try:
+            running = job_queue.submit(1, _upload(tmp_path), "a.pdf")
+            deadline = time.monotonic() + 5
+            while running.status != JobStatus.PROCESSING and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+            job_queue.submit(1, _upload(tmp_path), "b.pdf")
+            job_queue.submit(1, _upload(tmp_path), "c.pdf")
+
+            # Fila do processo no limite, mesmo para outro workspace
+            with pytest.raises(JobQueueFull) as exc_info:
+                job_queue.submit(2, _upload(tmp_path), "d.pdf")
+            assert exc_info.value.retry_after >= 1
+            assert "Fila de extração cheia" in str(exc_info.value)
+
+            assert job_queue.stats()["queued"] == 2
+            assert job_queue.stats()["rejected"] == 1
+        finally:
+            gate.set()
+
+    def test_per_workspace_limit(self, make_queue, tmp_path):
+        gate = threading.Event()
+        job_queue = make_queue(FakeProcessor(gate=gate), workers=1, max_queued=10, max_per_workspace=1)
+
+        try:
+            job_queue.submit(1, _upload(tmp_path), "a.pdf")
+            with pytest.raises(JobQueueFull):
+                job_queue.submit(1, _upload(tmp_path), "b.pdf")
+
+            # Outro workspace não é afetado
+            other = job_queue.submit(2, _upload(tmp_path), "c.pdf")
+        finally:
+            gate.set()
+
+        assert _wait(other).status == JobStatus.COMPLETED
+
+    def test_jobs_are_scoped_to_workspace(self, make_queue):
+        job_queue = make_queue(FakeProcessor())
+        job = job_queue.add_completed(1, "fatura.pdf", "abc", dict(RESULT))
+
+        assert job_queue.get(job.job_id, 1) is job
+        assert job_queue.get(job.job_id, 2) is None
+        assert job.cache_hit and job.status == JobStatus.COMPLETED
+
+    def test_finished_jobs_expire(self, make_queue, tmp_path):
+        job_queue = make_queue(FakeProcessor(), result_ttl_seconds=0.0)
+        job = _wait(job_queue.submit(1, _upload(tmp_path), "fatura.pdf"))
+        time.sleep(0.01)
+
+        job_queue.submit(1, _upload(tmp_path), "outra.pdf")
+
+        assert job_queue.get(job.job_id, 1) is None
+
+
+class TestExtractionBatches:
+    """Lotes na fila: prioridade, limites e expiração"""
+
+    def test_single_uploads_run_before_queued_batch_jobs(self, make_queue, tmp_path):
+        gate = threading.Event()
+        processor = FakeProcessor(pages=0, gate=gate)
+        job_queue = make_queue(processor, workers=1, max_queued=2)
+
+        try:
+            running = job_queue.submit(1, _upload(tmp_path), "a.pdf")
+            _wait_processing(running)
+
+            batch = job_queue.submit_batch(_batch(tmp_path, 1, ["l1.pdf", "l2.pdf", "l3.pdf"]))
+            # Jobs do lote não contam no limite dos uploads individuais
+            single = job_queue.submit(1, _upload(tmp_path), "b.pdf")
+            assert job_queue.stats()["active_batches"] == 1
+        finally:
+            gate.set()
+
+        for job in batch.jobs:
+            _wait(job)
+
+        assert batch.is_finished
+        assert _wait(single).status == JobStatus.COMPLETED
+        assert processor.filenames == ["a.pdf", "b.pdf", "l1.pdf", "l2.pdf", "l3.pdf"]
+        assert all(job.batch_id == batch.batch_id for job in batch.jobs)
+        assert job_queue.get_batch(batch.batch_id, 1) is batch
+        assert job_queue.get_batch(batch.batch_id, 2) is None
+
+    def test_batch_limits(self, make_queue, tmp_path):
+        gate = threading.Event()
+        job_queue = make_queue(FakeProcessor(gate=gate), workers=1, max_queued=2, max_batches_per_workspace=1)
+
+        try:
+            batch = job_queue.submit_batch(_batch(tmp_path, 1, ["l1.pdf", "l2.pdf", "l3.pdf"]))
+            _wait_processing(batch.jobs[0])
+
+            # Um lote ativo por workspace
+            with pytest.raises(JobQueueFull) as exc_info:
+                job_queue.submit_batch(_batch(tmp_path, 1, ["m1.pdf"]))
+            assert "lote" in str(exc_info.value)
+
+            # Fila do processo cheia com os jobs do primeiro lote
+            with pytest.raises(JobQueueFull) as exc_info:
+                job_queue.submit_batch(_batch(tmp_path, 2, ["n1.pdf"]))
+            assert "Fila de extração cheia" in str(exc_info.value)
+            assert job_queue.stats()["rejected"] == 2
+
+            # Lote só com resultados do cache não ocupa a fila
+            cached = ExtractionBatch(2, [BatchEntry(
+                "c.pdf", "c", 10, job=ExtractionJob.from_cache(2, "c.pdf", "c", dict(RESULT))
+            )])
+            assert job_queue.submit_batch(cached).is_finished
+        finally:
+            gate.set()
+
+    def test_finished_batches_expire(self, make_queue, tmp_path):
+        job_queue = make_queue(FakeProcessor(), result_ttl_seconds=0.0)
+        batch = job_queue.submit_batch(_batch(tmp_path, 1, ["l1.pdf"]))
+        _wait(batch.jobs[0])
+        time.sleep(0.01)
+
+        job_queue.submit(1, _upload(tmp_path), "outra.pdf")
+
+        assert job_queue.get_batch(batch.batch_id, 1) is None
@@ -0,0 +1,134 @@
+"""
+Testes unitários para o worker de micro-batching do LayoutLM
+"""
+import asyncio
+import threading
+import time
+import pytest
+
+from app.services.layout_lm_batcher import LayoutLMBatcher
+
+
+class FakeLayoutLMService:
+    """Serviço com a interface usada pelo worker (load_model/predict_batch)"""
+
+    def __init__(self, load_ok=True, delay=0.0, fail=False):
+        self._model_loaded = False
+        self.load_ok = load_ok
+        self.delay = delay
+        self.fail = fail
+        self.load_calls = 0
+        self.batches = []
+        self.threads = set()
+
+    async def load_model(self):
+        self.load_calls += 1
+        self._model_loaded = self.load_ok
+        return self.load_ok
+
+    def predict_batch(self, images, ocr_results, page_ids):
+        self.threads.add(threading.current_thread().name)
+        self.batches.append(list(page_ids))
+        if self.fail:
+            raise ValueError("erro na inferência")
+        time.sleep(self.delay)
+        return [
+            {"page_id": page_id, "extracted_fields": {"supplier_name": image}, "confidence_score": 0.9}
+            for image, page_id in zip(images, page_ids)
+        ]
+
+
+@pytest.fixture
+def make_batcher():
+    created = []
+
+    def factory(service, **kwargs):
+        batcher = LayoutLMBatcher(service, **kwargs)
+        created.append(batcher)
+        return batcher
+
+    yield factory
+
+    for batcher in created:
+        batcher.shutdown(timeout=5)
+
+
+def _ocr(word):
+    return {"words": [word], "boxes": [[0, 0, 10, 10]]}
+
+
+class TestLayoutLMBatcher:
+    """Agrupamento em micro-lotes e roteamento das predições"""
+
+    def test_concurrent_requests_are_batched_and_routed(self, make_batcher):
+        service = FakeLayoutLMService(delay=0.02)
+        batcher = make_batcher(service, max_batch_size=4, max_wait_ms=50)
+
+        async def run():
+            return await asyncio.gather(*[
+                batcher.predict(f"imagem_{i}", _ocr(str(i)), f"page_{i}") for i in range(10)
+            ])
+
+        results = asyncio.run(run())
+
+        assert [r["page_id"] for r in results] == [f"page_{i}" for i in range(10)]
+        assert [r["extracted_fields"]["supplier_name"] for r in results] == [f"imagem_{i}" for i in range(10)]
+        assert all(len(batch) <= 4 for batch in service.batches)
+        assert len(service.batches) < 10
+        assert sorted(page for batch in service.batches for page in batch) == sorted(f"page_{i}" for i in range(10))
+
+        stats = batcher.stats()
+        assert stats["pages"] == 10
+        assert stats["largest_batch"] == 4
+        assert service.load_calls == 1
+        assert service.threads == {"layoutlm-batcher"}
+
+    def test_single_request_waits_at_most_max_wait(self, make_batcher):
+        service = FakeLayoutLMService()
+        batcher = make_batcher(service, max_batch_size=8, max_wait_ms=30)
+
+        started = time.perf_counter()
+        result = batcher.submit("imagem", _ocr("texto"), "unica").result(timeout=5)
+        elapsed = time.perf_counter() - started
+
+        assert result["page_id"] == "unica"
+        assert service.batches == [["unica"]]
+        assert elapsed < 1.0
+
+    def test_batch_size_one_runs_each_page_alone(self, make_batcher):
+        service = FakeLayoutLMService()
+        batcher = make_batcher(service, max_batch_size=1, max_wait_ms=50)
+
+        futures = [batcher.submit(f"imagem_{i}", _ocr("x"), f"page_{i}") for i in range(5)]
+        results = [future.result(timeout=5) for future in futures]
+
+        assert [r["page_id"] for r in results] == [f"page_{i}" for i in range(5)]
+        assert service.batches == [[f"page_{i}"] for i in range(5)]
+
+    def test_inference_error_propagates_to_callers(self, make_batcher):
+        batcher = make_batcher(FakeLayoutLMService(fail=True), max_batch_size=4, max_wait_ms=5)
+
+        future = batcher.submit("imagem", _ocr("x"), "page_1")
+
+        with pytest.raises(ValueError, match="erro na inferência"):
+            future.result(timeout=5)
+
+        # O worker continua atendendo após o erro
+        batcher.service.fail = False
+        assert batcher.submit("imagem", _ocr("x"), "page_2").result(timeout=5)["page_id"] == "page_2"
+
+    def test_model_load_failure(self, make_batcher):
+        batcher = make_batcher(FakeLayoutLMService(load_ok=False), max_batch_size=4, max_wait_ms=5)
+
+        with pytest.raises(RuntimeError, match="Falha ao carregar modelo"):
+            asyncio.run(batcher.predict("imagem", _ocr("x"), "page_1"))
+
+    def test_shutdown_drains_queue_and_restarts(self, make_batcher):
+        service = FakeLayoutLMService(delay=0.01)
+        batcher = make_batcher(service, max_batch_size=2, max_wait_ms=5)
+
+        futures = [batcher.submit(f"imagem_{i}", _ocr("x"), f"page_{i}") for i in range(4)]
+        batcher.shutdown(timeout=5)
+
+        assert all(future.done() for future in futures)
+        assert batcher.submit("imagem", _ocr("x"), "depois").result(timeout=5)["page_id"] == "depois"
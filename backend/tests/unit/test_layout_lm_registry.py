@@ -0,0 +1,102 @@
+"""
+Testes unitários para o registro compartilhado de modelos LayoutLM
+"""
+import threading
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from app.services.layout_lm_registry import LayoutLMModelRegistry, model_size_mb
+
+
+class TinyProcessor:
+    """Processor mínimo com a mesma assinatura do LayoutLMv3Processor"""
+
+    def __call__(self, images, words, boxes=None, return_tensors="pt", padding=True, truncation=True):
+        return {"input_ids": torch.arange(len(words)).unsqueeze(0) % 50}
+
+
+class TinyModel(torch.nn.Module):
+    def __init__(self, num_labels):
+        super().__init__()
+        self.embedding = torch.nn.Embedding(50, 64)
+        self.hidden = torch.nn.Linear(64, 64)
+        self.classifier = torch.nn.Linear(64, num_labels)
+        self.forward_calls = 0
+
+    def forward(self, input_ids, **kwargs):
+        self.forward_calls += 1
+        return self.classifier(torch.relu(self.hidden(self.embedding(input_ids))))
+
+
+class CountingLoader:
+    def __init__(self):
+        self.calls = []
+        self.models = []
+
+    def __call__(self, model_name, num_labels):
+        self.calls.append(model_name)
+        model = TinyModel(num_labels)
+        self.models.append(model)
+        return TinyProcessor(), model
+
+
+class TestLayoutLMModelRegistry:
+    """Carga única, aquecimento e variante int8"""
+
+    def test_loads_once_per_process(self):
+        loader = CountingLoader()
+        registry = LayoutLMModelRegistry(loader=loader)
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(registry.get("modelo", quantize=False)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert loader.calls == ["modelo"]
+        assert len({id(loaded.model) for loaded in results}) == 1
+        assert registry.get("modelo", quantize=False) is results[0]
+
+    def test_warm_up_runs_before_first_request(self):
+        loader = CountingLoader()
+        loaded = LayoutLMModelRegistry(loader=loader).get("modelo", quantize=False)
+
+        assert loader.models[0].forward_calls == 1
+        assert loaded.warmup_seconds >= 0
+        assert not loaded.model.training
+
+    def test_int8_variant_is_quantized_and_smaller(self):
+        loader = CountingLoader()
+        registry = LayoutLMModelRegistry(loader=loader)
+
+        fp32 = registry.get("modelo", quantize=False)
+        int8 = registry.get("modelo", quantize=True)
+
+        assert loader.calls == ["modelo", "modelo"]
+        assert int8.quantized and not fp32.quantized
+        assert "quantized" in type(int8.model.classifier).__module__
+        assert int8.size_mb < fp32.size_mb
+        assert set(registry.loaded_models()) == {"modelo", "modelo (int8)"}
+
+    def test_torch_thread_count(self, monkeypatch):
+        from app.core.config import settings
+
+        original = torch.get_num_threads()
+        monkeypatch.setattr(settings, "TORCH_NUM_THREADS", 1)
+        try:
+            LayoutLMModelRegistry(loader=CountingLoader()).get("modelo", quantize=False)
+            assert torch.get_num_threads() == 1
+        finally:
+            torch.set_num_threads(original)
+
+    def test_model_size(self):
+        model = TinyModel(23)
+        expected = sum(p.numel() * p.element_size() for p in model.parameters()) / (1024 * 1024)
+
+        assert model_size_mb(model) == pytest.approx(expected)
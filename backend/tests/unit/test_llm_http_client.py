@@ -0,0 +1,246 @@
+"""
+Testes unitários para o cliente HTTP compartilhado das chamadas de LLM
+(contra um servidor aiohttp local)
+"""
+import asyncio
+import json
+import threading
+import time
+import pytest
+from aiohttp import web
+
+from app.services import ai_service as ai_service_module
+from app.services.ai_service import AIService
+from app.services.llm_http_client import LLMHttpClient, LLMHttpError, TokenBucket
+from app.services.llm_response_cache import LLMResponseCache
+
+CONTENT = json.dumps({"supplier_name": "Fornecedor Teste LTDA", "total_amount": 1500.0})
+
+
+class StubLLMServer:
+    """Endpoint de chat com respostas programadas e contadores"""
+
+    def __init__(self, statuses=(), delay=0.0):
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.requests = 0
+        self.active = 0
+        self.peak = 0
+        self.connections = set()
+        self.payloads = []
+        self.url = None
+        self._runner = None
+
+    async def handle(self, request):
+        self.requests += 1
+        self.connections.add(request.transport.get_extra_info("peername"))
+        self.payloads.append(await request.json())
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status != 200:
+            return web.json_response({"error": "stub"}, status=status, headers={"Retry-After": "0"})
+        return web.json_response({"choices": [{"message": {"content": CONTENT}}]})
+
+    def start(self):
+        """Sobe o servidor em um event loop próprio (thread)"""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._serve(), self._loop).result(5)
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop.close()
+
+    async def _serve(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/v1"
+
+
+@pytest.fixture
+def make_server():
+    servers = []
+
+    def factory(**kwargs):
+        server = StubLLMServer(**kwargs).start()
+        servers.append(server)
+        return server
+
+    yield factory
+
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def make_client():
+    clients = []
+
+    def factory(**kwargs):
+        kwargs.setdefault("requests_per_second", 0)
+        kwargs.setdefault("backoff_seconds", 0.01)
+        client = LLMHttpClient(**kwargs)
+        clients.append(client)
+        return client
+
+    yield factory
+
+    for client in clients:
+        client.shutdown(timeout=5)
+
+
+@pytest.mark.asyncio
+class TestLLMHttpClient:
+    """Pool de conexões, limites e retentativas"""
+
+    async def test_connections_are_reused(self, make_server, make_client):
+        server = make_server()
+        client = make_client()
+
+        for _ in range(10):
+            data = await client.post_json(f"{server.url}/chat/completions", {"n": 1})
+            assert data["choices"][0]["message"]["content"] == CONTENT
+
+        assert server.requests == 10
+        assert len(server.connections) == 1
+
+    async def test_retries_on_429_and_5xx(self, make_server, make_client):
+        server = make_server(statuses=[429, 503])
+        client = make_client(max_retries=3)
+
+        await client.post_json(f"{server.url}/chat/completions", {})
+
+        assert server.requests == 3
+        assert client.stats()["retries"] == 2
+        assert client.stats()["failures"] == 0
+
+    async def test_gives_up_after_retries(self, make_server, make_client):
+        server = make_server(statuses=[500, 500, 500])
+        client = make_client(max_retries=1)
+
+        with pytest.raises(LLMHttpError) as exc_info:
+            await client.post_json(f"{server.url}/chat/completions", {})
+
+        assert exc_info.value.status == 500
+        assert server.requests == 2
+        assert client.stats()["failures"] == 1
+
+    async def test_client_errors_are_not_retried(self, make_server, make_client):
+        server = make_server(statuses=[400])
+        client = make_client(max_retries=3)
+
+        with pytest.raises(LLMHttpError) as exc_info:
+            await client.post_json(f"{server.url}/chat/completions", {})
+
+        assert exc_info.value.status == 400
+        assert server.requests == 1
+
+    async def test_connection_errors_are_retried(self, make_client):
+        client = make_client(max_retries=2)
+
+        with pytest.raises(LLMHttpError) as exc_info:
+            await client.post_json("http://127.0.0.1:9/v1/chat/completions", {})
+
+        assert "conexão" in str(exc_info.value)
+        assert client.stats()["attempts"] == 3
+
+    async def test_concurrency_cap(self, make_server, make_client):
+        server = make_server(delay=0.05)
+        client = make_client(max_concurrency=3)
+
+        await asyncio.gather(*[client.post_json(f"{server.url}/chat/completions", {}) for _ in range(12)])
+
+        assert server.peak == 3
+        assert client.stats()["peak_in_flight"] == 3
+
+    async def test_rate_limit(self, make_server, make_client):
+        server = make_server()
+        client = make_client(requests_per_second=20, burst=2)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[client.post_json(f"{server.url}/chat/completions", {}) for _ in range(6)])
+
+        # 2 liberadas pela rajada, 4 a 20 req/s
+        assert time.perf_counter() - started >= 0.18
+        assert client.stats()["throttled_seconds"] > 0
+
+    async def test_shared_between_event_loops(self, make_server, make_client):
+        server = make_server()
+        client = make_client()
+        url = f"{server.url}/chat/completions"
+
+        # Workers da fila de jobs e da ingestão em lote rodam em loops próprios
+        results = await asyncio.gather(*[
+            asyncio.to_thread(asyncio.run, client.post_json(url, {})) for _ in range(4)
+        ])
+
+        assert len(results) == 4
+        assert len(server.connections) <= 4
+
+
+@pytest.mark.asyncio
+class TestTokenBucket:
+    async def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=100, capacity=3)
+
+        waits = [await bucket.acquire() for _ in range(5)]
+
+        assert waits[:3] == [0.0, 0.0, 0.0]
+        assert all(wait > 0 for wait in waits[3:])
+
+    async def test_disabled(self):
+        bucket = TokenBucket(rate=0, capacity=1)
+        assert [await bucket.acquire() for _ in range(100)] == [0.0] * 100
+
+
+@pytest.fixture(autouse=True)
+def no_llm_cache(monkeypatch):
+    """Cada teste chama o servidor (sem respostas em cache de outros testes)"""
+    monkeypatch.setattr(ai_service_module, "llm_response_cache", LLMResponseCache())
+
+
+@pytest.mark.asyncio
+class TestAIServiceClient:
+    """AIService usando o cliente compartilhado"""
+
+    async def test_extract_invoice_data(self, make_server, make_client, monkeypatch):
+        server = make_server(statuses=[503])
+        client = make_client(max_retries=2)
+        monkeypatch.setattr(ai_service_module, "get_llm_http_client", lambda: client)
+
+        service = AIService()
+        service.api_key = "sk-test"
+        service.base_url = server.url
+
+        response = await service.extract_invoice_data("texto da fatura")
+
+        assert response == CONTENT
+        assert server.payloads[-1]["model"] == service.model
+        assert server.payloads[-1]["messages"][1]["content"] == "texto da fatura"
+
+    async def test_api_error_falls_back_to_mock(self, make_server, make_client, monkeypatch):
+        server = make_server(statuses=[401])
+        monkeypatch.setattr(ai_service_module, "get_llm_http_client", lambda: make_client())
+
+        service = AIService()
+        service.api_key = "sk-test"
+        service.base_url = server.url
+
+        response = json.loads(await service.extract_invoice_data("texto"))
+
+        assert response == json.loads(service._create_mock_response())
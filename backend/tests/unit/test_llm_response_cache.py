@@ -0,0 +1,200 @@
+"""
+Testes unitários para o cache de respostas do LLM e a coalescência de chamadas
+"""
+import asyncio
+import json
+import threading
+import pytest
+
+from app.core.cache import MemoryCacheBackend
+from app.services import ai_service as ai_service_module
+from app.services.ai_service import AIService
+from app.services.llm_response_cache import LLMResponseCache
+
+CONTENT = json.dumps({"supplier_name": "Fornecedor Teste LTDA", "total_amount": 1500.0})
+
+
+def _payload(prompt, model="gpt-4o-mini", temperature=0.1):
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": "Retorne apenas JSON."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": temperature,
+        "max_tokens": 2000
+    }
+
+
+class FakeUpstream:
+    """Chamada ao LLM contada, com atraso e falha opcionais"""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream indisponível")
+        return CONTENT
+
+
+class TestCacheKey:
+    def test_whitespace_is_normalized(self):
+        key = LLMResponseCache.build_key(_payload("Fornecedor:  ACME\n\n  Total: 10,00 "))
+
+        assert key == LLMResponseCache.build_key(_payload("Fornecedor: ACME Total: 10,00"))
+        assert key.startswith("llm:gpt-4o-mini:")
+
+    def test_model_and_parameters_are_part_of_the_key(self):
+        key = LLMResponseCache.build_key(_payload("texto"))
+
+        assert key != LLMResponseCache.build_key(_payload("texto", model="gpt-4o"))
+        assert key != LLMResponseCache.build_key(_payload("texto", temperature=0.7))
+        assert key != LLMResponseCache.build_key(_payload("outro texto"))
+
+    def test_multimodal_text_parts(self):
+        def vision(text, image):
+            return {"model": "gpt-4o", "messages": [{"role": "user", "content": [
+                {"type": "text", "text": text},
+                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image}"}}
+            ]}]}
+
+        assert LLMResponseCache.build_key(vision("Analise  esta\nfatura", "AAA")) == \
+            LLMResponseCache.build_key(vision("Analise esta fatura", "AAA"))
+        assert LLMResponseCache.build_key(vision("Analise", "AAA")) != \
+            LLMResponseCache.build_key(vision("Analise", "BBB"))
+
+
+@pytest.mark.asyncio
+class TestLLMResponseCache:
+    async def test_hit_after_first_call(self):
+        cache = LLMResponseCache(MemoryCacheBackend(16), ttl_seconds=60)
+        upstream = FakeUpstream()
+
+        assert await cache.get_or_call(_payload("texto"), upstream) == CONTENT
+        assert await cache.get_or_call(_payload(" texto "), upstream) == CONTENT
+
+        metrics = cache.metrics()
+        assert upstream.calls == 1
+        assert (metrics["hits"], metrics["misses"], metrics["saved_calls"]) == (1, 1, 1)
+        assert metrics["hit_rate"] == pytest.approx(0.5)
+        assert metrics["entries"] == 1
+
+    async def test_ttl_and_lru_eviction(self):
+        cache = LLMResponseCache(MemoryCacheBackend(2), ttl_seconds=0)
+        upstream = FakeUpstream()
+
+        await cache.get_or_call(_payload("a"), upstream)
+        await cache.get_or_call(_payload("a"), upstream)
+        assert upstream.calls == 2  # expirada
+
+        cache = LLMResponseCache(MemoryCacheBackend(2), ttl_seconds=60)
+        for prompt in ("a", "b", "c", "a"):
+            await cache.get_or_call(_payload(prompt), upstream)
+        assert cache.metrics()["evictions"] >= 1
+        assert cache.metrics()["hits"] == 0
+
+    async def test_concurrent_duplicates_are_coalesced(self):
+        cache = LLMResponseCache(None)
+        upstream = FakeUpstream(delay=0.05)
+
+        results = await asyncio.gather(*[cache.get_or_call(_payload("página duplicada"), upstream) for _ in range(10)])
+
+        assert results == [CONTENT] * 10
+        assert upstream.calls == 1
+        metrics = cache.metrics()
+        assert (metrics["coalesced"], metrics["saved_calls"], metrics["in_flight"]) == (9, 9, 0)
+        assert metrics["backend"] == "off"
+
+    async def test_coalescing_across_event_loops(self):
+        cache = LLMResponseCache(None)
+        upstream = FakeUpstream(delay=0.1)
+        started = threading.Barrier(4)
+
+        def worker():
+            started.wait()
+            return asyncio.run(cache.get_or_call(_payload("texto"), upstream))
+
+        results = await asyncio.gather(*[asyncio.to_thread(worker) for _ in range(4)])
+
+        assert results == [CONTENT] * 4
+        assert upstream.calls == 1
+
+    async def test_errors_are_shared_and_not_cached(self):
+        cache = LLMResponseCache(MemoryCacheBackend(16))
+        upstream = FakeUpstream(delay=0.05, fail=True)
+
+        results = await asyncio.gather(
+            *[cache.get_or_call(_payload("texto"), upstream) for _ in range(3)], return_exceptions=True
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert upstream.calls == 1
+
+        upstream.fail = False
+        assert await cache.get_or_call(_payload("texto"), upstream) == CONTENT
+        assert upstream.calls == 2
+
+    async def test_backend_errors_are_misses(self):
+        class BrokenBackend(MemoryCacheBackend):
+            name = "redis"
+
+            def get(self, workspace_id, key):
+                raise ConnectionError("redis fora do ar")
+
+        cache = LLMResponseCache(BrokenBackend())
+        assert await cache.get_or_call(_payload("texto"), FakeUpstream()) == CONTENT
+        assert cache.metrics()["errors"] == 1
+
+
+    async def test_cancelled_call_is_reissued_by_a_waiter(self):
+        cache = LLMResponseCache(None)
+        upstream = FakeUpstream(delay=0.05)
+
+        leader = asyncio.ensure_future(cache.get_or_call(_payload("texto"), upstream))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.ensure_future(cache.get_or_call(_payload("texto"), upstream)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        assert await asyncio.gather(*waiters) == [CONTENT, CONTENT]
+        assert leader.cancelled()
+        assert upstream.calls == 2
+        assert cache.metrics()["in_flight"] == 0
+
+    async def test_cancelled_waiter_does_not_cancel_the_call(self):
+        cache = LLMResponseCache(None)
+        upstream = FakeUpstream(delay=0.05)
+
+        leader = asyncio.ensure_future(cache.get_or_call(_payload("texto"), upstream))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.ensure_future(cache.get_or_call(_payload("texto"), upstream)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        waiters[0].cancel()
+
+        assert await leader == CONTENT
+        assert await waiters[1] == CONTENT
+        assert upstream.calls == 1
+
+
+@pytest.mark.asyncio
+class TestAIServiceCache:
+    async def test_duplicate_prompts_reach_the_api_once(self, monkeypatch):
+        cache = LLMResponseCache(MemoryCacheBackend(16))
+        monkeypatch.setattr(ai_service_module, "llm_response_cache", cache)
+
+        service = AIService()
+        service.api_key = "sk-test"
+        upstream = FakeUpstream(delay=0.02)
+        monkeypatch.setattr(service, "_request_chat_completion", lambda payload: upstream())
+
+        responses = await asyncio.gather(*[service.extract_invoice_data("NF-e 123 Total 10,00") for _ in range(5)])
+        responses.append(await service.extract_invoice_data("NF-e 123  Total 10,00"))
+
+        assert responses == [CONTENT] * 6
+        assert upstream.calls == 1
+        assert cache.metrics()["saved_calls"] == 5
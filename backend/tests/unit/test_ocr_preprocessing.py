@@ -0,0 +1,183 @@
+"""
+Testes unitários para o pré-processamento do OCR e o DPI adaptativo
+"""
+import numpy as np
+import cv2
+import pytest
+from PIL import Image
+
+from app.services import pdf_page_pipeline
+from app.services.ocr_preprocessing import (
+    OcrWord,
+    adaptive_ocr_report,
+    estimate_skew,
+    low_confidence_regions,
+    merge_refined_words,
+    preprocess_for_ocr,
+    rotate,
+)
+from app.services.pdf_page_pipeline import OcrRefinement, ocr_refinement, perform_ocr, resolve_ocr_dpi
+
+
+def _page(width=1200, height=1600) -> np.ndarray:
+    """Página em tons de cinza com linhas de texto horizontais"""
+    page = np.full((height, width), 255, np.uint8)
+    for row in range(30):
+        cv2.putText(
+            page, "NOTA FISCAL 000123 CNPJ 12.345.678/0001-90 VALOR",
+            (60, 80 + row * 48), cv2.FONT_HERSHEY_SIMPLEX, 0.9, 0, 2
+        )
+    return page
+
+
+def _word(text, confidence, box, line):
+    return OcrWord(text, confidence, box, line)
+
+
+def _tesseract_data(words):
+    """Saída de image_to_data (Output.DICT) para (texto, confiança, caixa, linha)"""
+    data = {key: [] for key in ('text', 'conf', 'left', 'top', 'width', 'height', 'block_num', 'par_num', 'line_num')}
+    for text, confidence, (left, top, right, bottom), line in words:
+        data['text'].append(text)
+        data['conf'].append(str(confidence))
+        data['left'].append(left)
+        data['top'].append(top)
+        data['width'].append(right - left)
+        data['height'].append(bottom - top)
+        data['block_num'].append(1)
+        data['par_num'].append(1)
+        data['line_num'].append(line)
+    return data
+
+
+class TestPreprocessing:
+    """Tons de cinza, inclinação e binarização"""
+
+    @pytest.mark.parametrize("angle", [3.0, -2.5, 1.0])
+    def test_estimates_rotation(self, angle):
+        assert estimate_skew(rotate(_page(), angle)) == pytest.approx(-angle, abs=0.3)
+
+    def test_preprocess_deskews_and_binarizes_rgb(self):
+        image = Image.fromarray(rotate(_page(), 3.0)).convert('RGB')
+
+        result = preprocess_for_ocr(image)
+
+        assert result.image.shape == (1600, 1200)
+        assert result.image.dtype == np.uint8
+        assert set(np.unique(result.image)) <= {0, 255}
+        assert result.skew_angle == pytest.approx(-3.0, abs=0.3)
+
+    def test_straight_page_is_not_rotated(self):
+        page = _page()
+
+        result = preprocess_for_ocr(Image.fromarray(page), threshold=False)
+
+        assert result.skew_angle == 0.0
+        assert np.array_equal(result.image, page)
+
+    def test_given_angle_skips_estimate(self):
+        result = preprocess_for_ocr(Image.fromarray(_page()), skew_angle=2.0, threshold=False)
+        assert result.skew_angle == 2.0
+
+
+class TestLowConfidenceRegions:
+    """Linhas fracas agrupadas em regiões e substituídas pelo OCR refeito"""
+
+    def test_regions_from_weak_lines(self):
+        words = [
+            _word("NOTA", 95, (10, 10, 60, 30), (1, 1, 1)),
+            _word("T0TAL", 35, (10, 100, 70, 120), (1, 1, 2)),
+            _word("R$", 60, (80, 100, 110, 120), (1, 1, 2)),
+            _word("1.5OO", 40, (10, 125, 70, 145), (1, 1, 3)),
+        ]
+
+        regions = low_confidence_regions(words, (600, 800), 70)
+
+        # Linhas 2 e 3 se sobrepõem com a margem e viram uma região
+        assert regions == [(0, 89, 121, 156)]
+
+    def test_whole_page_when_mostly_weak(self):
+        words = [_word("x", 10, (0, row * 100, 600, row * 100 + 90), (1, 1, row)) for row in range(8)]
+        assert low_confidence_regions(words, (600, 800), 70) == [(0, 0, 600, 800)]
+
+    def test_merge_keeps_reading_order_and_only_better_regions(self):
+        words = [
+            _word("NOTA", 95, (10, 10, 60, 30), (1, 1, 1)),
+            _word("T0TAL", 35, (10, 100, 70, 120), (1, 1, 2)),
+            _word("FIM", 90, (10, 300, 50, 320), (1, 1, 4)),
+            _word("ruido", 50, (10, 400, 50, 420), (1, 1, 5)),
+        ]
+        regions = [(0, 90, 200, 130), (0, 390, 200, 430)]
+        refined = [
+            [_word("TOTAL", 93, (10, 101, 70, 119), (1, 1, 1)), _word("R$", 90, (80, 101, 100, 119), (1, 1, 1))],
+            [_word("ruído", 20, (10, 400, 50, 420), (1, 1, 1))],
+        ]
+
+        merged, replaced = merge_refined_words(words, regions, refined)
+
+        assert [word.text for word in merged] == ["NOTA", "TOTAL", "R$", "FIM", "ruido"]
+        assert replaced == 1
+
+
+class TestAdaptiveOcr:
+    """perform_ocr com refinamento em alta resolução"""
+
+    @pytest.fixture
+    def tesseract(self, monkeypatch):
+        calls = []
+
+        def image_to_data(image):
+            calls.append(image.shape)
+            if len(calls) == 1:
+                return _tesseract_data([
+                    ("NOTA", 96, (20, 20, 120, 40), 1),
+                    ("T0TAL", 25, (20, 200, 120, 220), 2),
+                ])
+            # Recorte em alta resolução da linha fraca
+            return _tesseract_data([("TOTAL", 91, (22, 22, 222, 62), 1)])
+
+        monkeypatch.setattr(pdf_page_pipeline, "_image_to_data", image_to_data)
+        return calls
+
+    def test_refines_weak_lines_at_high_dpi(self, tesseract, monkeypatch):
+        rasterized = []
+
+        def rasterize(file_path, page_number, dpi, grayscale=False):
+            rasterized.append((file_path, page_number, dpi, grayscale))
+            return Image.new('L', (1200, 1600), 255)
+
+        monkeypatch.setattr(pdf_page_pipeline, "rasterize_page", rasterize)
+        image = Image.new('RGB', (600, 800), 'white')
+
+        result = perform_ocr(image, OcrRefinement("nota.pdf", 2, 150, 300))
+
+        assert rasterized == [("nota.pdf", 2, 300, True)]
+        assert tesseract[0] == (800, 600)
+        assert result['words'] == ["NOTA", "TOTAL"]
+        assert result['boxes'][1] == [33, 250, 200, 275]
+        assert (result['dpi'], result['refined_dpi'], result['refined_regions']) == (150, 300, 1)
+        assert result['mean_confidence'] == pytest.approx(93.5)
+        assert result['confidences'] == [96.0, 91.0]
+        assert result['text'] == "NOTA\nTOTAL"
+
+    def test_without_refinement_drops_weak_words(self, tesseract, monkeypatch):
+        monkeypatch.setattr(pdf_page_pipeline, "rasterize_page", pytest.fail)
+
+        result = perform_ocr(Image.new('RGB', (600, 800), 'white'))
+
+        assert result['words'] == ["NOTA"]
+        assert result['boxes'] == [[33, 25, 200, 50]]
+        assert result['refined_regions'] == 0
+        # O texto corrido da IA mantém as palavras fracas
+        assert result['text'] == "NOTA\nT0TAL"
+
+        report = adaptive_ocr_report([result, None])
+        assert report['ocr_pages'] == 1 and report['refined_pages'] == 0
+
+    def test_dpi_resolution(self, monkeypatch):
+        assert resolve_ocr_dpi(300) == 150
+        assert ocr_refinement("a.pdf", 1, 150, 300) == OcrRefinement("a.pdf", 1, 150, 300)
+        assert ocr_refinement("a.pdf", 1, 300, 300) is None
+
+        monkeypatch.setattr(pdf_page_pipeline.settings, "OCR_ADAPTIVE_DPI_ENABLED", False)
+        assert resolve_ocr_dpi(300) == 300
@@ -0,0 +1,126 @@
+"""
+Testes unitários para a leitura da camada de texto de PDFs digitais
+"""
+import pytest
+
+from app.services import pdf_page_pipeline
+from app.services.pdf_page_pipeline import (
+    extract_text_layers,
+    is_usable_text_layer,
+    record_ocr_page_seconds,
+    text_layer_report,
+)
+
+INVOICE_LINES = [
+    "NOTA FISCAL ELETRONICA NF-e No 000.123.456 Serie 1",
+    "Emitente: Fornecedor Teste LTDA CNPJ 12.345.678/0001-90",
+    "Data de emissao 15/03/2024 Vencimento 15/04/2024",
+    "Valor total da nota R$ 1.500,00 ICMS R$ 180,00",
+]
+
+
+def _pdf(pages) -> bytes:
+    """PDF mínimo com uma página por lista de linhas (lista vazia = página sem texto)"""
+    page_count = len(pages)
+    font_id = 3 + 2 * page_count
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{3 + 2 * index} 0 R" for index in range(page_count)), page_count
+        )).encode(),
+    ]
+    for index, lines in enumerate(pages):
+        content = "".join(
+            f"BT /F1 11 Tf 50 {780 - 20 * row} Td ({line}) Tj ET\n" for row, line in enumerate(lines)
+        ).encode()
+        objects.append((
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * index} 0 R >>"
+        ).encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"endstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(output)
+
+
+@pytest.fixture
+def mixed_pdf(tmp_path):
+    path = tmp_path / "fatura.pdf"
+    path.write_bytes(_pdf([INVOICE_LINES, [], ["Pagina 3"]]))
+    return str(path)
+
+
+@pytest.fixture
+def ocr_cost():
+    saved = pdf_page_pipeline._ocr_page_seconds, pdf_page_pipeline._ocr_page_measured
+    yield
+    pdf_page_pipeline._ocr_page_seconds, pdf_page_pipeline._ocr_page_measured = saved
+
+
+class TestTextLayer:
+    """Detecção e extração da camada de texto"""
+
+    def test_extract_words_and_boxes(self, mixed_pdf):
+        layers = extract_text_layers(mixed_pdf, 4)
+
+        assert len(layers) == 4
+        first = layers[0]
+        assert first["source"] == "text_layer"
+        assert first["words"][:3] == ["NOTA", "FISCAL", "ELETRONICA"]
+        assert len(first["boxes"]) == len(first["words"])
+        assert all(0 <= coordinate <= 1000 for box in first["boxes"] for coordinate in box)
+        assert "Fornecedor Teste LTDA" in first["text"]
+        assert first["image_size"] == (612, 792)
+
+        # Primeira linha acima da segunda na página
+        emitente = first["boxes"][first["words"].index("Emitente:")]
+        assert first["boxes"][0][1] < emitente[1]
+
+        # Página sem texto, com texto insuficiente e além do fim do PDF
+        assert layers[1:] == [None, None, None]
+
+    def test_unreadable_pdf_needs_ocr(self, tmp_path):
+        path = tmp_path / "corrompido.pdf"
+        path.write_bytes(b"%PDF-1.4 nao e um pdf")
+
+        assert extract_text_layers(str(path), 2) == [None, None]
+
+    def test_usable_text_layer(self):
+        words = " ".join(INVOICE_LINES).split()
+
+        assert is_usable_text_layer(words, min_words=10)
+        assert not is_usable_text_layer(words[:5], min_words=10)
+        assert not is_usable_text_layer(["(cid:12)(cid:40)"] * 20 + words[:5], min_words=10)
+        assert not is_usable_text_layer(["��"] * 20, min_words=10)
+
+
+class TestTextLayerReport:
+    """Caminho escolhido e tempo economizado"""
+
+    def test_paths(self, ocr_cost):
+        assert text_layer_report(["ocr", "ocr"], 0.0)["path"] == "ocr"
+        assert text_layer_report(["text_layer", "ocr"], 0.0)["path"] == "mixed"
+
+        report = text_layer_report(["text_layer", "text_layer"], 0.0)
+        assert report["path"] == "text_layer"
+        assert (report["text_layer_pages"], report["ocr_pages"]) == (2, 0)
+
+    def test_seconds_saved_uses_measured_ocr_cost(self, ocr_cost):
+        pdf_page_pipeline._ocr_page_measured = False
+        record_ocr_page_seconds(3.0)
+        record_ocr_page_seconds(3.0)
+
+        report = text_layer_report(["text_layer", "text_layer", "ocr"], 0.5)
+
+        assert report["estimated_seconds_saved"] == pytest.approx(5.5)
+        assert text_layer_report(["ocr"], 0.5)["estimated_seconds_saved"] == 0.0
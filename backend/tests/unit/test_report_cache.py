@@ -0,0 +1,291 @@
+"""
+Testes unitários para o cache de respostas do Executive Dashboard
+"""
+import asyncio
+import pytest
+from datetime import datetime, date
+from types import SimpleNamespace
+
+from app.core.cache import MemoryCacheBackend, RedisCacheBackend, ResponseCache
+from app.models.cash_flow import BankAccount, CashFlowTransaction
+from app.models.accounts_receivable import AccountsReceivable
+from app.models.accounts_payable import AccountsPayableInvoice
+from app.services.report_cache import report_cache
+from app.api.api_v1.endpoints import reports
+
+
+class FailingBackend:
+    """Backend que simula Redis indisponível"""
+    name = "failing"
+
+    def get(self, workspace_id, key):
+        raise ConnectionError("redis down")
+
+    def set(self, workspace_id, key, value, ttl):
+        raise ConnectionError("redis down")
+
+    def invalidate_workspace(self, workspace_id):
+        raise ConnectionError("redis down")
+
+    def size(self):
+        raise ConnectionError("redis down")
+
+
+class FakeRedis:
+    """Subconjunto dos comandos do redis-py usados pelo RedisCacheBackend"""
+
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+        self.sorted_sets = {}
+
+    def get(self, key):
+        value = self.values.get(key)
+        return value.encode("utf-8") if value is not None else None
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+        self.ttls[key] = ex
+
+    def delete(self, *keys):
+        removed = sum(1 for key in keys if self.values.pop(key, None) is not None)
+        for key in keys:
+            self.sorted_sets.pop(key, None)
+        return removed
+
+    def scan_iter(self, pattern):
+        prefix = pattern.rstrip("*")
+        return [key for key in [*self.values, *self.sorted_sets] if key.startswith(prefix)]
+
+    def zadd(self, name, mapping):
+        self.sorted_sets.setdefault(name, {}).update(mapping)
+
+    def zrem(self, name, *members):
+        for member in members:
+            self.sorted_sets.get(name, {}).pop(member, None)
+
+    def zrange(self, name, start, end):
+        return [member for member, _ in sorted(self.sorted_sets.get(name, {}).items(), key=lambda item: item[1])]
+
+    def zrangebyscore(self, name, low, high):
+        return [member for member, score in self.sorted_sets.get(name, {}).items() if score <= high]
+
+    def zcard(self, name):
+        return len(self.sorted_sets.get(name, {}))
+
+    def zcount(self, name, low, high):
+        return sum(1 for score in self.sorted_sets.get(name, {}).values() if score >= low)
+
+    def zpopmin(self, name, count):
+        members = self.sorted_sets.get(name, {})
+        popped = sorted(members.items(), key=lambda item: item[1])[:count]
+        for member, _ in popped:
+            del members[member]
+        return popped
+
+    def pipeline(self):
+        client = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def __getattr__(self, command):
+                return lambda *args, **kwargs: self.calls.append((command, args, kwargs))
+
+            def execute(self):
+                return [getattr(client, command)(*args, **kwargs) for command, args, kwargs in self.calls]
+
+        return Pipeline()
+
+
+class TestResponseCache:
+    """Backend LRU e métricas"""
+
+    def test_hit_miss_and_metrics(self):
+        cache = ResponseCache(MemoryCacheBackend(), default_ttl=60)
+        params = {"period_start": date(2024, 1, 1), "period_end": date(2024, 1, 31)}
+
+        assert cache.get(1, "kpis", params) is None
+        cache.set(1, "kpis", params, '{"ok": true}')
+        assert cache.get(1, "kpis", dict(reversed(list(params.items())))) == '{"ok": true}'
+
+        metrics = cache.metrics()
+        assert metrics["hits"] == 1
+        assert metrics["misses"] == 1
+        assert metrics["hit_rate"] == pytest.approx(0.5)
+        assert metrics["by_endpoint"]["kpis"]["sets"] == 1
+        assert metrics["entries"] == 1
+
+    def test_invalidation_is_scoped_to_workspace(self):
+        cache = ResponseCache(MemoryCacheBackend(), default_ttl=60)
+        for workspace_id in (1, 2):
+            cache.set(workspace_id, "kpis", {}, "kpis")
+            cache.set(workspace_id, "charts", {}, "charts")
+
+        assert cache.invalidate_workspace(1) == 2
+        assert cache.get(1, "kpis", {}) is None
+        assert cache.get(2, "kpis", {}) == "kpis"
+        assert cache.get(2, "charts", {}) == "charts"
+
+    def test_ttl_and_lru_eviction(self, monkeypatch):
+        backend = MemoryCacheBackend(max_entries=2)
+        clock = [1000.0]
+        monkeypatch.setattr("app.core.cache.time.monotonic", lambda: clock[0])
+
+        backend.set(1, "a", "A", ttl=10)
+        backend.set(1, "b", "B", ttl=100)
+        backend.get(1, "a")            # "a" passa a ser o mais recente
+        backend.set(2, "c", "C", ttl=100)
+
+        assert backend.get(1, "b") is None
+        assert backend.evictions == 1
+
+        clock[0] += 11
+        assert backend.get(1, "a") is None
+        assert backend.get(2, "c") == "C"
+
+    def test_backend_errors_are_treated_as_miss(self):
+        cache = ResponseCache(FailingBackend())
+
+        assert cache.get(1, "kpis", {}) is None
+        cache.set(1, "kpis", {}, "value")
+        assert cache.invalidate_workspace(1) == 0
+
+        metrics = cache.metrics()
+        assert metrics["errors"] == 3
+        assert metrics["misses"] == 1
+        assert metrics["entries"] is None
+
+
+class TestRedisCacheBackend:
+    """Uma chave por resposta, com TTL próprio, limite de entradas e índice por workspace"""
+
+    def test_entries_are_separate_keys_with_ttl(self):
+        client = FakeRedis()
+        backend = RedisCacheBackend("", max_entries=10, prefix="orion:cache", client=client)
+
+        backend.set(1, "reports:kpis:a", "{}", 300)
+        backend.set(1, "reports:kpis:b", "[]", 60)
+
+        assert backend.get(1, "reports:kpis:a") == "{}"
+        assert backend.get(1, "reports:kpis:c") is None
+        assert client.ttls == {"orion:cache:ws:1:reports:kpis:a": 300, "orion:cache:ws:1:reports:kpis:b": 60}
+        assert backend.size() == 2
+
+    def test_max_entries_evicts_first_to_expire(self):
+        client = FakeRedis()
+        backend = RedisCacheBackend("", max_entries=2, prefix="orion:cache", client=client)
+
+        backend.set(1, "a", "a", 60)
+        backend.set(2, "b", "b", 60)
+        backend.set(1, "c", "c", 60)
+
+        assert backend.get(1, "a") is None
+        assert (backend.get(2, "b"), backend.get(1, "c")) == ("b", "c")
+        assert (backend.size(), backend.evictions) == (2, 1)
+        assert list(client.sorted_sets["orion:cache:index:ws:1"]) == ["orion:cache:ws:1:c"]
+
+        backend.clear()
+        assert client.values == {} and client.sorted_sets == {} and backend.size() == 0
+
+    def test_expired_entries_leave_the_indexes(self, monkeypatch):
+        client = FakeRedis()
+        backend = RedisCacheBackend("", max_entries=10, prefix="orion:cache", client=client)
+        clock = [1000.0]
+        monkeypatch.setattr("app.core.cache.time.time", lambda: clock[0])
+
+        backend.set(1, "a", "a", 60)
+        clock[0] += 61
+        backend.set(2, "b", "b", 60)
+
+        assert list(client.sorted_sets["orion:cache:index"]) == ["orion:cache:ws:2:b"]
+        assert client.sorted_sets["orion:cache:index:ws:1"] == {}
+
+    def test_invalidation_uses_workspace_index(self):
+        client = FakeRedis()
+        backend = RedisCacheBackend("", max_entries=10, prefix="orion:cache", client=client)
+        client.scan_iter = None  # invalidar não varre o keyspace
+
+        backend.set(1, "a", "a", 60)
+        backend.set(1, "b", "b", 60)
+        backend.set(2, "c", "c", 60)
+
+        assert backend.invalidate_workspace(1) == 2
+        assert backend.invalidate_workspace(1) == 0
+        assert (backend.get(1, "a"), backend.get(2, "c")) == (None, "c")
+        assert list(client.sorted_sets["orion:cache:index"]) == ["orion:cache:ws:2:c"]
+        assert backend.size() == 1
+
+
+class TestReportCacheInvalidation:
+    """Invalidação dirigida pelos commits da sessão"""
+
+    @pytest.fixture
+    def db(self, sqlite_session):
+        tables = [
+            BankAccount.__table__,
+            CashFlowTransaction.__table__,
+            AccountsReceivable.__table__,
+            AccountsPayableInvoice.__table__,
+        ]
+        with sqlite_session(tables) as session:
+            report_cache.clear()
+
+            try:
+                yield session
+            finally:
+                report_cache.clear()
+
+    @staticmethod
+    def _transaction(workspace_id: int, value: float = 100.0) -> CashFlowTransaction:
+        return CashFlowTransaction(
+            workspace_id=workspace_id,
+            transaction_date=datetime(2024, 3, 10, 10, 0),
+            type="entrada",
+            category="Vendas",
+            description="Venda",
+            value=value
+        )
+
+    def test_commit_evicts_only_affected_workspace(self, db):
+        report_cache.set(1, "kpis", {}, "ws1")
+        report_cache.set(2, "kpis", {}, "ws2")
+
+        db.add(self._transaction(1))
+        db.commit()
+
+        assert report_cache.get(1, "kpis", {}) is None
+        assert report_cache.get(2, "kpis", {}) == "ws2"
+
+    def test_rollback_keeps_cache(self, db):
+        report_cache.set(1, "kpis", {}, "ws1")
+
+        db.add(self._transaction(1))
+        db.flush()
+        db.rollback()
+        db.commit()
+
+        assert report_cache.get(1, "kpis", {}) == "ws1"
+
+    def test_kpis_served_from_cache_until_write(self, db):
+        user = SimpleNamespace(id=1, workspace_id=1, role="user")
+        db.add(self._transaction(1, value=250.0))
+        db.commit()
+
+        def kpis():
+            response = asyncio.run(reports.get_executive_dashboard_kpis(
+                date(2024, 3, 1), date(2024, 3, 31), db, user
+            ))
+            return {kpi.id: kpi.valor for kpi in response.kpis}
+
+        assert kpis()["receita-total"] == pytest.approx(250.0)
+
+        # Gravação fora do ORM não dispara invalidação: resposta vem do cache
+        db.execute(CashFlowTransaction.__table__.update().values(value=999.0))
+        assert kpis()["receita-total"] == pytest.approx(250.0)
+        assert report_cache.metrics()["by_endpoint"]["executive-dashboard/kpis"]["hits"] == 1
+
+        db.add(self._transaction(1, value=50.0))
+        db.commit()
+        assert kpis()["receita-total"] == pytest.approx(1049.0)
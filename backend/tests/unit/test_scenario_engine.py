@@ -0,0 +1,242 @@
+"""
+Testes unitários para o motor vetorizado de cenários (scenario_engine)
+
+Compara o kernel NumPy com o loop diário usado anteriormente em
+calculate_scenarios/simulate_scenario.
+"""
+import pytest
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+import numpy as np
+
+from app.models.cash_flow import BankAccount, CashFlowTransaction, CashFlowDailyBalance
+from app.models.accounts_receivable import AccountsReceivable
+from app.models.accounts_payable import AccountsPayableInvoice
+from app.services.scenario_engine import confidence_curve, project_scenarios, to_projection_points
+from app.schemas.cash_flow import (
+    ScenarioComparisonRequest,
+    ScenarioSensitivityRequest,
+    SimulationAdjustments,
+    SimulationRequest,
+)
+from app.api.api_v1.endpoints import cash_flow_analytics
+
+
+WORKSPACE_ID = 1
+
+
+def _legacy_projection(days_ahead, opening, base_entries, receivables, delay, base_exits,
+                       one_time_income=0.0, one_time_expense=0.0):
+    """Loop diário equivalente à implementação anterior"""
+    running_balance = opening
+    min_balance = max_balance = opening
+    total_entries = one_time_income
+    total_exits = one_time_expense
+    running_balance += one_time_income
+    running_balance -= one_time_expense
+
+    balances, confidences = [], []
+    for day in range(days_ahead):
+        daily_entries = base_entries
+        if day >= delay:
+            daily_entries += receivables
+        daily_exits = base_exits
+
+        running_balance += daily_entries - daily_exits
+        total_entries += daily_entries
+        total_exits += daily_exits
+        min_balance = min(min_balance, running_balance)
+        max_balance = max(max_balance, running_balance)
+
+        balances.append(running_balance)
+        confidences.append(max(0.5, 1.0 - (day / days_ahead) * 0.5))
+
+    return {
+        'balances': balances,
+        'confidences': confidences,
+        'final_balance': running_balance,
+        'minimum_balance': min_balance,
+        'maximum_balance': max_balance,
+        'average_balance': sum(balances) / len(balances),
+        'total_entries': total_entries,
+        'total_exits': total_exits,
+    }
+
+
+class TestScenarioEngine:
+    """Testes do kernel de projeção"""
+
+    PARAMETERS = [
+        # (abertura, entradas base, recebíveis, atraso, saídas, receita única, despesa única)
+        (10000.0, 950.0, 120.0, 2, 1100.0, 0.0, 0.0),
+        (10000.0, 850.0, 90.0, 7, 1300.0, 0.0, 0.0),
+        (-500.0, 400.0, 50.0, 15, 380.0, 2500.0, 700.0),
+        (0.0, 0.0, 0.0, 0, 0.0, 0.0, 0.0),
+    ]
+
+    @pytest.mark.parametrize("days_ahead", [7, 30, 365])
+    def test_matches_daily_loop(self, days_ahead):
+        columns = list(zip(*self.PARAMETERS))
+        batch = project_scenarios(
+            days_ahead,
+            opening_balance=columns[0],
+            base_entries=columns[1],
+            receivable_entries=columns[2],
+            delay_days=columns[3],
+            base_exits=columns[4],
+            one_time_income=columns[5],
+            one_time_expense=columns[6]
+        )
+
+        assert batch.size == len(self.PARAMETERS)
+        for index, params in enumerate(self.PARAMETERS):
+            expected = _legacy_projection(days_ahead, *params)
+            assert batch.balances[index].tolist() == pytest.approx(expected['balances'])
+            for metric in ('final_balance', 'minimum_balance', 'maximum_balance',
+                           'average_balance', 'total_entries', 'total_exits'):
+                assert float(getattr(batch, metric)[index]) == pytest.approx(expected[metric])
+            assert batch.confidence.tolist() == pytest.approx(expected['confidences'])
+
+    def test_scalar_parameters_broadcast(self):
+        batch = project_scenarios(10, 100.0, 10.0, 5.0, 3, 12.0)
+
+        assert batch.balances.shape == (1, 10)
+        assert batch.entries[0, :3].tolist() == [10.0, 10.0, 10.0]
+        assert batch.entries[0, 3:].tolist() == [15.0] * 7
+
+    def test_first_negative_day(self):
+        batch = project_scenarios(10, [100.0, 100.0], 0.0, 0.0, 0, [30.0, 5.0])
+
+        # 100 - 30 * 4 = -20 no quarto dia (índice 3); o segundo nunca fica negativo
+        assert batch.first_negative_day.tolist() == [3, -1]
+
+    def test_confidence_curve_decay(self):
+        curve = confidence_curve(4)
+        assert curve.tolist() == pytest.approx([1.0, 0.875, 0.75, 0.625])
+
+    def test_projection_points_serialization(self):
+        batch = project_scenarios(3, [0.0, 50.0], 10.0, 0.0, 0, 4.0)
+        points = to_projection_points(batch, 1, date(2024, 1, 31))
+
+        assert [p.projection_date for p in points] == [date(2024, 2, 1), date(2024, 2, 2), date(2024, 2, 3)]
+        assert [p.projected_balance for p in points] == pytest.approx([56.0, 62.0, 68.0])
+        assert all(isinstance(p.net_flow, float) for p in points)
+
+    @pytest.mark.slow
+    def test_vectorized_faster_than_loop(self):
+        rng = np.random.default_rng(7)
+        size, days_ahead = 500, 365
+        params = np.column_stack([
+            rng.uniform(-1000, 50000, size),
+            rng.uniform(0, 3000, size),
+            rng.uniform(0, 500, size),
+            rng.integers(0, 30, size),
+            rng.uniform(0, 3000, size),
+        ])
+
+        start_time = time.perf_counter()
+        for row in params.tolist():
+            _legacy_projection(days_ahead, *row)
+        legacy_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        project_scenarios(days_ahead, *params.T)
+        vectorized_time = time.perf_counter() - start_time
+
+        print(f"Loop Python: {legacy_time * 1000:.1f}ms")
+        print(f"NumPy: {vectorized_time * 1000:.1f}ms")
+        print(f"Speedup: {legacy_time / vectorized_time:.1f}x")
+
+        assert vectorized_time < legacy_time
+
+
+class TestScenarioEndpoints:
+    """Endpoints de cenários sobre o kernel vetorizado"""
+
+    @pytest.fixture
+    def db(self, sqlite_session):
+        """Sessão SQLite em memória com as tabelas usadas pelos cenários"""
+        tables = [
+            BankAccount.__table__,
+            CashFlowTransaction.__table__,
+            CashFlowDailyBalance.__table__,
+            AccountsReceivable.__table__,
+            AccountsPayableInvoice.__table__,
+        ]
+
+        with sqlite_session(tables) as session:
+            session.add(BankAccount(
+                id=1,
+                workspace_id=WORKSPACE_ID,
+                bank_name="Banco 1",
+                account_type="corrente",
+                current_balance=5000.0,
+                initial_balance=5000.0,
+                is_active=True
+            ))
+            session.commit()
+
+            yield session
+
+    @pytest.fixture
+    def current_user(self):
+        return SimpleNamespace(id=1, workspace_id=WORKSPACE_ID)
+
+    def test_calculate_scenarios(self, db, current_user):
+        response = cash_flow_analytics.calculate_scenarios(
+            ScenarioComparisonRequest(days_ahead=30, include_realistic=False), db, current_user
+        )
+
+        assert [s.scenario_name for s in response.scenarios] == ["Cenário Otimista", "Cenário Pessimista"]
+        for scenario in response.scenarios:
+            assert len(scenario.projections) == 30
+            assert scenario.final_balance == pytest.approx(5000.0)
+            assert scenario.projections[0].projection_date == date.today() + timedelta(days=1)
+
+    def test_simulate_scenario_reports_minimum_date(self, db, current_user):
+        response = cash_flow_analytics.simulate_scenario(
+            SimulationRequest(
+                days_ahead=10,
+                adjustments=SimulationAdjustments(additional_expenses=30000.0, one_time_income=1000.0)
+            ),
+            db,
+            current_user
+        )
+
+        simulated = response.simulated_scenario
+        # 5000 + 1000 - 1000/dia durante 10 dias
+        assert simulated.final_balance == pytest.approx(-4000.0)
+        assert simulated.total_entries == pytest.approx(1000.0)
+        assert response.comparison_metrics["baseline_final_balance"] == pytest.approx(5000.0)
+        assert response.comparison_metrics["minimum_balance_date"] == (
+            date.today() + timedelta(days=10)
+        ).isoformat()
+
+    def test_sensitivity_grid(self, db, current_user):
+        response = cash_flow_analytics.calculate_scenario_sensitivity(
+            ScenarioSensitivityRequest(
+                days_ahead=30,
+                collection_rates=[0.5, 1.0],
+                delay_days=[0],
+                revenue_growths=[0.0],
+                expense_variations=[0.0, 10.0, 20.0]
+            ),
+            db,
+            current_user
+        )
+
+        assert response.combinations == 6
+        assert len(response.results) == 6
+        assert response.results[0].premises.collection_rate == 0.5
+        assert response.results[-1].premises.expense_variation == 20.0
+        assert response.negative_combinations == 0
+
+    def test_sensitivity_grid_limit(self):
+        with pytest.raises(ValueError):
+            ScenarioSensitivityRequest(
+                collection_rates=[0.1 * i for i in range(11)],
+                delay_days=list(range(10)),
+                revenue_growths=list(range(10)),
+                expense_variations=[0.0, 1.0]
+            )
@@ -0,0 +1,166 @@
+"""
+Testes unitários para o cache de índices de fornecedores por workspace
+"""
+import pytest
+from types import SimpleNamespace
+
+from app.models.supplier_model import Supplier
+from app.models.invoice_model import Invoice
+from app.models.accounts_payable import AccountsPayableInvoice
+from app.schemas.supplier import SupplierCreate, SupplierUpdate
+from app.services.supplier_index_cache import SupplierIndexCache, supplier_index_cache, warm_supplier_index_cache
+from app.services.supplier_matcher import SupplierMatcher
+from app.api.api_v1.endpoints import suppliers as supplier_endpoints
+
+
+def _suppliers(*names):
+    return [
+        {'supplier_id': i, 'name': name, 'cnpj': None, 'category': None, 'normalized_name': name.lower()}
+        for i, name in enumerate(names, start=1)
+    ]
+
+
+class TestSupplierIndexCache:
+    """Versões, TTL e limites de memória"""
+
+    def test_hit_after_first_load(self):
+        cache = SupplierIndexCache()
+        loads = []
+
+        def load():
+            loads.append(1)
+            return _suppliers("Alfa", "Beta")
+
+        first = cache.get(1, load)
+        assert cache.get(1, load) is first
+        assert len(loads) == 1
+
+        metrics = cache.metrics()
+        assert (metrics["hits"], metrics["misses"], metrics["suppliers"]) == (1, 1, 2)
+
+    def test_invalidation_is_scoped_to_workspace(self):
+        cache = SupplierIndexCache()
+        one = cache.get(1, lambda: _suppliers("Alfa"))
+        two = cache.get(2, lambda: _suppliers("Beta"))
+
+        assert cache.invalidate_workspace(1) is True
+        assert cache.get(1, lambda: _suppliers("Alfa", "Gama")) is not one
+        assert cache.get(2, lambda: _suppliers("Outro")) is two
+
+    def test_load_during_invalidation_is_not_stored(self):
+        cache = SupplierIndexCache()
+
+        def load():
+            # Fornecedor gravado enquanto o índice era carregado
+            cache.invalidate_workspace(1)
+            return _suppliers("Alfa")
+
+        stale = cache.get(1, load)
+        assert len(stale) == 1
+        assert cache.metrics()["stale_loads"] == 1
+        assert cache.get(1, lambda: _suppliers("Alfa", "Beta")) is not stale
+
+    def test_lru_bounds(self):
+        cache = SupplierIndexCache(max_workspaces=2, max_suppliers=5)
+        cache.get(1, lambda: _suppliers("A", "B"))
+        cache.get(2, lambda: _suppliers("C"))
+        cache.get(1, lambda: [])           # workspace 1 passa a ser o mais recente
+        cache.get(3, lambda: _suppliers("D"))
+
+        metrics = cache.metrics()
+        assert metrics["workspaces"] == 2
+        assert metrics["evictions"] == 1
+
+        cache.get(4, lambda: _suppliers("E", "F", "G", "H"))
+        assert cache.metrics()["suppliers"] <= 5
+
+        # Um workspace acima do limite ainda fica em cache
+        big = cache.get(5, lambda: _suppliers(*"ABCDEFG"))
+        assert cache.get(5, lambda: []) is big
+        assert cache.metrics()["workspaces"] == 1
+
+    def test_ttl(self, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr("app.services.supplier_index_cache.time.monotonic", lambda: clock[0])
+        cache = SupplierIndexCache(ttl_seconds=10)
+
+        first = cache.get(1, lambda: _suppliers("Alfa"))
+        clock[0] += 5
+        assert cache.get(1, lambda: []) is first
+        clock[0] += 6
+        assert cache.get(1, lambda: []) is not first
+
+
+class TestSupplierIndexInvalidation:
+    """Índice compartilhado entre matchers e invalidado pelos commits"""
+
+    @pytest.fixture
+    def db(self, sqlite_session):
+        tables = [Supplier.__table__, Invoice.__table__, AccountsPayableInvoice.__table__]
+        with sqlite_session(tables) as session:
+            supplier_index_cache.clear()
+
+            try:
+                yield session
+            finally:
+                supplier_index_cache.clear()
+
+    @staticmethod
+    def _match(db, workspace_id, name, cnpj=None):
+        return SupplierMatcher(db, workspace_id).find_matching_suppliers(name, cnpj)
+
+    def test_matchers_share_workspace_index(self, db):
+        db.add_all([
+            Supplier(workspace_id=1, name="Papelaria Central Ltda", document="12.345.678/0001-90"),
+            Supplier(workspace_id=2, name="Papelaria Central Ltda", document="12.345.678/0001-90"),
+        ])
+        db.commit()
+
+        first = self._match(db, 1, "Papelaria Central", "12345678000190")
+        second = self._match(db, 1, "Papelaria Central")
+
+        assert [match['supplier_id'] for match in first] == [match['supplier_id'] for match in second]
+        assert supplier_index_cache.metrics()["loads"] == 1
+        assert self._match(db, 2, "Papelaria Central", "12345678000190")[0]['supplier_id'] != first[0]['supplier_id']
+
+    def test_endpoint_writes_invalidate_only_affected_workspace(self, db):
+        user = SimpleNamespace(id=1, workspace_id=1, role="user")
+        db.add(Supplier(workspace_id=2, name="Transportes Norte"))
+        db.commit()
+
+        assert self._match(db, 1, "Alimentos Serra Azul") == []
+        assert self._match(db, 2, "Transportes Norte")
+        invalidations = supplier_index_cache.metrics()["invalidations"]
+
+        created = supplier_endpoints.create_supplier(SupplierCreate(name="Alimentos Serra Azul"), db, user)
+        assert [match['supplier_id'] for match in self._match(db, 1, "Alimentos Serra Azul")] == [created.id]
+
+        supplier_endpoints.update_supplier(created.id, SupplierUpdate(active=False), db, user)
+        assert self._match(db, 1, "Alimentos Serra Azul") == []
+
+        supplier_endpoints.delete_supplier(created.id, db, user)
+
+        metrics = supplier_index_cache.metrics()
+        assert metrics["invalidations"] == invalidations + 3
+        assert metrics["workspaces"] == 1  # workspace 2 continua em cache
+
+    def test_rollback_keeps_index(self, db):
+        self._match(db, 1, "Alfa")
+
+        db.add(Supplier(workspace_id=1, name="Alfa Comércio"))
+        db.flush()
+        db.rollback()
+        db.commit()
+
+        assert supplier_index_cache.metrics()["invalidations"] == 0
+
+    def test_warm_loads_largest_workspaces(self, db):
+        db.add_all([Supplier(workspace_id=1, name=f"Fornecedor {i}") for i in range(3)])
+        db.add_all([Supplier(workspace_id=2, name="Outro"), Supplier(workspace_id=3, name="Inativo", active=False)])
+        db.commit()
+
+        assert warm_supplier_index_cache(db, max_workspaces=1) == 1
+        assert supplier_index_cache.metrics()["suppliers"] == 3
+
+        self._match(db, 1, "Fornecedor 1")
+        assert supplier_index_cache.metrics()["hits"] == 1
@@ -0,0 +1,143 @@
+"""
+Testes unitários para o histórico agregado de faturas por fornecedor
+"""
+import pytest
+from datetime import date
+from types import SimpleNamespace
+from sqlalchemy import event
+
+from app.models.supplier_model import Supplier, SupplierInvoiceStat
+from app.models.invoice_model import Invoice
+from app.models.accounts_payable import AccountsPayableInvoice
+from app.schemas.accounts_payable import InvoiceCreate
+from app.services.supplier_index_cache import supplier_index_cache
+from app.services.supplier_invoice_stats import SupplierInvoiceStats
+from app.services.supplier_matcher import SupplierMatcher
+from app.api.api_v1.endpoints import accounts_payable
+
+
+@pytest.fixture
+def db(sqlite_session):
+    tables = [Supplier.__table__, Invoice.__table__, AccountsPayableInvoice.__table__, SupplierInvoiceStat.__table__]
+    with sqlite_session(tables) as session:
+        supplier_index_cache.clear()
+        try:
+            yield session
+        finally:
+            supplier_index_cache.clear()
+
+
+def _invoice(supplier, invoice_date, number="1"):
+    return Invoice(
+        workspace_id=supplier.workspace_id,
+        supplier_id=supplier.id,
+        invoice_number=number,
+        invoice_date=invoice_date,
+        total_value=100.0
+    )
+
+
+class TestSupplierInvoiceStats:
+    """Manutenção incremental e consultas"""
+
+    def test_counts_names_and_last_seen(self, db):
+        supplier = Supplier(workspace_id=1, name="Papelaria Central", document="12.345.678/0001-90")
+        db.add(supplier)
+        db.commit()
+
+        stats = SupplierInvoiceStats(db)
+        stats.record_invoice(_invoice(supplier, date(2024, 3, 10)))
+        stats.record_invoice(_invoice(supplier, date(2024, 1, 5)))
+
+        supplier.name = "Papelaria Central do Brasil"
+        stats.record_invoice(_invoice(supplier, date(2024, 2, 1)))
+        stats.record_invoice(_invoice(supplier, date(2024, 2, 2)), supplier_name="PAPELARIA CENTRAL LTDA")
+        db.commit()
+
+        history = {entry.name: entry for entry in stats.history(1)}
+        assert set(history) == {"Papelaria Central", "Papelaria Central do Brasil", "PAPELARIA CENTRAL LTDA"}
+        assert history["Papelaria Central"].invoice_count == 2
+        assert history["Papelaria Central"].last_seen_date == date(2024, 3, 10)
+        assert history["Papelaria Central"].cnpj == "12345678000190"
+
+        assert stats.invoice_counts([supplier.id, 999], workspace_id=1) == {supplier.id: 4}
+        assert stats.count_for_name("Papelaria Central", "12345678000190") == 2
+        assert stats.history(2) == []
+
+    def test_ignores_invoices_without_supplier_or_other_workspace(self, db):
+        supplier = Supplier(workspace_id=1, name="Alfa")
+        db.add(supplier)
+        db.commit()
+
+        stats = SupplierInvoiceStats(db)
+        stats.record_invoice(SimpleNamespace(workspace_id=1, supplier_id=None, invoice_date=date(2024, 1, 1)))
+        stats.record_invoice(SimpleNamespace(workspace_id=2, supplier_id=supplier.id, invoice_date=date(2024, 1, 1)))
+
+        assert db.query(SupplierInvoiceStat).count() == 0
+
+    def test_accounts_payable_insert_updates_stats(self, db):
+        supplier = Supplier(workspace_id=1, name="Transportes Norte")
+        db.add(supplier)
+        db.commit()
+        user = SimpleNamespace(id=1, workspace_id=1, role="user")
+
+        invoice = InvoiceCreate(
+            supplier_id=supplier.id,
+            invoice_number="NF-1",
+            invoice_date=date(2024, 5, 2),
+            due_date=date(2024, 6, 2),
+            gross_value=100.0,
+            total_value=100.0
+        )
+        accounts_payable.create_invoice(invoice, db, user)
+
+        assert SupplierInvoiceStats(db).invoice_counts([supplier.id]) == {supplier.id: 1}
+
+
+class TestSupplierMatcherHistory:
+    """Matching pelo histórico agregado"""
+
+    def test_history_lookup_uses_single_query(self, db):
+        supplier = Supplier(workspace_id=1, name="Mercado Bom Preço", document="11.222.333/0001-44")
+        other = Supplier(workspace_id=1, name="Mercado Preço Bom Ltda")
+        db.add_all([supplier, other])
+        db.commit()
+
+        stats = SupplierInvoiceStats(db)
+        stats.record_invoice(_invoice(supplier, date(2024, 1, 1)))
+        supplier.name = "Supermercados BP"
+        for day in range(1, 4):
+            stats.record_invoice(_invoice(other, date(2024, 1, day)))
+        db.commit()
+
+        statements = []
+        event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        matcher = SupplierMatcher(db, workspace_id=1)
+        history = matcher._find_in_invoice_history("Mercado Bom Preço", None, 5)
+
+        assert len(statements) == 1
+        assert [match['supplier_id'] for match in history] == [supplier.id, other.id]
+        assert history[0]['invoice_count'] == 1
+
+        by_cnpj = matcher._find_in_invoice_history("", "11222333000144", 5)
+        assert by_cnpj[0]['match_type'] == 'historical_cnpj'
+        assert by_cnpj[0]['supplier_id'] == supplier.id
+
+    def test_invoice_count_breaks_score_ties(self, db):
+        first = Supplier(workspace_id=1, name="Alfa Materiais")
+        second = Supplier(workspace_id=1, name="Alfa Materiais")
+        db.add_all([first, second])
+        db.commit()
+
+        SupplierInvoiceStats(db).record_invoice(_invoice(second, date(2024, 1, 1)))
+        db.commit()
+
+        matcher = SupplierMatcher(db, workspace_id=1)
+        ranked = matcher._deduplicate_and_rank([
+            {'supplier_id': first.id, 'score': 90, 'match_type': 'fuzzy_ratio'},
+            {'supplier_id': second.id, 'score': 90, 'match_type': 'fuzzy_ratio'},
+        ], 5)
+
+        assert [match['supplier_id'] for match in ranked] == [second.id, first.id]
+        assert [match['invoice_count'] for match in ranked] == [1, 0]
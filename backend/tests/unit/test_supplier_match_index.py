@@ -0,0 +1,97 @@
+"""
+Testes unitários para o índice de matching de fornecedores
+"""
+import random
+import pytest
+from unittest.mock import MagicMock
+
+from app.services.supplier_match_index import SupplierMatchIndex, name_trigrams, normalize_cnpj
+from app.services.supplier_matcher import SupplierMatcher
+from tests.fixtures.sample_suppliers import linear_scan, supplier_cache, supplier_name, with_typos
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return SupplierMatcher(MagicMock())
+
+
+@pytest.fixture(scope="module")
+def suppliers(matcher):
+    suppliers = supplier_cache(3000, matcher._normalize_text)
+
+    # Nomes repetidos e CNPJ repetido: vale o primeiro da lista
+    suppliers.append(dict(suppliers[10], supplier_id=9001))
+    suppliers.append(dict(suppliers[20], supplier_id=9002, name="Outro", normalized_name="outro"))
+    return suppliers
+
+
+class TestSupplierMatchIndex:
+    def test_trigrams_and_cnpj(self):
+        assert name_trigrams("abc de") == {" ab", "abc", "bc ", " de", "de "}
+        assert normalize_cnpj("12.345.678/0001-90") == "12345678000190"
+        assert normalize_cnpj(None) == ""
+
+    def test_cnpj_lookup(self, suppliers):
+        index = SupplierMatchIndex(suppliers)
+        target = suppliers[20]
+
+        assert index.find_by_cnpj(normalize_cnpj(target['cnpj'])) is target
+        assert index.find_by_cnpj(target['cnpj']) is target
+        assert index.find_by_cnpj("00.000.000/0000-00") is None
+
+    def test_same_results_as_linear_scan(self, matcher, suppliers):
+        """Top-k idêntico à varredura completa (scores, ordem e método)"""
+        index = SupplierMatchIndex(suppliers)
+        rng = random.Random(3)
+        queries = (
+            [with_typos(rng, rng.choice(suppliers)['name']) for _ in range(150)]
+            + [supplier_name(rng) for _ in range(30)]
+            + ["Microsoft Corp", "Alfa", "Distribuidora", "ltda", "", "123"]
+        )
+
+        for query in queries:
+            target = matcher._normalize_text(query)
+            for limit in (1, 5):
+                expected = linear_scan(target, suppliers, limit)
+                found = [
+                    {'supplier_id': match.supplier['supplier_id'], 'score': match.score,
+                     'match_type': f'fuzzy_{match.method}'}
+                    for match in index.search(target, limit, 70)
+                ]
+                assert found == expected, query
+
+    def test_blocking_skips_unrelated_names(self, matcher, suppliers):
+        index = SupplierMatchIndex(suppliers)
+        target = matcher._normalize_text(suppliers[0]['name'])
+
+        assert 0 < len(index.candidates(target)) < len(suppliers) / 2
+
+
+class TestSupplierMatcherIndex:
+    def test_index_is_built_once_per_list(self, matcher, suppliers):
+        matcher._clear_cache()
+        matcher._fuzzy_match_by_name("Alfa Distribuidora", suppliers, 5)
+        index = matcher._match_index
+
+        matcher._find_by_cnpj(suppliers[0]['cnpj'], suppliers)
+        matcher._fuzzy_match_by_name("Beta Alimentos", suppliers, 5)
+        assert matcher._match_index is index
+
+        matcher._fuzzy_match_by_name("Beta Alimentos", suppliers[:10], 5)
+        assert matcher._match_index is not index
+
+        matcher._clear_cache()
+        assert matcher._match_index is None
+
+    def test_loads_workspace_suppliers(self):
+        db = MagicMock()
+        supplier = MagicMock(id=1, document="12.345.678/0001-90", active=True)
+        supplier.name = "Fornecedor Teste LTDA"
+        db.query.return_value.filter.return_value.filter.return_value.all.return_value = [supplier]
+
+        matcher = SupplierMatcher(db, workspace_id=7)
+        matches = matcher.find_matching_suppliers("Fornecedor Teste", "12345678000190")
+
+        assert [match['supplier_id'] for match in matches] == [1]
+        assert matches[0]['match_type'] == 'exact_cnpj'
+        assert db.query.return_value.filter.return_value.filter.called